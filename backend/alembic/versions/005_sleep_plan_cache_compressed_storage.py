@@ -0,0 +1,50 @@
+"""sleep_plan_cache: 圧縮保存（plan_format / plan_data 追加、plan_json を nullable に）
+
+既存行は plan_format=0（平文 plan_json）のまま読み込めるため、データ移行は行わない。
+次回の再生成で PLAN_CACHE_CODEC の形式に書き換わる。
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sleep_plan_cache",
+        sa.Column("plan_format", sa.SmallInteger(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "sleep_plan_cache",
+        sa.Column("plan_data", sa.LargeBinary(), nullable=True),
+    )
+    op.alter_column("sleep_plan_cache", "plan_json", existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    # zlib 形式は平文に戻す。zstd 形式はキャッシュなので削除（次回リクエストで再生成される）
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text("SELECT user_id, plan_data FROM sleep_plan_cache WHERE plan_format = 1")
+    ).fetchall()
+    for user_id, data in rows:
+        bind.execute(
+            sa.text("UPDATE sleep_plan_cache SET plan_json = :text WHERE user_id = :user_id"),
+            {"text": zlib.decompress(data).decode("utf-8"), "user_id": user_id},
+        )
+    op.execute("DELETE FROM sleep_plan_cache WHERE plan_format >= 2")
+    op.alter_column("sleep_plan_cache", "plan_json", existing_type=sa.Text(), nullable=False)
+    op.drop_column("sleep_plan_cache", "plan_data")
+    op.drop_column("sleep_plan_cache", "plan_format")
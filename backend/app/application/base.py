@@ -4,7 +4,9 @@ UseCase 基底クラス
 """
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
+
+from app.application.tracing import trace_method
 
 InputT = TypeVar("InputT")
 OutputT = TypeVar("OutputT")
@@ -13,6 +15,12 @@ OutputT = TypeVar("OutputT")
 class BaseUseCase(ABC, Generic[InputT, OutputT]):
     """UseCase 基底クラス。各 UseCase は execute メソッドを実装する。"""
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # execute は "クラス名.execute" のスパンで囲む（トレーシング無効時はそのまま呼ぶだけ）
+        if "execute" in vars(cls):
+            cls.execute = trace_method(vars(cls)["execute"], "execute")  # type: ignore[method-assign]
+
     @abstractmethod
     async def execute(self, input: InputT) -> OutputT:
         """UseCase のメイン処理"""
@@ -22,6 +30,11 @@ class BaseUseCase(ABC, Generic[InputT, OutputT]):
 class NoInputUseCase(ABC, Generic[OutputT]):
     """入力なしの UseCase 基底クラス"""
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "execute" in vars(cls):
+            cls.execute = trace_method(vars(cls)["execute"], "execute")  # type: ignore[method-assign]
+
     @abstractmethod
     async def execute(self) -> OutputT:
         """UseCase のメイン処理"""
@@ -0,0 +1,13 @@
+"""Calendar ユースケース"""
+
+from app.application.calendar.sync_calendar import (
+    CalendarSyncConflictError,
+    SyncCalendarInput,
+    SyncCalendarUseCase,
+)
+
+__all__ = [
+    "SyncCalendarUseCase",
+    "SyncCalendarInput",
+    "CalendarSyncConflictError",
+]
@@ -0,0 +1,87 @@
+"""
+SyncCalendarUseCase - カレンダー予定の差分同期
+クライアントは前回の同期トークン以降に追加・変更・削除した予定だけを送る。
+同期トークンが無ければ全件同期（保存済みの予定を全て置き換える）。
+トークンが現在の状態と一致しなければ CalendarSyncConflictError（クライアントは全件同期し直す）。
+ダイジェストは変わった予定の分だけで更新するため、処理量は予定の総数ではなく変更数に比例する。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.application.base import BaseUseCase
+from app.domain.calendar.repositories import CalendarSyncState, ICalendarEventRepository
+from app.domain.calendar.value_objects import (
+    EMPTY_CALENDAR_DIGEST,
+    calendar_event_hash,
+    update_calendar_digest,
+)
+
+
+@dataclass
+class SyncCalendarInput:
+    """
+    upserts: 追加・変更した予定（ID → 予定。予定はプラン取得の calendar_events の要素と同じ形）
+    deletes: 削除した予定の ID（upserts にも含まれる ID は upserts が優先）
+    """
+
+    user_id: str
+    sync_token: str | None = None
+    upserts: dict[str, dict[str, Any]] = field(default_factory=dict)
+    deletes: list[str] = field(default_factory=list)
+
+
+class CalendarSyncConflictError(Exception):
+    """同期トークンが現在の状態と一致しない（別の端末が先に同期した・トークンが古い）"""
+
+    def __init__(self, current_token: str | None):
+        super().__init__(f"calendar sync token mismatch (current={current_token})")
+        self.current_token = current_token
+
+
+class SyncCalendarUseCase(BaseUseCase[SyncCalendarInput, CalendarSyncState]):
+    """カレンダー予定を差分で同期し、新しい同期状態（トークン・ダイジェスト）を返す UseCase"""
+
+    def __init__(self, calendar_repo: ICalendarEventRepository):
+        self.calendar_repo = calendar_repo
+
+    async def execute(self, input: SyncCalendarInput) -> CalendarSyncState:
+        state = await self.calendar_repo.get_state(input.user_id, for_update=True)
+        full = input.sync_token is None
+        if not full and (state is None or input.sync_token != state.sync_token):
+            raise CalendarSyncConflictError(state.sync_token if state is not None else None)
+
+        new_hashes = {
+            event_id: calendar_event_hash(event_id, event)
+            for event_id, event in input.upserts.items()
+        }
+        deletes = [
+            event_id for event_id in dict.fromkeys(input.deletes) if event_id not in new_hashes
+        ]
+        if full or state is None:
+            digest, event_count, old_hashes = EMPTY_CALENDAR_DIGEST, 0, {}
+        else:
+            digest, event_count = state.digest, state.event_count
+            old_hashes = await self.calendar_repo.get_event_hashes(
+                input.user_id, [*new_hashes, *deletes]
+            )
+
+        digest = update_calendar_digest(
+            digest, added=new_hashes.values(), removed=old_hashes.values()
+        )
+        event_count += len(new_hashes) - len(old_hashes)
+        await self.calendar_repo.replace(
+            input.user_id,
+            {event_id: (input.upserts[event_id], h) for event_id, h in new_hashes.items()},
+            [event_id for event_id in deletes if event_id in old_hashes],
+            clear=full,
+        )
+        new_state = CalendarSyncState(
+            version=(state.version if state is not None else 0) + 1,
+            digest=digest,
+            event_count=event_count,
+        )
+        await self.calendar_repo.save_state(input.user_id, new_state)
+        return new_state
@@ -1,8 +1,24 @@
 """Plan ユースケース"""
 
+from app.application.plan.get_current_plan import GetCurrentPlanUseCase
 from app.application.plan.get_or_create_plan import (
+    CalendarOutOfSyncError,
     GetOrCreatePlanInput,
     GetOrCreatePlanUseCase,
+    PlanRateLimitedError,
+    PlanResult,
 )
+from app.application.plan.metrics import PlanGenerationMetrics
+from app.application.plan.precompute import PlanPrecomputeMetrics, PlanPrecomputer
 
-__all__ = ["GetOrCreatePlanUseCase", "GetOrCreatePlanInput"]
+__all__ = [
+    "GetOrCreatePlanUseCase",
+    "GetOrCreatePlanInput",
+    "GetCurrentPlanUseCase",
+    "PlanResult",
+    "PlanRateLimitedError",
+    "CalendarOutOfSyncError",
+    "PlanGenerationMetrics",
+    "PlanPrecomputer",
+    "PlanPrecomputeMetrics",
+]
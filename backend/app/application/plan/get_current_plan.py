@@ -0,0 +1,20 @@
+"""
+GetCurrentPlanUseCase - 最新キャッシュ済みプランの取得（読み取り専用）
+入力（カレンダー・ログ・設定）を受け取らず、署名計算も LLM 呼び出しも行わない。
+ホーム画面の初期表示用に sleep_plan_cache の 1 行をそのまま返す。
+"""
+
+from __future__ import annotations
+
+from app.application.base import BaseUseCase
+from app.domain.plan.repositories import IPlanCacheRepository, PlanCacheRecord
+
+
+class GetCurrentPlanUseCase(BaseUseCase[str, PlanCacheRecord | None]):
+    """user_id の最新キャッシュ済みプランを返す UseCase（無ければ None）"""
+
+    def __init__(self, cache_repo: IPlanCacheRepository):
+        self.cache_repo = cache_repo
+
+    async def execute(self, input: str) -> PlanCacheRecord | None:
+        return await self.cache_repo.get_by_user_id(input)
@@ -3,18 +3,44 @@ GetOrCreatePlanUseCase - 週間睡眠プラン取得
 キャッシュヒットなら返却、ミスなら LLM で生成して保存して返す。
 force=True の場合はキャッシュを無視して再計算する。
 settings には today_override を含める（統合済み）。
+結果は保存形式の JSON 文字列のまま返し、ヒット時はパース・再エンコードを行わない。
+LLM 生成（force / キャッシュミス）はユーザーごとのレート制限を受け、超過時は最後のキャッシュを
+stale=True で返す（キャッシュも無ければ PlanRateLimitedError）。
+同じ入力（ユーザー × 署名ハッシュ）の生成はリース（IGenerationLease）で全ワーカー 1 つに絞り、
+リースを取れなかったリクエストは生成の完了を待ってキャッシュを読み直す（LLM を呼ばない）。
+週のキャッシュに無くても、日単位のキャッシュ（IPlanDayCacheRepository）に日ごとの署名が一致する日が
+あれば再利用し、足りない日だけを LLM で生成する（前後の日を文脈として渡す）。日付が進んだときは
+新しく週に入った日と入力の変わった日だけが生成対象になる。
+calendar_digest が指定された場合、予定はサーバーに同期済みのもの（ICalendarSnapshotReader）を使い、
+署名にはダイジェストを含める。予定はキャッシュミスのときだけ読み込む。
+shutdown（ShutdownCoordinator）を渡すと、生成は呼び出し側のキャンセルに関係なく保存まで続け、
+シャットダウン中の新しい生成は ShuttingDownError で断る。
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
-from typing import Any, cast
+from dataclasses import dataclass
+from typing import Any
+
+import orjson
 
 from app.application.base import BaseUseCase
-from app.application.plan.ports import IPlanGenerator
-from app.domain.plan.repositories import IPlanCacheRepository
-from app.domain.plan.value_objects import build_signature_hash
+from app.application.plan.metrics import PlanGenerationMetrics
+from app.application.plan.ports import (
+    IGenerationLease,
+    IPlanGenerator,
+    IPlanGeneratorAvailability,
+    IRateLimiter,
+    RateLimitPolicy,
+)
+from app.application.shutdown import ShutdownCoordinator
+from app.application.timing import timed
+from app.application.tracing import get_current_span
+from app.domain.calendar.repositories import ICalendarSnapshotReader
+from app.domain.plan.repositories import IPlanCacheRepository, IPlanDayCacheRepository, PlanDay
+from app.domain.plan.value_objects import build_day_signatures, build_signature_hash, plan_dates
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +56,7 @@ class GetOrCreatePlanInput:
         settings: dict[str, Any],
         today_date: str | None = None,
         force: bool = False,
+        calendar_digest: str | None = None,
     ):
         self.user_id = user_id
         self.calendar_events = calendar_events
@@ -37,26 +64,167 @@ class GetOrCreatePlanInput:
         self.settings = settings
         self.today_date = today_date
         self.force = force
+        # サーバーに同期済みの予定全体のダイジェスト（指定時は calendar_events を使わない）
+        self.calendar_digest = calendar_digest
+
+
+@dataclass
+class PlanResult:
+    """
+    プラン取得結果。plan_json は sleep_plan_cache に保存されている JSON そのもの（cache_hit は含まない）。
+    stale=True はレート制限により、今回の入力とは異なる最後のキャッシュを返したことを示す。
+    """
+
+    plan_json: str
+    cache_hit: bool
+    signature_hash: str
+    stale: bool = False
+    retry_after_seconds: float | None = None
+
+
+class PlanRateLimitedError(Exception):
+    """LLM 生成のレート制限を超え、代わりに返せるキャッシュも無い"""
 
+    def __init__(self, retry_after_seconds: float):
+        super().__init__(f"plan generation rate limited (retry after {retry_after_seconds:.0f}s)")
+        self.retry_after_seconds = retry_after_seconds
 
-class GetOrCreatePlanUseCase(BaseUseCase[GetOrCreatePlanInput, dict[str, Any]]):
+
+class CalendarOutOfSyncError(Exception):
+    """calendar_digest がサーバーに同期済みの予定のダイジェストと一致しない（クライアントは同期し直す）"""
+
+    def __init__(self, current_digest: str | None):
+        super().__init__(f"calendar digest mismatch (current={current_digest})")
+        self.current_digest = current_digest
+
+
+class GetOrCreatePlanUseCase(BaseUseCase[GetOrCreatePlanInput, PlanResult]):
     """週間睡眠プランを取得または生成する UseCase"""
 
     def __init__(
         self,
         cache_repo: IPlanCacheRepository,
         plan_generator: IPlanGenerator,
+        rate_limiter: IRateLimiter | None = None,
+        force_policy: RateLimitPolicy | None = None,
+        generate_policy: RateLimitPolicy | None = None,
+        lease: IGenerationLease | None = None,
+        lease_ttl_seconds: float = 90.0,
+        wait_timeout_seconds: float = 75.0,
+        poll_interval_seconds: float = 0.25,
+        metrics: PlanGenerationMetrics | None = None,
+        day_cache_repo: IPlanDayCacheRepository | None = None,
+        calendar_repo: ICalendarSnapshotReader | None = None,
+        shutdown: ShutdownCoordinator | None = None,
+        rate_limit_namespace: str = "plan",
+        availability: IPlanGeneratorAvailability | None = None,
     ):
         self.cache_repo = cache_repo
         self.plan_generator = plan_generator
+        self.rate_limiter = rate_limiter
+        self.force_policy = force_policy
+        self.generate_policy = generate_policy
+        self.lease = lease
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.metrics = metrics or PlanGenerationMetrics()
+        self.day_cache_repo = day_cache_repo
+        self.calendar_repo = calendar_repo
+        self.shutdown = shutdown
+        # レート制限のキーの接頭辞（事前計算は別のバケットを使い、ユーザーの生成枠を消費しない）
+        self.rate_limit_namespace = rate_limit_namespace
+        # 生成器を呼べるか（サーキットブレーカー）。レート制限のトークンを取る前に確認する
+        self.availability = availability
 
-    async def execute(self, input: GetOrCreatePlanInput) -> dict[str, Any]:
-        signature_hash = build_signature_hash(
-            input.calendar_events,
-            input.sleep_logs,
-            input.settings,
-            input.today_date,
+    async def _acquire_or_wait(
+        self, lease: IGenerationLease, key: str, input: GetOrCreatePlanInput, signature_hash: str
+    ) -> tuple[str | None, PlanResult | None]:
+        """
+        生成のリースを取る。取れれば (トークン, None)。
+        他が生成中なら解放まで待ち、その結果がキャッシュにあれば (None, 結果) を返す。
+        結果が無ければ（生成失敗など）リースを取り直して生成役になる。
+        wait_timeout_seconds を過ぎたら (None, None)（リース無しで生成する）。
+        """
+        token = await lease.try_acquire(key, self.lease_ttl_seconds)
+        if token is not None:
+            self.metrics.lease_acquired += 1
+            return token, None
+        self.metrics.lease_contended += 1
+        logger.info(
+            "plan generation in progress elsewhere, waiting signature_hash=%s", signature_hash
         )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout_seconds
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval_seconds)
+            if await lease.is_held(key):
+                continue
+            cached = await self.cache_repo.get_by_user_and_hash(input.user_id, signature_hash)
+            if cached:
+                self.metrics.coalesced += 1
+                logger.info("plan coalesced signature_hash=%s", signature_hash)
+                return None, PlanResult(
+                    plan_json=cached.plan_json,
+                    cache_hit=True,
+                    signature_hash=signature_hash,
+                )
+            token = await lease.try_acquire(key, self.lease_ttl_seconds)
+            if token is not None:
+                self.metrics.lease_acquired += 1
+                return token, None
+        self.metrics.wait_timeouts += 1
+        logger.warning(
+            "plan generation wait timed out after %.0fs signature_hash=%s",
+            self.wait_timeout_seconds,
+            signature_hash,
+        )
+        return None, None
+
+    async def _check_rate_limit(
+        self, input: GetOrCreatePlanInput, signature_hash: str
+    ) -> PlanResult | None:
+        """
+        LLM 生成前のレート制限。許可なら None。
+        超過時は最後のキャッシュを返す（無ければ PlanRateLimitedError）。
+        """
+        kind, policy = (
+            (f"{self.rate_limit_namespace}_force", self.force_policy)
+            if input.force
+            else (f"{self.rate_limit_namespace}_generate", self.generate_policy)
+        )
+        if self.rate_limiter is None or policy is None:
+            return None
+        decision = await self.rate_limiter.acquire(f"{kind}:{input.user_id}", policy)
+        if decision.allowed:
+            return None
+        logger.warning(
+            "plan rate limited kind=%s user_id=%s retry_after=%.0fs",
+            kind,
+            input.user_id[:8] + "...",
+            decision.retry_after_seconds,
+        )
+        cached = await self.cache_repo.get_by_user_id(input.user_id)
+        if cached is None:
+            raise PlanRateLimitedError(decision.retry_after_seconds)
+        return PlanResult(
+            plan_json=cached.plan_json,
+            cache_hit=True,
+            signature_hash=cached.signature_hash,
+            stale=cached.signature_hash != signature_hash,
+            retry_after_seconds=decision.retry_after_seconds,
+        )
+
+    async def execute(self, input: GetOrCreatePlanInput) -> PlanResult:
+        with timed("signature"):
+            signature_hash = build_signature_hash(
+                input.calendar_events,
+                input.sleep_logs,
+                input.settings,
+                input.today_date,
+                calendar_digest=input.calendar_digest,
+            )
         # デバッグ: リクエスト概要と signature_hash をログ（キャッシュ効きの切り分け用）
         sleep_logs_summary = [
             {"date": lg.get("date"), "score": lg.get("score"), "mood": lg.get("mood")}
@@ -80,29 +248,224 @@ class GetOrCreatePlanUseCase(BaseUseCase[GetOrCreatePlanInput, dict[str, Any]]):
 
         # force=True でなければキャッシュを検索
         if not input.force:
-            cached = await self.cache_repo.get_by_user_and_hash(input.user_id, signature_hash)
+            with timed("cache"):
+                cached = await self.cache_repo.get_by_user_and_hash(input.user_id, signature_hash)
             if cached:
                 logger.info("plan cache_hit signature_hash=%s", signature_hash)
                 print(f"[plan] cache_hit signature={signature_hash[:16]}...", flush=True)
-                plan = cast(dict[str, Any], json.loads(cached.plan_json))
-                plan["cache_hit"] = True
-                return plan
+                get_current_span().set_attribute("plan.cache_tier", "week")
+                return PlanResult(
+                    plan_json=cached.plan_json,
+                    cache_hit=True,
+                    signature_hash=signature_hash,
+                )
 
-        logger.info("plan cache_miss (or force) signature_hash=%s", signature_hash)
-        print(f"[plan] cache_miss (LLM生成) signature={signature_hash[:16]}...", flush=True)
-        # キャッシュミス（または force）: LLM で週間プラン生成
-        plan = await self.plan_generator.generate_week_plan(
-            input.calendar_events,
-            input.sleep_logs,
-            input.settings,
+        with timed("calendar"):
+            input = await self._with_synced_calendar(input)
+        with timed("days"):
+            day_signatures = self._day_signatures(input)
+            assembled = (
+                await self._assemble_from_days(input, signature_hash, day_signatures)
+                if not input.force and day_signatures
+                else None
+            )
+        if assembled is not None:
+            get_current_span().set_attribute("plan.cache_tier", "days")
+            return assembled
+
+        if self.shutdown is not None:
+            # シャットダウン中は新しい生成を始めない（リース・レート制限を取る前に断る）
+            self.shutdown.ensure_accepting()
+        lease_key = f"plan:{input.user_id}:{signature_hash}"
+        # 取得したリース（lease, トークン）。取れなかった・リース無しなら None
+        held: tuple[IGenerationLease, str] | None = None
+        lease = self.lease
+        if lease is not None:
+            with timed("lease"):
+                lease_token, coalesced = await self._acquire_or_wait(
+                    lease, lease_key, input, signature_hash
+                )
+            if coalesced is not None:
+                get_current_span().set_attribute("plan.cache_tier", "coalesced")
+                return coalesced
+            if lease_token is not None:
+                held = (lease, lease_token)
+        generation = self._generate_and_release(
+            input, signature_hash, day_signatures, lease_key, held
+        )
+        if self.shutdown is None:
+            return await generation
+        # リクエストがキャンセルされても生成・保存・リース解放までは続ける（シャットダウン時は drain が待つ）
+        return await self.shutdown.run(generation)
+
+    async def _generate_and_release(
+        self,
+        input: GetOrCreatePlanInput,
+        signature_hash: str,
+        day_signatures: dict[str, str] | None,
+        lease_key: str,
+        held: tuple[IGenerationLease, str] | None,
+    ) -> PlanResult:
+        try:
+            return await self._generate(input, signature_hash, day_signatures)
+        finally:
+            if held is not None:
+                lease, token = held
+                await lease.release(lease_key, token)
+
+    async def _with_synced_calendar(self, input: GetOrCreatePlanInput) -> GetOrCreatePlanInput:
+        """calendar_digest 指定時、同期済みの予定を読み込んだ入力を返す（ダイジェスト不一致はエラー）"""
+        if input.calendar_digest is None:
+            return input
+        snapshot = (
+            await self.calendar_repo.get_snapshot(input.user_id)
+            if self.calendar_repo is not None
+            else None
+        )
+        if snapshot is None or snapshot.digest != input.calendar_digest:
+            raise CalendarOutOfSyncError(snapshot.digest if snapshot is not None else None)
+        return GetOrCreatePlanInput(
+            user_id=input.user_id,
+            calendar_events=snapshot.events,
+            sleep_logs=input.sleep_logs,
+            settings=input.settings,
             today_date=input.today_date,
+            force=input.force,
+            calendar_digest=input.calendar_digest,
+        )
+
+    def _day_signatures(self, input: GetOrCreatePlanInput) -> dict[str, str] | None:
+        """週の各日の署名（日単位のキャッシュが無い・today_date が無い場合は None）"""
+        if self.day_cache_repo is None:
+            return None
+        dates = plan_dates(input.today_date)
+        if dates is None:
+            return None
+        return build_day_signatures(
+            input.calendar_events, input.sleep_logs, input.settings, dates, input.today_date
         )
-        plan_json = json.dumps(plan, ensure_ascii=False)
 
+    async def _reusable_days(
+        self, user_id: str, day_signatures: dict[str, str]
+    ) -> dict[str, PlanDay]:
+        """日単位のキャッシュのうち、署名が今回の入力と一致する日"""
+        assert self.day_cache_repo is not None
+        cached = await self.day_cache_repo.get_days(user_id, list(day_signatures))
+        return {d: day for d, day in cached.items() if day_signatures.get(d) == day.signature_hash}
+
+    async def _assemble_from_days(
+        self, input: GetOrCreatePlanInput, signature_hash: str, day_signatures: dict[str, str]
+    ) -> PlanResult | None:
+        """全ての日が日単位のキャッシュにあれば、LLM を呼ばずに週を組み立てて保存する"""
+        reusable = await self._reusable_days(input.user_id, day_signatures)
+        if len(reusable) < len(day_signatures):
+            return None
+        plan_json = _week_plan_json([reusable[d].day_json for d in day_signatures])
         await self.cache_repo.upsert(
-            user_id=input.user_id,
-            signature_hash=signature_hash,
-            plan_json=plan_json,
+            user_id=input.user_id, signature_hash=signature_hash, plan_json=plan_json
         )
-        plan["cache_hit"] = False
-        return plan
+        self.metrics.assembled += 1
+        self.metrics.days_reused += len(reusable)
+        logger.info("plan assembled from day cache signature_hash=%s", signature_hash)
+        return PlanResult(plan_json=plan_json, cache_hit=True, signature_hash=signature_hash)
+
+    async def _generate(
+        self,
+        input: GetOrCreatePlanInput,
+        signature_hash: str,
+        day_signatures: dict[str, str] | None = None,
+    ) -> PlanResult:
+        """レート制限を確認し、LLM で生成して保存する（日単位のキャッシュにある日は再利用する）"""
+        if self.availability is not None:
+            # LLM を呼べない間に生成枠のトークンを消費しない
+            self.availability.ensure_available()
+        with timed("rate_limit"):
+            limited = await self._check_rate_limit(input, signature_hash)
+        if limited is not None:
+            get_current_span().set_attribute("plan.cache_tier", "rate_limited")
+            return limited
+
+        reusable: dict[str, PlanDay] = {}
+        if day_signatures and not input.force:
+            reusable = await self._reusable_days(input.user_id, day_signatures)
+
+        logger.info("plan cache_miss (or force) signature_hash=%s", signature_hash)
+        print(f"[plan] cache_miss (LLM生成) signature={signature_hash[:16]}...", flush=True)
+        self.metrics.llm_calls += 1
+        # キャッシュの段階（week / days / coalesced / rate_limited / partial / miss）
+        get_current_span().set_attribute("plan.cache_tier", "partial" if reusable else "miss")
+        if day_signatures and reusable:
+            # 一部の日だけが変わった（日付が進んだ・その日の予定が変わった）: 足りない日だけを生成
+            missing = [d for d in day_signatures if d not in reusable]
+            logger.info("plan partial generation reused=%d missing=%s", len(reusable), missing)
+            self.metrics.partial_generations += 1
+            with timed("llm"):
+                days = await self.plan_generator.generate_days(
+                    input.calendar_events,
+                    input.sleep_logs,
+                    input.settings,
+                    input.today_date,
+                    dates=missing,
+                    context_days=[
+                        orjson.loads(reusable[d].day_json) for d in day_signatures if d in reusable
+                    ],
+                )
+            generated = _day_jsons(days, missing)
+            absent = [d for d in missing if d not in generated]
+            if absent:
+                # 欠けた週を全体の署名で保存すると、以後のヒットが欠けたままになる: 週全体を生成し直す
+                logger.warning("plan partial generation missing days=%s, regenerating week", absent)
+                self.metrics.partial_fallbacks += 1
+                self.metrics.llm_calls += 1
+                reusable = {}
+            else:
+                merged = {**{d: day.day_json for d, day in reusable.items()}, **generated}
+                plan_json = _week_plan_json([merged[d] for d in day_signatures])
+        if not (day_signatures and reusable):
+            # キャッシュミス（または force・一部の日の生成で日が欠けた）: LLM で週間プラン生成
+            with timed("llm"):
+                plan = await self.plan_generator.generate_week_plan(
+                    input.calendar_events,
+                    input.sleep_logs,
+                    input.settings,
+                    today_date=input.today_date,
+                )
+            plan_json = orjson.dumps(plan).decode("utf-8")
+            generated = (
+                _day_jsons(plan.get("week_plan"), list(day_signatures)) if day_signatures else {}
+            )
+
+        with timed("store"):
+            await self.cache_repo.upsert(
+                user_id=input.user_id,
+                signature_hash=signature_hash,
+                plan_json=plan_json,
+            )
+            if day_signatures and self.day_cache_repo is not None:
+                await self.day_cache_repo.upsert_days(
+                    input.user_id,
+                    [
+                        PlanDay(date=d, signature_hash=day_signatures[d], day_json=day_json)
+                        for d, day_json in generated.items()
+                    ],
+                    keep_from=input.today_date,
+                )
+        if day_signatures and self.day_cache_repo is not None:
+            self.metrics.days_reused += len(reusable)
+            self.metrics.days_generated += len(generated)
+        return PlanResult(plan_json=plan_json, cache_hit=False, signature_hash=signature_hash)
+
+
+def _day_jsons(days: Any, dates: list[str]) -> dict[str, str]:
+    """生成結果の日のうち dates に含まれるもの（先に現れたものを優先）を date → JSON にする"""
+    result: dict[str, str] = {}
+    for day in days if isinstance(days, list) else ():
+        d = day.get("date") if isinstance(day, dict) else None
+        if d in dates and d not in result:
+            result[d] = orjson.dumps(day).decode("utf-8")
+    return result
+
+
+def _week_plan_json(day_jsons: list[str]) -> str:
+    """日ごとの JSON を（パースせずに）{"week_plan": [...]} に連結する"""
+    return '{"week_plan":[' + ",".join(day_jsons) + "]}"
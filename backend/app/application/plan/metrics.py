@@ -0,0 +1,36 @@
+"""
+プラン生成の単一化（single-flight）と日単位キャッシュの再利用に関するカウンタ
+プロセス内の累積値。GET /health/metrics で参照する。
+"""
+
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class PlanGenerationMetrics:
+    """
+    lease_acquired: リースを取って LLM 生成した回数
+    lease_contended: 他の生成中のリースに当たった回数（ロック競合）
+    coalesced: 待った結果、他の生成結果を返して LLM 呼び出しを省いた回数
+    wait_timeouts: 待ち時間の上限を超え、リース無しで生成した回数
+    llm_calls: LLM を呼んだ回数（リース無しの生成を含む）
+    partial_generations: 日単位のキャッシュに無い日だけを LLM で生成した回数（llm_calls の内数）
+    partial_fallbacks: 一部の日の生成で日が欠け、週全体を生成し直した回数
+    assembled: 全ての日が日単位のキャッシュにあり、LLM を呼ばずに週を組み立てた回数
+    days_reused: 日単位のキャッシュから再利用した日数
+    days_generated: LLM で生成して日単位のキャッシュに保存した日数
+    """
+
+    lease_acquired: int = 0
+    lease_contended: int = 0
+    coalesced: int = 0
+    wait_timeouts: int = 0
+    llm_calls: int = 0
+    partial_generations: int = 0
+    partial_fallbacks: int = 0
+    assembled: int = 0
+    days_reused: int = 0
+    days_generated: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return asdict(self)
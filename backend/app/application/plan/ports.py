@@ -1,8 +1,9 @@
 """
 Plan ユースケースのポート（外部サービスインターフェース）
-Infrastructure 層の LLM クライアントが実装する。
+Infrastructure 層の LLM クライアント・レート制限が実装する。
 """
 
+from dataclasses import dataclass
 from typing import Any, Protocol
 
 
@@ -18,3 +19,77 @@ class IPlanGenerator(Protocol):
     ) -> dict[str, Any]:
         """カレンダー・睡眠ログ・設定・today_date から週間プラン JSON を生成する。settings に today_override を含む。"""
         ...
+
+    async def generate_days(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None,
+        dates: list[str],
+        context_days: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        """
+        週のうち dates の日だけを生成し、week_plan の要素（日ごとの dict）のリストを返す。
+        context_days は既に決まっている前後の日（整合させるための文脈）。
+        """
+        ...
+
+
+class PlanGeneratorUnavailableError(Exception):
+    """生成器（LLM）が一時的に使えない（障害が続きサーキットブレーカーが開いている）"""
+
+    def __init__(self, retry_after_seconds: float):
+        super().__init__(f"plan generator unavailable, retry after {retry_after_seconds:.0f}s")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class IPlanGeneratorAvailability(Protocol):
+    """生成器を今呼べるかの確認（サーキットブレーカー等）"""
+
+    def ensure_available(self) -> None:
+        """呼べなければ PlanGeneratorUnavailableError（レート制限のトークンを取る前に呼ぶ）"""
+        ...
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """トークンバケットの設定。burst 回まで連続で許可し、その後は refill_per_second で回復する"""
+
+    burst: float
+    refill_per_second: float
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """レート制限の判定結果。拒否時は retry_after_seconds 後に 1 トークン回復する"""
+
+    allowed: bool
+    retry_after_seconds: float = 0.0
+
+
+class IRateLimiter(Protocol):
+    """キー（ユーザー × 操作）ごとのトークンバケットで実行可否を判定するポート"""
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        """1 トークン消費できれば allowed=True（消費する）。できなければ allowed=False"""
+        ...
+
+
+class IGenerationLease(Protocol):
+    """
+    同じ入力のプラン生成を全ワーカーで 1 つに絞るためのリース（期限付きのロック）。
+    保持者が落ちても ttl_seconds で失効する。
+    """
+
+    async def try_acquire(self, key: str, ttl_seconds: float) -> str | None:
+        """取得できればリースの所有者トークンを返す。他が保持中なら None"""
+        ...
+
+    async def is_held(self, key: str) -> bool:
+        """有効なリースが存在するか"""
+        ...
+
+    async def release(self, key: str, token: str) -> None:
+        """try_acquire で得たトークンのリースを解放する（失効・他者に取られた後なら何もしない）"""
+        ...
@@ -0,0 +1,311 @@
+"""
+書き込み後のプラン事前計算
+設定の保存・睡眠ログの作成/更新・カレンダーの同期（ドメインイベント）を受け取り、そのユーザーのプランを裏で生成しておく。
+直近のプラン取得の入力に書き込みの内容を反映した入力（フロントエンドが次に送る body と同じ形。
+予定は直近の入力のもの、カレンダーを同期済みなら同期後のダイジェスト）で GetOrCreatePlanUseCase を
+実行し、次の POST /sleep-plans をキャッシュヒットにする。
+
+- キューは上限付き（max_queue）。満杯なら publish は受け付けずに False を返す（書き込み経路は待たせない）
+- 同じユーザーのイベントは 1 件にまとめ、最後のイベントから debounce_seconds 後に 1 回だけ生成する
+- 直近の入力はプロセス内（ワーカーごと）に持つため、そのワーカーでプランを取得したことのないユーザーは対象外
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any
+
+from app.application.plan.get_or_create_plan import GetOrCreatePlanInput, GetOrCreatePlanUseCase
+from app.domain.events import (
+    CalendarSynced,
+    DomainEvent,
+    SleepLogCreated,
+    SleepLogUpdated,
+    SleepSettingsChanged,
+)
+from app.domain.plan.value_objects import JST
+
+logger = logging.getLogger(__name__)
+
+# フロントエンドがプラン取得で送る睡眠ログの件数（直近 7 件）
+PLAN_SLEEP_LOG_LIMIT = 7
+
+
+@dataclass
+class PlanPrecomputeMetrics:
+    """
+    プロセス内の累積値（GET /health/metrics で参照）
+    published: 受け付けたイベント数 / coalesced: 既に待っている同じユーザーにまとめた数
+    rejected: キューが満杯で受け付けなかった数 / skipped: 直近の入力が無く対象外にした数
+    regenerated: 事前計算で LLM 生成した数 / already_cached: 事前計算の時点で既にキャッシュにあった数
+    rate_limited: レート制限で生成しなかった数 / failed: 事前計算の失敗数
+    reads_after_write / hits_after_write: 書き込み後の最初のプラン取得の数と、そのうちキャッシュヒットの数
+    """
+
+    published: int = 0
+    coalesced: int = 0
+    rejected: int = 0
+    skipped: int = 0
+    regenerated: int = 0
+    already_cached: int = 0
+    rate_limited: int = 0
+    failed: int = 0
+    reads_after_write: int = 0
+    hits_after_write: int = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        data: dict[str, Any] = asdict(self)
+        data["hit_after_write_rate"] = (
+            round(self.hits_after_write / self.reads_after_write, 3)
+            if self.reads_after_write
+            else 0.0
+        )
+        return data
+
+
+def _plan_settings(event: SleepSettingsChanged) -> dict[str, Any]:
+    """保存された設定を、プラン取得の settings と同じ形にする"""
+    settings: dict[str, Any] = {
+        "wake_up_time": f"{event.wake_up_hour:02d}:{event.wake_up_minute:02d}",
+        "sleep_duration_hours": event.sleep_duration_hours,
+        "preparation_minutes": event.preparation_minutes,
+    }
+    override = event.today_override
+    if override is not None:
+        settings["today_override"] = {
+            "date": override.date.isoformat(),
+            "sleepHour": override.sleep_hour,
+            "sleepMinute": override.sleep_minute,
+            "wakeHour": override.wake_hour,
+            "wakeMinute": override.wake_minute,
+        }
+    return settings
+
+
+def _plan_sleep_log(event: SleepLogCreated | SleepLogUpdated) -> dict[str, Any]:
+    """作成・更新された睡眠ログを、プラン取得の sleep_logs の要素と同じ形にする（時刻は JST）"""
+    scheduled = event.scheduled_sleep_time
+    return {
+        "date": event.date.isoformat(),
+        "score": event.score,
+        "scheduled_sleep_time": scheduled.astimezone(JST).isoformat(timespec="seconds")
+        if scheduled is not None
+        else None,
+        "mood": event.mood,
+    }
+
+
+def apply_events(
+    base: GetOrCreatePlanInput, events: list[DomainEvent], today_date: str
+) -> GetOrCreatePlanInput:
+    """直近のプラン取得の入力に、書き込みイベントを順に反映した入力を返す"""
+    settings = dict(base.settings)
+    calendar_events, calendar_digest = base.calendar_events, base.calendar_digest
+    logs = {str(lg.get("date")): lg for lg in base.sleep_logs if isinstance(lg, dict)}
+    for event in events:
+        if isinstance(event, SleepSettingsChanged):
+            settings.pop("today_override", None)
+            settings.update(_plan_settings(event))
+        elif isinstance(event, CalendarSynced):
+            # 同期後のクライアントは予定の代わりにダイジェストを送る
+            calendar_events, calendar_digest = [], event.digest
+        else:
+            logs[event.date.isoformat()] = _plan_sleep_log(event)
+    # today_override は今日の日付のものだけを送る（フロントエンドと同じ）
+    override = settings.get("today_override")
+    if isinstance(override, dict) and override.get("date") != today_date:
+        del settings["today_override"]
+    recent = sorted(logs.values(), key=lambda lg: str(lg.get("date")), reverse=True)
+    return GetOrCreatePlanInput(
+        user_id=base.user_id,
+        calendar_events=calendar_events,
+        sleep_logs=recent[:PLAN_SLEEP_LOG_LIMIT],
+        settings=settings,
+        today_date=today_date,
+        calendar_digest=calendar_digest,
+    )
+
+
+def _today_jst() -> str:
+    return datetime.now(JST).date().isoformat()
+
+
+@dataclass
+class _Pending:
+    events: list[DomainEvent] = field(default_factory=list)
+    due: float = 0.0
+
+
+class PlanPrecomputer:
+    """
+    IDomainEventPublisher の実装。イベントをユーザー単位でまとめて上限付きキューに積み、
+    workers 個のタスクが debounce_seconds 待ってからプランを生成する（start() で開始）。
+    """
+
+    def __init__(
+        self,
+        usecase_factory: Callable[[], GetOrCreatePlanUseCase],
+        *,
+        enabled: bool = True,
+        debounce_seconds: float = 3.0,
+        max_queue: int = 1000,
+        workers: int = 2,
+        max_users: int = 10000,
+        metrics: PlanPrecomputeMetrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], str] = _today_jst,
+    ):
+        self.usecase_factory = usecase_factory
+        self.enabled = enabled
+        self.debounce_seconds = debounce_seconds
+        self.workers = workers
+        self.max_users = max_users
+        self.metrics = metrics or PlanPrecomputeMetrics()
+        self._clock = clock
+        self._today = today
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self._pending: dict[str, _Pending] = {}
+        self._inputs: OrderedDict[str, GetOrCreatePlanInput] = OrderedDict()
+        self._awaiting_read: set[str] = set()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**self.metrics.snapshot(), "queue_depth": self.queue_depth}
+
+    def worker_status(self) -> dict[str, Any]:
+        """ワーカーの生存状況（alive < started なら落ちたワーカーがある）"""
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "started": len(self._tasks),
+            "alive": sum(not task.done() for task in self._tasks),
+        }
+
+    def remember(self, input: GetOrCreatePlanInput) -> None:
+        """プラン取得の入力を、そのユーザーの事前計算の元として覚える（古いユーザーから捨てる）"""
+        if not self.enabled:
+            return
+        self._inputs.pop(input.user_id, None)
+        while len(self._inputs) >= self.max_users:
+            evicted, _ = self._inputs.popitem(last=False)
+            # 覚えていないユーザーは事前計算しないので、書き込み後の取得も待たない
+            self._awaiting_read.discard(evicted)
+        self._inputs[input.user_id] = GetOrCreatePlanInput(
+            user_id=input.user_id,
+            calendar_events=input.calendar_events,
+            sleep_logs=input.sleep_logs,
+            settings=input.settings,
+            today_date=input.today_date,
+            calendar_digest=input.calendar_digest,
+        )
+
+    def record_read(self, user_id: str, cache_hit: bool) -> None:
+        """プラン取得の結果。書き込み後の最初の取得ならヒット率に数える"""
+        if user_id not in self._awaiting_read:
+            return
+        self._awaiting_read.discard(user_id)
+        self.metrics.reads_after_write += 1
+        if cache_hit:
+            self.metrics.hits_after_write += 1
+
+    def publish(self, event: DomainEvent) -> bool:
+        """イベントを受け付ける（ブロックしない）。受け付けなければ False"""
+        if not self.enabled:
+            return False
+        user_id = event.user_id
+        if user_id not in self._inputs:
+            self.metrics.skipped += 1
+            return False
+        due = self._clock() + self.debounce_seconds
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            pending.events.append(event)
+            pending.due = due
+            self.metrics.coalesced += 1
+        else:
+            try:
+                self._queue.put_nowait(user_id)
+            except asyncio.QueueFull:
+                self.metrics.rejected += 1
+                logger.warning("plan precompute queue full, dropping user_id=%s", user_id[:8])
+                return False
+            self._pending[user_id] = _Pending(events=[event], due=due)
+        self.metrics.published += 1
+        self._awaiting_read.add(user_id)
+        return True
+
+    def start(self) -> None:
+        if self.enabled and not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"plan-precompute-{i}")
+                for i in range(self.workers)
+            ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        if self._pending:
+            logger.info("plan precompute stopped with %d pending users", len(self._pending))
+
+    async def join(self) -> None:
+        """キューに積まれた事前計算が全て終わるまで待つ"""
+        await self._queue.join()
+
+    async def _worker(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            try:
+                await self._wait_quiet(user_id)
+                await self._run(user_id)
+            except Exception as e:
+                self.metrics.failed += 1
+                logger.warning("plan precompute failed user_id=%s: %s", user_id[:8], e)
+            finally:
+                self._queue.task_done()
+
+    async def _wait_quiet(self, user_id: str) -> None:
+        """最後のイベントから debounce_seconds 経つまで待つ（待つ間に届いたイベントで延びる）"""
+        while True:
+            pending = self._pending.get(user_id)
+            delay = pending.due - self._clock() if pending is not None else 0.0
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def _run(self, user_id: str) -> None:
+        pending = self._pending.pop(user_id, None)
+        base = self._inputs.get(user_id)
+        if pending is None or base is None:
+            self.metrics.skipped += 1
+            self._awaiting_read.discard(user_id)
+            return
+        input = apply_events(base, pending.events, self._today())
+        self._inputs[user_id] = input
+        result = await self.usecase_factory().execute(input)
+        if result.retry_after_seconds is not None:
+            self.metrics.rate_limited += 1
+        elif result.cache_hit:
+            self.metrics.already_cached += 1
+        else:
+            self.metrics.regenerated += 1
+        logger.info(
+            "plan precomputed user_id=%s events=%d cache_hit=%s",
+            user_id[:8],
+            len(pending.events),
+            result.cache_hit,
+        )
@@ -0,0 +1,119 @@
+"""
+シャットダウン時の LLM 生成の退避（graceful drain）
+生成（LLM 呼び出し〜sleep_plan_cache への保存）は ShutdownCoordinator.run で独立したタスクとして走らせ、
+リクエストがキャンセルされても（uvicorn の --timeout-graceful-shutdown・クライアント切断）最後まで続ける。
+SIGTERM（drain_on_signal）または lifespan の終了で退避を始め、以降の新しい生成は ShuttingDownError で断る。
+drain() は退避開始から deadline_seconds まで実行中の生成を待ち、間に合わなかった分だけキャンセルする。
+"""
+
+import asyncio
+import logging
+import signal
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ShuttingDownError(Exception):
+    """シャットダウン中のため新しい生成を受け付けない（他のインスタンスで再試行する）"""
+
+
+class ShutdownCoordinator:
+    """実行中の生成を追跡し、シャットダウン時に期限まで待つ"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self.draining_since: float | None = None
+        self.rejected = 0
+        self.drained = 0
+        self.abandoned = 0
+
+    @property
+    def draining(self) -> bool:
+        return self.draining_since is not None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def begin_drain(self) -> None:
+        """新しい生成の受け付けをやめる（シグナルハンドラーからも呼べるよう、フラグを立てるだけ）"""
+        if self.draining_since is None:
+            self.draining_since = self._clock()
+
+    def ensure_accepting(self) -> None:
+        """退避中なら ShuttingDownError（生成のリース・レート制限を取る前に呼ぶ）"""
+        if self.draining:
+            self.rejected += 1
+            raise ShuttingDownError()
+
+    async def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        coro を独立したタスクで実行して結果を待つ。呼び出し側がキャンセルされてもタスクは止めない
+        （コンテキストは引き継ぐため、Server-Timing・スパンはそのリクエストに記録される）。
+        """
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return await asyncio.shield(task)
+
+    async def drain(self, deadline_seconds: float) -> None:
+        """退避を始め（済みならそのまま）、開始から deadline_seconds まで実行中の生成を待つ"""
+        self.begin_drain()
+        assert self.draining_since is not None
+        pending = set(self._tasks)
+        if not pending:
+            return
+        remaining = max(0.0, self.draining_since + deadline_seconds - self._clock())
+        logger.info("draining %d in-flight plan generations (%.1fs left)", len(pending), remaining)
+        done, pending = await asyncio.wait(pending, timeout=remaining)
+        self.drained += len(done)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            self.abandoned += len(pending)
+            logger.warning("abandoned %d plan generations at shutdown deadline", len(pending))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "drained": self.drained,
+            "abandoned": self.abandoned,
+        }
+
+
+def drain_on_signal(
+    coordinator: ShutdownCoordinator, signum: int = signal.SIGTERM
+) -> Callable[[], None]:
+    """
+    signum を受けたら退避を始めてから、元のハンドラー（uvicorn の終了処理）を呼ぶようにする。
+    戻り値を呼ぶと元のハンドラーに戻す。メインスレッド以外では何もしない。
+    """
+    try:
+        previous = signal.getsignal(signum)
+
+        def handler(sig: int, frame: Any) -> None:
+            coordinator.begin_drain()
+            if callable(previous):
+                previous(sig, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(sig, signal.SIG_DFL)
+                signal.raise_signal(sig)
+
+        signal.signal(signum, handler)
+    except ValueError:
+        # signal.signal はメインスレッドでしか使えない（テストのクライアントなど）
+        return lambda: None
+
+    def restore() -> None:
+        signal.signal(signum, previous)
+
+    return restore
@@ -0,0 +1,112 @@
+"""
+リクエスト内の区間計測（Server-Timing）
+ServerTimingMiddleware がサンプリングしたリクエストにだけ RequestTiming を contextvar に置き、
+依存性・ユースケース・インフラ層は timed("名前") で区間を計測する。
+ヘッダーで返すのは expose_timing_header() を呼んだリクエスト（管理者）だけで、それ以外は集計とログにだけ使う。
+サンプリング外のリクエストでは timed は contextvar を 1 回読むだけで何もしない。
+同じ名前の区間は合計する（LLM の再試行やキャッシュの読み直しなど）。
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class RequestTiming:
+    """1 リクエストの区間（名前 → 合計秒・回数。記録順を保つ）"""
+
+    started: float = field(default_factory=time.perf_counter)
+    spans: dict[str, list[float]] = field(default_factory=dict)
+    # レスポンス開始時に確定した全体の秒数（finish 前は None）
+    total: float | None = None
+    # Server-Timing ヘッダーを返すか（管理者のリクエストだけ。計測・集計は常に行う）
+    expose_header: bool = False
+
+    def add(self, name: str, seconds: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+    def finish(self) -> float:
+        """全体の秒数を確定する（2 回目以降は最初の値を返す）"""
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+        return self.total
+
+    def header_value(self) -> str:
+        """Server-Timing ヘッダーの値（区間の後に total）"""
+        parts = [f"{name};dur={span[0] * 1000:.1f}" for name, span in self.spans.items()]
+        parts.append(f"total;dur={self.finish() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# サンプリングされたリクエストの RequestTiming（それ以外は None）
+current_timing: ContextVar[RequestTiming | None] = ContextVar("current_timing", default=None)
+
+
+def expose_timing_header() -> None:
+    """このリクエストのレスポンスに Server-Timing ヘッダーを付ける（認証で管理者と分かったとき）"""
+    timing = current_timing.get()
+    if timing is not None:
+        timing.expose_header = True
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """with timed("cache"): ... の区間を現在のリクエストの Server-Timing に加える"""
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class ServerTimingMetrics:
+    """サンプリングしたリクエストの区間の累積（区間名 → SpanStats。GET /health/metrics で参照）"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.spans: dict[str, SpanStats] = {}
+
+    def record(self, timing: RequestTiming) -> None:
+        self.requests += 1
+        for name, (seconds, _count) in [*timing.spans.items(), ("total", (timing.finish(), 1))]:
+            stats = self.spans.setdefault(name, SpanStats())
+            ms = seconds * 1000
+            stats.count += 1
+            stats.total_ms += ms
+            stats.max_ms = max(stats.max_ms, ms)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "spans": {name: stats.snapshot() for name, stats in self.spans.items()},
+        }
+
+
+server_timing_metrics = ServerTimingMetrics()
@@ -0,0 +1,257 @@
+"""
+トレーシング（ユースケース・リポジトリ・SQL・LLM 呼び出しのスパン）
+スパンは OpenTelemetry と同じ形（trace_id 128bit / span_id 64bit の 16 進、親スパン、
+開始・終了の UNIX ナノ秒、属性、状態）で、終了時に exporter へ渡す。
+exporter が無ければ無効（既定）。無効時の span() / start_span() は属性の組み立ても行わずに返る。
+
+- tracer.span("名前"): with で囲んだ区間を現在のスパンの子にし、その間の現在のスパンにする
+- tracer.start_span / end_span: 現在のスパンを切り替えない末端のスパン（SQL・ストリーミング応答）
+- trace_method / traced_methods: async メソッド・クラスの公開 async メソッドをスパンで囲む
+  （BaseUseCase.execute とリポジトリ）
+OpenTelemetry SDK へ送る場合は、Span を OTLP に変換する SpanExporter を実装して tracer.exporter に渡す。
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import secrets
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+AttributeValue = str | bool | int | float
+
+
+@dataclass
+class Span:
+    """終了したスパン（OpenTelemetry の ReadableSpan に相当する項目）"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_time_unix_nano: int
+    end_time_unix_nano: int | None = None
+    attributes: dict[str, AttributeValue] = field(default_factory=dict)
+    # UNSET / OK / ERROR
+    status: str = "UNSET"
+    status_description: str | None = None
+
+    def set_attribute(self, key: str, value: AttributeValue | None) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_description = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_unix_nano or time.time_ns()
+        return (end - self.start_time_unix_nano) / 1_000_000
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _NonRecordingSpan:
+    """トレーシング無効時・スパン外で返す、何も記録しないスパン"""
+
+    def set_attribute(self, key: str, value: AttributeValue | None) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+class SpanExporter(Protocol):
+    """終了したスパンの送り先"""
+
+    def export(self, spans: Sequence[Span]) -> None: ...
+
+
+class InMemorySpanExporter:
+    """終了したスパンをメモリに溜める（テスト・デバッグ用。max_spans を超えたら古いものから捨てる）"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+            del self._spans[: max(0, len(self._spans) - self.max_spans)]
+
+    def get_finished_spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class LoggingSpanExporter:
+    """終了したスパンを 1 件 1 行の JSON で INFO ログに出す"""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        for span in spans:
+            logger.info("span %s", json.dumps(span.to_dict(), ensure_ascii=False))
+
+
+def build_span_exporter(name: str) -> SpanExporter | None:
+    """TRACING_EXPORTER（none | memory | log）から exporter を作る（none なら None = 無効）"""
+    if name == "none":
+        return None
+    if name == "memory":
+        return InMemorySpanExporter()
+    if name == "log":
+        return LoggingSpanExporter()
+    raise ValueError(f"未知の TRACING_EXPORTER: {name}")
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Span | _NonRecordingSpan:
+    """現在のスパン（無効時・スパン外では何も記録しないスパン）"""
+    return _current_span.get() or NON_RECORDING_SPAN
+
+
+class Tracer:
+    """スパンを作って exporter に渡す。exporter が None の間は無効"""
+
+    def __init__(self, exporter: SpanExporter | None = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(
+        self, name: str, attributes: dict[str, AttributeValue] | None = None
+    ) -> Span | None:
+        """現在のスパンの子を開始する（現在のスパンは切り替えない）。無効なら None"""
+        if self.exporter is None:
+            return None
+        parent = _current_span.get()
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent is not None else None,
+            start_time_unix_nano=time.time_ns(),
+            attributes=dict(attributes) if attributes else {},
+        )
+
+    def end_span(self, span: Span | None, error: BaseException | None = None) -> None:
+        """start_span したスパンを終了して exporter に渡す"""
+        if span is None:
+            return
+        span.end_time_unix_nano = time.time_ns()
+        if error is not None:
+            span.record_error(error)
+        elif span.status == "UNSET":
+            span.status = "OK"
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export([span])
+        except Exception as e:
+            logger.warning("span export failed: %s", e)
+
+    @contextmanager
+    def span(
+        self, name: str, attributes: dict[str, AttributeValue] | None = None
+    ) -> Iterator[Span | _NonRecordingSpan]:
+        """with で囲んだ区間のスパン。区間内では現在のスパンになる"""
+        span = self.start_span(name, attributes)
+        if span is None:
+            yield NON_RECORDING_SPAN
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            _current_span.reset(token)
+            self.end_span(span, e)
+            raise
+        _current_span.reset(token)
+        self.end_span(span)
+
+
+# プロセス全体のトレーサー（main が TRACING_EXPORTER から exporter を設定する）
+tracer = Tracer()
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+_C = TypeVar("_C", bound=type)
+
+
+def _row_count(result: Any) -> int | None:
+    """リポジトリの戻り値の行数（None は 0 行、1 件のオブジェクトは 1 行。bool 等は数えない）"""
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, dict, set)):
+        return len(result)
+    if isinstance(result, (bool, int, float, str, bytes)):
+        return None
+    return 1
+
+
+def _traced(fn: _F, name: Callable[[tuple[Any, ...]], str], count_rows: bool) -> _F:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if tracer.exporter is None:
+            return await fn(*args, **kwargs)
+        with tracer.span(name(args)) as span:
+            result = await fn(*args, **kwargs)
+            if count_rows:
+                span.set_attribute("db.rows", _row_count(result))
+            return result
+
+    wrapper.__traced__ = True  # type: ignore[attr-defined]
+    return wrapper  # type: ignore[return-value]
+
+
+def trace_async(name: str) -> Callable[[_F], _F]:
+    """async 関数を name のスパンで囲むデコレーター。無効時は関数をそのまま呼ぶだけ"""
+    return lambda fn: _traced(fn, lambda _args: name, count_rows=False)
+
+
+def trace_method(fn: _F, method: str, count_rows: bool = False) -> _F:
+    """async メソッドを "実行時のクラス名.method" のスパンで囲む（基底クラスのメソッドも呼び出し側のクラス名になる）"""
+    if getattr(fn, "__traced__", False):
+        return fn
+    return _traced(fn, lambda args: f"{type(args[0]).__name__}.{method}", count_rows)
+
+
+def traced_methods(cls: _C) -> _C:
+    """クラスの公開 async メソッドをスパンで囲むクラスデコレーター（戻り値の行数を db.rows に記録）"""
+    for attr, fn in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(fn):
+            setattr(cls, attr, trace_method(fn, attr, count_rows=True))
+    return cls
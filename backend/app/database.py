@@ -6,9 +6,10 @@
 from app.infrastructure.persistence.database import (
     AsyncSessionLocal,
     Base,
+    dispose_engines,
     engine,
     get_db,
     init_db,
 )
 
-__all__ = ["AsyncSessionLocal", "Base", "engine", "get_db", "init_db"]
+__all__ = ["AsyncSessionLocal", "Base", "dispose_engines", "engine", "get_db", "init_db"]
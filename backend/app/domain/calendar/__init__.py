@@ -0,0 +1,18 @@
+"""Calendar ドメイン（サーバー側に保存するカレンダー予定と差分同期）"""
+
+from app.domain.calendar.repositories import (
+    CalendarSnapshot,
+    CalendarSyncState,
+    ICalendarEventRepository,
+    ICalendarSnapshotReader,
+)
+from app.domain.calendar.value_objects import EMPTY_CALENDAR_DIGEST, calendar_event_hash
+
+__all__ = [
+    "CalendarSnapshot",
+    "CalendarSyncState",
+    "ICalendarEventRepository",
+    "ICalendarSnapshotReader",
+    "EMPTY_CALENDAR_DIGEST",
+    "calendar_event_hash",
+]
@@ -0,0 +1,65 @@
+"""
+カレンダー予定リポジトリのポート（インターフェース）
+Infrastructure 層がこのインターフェースを実装する。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+
+@dataclass(frozen=True)
+class CalendarSyncState:
+    """
+    ユーザーのカレンダーの同期状態（1 ユーザー 1 行）
+    version: 同期のたびに 1 増える（同期トークンの元）/ digest: 保存済みの予定全体のダイジェスト
+    """
+
+    version: int
+    digest: str
+    event_count: int
+
+    @property
+    def sync_token(self) -> str:
+        return str(self.version)
+
+
+@dataclass(frozen=True)
+class CalendarSnapshot:
+    """保存済みの予定全体（events はプラン取得の calendar_events と同じ形）"""
+
+    digest: str
+    events: list[dict[str, Any]]
+
+
+class ICalendarSnapshotReader(Protocol):
+    """保存済みの予定全体の読み取りポート（プラン取得用）"""
+
+    async def get_snapshot(self, user_id: str) -> CalendarSnapshot | None:
+        """保存済みの予定全体とダイジェスト。一度も同期していなければ None"""
+        ...
+
+
+class ICalendarEventRepository(ICalendarSnapshotReader, Protocol):
+    """サーバー側に保存するカレンダー予定のリポジトリポート"""
+
+    async def get_state(self, user_id: str, for_update: bool = False) -> CalendarSyncState | None:
+        """同期状態を取得（for_update なら同じユーザーの同期を直列化するため行ロック）"""
+        ...
+
+    async def get_event_hashes(self, user_id: str, event_ids: list[str]) -> dict[str, str]:
+        """event_ids のうち保存済みの予定を ID → 予定ハッシュで返す"""
+        ...
+
+    async def replace(
+        self,
+        user_id: str,
+        upserts: dict[str, tuple[dict[str, Any], str]],
+        deletes: list[str],
+        clear: bool = False,
+    ) -> None:
+        """予定を ID ごとに上書き（なければ INSERT）・削除する。clear なら先に全件削除する"""
+        ...
+
+    async def save_state(self, user_id: str, state: CalendarSyncState) -> None:
+        """同期状態を保存する（なければ INSERT）"""
+        ...
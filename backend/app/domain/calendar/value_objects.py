@@ -0,0 +1,32 @@
+"""
+カレンダーのダイジェスト（保存済みの予定全体を表すハッシュ）
+予定ごとのハッシュを 2^256 を法として足し合わせるため、並び順に依存せず、
+予定の追加・変更・削除のたびに変わった予定の分だけで更新できる（全件を読み直さない）。
+"""
+
+import hashlib
+import json
+from collections.abc import Iterable
+from typing import Any
+
+_DIGEST_MODULUS = 1 << 256
+# 予定が 1 件も無いカレンダーのダイジェスト
+EMPTY_CALENDAR_DIGEST = "0" * 64
+
+
+def calendar_event_hash(event_id: str, event: dict[str, Any]) -> str:
+    """予定 1 件（クライアントの ID と内容）の SHA-256"""
+    canonical = json.dumps({"id": event_id, "event": event}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def update_calendar_digest(
+    digest: str, added: Iterable[str] = (), removed: Iterable[str] = ()
+) -> str:
+    """ダイジェストに added の予定ハッシュを加え、removed の予定ハッシュを除いた値を返す"""
+    value = int(digest, 16)
+    for h in added:
+        value += int(h, 16)
+    for h in removed:
+        value -= int(h, 16)
+    return f"{value % _DIGEST_MODULUS:064x}"
@@ -0,0 +1,71 @@
+"""
+ドメインイベント
+書き込み（設定の保存・睡眠ログの作成/更新・カレンダーの同期）が完了したことを、書き込み経路から購読者へ知らせる。
+購読者（プランの事前計算など）は書き込み経路をブロックしてはならない。
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Protocol
+
+
+@dataclass(frozen=True)
+class TodayOverrideSnapshot:
+    """保存された今日のオーバーライド"""
+
+    date: date
+    sleep_hour: int
+    sleep_minute: int
+    wake_hour: int
+    wake_minute: int
+
+
+@dataclass(frozen=True)
+class SleepSettingsChanged:
+    """睡眠設定が保存された（プランに効く項目のみ）"""
+
+    user_id: str
+    wake_up_hour: int
+    wake_up_minute: int
+    sleep_duration_hours: int
+    preparation_minutes: int
+    today_override: TodayOverrideSnapshot | None = None
+
+
+@dataclass(frozen=True)
+class SleepLogCreated:
+    """睡眠ログが作成された"""
+
+    user_id: str
+    date: date
+    score: int
+    scheduled_sleep_time: datetime | None
+    mood: int | None
+
+
+@dataclass(frozen=True)
+class SleepLogUpdated:
+    """睡眠ログが更新された（気分の記録を含む。更新後の値）"""
+
+    user_id: str
+    date: date
+    score: int
+    scheduled_sleep_time: datetime | None
+    mood: int | None
+
+
+@dataclass(frozen=True)
+class CalendarSynced:
+    """カレンダー予定が差分同期された（同期後の予定全体のダイジェスト）"""
+
+    user_id: str
+    digest: str
+
+
+DomainEvent = SleepSettingsChanged | SleepLogCreated | SleepLogUpdated | CalendarSynced
+
+
+class IDomainEventPublisher(Protocol):
+    """ドメインイベントの発行ポート（ブロックしない。受け付けなかった場合は False）"""
+
+    def publish(self, event: DomainEvent) -> bool: ...
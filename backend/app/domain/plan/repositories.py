@@ -3,13 +3,21 @@
 Infrastructure 層がこのインターフェースを実装する。
 """
 
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Protocol
 
 
 class PlanCacheRecord(Protocol):
     """キャッシュレコードのプロトコル（plan_json を持つ）"""
 
-    plan_json: str
+    signature_hash: str
+    created_at: datetime
+
+    @property
+    def plan_json(self) -> str:
+        """週間プランの JSON 文字列（保存形式から復元した値。読み取り専用）"""
+        ...
 
 
 class IPlanCacheRepository(Protocol):
@@ -28,3 +36,26 @@ class IPlanCacheRepository(Protocol):
     async def upsert(self, user_id: str, signature_hash: str, plan_json: str) -> PlanCacheRecord:
         """同一 user_id の行を上書き（なければ INSERT）"""
         ...
+
+
+@dataclass(frozen=True)
+class PlanDay:
+    """日単位のプランキャッシュの 1 日分（day_json は week_plan の要素 1 つの JSON）"""
+
+    date: str
+    signature_hash: str
+    day_json: str
+
+
+class IPlanDayCacheRepository(Protocol):
+    """日単位の睡眠プランキャッシュのリポジトリポート（1 ユーザー × 日付で 1 行）"""
+
+    async def get_days(self, user_id: str, dates: list[str]) -> dict[str, PlanDay]:
+        """dates（YYYY-MM-DD）のうち保存済みの日を date → PlanDay で返す"""
+        ...
+
+    async def upsert_days(
+        self, user_id: str, days: list[PlanDay], keep_from: str | None = None
+    ) -> None:
+        """同じ日付の行を上書き（なければ INSERT）。keep_from より前の日付の行は削除する"""
+        ...
@@ -3,12 +3,19 @@
 入力データ（カレンダー予定・睡眠ログ・設定・today_date）から署名ハッシュを生成する。
 settings には today_override を含める（統合済み）。
 同じ入力なら同じハッシュになり、キャッシュヒット判定に使う。
+日単位のキャッシュ用に、1 日分のプランに効く入力だけから日ごとの署名も生成する（build_day_signatures）。
 """
 
 import hashlib
 import json
 import re
+from datetime import date, datetime, timedelta
 from typing import Any
+from zoneinfo import ZoneInfo
+
+JST = ZoneInfo("Asia/Tokyo")
+# 週間プランの日数（today_date から 7 日）
+PLAN_DAYS = 7
 
 # ISO 8601 日時（YYYY-MM-DDTHH:MM:SS の後は .fff や Z 等）にマッチ。秒単位に切り詰めて正規化する
 _ISO_DATETIME_RE = re.compile(
@@ -60,18 +67,104 @@ def build_signature_hash(
     sleep_logs: list[Any],
     settings: dict[str, Any],
     today_date: str | None = None,
+    calendar_digest: str | None = None,
 ) -> str:
     """
     カレンダー予定・睡眠ログ・設定・today_date を正規化し、SHA-256 の先頭 64 文字を返す。
 
     - settings には today_override を含める（統合済み）
     - today_date が日付跨ぎでキャッシュを区別するために署名に含まれる
+    - calendar_digest（サーバーに同期済みの予定全体のダイジェスト）があれば、予定の代わりに署名に含める
+      （予定の件数に関係なく一定の計算量で済む）
     """
     payload = {
-        "calendar_events": _sorted_canonical_list(calendar_events, sort_key="start"),
+        "calendar_events": {"digest": calendar_digest}
+        if calendar_digest is not None
+        else _sorted_canonical_list(calendar_events, sort_key="start"),
         "sleep_logs": _sorted_canonical_list(sleep_logs, sort_key="date"),
         "settings": _canonical_value(settings),
         "today_date": today_date or "",
     }
     canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
     return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def plan_dates(today_date: str | None, days: int = PLAN_DAYS) -> list[str] | None:
+    """today_date から days 日分の日付（YYYY-MM-DD）。today_date が無い・不正なら None"""
+    if not today_date:
+        return None
+    try:
+        start = date.fromisoformat(today_date)
+    except ValueError:
+        return None
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def _event_date_jst(event: Any) -> str | None:
+    """予定の開始日（JST の YYYY-MM-DD）。判定できなければ None"""
+    start = event.get("start") if isinstance(event, dict) else None
+    if not isinstance(start, str):
+        return None
+    try:
+        if "T" in start:
+            dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+            return dt.astimezone(JST).date().isoformat()
+        return date.fromisoformat(start[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def _hash_payload(payload: dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_day_signatures(
+    calendar_events: list[Any],
+    sleep_logs: list[Any],
+    settings: dict[str, Any],
+    dates: list[str],
+    today_date: str | None = None,
+) -> dict[str, str]:
+    """
+    dates の各日について、その日のプランに効く入力だけから署名ハッシュを作る（date → ハッシュ）。
+
+    - その日と翌日（JST）の予定。開始日が判定できない予定は全ての日に含める
+    - その日の前日・当日の睡眠ログ
+    - today_override を除いた設定。today_override はその日が today_date のときだけ含める
+    - today_date 自体は含めない（日付が進んでも、入力の変わらない日は同じハッシュのまま）
+    """
+    events_by_date: dict[str, list[Any]] = {}
+    undated_events: list[Any] = []
+    for ev in calendar_events:
+        d = _event_date_jst(ev)
+        if d is None:
+            undated_events.append(ev)
+        else:
+            events_by_date.setdefault(d, []).append(ev)
+    logs_by_date: dict[str, list[Any]] = {}
+    for lg in sleep_logs:
+        if isinstance(lg, dict) and lg.get("date"):
+            logs_by_date.setdefault(str(lg["date"])[:10], []).append(lg)
+    base_settings = _canonical_value({k: v for k, v in settings.items() if k != "today_override"})
+    today_override = settings.get("today_override")
+
+    signatures: dict[str, str] = {}
+    for d in dates:
+        day = date.fromisoformat(d)
+        prev_day = (day - timedelta(days=1)).isoformat()
+        next_day = (day + timedelta(days=1)).isoformat()
+        payload = {
+            "date": d,
+            "calendar_events": _sorted_canonical_list(
+                [*events_by_date.get(d, []), *events_by_date.get(next_day, []), *undated_events],
+                sort_key="start",
+            ),
+            "sleep_logs": _sorted_canonical_list(
+                [*logs_by_date.get(prev_day, []), *logs_by_date.get(d, [])], sort_key="date"
+            ),
+            "settings": base_settings,
+            "today_override": _canonical_value(today_override) if d == today_date else None,
+        }
+        signatures[d] = _hash_payload(payload)
+    return signatures
@@ -1,11 +1,11 @@
 """
 Supabase JWT 検証: アクセストークンから user_id を取得する。
+supabase SDK（gotrue・postgrest・realtime・storage を含む）は読み込みが重いため、
+起動時ではなく最初の検証のときに import する。
 """
 
 import logging
 
-from supabase import create_client
-
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -27,6 +27,8 @@ def verify_supabase_jwt(access_token: str) -> str:
     if not settings.SUPABASE_URL or not settings.SUPABASE_ANON_KEY:
         raise ValueError("Supabase is not configured (SUPABASE_URL / SUPABASE_ANON_KEY)")
 
+    from supabase import create_client
+
     try:
         client = create_client(
             settings.SUPABASE_URL,
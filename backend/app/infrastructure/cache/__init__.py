@@ -0,0 +1,29 @@
+"""プロセス内キャッシュと、PostgreSQL LISTEN/NOTIFY によるワーカー間の無効化"""
+
+from app.infrastructure.cache.invalidation import (
+    TOPIC_PLAN,
+    TOPIC_SETTINGS,
+    TOPIC_SLEEP_LOGS,
+    InvalidationListener,
+    build_invalidation_listener,
+)
+from app.infrastructure.cache.local import (
+    MISSING,
+    TOPIC_USER,
+    CacheRegistry,
+    LocalCache,
+    cache_registry,
+)
+
+__all__ = [
+    "MISSING",
+    "TOPIC_PLAN",
+    "TOPIC_SETTINGS",
+    "TOPIC_SLEEP_LOGS",
+    "TOPIC_USER",
+    "CacheRegistry",
+    "InvalidationListener",
+    "LocalCache",
+    "build_invalidation_listener",
+    "cache_registry",
+]
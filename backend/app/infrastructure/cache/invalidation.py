@@ -0,0 +1,228 @@
+"""
+PostgreSQL LISTEN/NOTIFY によるワーカー間のキャッシュ無効化バス
+
+- 送信: ORM セッションで users / sleep_settings / sleep_logs / sleep_plan_cache に書き込むと、
+  COMMIT 直前に同じトランザクションで pg_notify を発行する（NOTIFY は COMMIT 時にだけ配信され、
+  ロールバックすれば届かない）。自プロセスのキャッシュは COMMIT 直後にその場で消す。
+- 受信: InvalidationListener（lifespan で起動）が専用接続で LISTEN し、他ワーカーの通知で
+  該当エントリを消す。切断時はバックオフ付きで再接続し、その間はキャッシュを短い TTL で運用する。
+
+CACHE_INVALIDATION_BACKEND=none（既定）の場合は送信も受信もせず、TTL だけで期限切れにする。
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction
+
+from app.config import settings
+from app.infrastructure.cache.local import ALL_KEYS, TOPIC_USER, CacheRegistry, cache_registry
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+TOPIC_SETTINGS = "settings"
+TOPIC_SLEEP_LOGS = "sleep_logs"
+TOPIC_PLAN = "plan"
+
+# テーブル → (トピック, キーにする列)
+_TABLE_TOPICS = {
+    "users": (TOPIC_USER, "id"),
+    "sleep_settings": (TOPIC_SETTINGS, "user_id"),
+    "sleep_logs": (TOPIC_SLEEP_LOGS, "user_id"),
+    "sleep_plan_cache": (TOPIC_PLAN, "user_id"),
+}
+# pg_notify の payload 上限（8000 バイト）に収まるよう 1 通あたりの件数を抑える
+_MAX_KEYS_PER_NOTIFY = 100
+
+# 自プロセスが送った通知を受信時に読み飛ばすための識別子
+ORIGIN_ID = uuid.uuid4().hex[:12]
+
+# session.info のキー（COMMIT 時に通知する (topic, key) の集合）
+_SESSION_INVALIDATIONS = "cache_invalidations"
+
+
+class InvalidationPublisher:
+    """COMMIT 時に pg_notify を発行するか（CACHE_INVALIDATION_BACKEND=postgres のときだけ発行する）"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+
+
+publisher = InvalidationPublisher(settings.CACHE_INVALIDATION_BACKEND == "postgres")
+
+
+def _record(session: Session, topic: str, key: str) -> None:
+    session.info.setdefault(_SESSION_INVALIDATIONS, set()).add((topic, key))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_rows(session: Session, _flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table not in _TABLE_TOPICS:
+            continue
+        topic, column = _TABLE_TOPICS[table]
+        key = getattr(obj, column, None)
+        _record(session, topic, str(key) if key is not None else ALL_KEYS)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_statements(orm_execute_state: ORMExecuteState) -> None:
+    if not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    name = getattr(table, "name", None)
+    if name in _TABLE_TOPICS:
+        # どの行が変わったか分からないため、トピック内を全て消す
+        _record(orm_execute_state.session, _TABLE_TOPICS[name][0], ALL_KEYS)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session: Session) -> None:
+    if not publisher.enabled:
+        return
+    if session.new or session.dirty or session.deleted:
+        # before_commit は COMMIT 時の flush より先に呼ばれるため、ここで flush して変更を確定させる
+        session.flush()
+    pending = sorted(session.info.get(_SESSION_INVALIDATIONS, ()))
+    for i in range(0, len(pending), _MAX_KEYS_PER_NOTIFY):
+        payload = json.dumps({"o": ORIGIN_ID, "k": pending[i : i + _MAX_KEYS_PER_NOTIFY]})
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload}
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session: Session) -> None:
+    for topic, key in session.info.pop(_SESSION_INVALIDATIONS, ()):
+        cache_registry.evict(topic, key)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_rollback(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_SESSION_INVALIDATIONS, None)
+
+
+def listener_dsn(url: str) -> str:
+    """SQLAlchemy の URL（postgresql+asyncpg://）を asyncpg.connect 用の DSN に変換する"""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class InvalidationListener:
+    """
+    専用の asyncpg 接続で CHANNEL を LISTEN し、他ワーカーの無効化を registry に配る。
+    接続が切れたら registry を切断状態（短い TTL）にし、バックオフ（上限 max_backoff 秒・ジッター付き）で再接続する。
+    繋がっている間も keepalive_seconds ごとに SELECT 1 で生存確認する（無通知の切断対策）。
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        registry: CacheRegistry = cache_registry,
+        *,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        keepalive_seconds: float = 30.0,
+        connect: Callable[[str], Awaitable[Any]] = asyncpg.connect,
+    ):
+        self.dsn = dsn
+        self.registry = registry
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.keepalive_seconds = keepalive_seconds
+        self._connect = connect
+        self._task: asyncio.Task[None] | None = None
+        self._lost = asyncio.Event()
+        self.connects = 0
+        self.received = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.registry.connected
+
+    @property
+    def running(self) -> bool:
+        """再接続ループが動いているか（切断中でも再接続を試みていれば True）"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache-invalidation-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self.registry.set_connected(False)
+
+    def _on_notification(self, _conn: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            if message.get("o") == ORIGIN_ID:
+                return
+            for topic, key in message.get("k", []):
+                self.registry.evict(topic, key)
+            self.received += 1
+        except (ValueError, TypeError):
+            logger.warning("invalid cache invalidation payload: %.200s", payload)
+
+    def _on_termination(self, _conn: Any) -> None:
+        self._lost.set()
+
+    async def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            conn = None
+            try:
+                conn = await self._connect(self.dsn)
+                conn.add_termination_listener(self._on_termination)
+                await conn.add_listener(CHANNEL, self._on_notification)
+                self._lost.clear()
+                # 切断中の通知は届いていないため、繋がった時点でキャッシュを空にしてから長い TTL に戻す
+                self.registry.set_connected(True)
+                self.connects += 1
+                backoff = self.min_backoff
+                logger.info("cache invalidation listener connected")
+                while True:
+                    try:
+                        await asyncio.wait_for(self._lost.wait(), timeout=self.keepalive_seconds)
+                        break
+                    except TimeoutError:
+                        await asyncio.wait_for(conn.execute("SELECT 1"), timeout=5)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("cache invalidation listener error: %s", e)
+            finally:
+                if self.registry.connected:
+                    self.registry.set_connected(False)
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            delay = backoff * random.uniform(0.5, 1.0)
+            backoff = min(self.max_backoff, backoff * 2)
+            logger.info("cache invalidation listener reconnecting in %.1fs", delay)
+            await asyncio.sleep(delay)
+
+
+def build_invalidation_listener(backend: str) -> InvalidationListener | None:
+    """CACHE_INVALIDATION_BACKEND（none | postgres）からリスナーを作る（none なら None）"""
+    if backend == "none":
+        return None
+    if backend == "postgres":
+        return InvalidationListener(listener_dsn(settings.DATABASE_URL))
+    raise ValueError(f"未知の CACHE_INVALIDATION_BACKEND: {backend}")
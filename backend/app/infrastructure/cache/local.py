@@ -0,0 +1,175 @@
+"""
+プロセス内キャッシュ（ユーザー単位のキー）と、その登録簿
+他ワーカーの書き込みは無効化バス（invalidation.py）経由で消す。バスが繋がっていない間は
+取りこぼしがあり得るため、短い TTL（LOCAL_CACHE_FALLBACK_TTL_SECONDS）で期限切れにする。
+DB から読んで載せるとき（cache-aside）は、読む前に generation(key) を取り、set_if_generation で載せる。
+読んでいる間に書き込みの無効化が来ていれば載せない（読んだ古い行で新しい書き込みを上書きしない）。
+"""
+
+import time
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+
+from app.config import settings
+
+V = TypeVar("V")
+
+# get() のキャッシュミス（None もキャッシュできるよう区別する）
+MISSING: Any = object()
+
+# 全キャッシュから消すトピック（ユーザー削除など）
+TOPIC_USER = "user"
+# キーを特定できない書き込み（一括 UPDATE/DELETE など）はトピック内を全て消す
+ALL_KEYS = "*"
+
+
+class LocalCache(Generic[V]):
+    """
+    TTL と件数上限つきのキャッシュ。topic ごとに CacheRegistry に登録され、無効化で消される。
+    TTL は登録簿の状態（バス接続中か否か）で決まり、切り替わると既存エントリにも即座に効く。
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        *,
+        max_entries: int | None = None,
+        registry: "CacheRegistry | None" = None,
+    ):
+        self.topic = topic
+        self.max_entries = max_entries or settings.LOCAL_CACHE_MAX_ENTRIES
+        self._registry = registry or cache_registry
+        self._entries: dict[str, tuple[float, V]] = {}
+        # 無効化の通し番号。key ごとに最後に消した番号を覚える（古いものから max_entries 件まで）
+        self._evictions = 0
+        self._evicted_at: dict[str, int] = {}
+        # これ以前の番号は、忘れた key・全消しの分を含めて「消されたかもしれない」とみなす
+        self._evicted_floor = 0
+        self.hits = 0
+        self.misses = 0
+        self._registry.register(self)
+
+    def get(self, key: str, default: Any = MISSING) -> V | Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        stored_at, value = entry
+        if self._registry.clock() - stored_at >= self._registry.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        if self._registry.ttl_seconds <= 0:
+            return
+        self._entries.pop(key, None)
+        while len(self._entries) >= self.max_entries:
+            # 挿入順の古いものから捨てる
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (self._registry.clock(), value)
+
+    def generation(self, key: str) -> int:
+        """DB から読む前に取る番号（set_if_generation に渡す）"""
+        return self._evictions
+
+    def set_if_generation(self, key: str, generation: int, value: V) -> bool:
+        """generation を取ってから key が無効化されていなければ載せる。載せたら True"""
+        if generation < self._evicted_floor or self._evicted_at.get(key, 0) > generation:
+            return False
+        self.set(key, value)
+        return True
+
+    def _mark_evicted(self, key: str | None) -> None:
+        self._evictions += 1
+        if key is None:
+            self._evicted_at.clear()
+            self._evicted_floor = self._evictions
+            return
+        self._evicted_at.pop(key, None)
+        self._evicted_at[key] = self._evictions
+        while len(self._evicted_at) > self.max_entries:
+            oldest = next(iter(self._evicted_at))
+            self._evicted_floor = self._evicted_at.pop(oldest)
+
+    def evict(self, key: str) -> None:
+        if key == ALL_KEYS:
+            self._entries.clear()
+            self._mark_evicted(None)
+        else:
+            self._entries.pop(key, None)
+            self._mark_evicted(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._mark_evicted(None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class CacheRegistry:
+    """
+    プロセス内キャッシュの登録簿。無効化メッセージ（topic, key）を該当キャッシュに配る。
+    connected はバス（LISTEN）が繋がっているか。繋がっている間だけ長い TTL を使う。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        fallback_ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.connected_ttl_seconds = ttl_seconds
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.clock = clock
+        self.connected = False
+        self._caches: list[LocalCache[Any]] = []
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self.connected_ttl_seconds if self.connected else self.fallback_ttl_seconds
+
+    def register(self, cache: LocalCache[Any]) -> None:
+        self._caches.append(cache)
+
+    def evict(self, topic: str, key: str) -> None:
+        """topic のキャッシュから key を消す。TOPIC_USER なら全キャッシュから消す"""
+        for cache in self._caches:
+            if topic == TOPIC_USER or cache.topic == topic:
+                cache.evict(key)
+
+    def set_connected(self, connected: bool) -> None:
+        """
+        バスの接続状態を切り替える。切断中・再接続前の通知は取りこぼしている可能性があるため、
+        どちらに切り替わる場合も全キャッシュを空にする。
+        """
+        self.connected = connected
+        for cache in self._caches:
+            cache.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """キャッシュごとの件数とヒット率（GET /debug/health）"""
+        return {
+            "connected": self.connected,
+            "ttl_seconds": self.ttl_seconds,
+            "caches": {cache.topic: cache.snapshot() for cache in self._caches},
+        }
+
+
+cache_registry = CacheRegistry(
+    ttl_seconds=settings.LOCAL_CACHE_TTL_SECONDS,
+    fallback_ttl_seconds=settings.LOCAL_CACHE_FALLBACK_TTL_SECONDS,
+)
@@ -0,0 +1,111 @@
+"""
+LLM 呼び出しのサーキットブレーカー（プロセス内）
+連続 failure_threshold 回失敗すると開き（open）、reset_seconds の間は呼び出さずに
+PlanGeneratorUnavailableError で即座に失敗させる（タイムアウトまで待たせない・障害中の API を叩き続けない）。
+reset_seconds 後は 1 件だけ試し（half_open）、成功すれば閉じ、失敗すればまた開く。
+失敗として数えるのは API 側の障害（接続・タイムアウト・5xx: is_outage）だけ。応答はあったが
+出力が不完全・形式違反だった場合は API が生きているとみなす（出力の問題でブレーカーを開かない）。
+状態は GET /health/ready・/debug/health で参照できる。
+"""
+
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.application.plan.ports import PlanGeneratorUnavailableError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_outage(error: BaseException) -> bool:
+    """API 側の障害か（接続エラー・タイムアウト・5xx）。それ以外の失敗はブレーカーに数えない"""
+    # httpx は起動を軽くするため OpenRouter クライアントと一緒に読み込む（呼び出し後なら読み込み済み）
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError | TimeoutError)
+
+
+class CircuitBreaker:
+    """連続失敗数で開閉するサーキットブレーカー"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if self._clock() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def retry_after_seconds(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (self._clock() - self._opened_at))
+
+    def ensure_available(self) -> None:
+        """
+        開いている（または試行中）なら PlanGeneratorUnavailableError。half_open の試行枠は取らない。
+        レート制限のトークンを取る前に呼び、呼べないときにユーザーの生成枠を減らさない。
+        """
+        state = self.state
+        if state == CLOSED or (state == HALF_OPEN and not self._trial_in_flight):
+            return
+        self.rejected += 1
+        raise PlanGeneratorUnavailableError(self.retry_after_seconds() or self.reset_seconds)
+
+    def before_call(self) -> None:
+        """呼び出してよければ何もしない。開いている（または試行中）なら PlanGeneratorUnavailableError"""
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        # 試行中は結果が出るまで待たせず、次の試行までの目安として reset_seconds を返す
+        raise PlanGeneratorUnavailableError(self.retry_after_seconds() or self.reset_seconds)
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            if self._opened_at is None or self._trial_in_flight:
+                self.opens += 1
+            self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """呼び出しが結果を出さずに終わった（キャンセル）。試行中なら次の呼び出しで試し直す"""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after_seconds": round(self.retry_after_seconds(), 1),
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
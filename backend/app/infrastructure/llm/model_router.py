@@ -0,0 +1,359 @@
+"""
+入力の複雑さによるモデルの振り分け（IPlanGenerator の前段）
+予定の数・重なり・早朝の予定・今日のオーバーライド・低スコアの連続から複雑さを点数化し、
+PLAN_MODEL_TIERS の表から段階（モデル・出力トークン上限）を選ぶ。大半を占める単純な週は
+速く安いモデルに回す。段階ごとのレイテンシとトークン数を記録する（GET /health/metrics）。
+呼び出しはサーキットブレーカー（circuit_breaker.py）を通し、障害が続く間は LLM を呼ばずに失敗させる。
+OpenRouter クライアント（httpx・プロンプト組み立て）は起動を軽くするため、最初の生成のときに読み込む。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Coroutine
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from app.infrastructure.llm.circuit_breaker import CircuitBreaker, is_outage
+
+if TYPE_CHECKING:
+    from app.infrastructure.llm.openrouter_client import OpenRouterClient
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 複雑さの重み（1 件・1 回あたりの点数）
+EVENT_WEIGHT = 1
+CONFLICT_WEIGHT = 3
+EARLY_EVENT_WEIGHT = 2
+OVERRIDE_WEIGHT = 2
+BAD_STREAK_WEIGHT = 1
+# 早朝の予定（この時刻より前に始まる予定。起床時刻を逆算する必要がある）
+EARLY_EVENT_BEFORE = "08:00"
+# 低スコアとみなす睡眠ログの score
+BAD_SCORE_BELOW = 60
+# 低スコアがこの日数以上続いたら連続日数ぶん加点する
+BAD_STREAK_MIN_DAYS = 2
+PLAN_WINDOW_DAYS = 8  # 今日から 7 日分 + 最終日の「翌日」
+
+
+@dataclass(frozen=True)
+class PlanComplexity:
+    """プラン入力の複雑さ（score が段階の選択に使う合計点）"""
+
+    events: int
+    conflicts: int
+    early_events: int
+    override: bool
+    bad_streak: int
+
+    @property
+    def score(self) -> int:
+        streak = self.bad_streak if self.bad_streak >= BAD_STREAK_MIN_DAYS else 0
+        return (
+            self.events * EVENT_WEIGHT
+            + self.conflicts * CONFLICT_WEIGHT
+            + self.early_events * EARLY_EVENT_WEIGHT
+            + (OVERRIDE_WEIGHT if self.override else 0)
+            + streak * BAD_STREAK_WEIGHT
+        )
+
+
+def _window(today_date: str | None) -> tuple[str, str] | None:
+    if not today_date:
+        return None
+    try:
+        start = date.fromisoformat(today_date)
+    except ValueError:
+        return None
+    return start.isoformat(), (start + timedelta(days=PLAN_WINDOW_DAYS - 1)).isoformat()
+
+
+def _longest_bad_streak(sleep_logs: list[Any]) -> int:
+    scores = sorted(
+        (str(lg.get("date")), lg.get("score"))
+        for lg in sleep_logs
+        if isinstance(lg, dict) and lg.get("date")
+    )
+    longest = run = 0
+    for _d, score in scores:
+        run = run + 1 if isinstance(score, int | float) and score < BAD_SCORE_BELOW else 0
+        longest = max(longest, run)
+    return longest
+
+
+def score_plan_input(
+    calendar_events: list[Any],
+    sleep_logs: list[Any],
+    settings: dict[str, Any],
+    today_date: str | None = None,
+) -> PlanComplexity:
+    """プラン入力の複雑さを数える（today_date があれば対象期間内の予定だけを数える）"""
+    from app.infrastructure.llm.openrouter_client import _enrich_calendar_events_with_date_jst
+
+    window = _window(today_date)
+    timed: dict[str, list[tuple[str, str]]] = {}
+    events = early = 0
+    for ev in _enrich_calendar_events_with_date_jst(calendar_events):
+        day = ev.get("date_jst")
+        if window is not None and (day is None or not window[0] <= day <= window[1]):
+            continue
+        events += 1
+        start, end = ev.get("start"), ev.get("end")
+        # 時刻付きの予定は JST の "YYYY-MM-DD HH:MM" に変換されている（終日は日付のみ）
+        if isinstance(start, str) and len(start) == 16 and day is not None:
+            if start[11:] < EARLY_EVENT_BEFORE:
+                early += 1
+            end = end if isinstance(end, str) and len(end) == 16 else start
+            timed.setdefault(day, []).append((start, end))
+
+    conflicts = 0
+    for spans in timed.values():
+        spans.sort()
+        latest_end = ""
+        for start, end in spans:
+            if start < latest_end:
+                conflicts += 1
+            latest_end = max(latest_end, end)
+
+    return PlanComplexity(
+        events=events,
+        conflicts=conflicts,
+        early_events=early,
+        override=bool(settings.get("today_override")),
+        bad_streak=_longest_bad_streak(sleep_logs),
+    )
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """段階 1 つ。score が min_score 以上のうち最も高い段階が選ばれる"""
+
+    name: str
+    model: str
+    max_tokens: int
+    min_score: int
+
+
+def parse_model_tiers(spec: str, default_model: str) -> list[ModelTier]:
+    """
+    PLAN_MODEL_TIERS（"名前:モデル:max_tokens:min_score" のカンマ区切り）を解釈する。
+    モデルが空なら default_model（OPENROUTER_MODEL）。spec が空なら default_model の 1 段階のみ。
+    """
+    tiers: list[ModelTier] = []
+    for item in (x.strip() for x in spec.split(",")):
+        if not item:
+            continue
+        parts = item.split(":")
+        if len(parts) < 4:
+            raise ValueError(f"PLAN_MODEL_TIERS の形式が不正です: {item!r}")
+        # モデル名に ":"（例: deepseek/...:free）を含められるよう、名前と末尾 2 項目以外をモデルとする
+        name, model, max_tokens, min_score = (
+            parts[0],
+            ":".join(parts[1:-2]),
+            parts[-2],
+            parts[-1],
+        )
+        tiers.append(
+            ModelTier(
+                name=name.strip(),
+                model=model.strip() or default_model,
+                max_tokens=int(max_tokens),
+                min_score=int(min_score),
+            )
+        )
+    if not tiers:
+        return [ModelTier(name="default", model=default_model, max_tokens=2048, min_score=0)]
+    if len({t.name for t in tiers}) != len(tiers):
+        raise ValueError("PLAN_MODEL_TIERS の段階名が重複しています")
+    return sorted(tiers, key=lambda t: t.min_score)
+
+
+def select_tier(tiers: list[ModelTier], score: int) -> ModelTier:
+    """score が min_score 以上の段階のうち最も上の段階（どれにも届かなければ最下段）"""
+    chosen = tiers[0]
+    for tier in tiers:
+        if score >= tier.min_score:
+            chosen = tier
+    return chosen
+
+
+@dataclass
+class TierStats:
+    """段階ごとの累積値"""
+
+    requests: int = 0
+    errors: int = 0
+    latency_ms_total: float = 0.0
+    latency_ms_max: float = 0.0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    # 最初の本文が届くまでの時間（成功したリクエストの合計）
+    first_token_ms_total: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        ok = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms_avg": round(self.latency_ms_total / self.requests, 1)
+            if self.requests
+            else 0.0,
+            "latency_ms_max": round(self.latency_ms_max, 1),
+            "first_token_ms_avg": round(self.first_token_ms_total / ok, 1) if ok else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 3)
+            if self.prompt_tokens
+            else 0.0,
+            "completion_tokens": self.completion_tokens,
+            "completion_tokens_avg": round(self.completion_tokens / ok, 1) if ok else 0.0,
+        }
+
+
+class PlanModelMetrics:
+    """段階名 → TierStats"""
+
+    def __init__(self) -> None:
+        self.tiers: dict[str, TierStats] = {}
+
+    def record(
+        self, tier: str, latency_seconds: float, usage: dict[str, int] | None, ok: bool
+    ) -> None:
+        stats = self.tiers.setdefault(tier, TierStats())
+        latency_ms = latency_seconds * 1000
+        stats.requests += 1
+        stats.errors += 0 if ok else 1
+        stats.latency_ms_total += latency_ms
+        stats.latency_ms_max = max(stats.latency_ms_max, latency_ms)
+        if usage:
+            stats.prompt_tokens += usage.get("prompt_tokens", 0)
+            stats.cached_tokens += usage.get("cached_tokens", 0)
+            stats.first_token_ms_total += usage.get("first_token_ms", 0)
+            stats.completion_tokens += usage.get("completion_tokens", 0)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {name: stats.snapshot() for name, stats in self.tiers.items()}
+
+
+plan_model_metrics = PlanModelMetrics()
+
+
+class ModelRoutingPlanGenerator:
+    """IPlanGenerator の実装。入力の複雑さで段階を選び、その段階の OpenRouterClient で生成する"""
+
+    def __init__(
+        self,
+        tiers: list[ModelTier],
+        clients: dict[str, OpenRouterClient] | None = None,
+        metrics: PlanModelMetrics | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        if not tiers:
+            raise ValueError("tiers が空です")
+        self.tiers = tiers
+        # 段階ごとのクライアント（渡されなかった段階は最初に使うときに作る）
+        self.clients: dict[str, OpenRouterClient] = dict(clients or {})
+        self.metrics = metrics or plan_model_metrics
+        # 全段階で共有する（段階が違っても同じ OpenRouter に向くため）
+        self.breaker = breaker or CircuitBreaker()
+
+    def _client(self, tier: ModelTier) -> OpenRouterClient:
+        client = self.clients.get(tier.name)
+        if client is None:
+            from app.infrastructure.llm.openrouter_client import OpenRouterClient
+
+            client = OpenRouterClient(model=tier.model, max_tokens=tier.max_tokens)
+            self.clients[tier.name] = client
+        return client
+
+    def select(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None = None,
+    ) -> tuple[ModelTier, PlanComplexity]:
+        complexity = score_plan_input(calendar_events, sleep_logs, settings, today_date)
+        return select_tier(self.tiers, complexity.score), complexity
+
+    async def generate_week_plan(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None = None,
+    ) -> dict[str, Any]:
+        tier = self._select_logged(calendar_events, sleep_logs, settings, today_date)
+        return await self._run(
+            tier,
+            self._client(tier).generate_week_plan_with_usage(
+                calendar_events, sleep_logs, settings, today_date=today_date
+            ),
+        )
+
+    async def generate_days(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None,
+        dates: list[str],
+        context_days: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        # 一部の日だけの生成も、入力全体の複雑さで段階を選ぶ（同じ週なら同じモデルで揃える）
+        tier = self._select_logged(calendar_events, sleep_logs, settings, today_date)
+        return await self._run(
+            tier,
+            self._client(tier).generate_days_with_usage(
+                calendar_events, sleep_logs, settings, today_date, dates, context_days
+            ),
+        )
+
+    def _select_logged(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None,
+    ) -> ModelTier:
+        tier, complexity = self.select(calendar_events, sleep_logs, settings, today_date)
+        logger.info(
+            "plan model tier=%s model=%s max_tokens=%s score=%s complexity=%s",
+            tier.name,
+            tier.model,
+            tier.max_tokens,
+            complexity.score,
+            complexity,
+        )
+        return tier
+
+    async def _run(self, tier: ModelTier, call: Coroutine[Any, Any, tuple[T, dict[str, int]]]) -> T:
+        """段階のクライアント呼び出しを待ち、レイテンシと usage を記録して結果を返す"""
+        try:
+            self.breaker.before_call()
+        except Exception:
+            call.close()
+            raise
+        started = time.perf_counter()
+        try:
+            result, usage = await call
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        except Exception as e:
+            if is_outage(e):
+                self.breaker.record_failure()
+            else:
+                # 応答はあった（出力の不備・設定の誤り）: API は生きている
+                self.breaker.record_success()
+            self.metrics.record(tier.name, time.perf_counter() - started, None, ok=False)
+            raise
+        self.breaker.record_success()
+        self.metrics.record(tier.name, time.perf_counter() - started, usage, ok=True)
+        return result
@@ -1,19 +1,39 @@
 """
 OpenRouter 経由で LLM を呼び出すクライアント（IPlanGenerator のアダプター）
 https://openrouter.ai/docs
+週間プランは JSON Schema（response_format）で形式を指定し、ストリーミングで受け取りながら日ごとに検証する。
+途中で切れた・不正な日があれば、不足している日だけを 1 回再要求する（week_plan_output.py）。
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import math
+import time
+from collections.abc import AsyncIterator
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from typing import Any, cast
 
 import httpx
 
+from app.application.tracing import Span, tracer
 from app.config import settings
+from app.infrastructure.llm.week_plan_prompt import (
+    PROMPT_VERSION,
+    build_days_request,
+    build_messages,
+    build_user_content,
+)
+from app.infrastructure.llm.week_plan_output import (
+    WEEK_PLAN_RESPONSE_FORMAT,
+    IncompleteWeekPlanError,
+    WeekPlanCollector,
+    WeekPlanOutputMetrics,
+    WeekPlanStreamParser,
+    week_plan_output_metrics,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -59,9 +79,59 @@ def _enrich_calendar_events_with_date_jst(events: list[Any]) -> list[dict[str, A
         result.append(enriched)
     return result
 
+
+def _parse_json_content(raw: str) -> dict[str, Any] | list[Any]:
+    """LLM の応答本文から ```json ... ``` のコードフェンスを外して JSON としてパースする"""
+    if raw.startswith("```"):
+        lines = raw.split("\n")
+        if lines[0].startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        raw = "\n".join(lines)
+    return cast("dict[str, Any] | list[Any]", json.loads(raw))
+
+
+def _add_usage(total: dict[str, int], usage: dict[str, Any]) -> None:
+    """OpenRouter の usage の数値項目を total に加算する"""
+    for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = usage.get(key)
+        if isinstance(value, int):
+            total[key] = total.get(key, 0) + value
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if isinstance(cached, int):
+        total["cached_tokens"] = total.get("cached_tokens", 0) + cached
+
+
+def _set_usage_attributes(span: Span, usage: dict[str, int]) -> None:
+    """usage のトークン数をスパン属性（llm.prompt_tokens 等）に載せる"""
+    for key in ("prompt_tokens", "completion_tokens", "total_tokens", "cached_tokens"):
+        if key in usage:
+            span.set_attribute(f"llm.{key}", usage[key])
+
+
 # デバッグ用: LLM ペイロードログの最大文字数（超えたら省略表示）
 LLM_PAYLOAD_LOG_MAX_CHARS = 12000
 
+# ストリームが切れた理由（_stream_week_plan_days の戻り値）
+FINISH_LENGTH = "length"
+FINISH_INTERRUPTED = "interrupted"
+# max_tokens で切れたときの再要求の上限（元の max_tokens の倍数）
+REPAIR_MAX_TOKENS_FACTOR = 4
+
+
+def repair_max_tokens_for(max_tokens: int, days_done: int, days_missing: int) -> int:
+    """
+    max_tokens で切れた応答の不足日を再要求するときの上限。
+    届いた日で max_tokens を使い切ったとみなして 1 日あたりを見積もり、不足日の分に 1 日分の余裕を足す
+    （1 日も届いていなければ倍にする）。元の max_tokens 以上、REPAIR_MAX_TOKENS_FACTOR 倍以下。
+    """
+    if days_done <= 0:
+        estimate = max_tokens * 2
+    else:
+        estimate = math.ceil(max_tokens / days_done * (days_missing + 1))
+    return max(max_tokens, min(estimate, max_tokens * REPAIR_MAX_TOKENS_FACTOR))
+
 
 class OpenRouterClient:
     """OpenRouter API クライアント"""
@@ -71,11 +141,35 @@ class OpenRouterClient:
         api_key: str | None = None,
         base_url: str | None = None,
         model: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        structured_output: bool | None = None,
+        metrics: WeekPlanOutputMetrics | None = None,
+        max_tokens: int = 2048,
     ):
         self.api_key = api_key or settings.OPENROUTER_API_KEY
         self.base_url = base_url or settings.OPENROUTER_BASE_URL
         self.model = model or settings.OPENROUTER_MODEL
         self._chat_url = f"{self.base_url.rstrip('/')}/chat/completions"
+        # テスト・負荷試験で偽サーバー（benchmarks.fake_openrouter）を直接つなぐ場合に渡す
+        self._transport = transport
+        # response_format（JSON Schema）を送るか。非対応のモデルでは OPENROUTER_STRUCTURED_OUTPUT=false にする
+        self.structured_output = (
+            settings.OPENROUTER_STRUCTURED_OUTPUT
+            if structured_output is None
+            else structured_output
+        )
+        self.metrics = metrics or week_plan_output_metrics
+        # 週間プラン生成 1 回あたりの出力トークン上限（モデルの振り分けで段階ごとに変える）
+        self.max_tokens = max_tokens
+
+    def _start_span(self, max_tokens: int, stream: bool) -> Span | None:
+        """LLM 呼び出し 1 回分のスパン（トレーシング無効時は None）"""
+        if not tracer.enabled:
+            return None
+        return tracer.start_span(
+            "llm.chat",
+            {"llm.model": self.model, "llm.max_tokens": max_tokens, "llm.stream": stream},
+        )
 
     def _headers(self) -> dict[str, str]:
         return {
@@ -102,14 +196,24 @@ class OpenRouterClient:
             "max_tokens": max_tokens,
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            resp = await client.post(
-                self._chat_url,
-                headers=self._headers(),
-                json=payload,
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        span = self._start_span(max_tokens, stream=False)
+        try:
+            async with httpx.AsyncClient(timeout=60.0, transport=self._transport) as client:
+                resp = await client.post(
+                    self._chat_url,
+                    headers=self._headers(),
+                    json=payload,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+        except BaseException as e:
+            tracer.end_span(span, e)
+            raise
+        if span is not None:
+            call_usage: dict[str, int] = {}
+            _add_usage(call_usage, data.get("usage") or {})
+            _set_usage_attributes(span, call_usage)
+            tracer.end_span(span)
 
         choices = data.get("choices") or []
         if not choices:
@@ -117,6 +221,188 @@ class OpenRouterClient:
         content = choices[0].get("message", {}).get("content") or ""
         return content.strip()
 
+    async def chat_stream(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        temperature: float = 0,
+        max_tokens: int = 2048,
+        response_format: dict[str, Any] | None = None,
+        usage: dict[str, int] | None = None,
+    ) -> AsyncIterator[tuple[str, str | None]]:
+        """
+        stream=true で問い合わせ、(本文の差分, finish_reason) を届いた順に返す。
+        途中で接続が切れた場合は finish_reason を返さずに終わる。
+        usage を渡すと、最後のチャンクの usage（prompt_tokens / completion_tokens 等）を加算する。
+        """
+        if not self.api_key:
+            raise ValueError("OPENROUTER_API_KEY が設定されていません")
+
+        payload: dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+
+        # ストリームは呼び出し側が途中で閉じることもあるため、スパンは finally で閉じる
+        span = self._start_span(max_tokens, stream=True)
+        call_usage: dict[str, int] = {}
+        error: BaseException | None = None
+        try:
+            async with (
+                httpx.AsyncClient(timeout=60.0, transport=self._transport) as client,
+                client.stream(
+                    "POST", self._chat_url, headers=self._headers(), json=payload
+                ) as resp,
+            ):
+                if resp.is_error:
+                    await resp.aread()
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    # ": OPENROUTER PROCESSING" などのコメント行は読み飛ばす
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[len("data: ") :]
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    if "error" in event:
+                        raise ValueError(
+                            f"OpenRouter がストリーム中にエラーを返しました: {event['error']}"
+                        )
+                    if event.get("usage"):
+                        _add_usage(call_usage, event["usage"])
+                        if usage is not None:
+                            _add_usage(usage, event["usage"])
+                    for choice in event.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content") or ""
+                        if span is not None and choice.get("finish_reason"):
+                            span.set_attribute("llm.finish_reason", choice["finish_reason"])
+                        yield delta, choice.get("finish_reason")
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if span is not None:
+                _set_usage_attributes(span, call_usage)
+                tracer.end_span(span, error)
+
+    async def _stream_week_plan_days(
+        self,
+        messages: list[dict[str, str]],
+        collector: WeekPlanCollector,
+        usage: dict[str, int],
+        max_tokens: int,
+    ) -> str | None:
+        """
+        ストリーミングで受け取りながら完結した日を collector に渡す。
+        最後までそろえば None、max_tokens に達して切れれば FINISH_LENGTH、それ以外で切れれば FINISH_INTERRUPTED。
+        切れていても、それまでに完結した日は collector に残る。
+        """
+        parser = WeekPlanStreamParser()
+        started = time.perf_counter()
+        finish_reason: str | None = None
+        try:
+            async for delta, reason in self.chat_stream(
+                messages,
+                temperature=0,
+                max_tokens=max_tokens,
+                response_format=WEEK_PLAN_RESPONSE_FORMAT if self.structured_output else None,
+                usage=usage,
+            ):
+                if delta and "first_token_ms" not in usage:
+                    usage["first_token_ms"] = round((time.perf_counter() - started) * 1000)
+                if reason:
+                    finish_reason = reason
+                # ルートの JSON が閉じた後（フェンスの閉じ等）は parser が読み飛ばす。
+                # usage は最後のチャンクで届くため、ストリームは最後まで読む
+                for day in parser.feed(delta):
+                    collector.add(day)
+        except httpx.TransportError as e:
+            if not parser.days:
+                raise
+            logger.warning("plan llm stream interrupted after %d days: %s", len(parser.days), e)
+        self.metrics.invalid_days += parser.malformed
+        if finish_reason == FINISH_LENGTH:
+            logger.warning(
+                "plan llm output hit max_tokens=%d after %d days", max_tokens, len(parser.days)
+            )
+            return FINISH_LENGTH
+        return None if parser.complete else FINISH_INTERRUPTED
+
+    def _record_truncation(self, truncation: str | None) -> None:
+        if truncation is not None:
+            self.metrics.truncated += 1
+        if truncation == FINISH_LENGTH:
+            self.metrics.length_truncated += 1
+
+    async def _generate_week_plan_days(
+        self,
+        messages: list[dict[str, str]],
+        today_date: str | None,
+        usage: dict[str, int],
+        expected: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        週間プランの日（expected を指定すればその日だけ）を集めて検証する。途中で切れた・不正な日があれば、
+        不足している日だけを 1 回再要求する。それでもそろわなければ IncompleteWeekPlanError（キャッシュには保存されない）。
+        max_tokens で切れた場合は、届いた日のトークン数から不足日の分を見積もって上限を広げて再要求する。
+        """
+        collector = WeekPlanCollector(today_date, self.metrics, expected)
+        truncation = await self._stream_week_plan_days(messages, collector, usage, self.max_tokens)
+        self._record_truncation(truncation)
+        missing = collector.missing()
+        if not missing:
+            self.metrics.complete += 1
+            return collector.week_plan()
+
+        kept = collector.week_plan()
+        repair_max_tokens = (
+            repair_max_tokens_for(self.max_tokens, len(kept), len(missing))
+            if truncation == FINISH_LENGTH
+            else self.max_tokens
+        )
+        logger.warning(
+            "plan llm output incomplete (%s), requesting missing days: %s max_tokens=%d",
+            truncation or "invalid days",
+            missing,
+            repair_max_tokens,
+        )
+        self.metrics.repair_calls += 1
+        target = (
+            "不足している日付: " + ", ".join(missing)
+            if collector.expected is not None
+            else "今日から7日分"
+        )
+        repair_messages = [
+            *messages,
+            {
+                "role": "assistant",
+                "content": json.dumps({"week_plan": kept}, ensure_ascii=False),
+            },
+            {
+                "role": "user",
+                "content": (
+                    "上の応答は途中で切れたか、形式に合わない日がありました。\n"
+                    + target
+                    + "\nこれらの日付の要素だけを week_plan に入れ、同じ JSON 形式で返してください。"
+                ),
+            },
+        ]
+        self._record_truncation(
+            await self._stream_week_plan_days(repair_messages, collector, usage, repair_max_tokens)
+        )
+        missing = collector.missing()
+        if missing:
+            self.metrics.failed += 1
+            raise IncompleteWeekPlanError(missing)
+        self.metrics.repaired += 1
+        return collector.week_plan()
+
     async def chat_json(
         self,
         messages: list[dict[str, str]],
@@ -130,14 +416,7 @@ class OpenRouterClient:
             temperature=temperature,
             max_tokens=max_tokens,
         )
-        if raw.startswith("```"):
-            lines = raw.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            raw = "\n".join(lines)
-        return cast("dict[str, Any] | list[Any]", json.loads(raw))
+        return _parse_json_content(raw)
 
     async def generate_week_plan(
         self,
@@ -146,82 +425,89 @@ class OpenRouterClient:
         settings: dict[str, Any],
         today_date: str | None = None,
     ) -> dict[str, Any]:
+        """週間睡眠プランを生成する（IPlanGenerator の実装）"""
+        plan, _usage = await self.generate_week_plan_with_usage(
+            calendar_events, sleep_logs, settings, today_date=today_date
+        )
+        return plan
+
+    async def generate_week_plan_with_usage(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None = None,
+    ) -> tuple[dict[str, Any], dict[str, int]]:
         """
-        週間睡眠プランを生成する（IPlanGenerator の実装）
+        週間睡眠プランを生成し、(プラン, usage の合計) を返す。usage は不足日の再要求を含む全呼び出しの合計
+        （cached_tokens はプロンプトキャッシュに載った入力トークン、first_token_ms は最初の本文が届くまでの時間）。
         settings に today_override が含まれる場合はプロンプトに明示して反映する。
         today_date は「今日」の日付（YYYY-MM-DD）。プロンプトと出力の基準日となる。
         """
-        today_str = today_date or ""
-        today_override = settings.get("today_override")
         # カレンダー予定に date_jst（日本時間での日付）を付与し、当日/翌日の判断を確実にする
         enriched_events = _enrich_calendar_events_with_date_jst(calendar_events)
-
-        user_content = (
-            "以下を元に、このユーザー向けの「1週間の睡眠プラン」を JSON で返してください。\n"
-            "タイムゾーンは Asia/Tokyo です。\n"
-            "今日の日付は " + today_str + " です。この日を起点に、7日分のプランを作成してください。\n\n"
-            "返却形式は必ず次の JSON のみにしてください（他に説明は不要、マークダウン修飾も不要）。\n"
-            "{\n"
-            '  "week_plan": [\n'
-            '    { "date": "YYYY-MM-DD", "recommended_bedtime": "22:00", "recommended_wakeup": "06:30", '
-            '"importance": "high|medium|low", "next_day_event": "翌日の主要予定またはnull", "advice": "翌日の予定と重要度を考慮した1つの自然なアドバイス文。必ず翌日の重要度（高い・普通・低い等）に関する言及を含めること" },\n'
-            "    ... 7日分（今日から7日間、date を必須で含める）\n"
-            "  ]\n"
-            "}\n\n"
-            "ルール:\n"
-            "- 各要素に date（YYYY-MM-DD）を必須で含める。曜日ではなく日付で返す。\n"
-            "- week_plan の各 date は「その日に就寝する日」を表します。つまり date が 2026-02-21 なら、21日の夜に寝て22日の朝に起きる日のプランです。\n"
-            "- importance と next_day_event は「翌日」の予定に基づきます。ここで「翌日」= date の次の日（date+1日）です。例: date が 2026-02-21 なら翌日は 2026-02-22。\n"
-            "- カレンダー予定の start と end、および date_jst はすべて日本時間 (JST) で統一されています。必ずこれらを参照して、どの日付・時間帯の予定かを判断してください。\n"
-            "- importance: 翌日（date+1日）の予定の重要度。会議・試験・発表など重要な予定がある日は high、軽い予定は medium、予定なし・緩い日は low。\n"
-            "- next_day_event: 翌日（date+1日）の最も重要な予定のタイトル。該当なければ null。\n"
-            "- preparation_minutes が設定にある場合、起床から家を出る（または予定に取りかかる）までにその分数が必要。外出予定の開始時刻から逆算して起床時刻を決める。\n"
-            "- 夜の予定が遅く朝の予定が早いなどスケジュールが詰まっている場合、睡眠時間が多少短くなってしまっても良いので、朝の移動時間だけでなく、夜の帰宅移動時間と就寝準備時間の確保を優先して就寝時刻を決定してください。\n"
-            "- その日の最後の予定が終わった後、帰宅するための「移動時間」と帰宅後の「就寝準備時間」を一般常識から推測（推測が難しい場合は合わせて2時間と仮定）し、その時間を必ず確保した上で就寝時刻を設定してください。\n"
-            "- 外出予定がある場合、予定のある場所への移動時間を一般常識から推測（推測が難しい場合は1時間と仮定）し、その分も起床時刻を早める。\n"
-            "- 平日: 理想就寝 23:00、理想起床 6:00。ただし予定を優先。\n"
-            "- 休日: 理想就寝 24:00、理想起床 8:00。平日の睡眠不足を補うよう長めの睡眠を提案。\n"
-            "- 十分な睡眠が取れない日は、前後数日で睡眠時間を長めに取り補う。\n"
-            "- 睡眠ログの評価（score）が悪い日は、実質的な睡眠時間が短い可能性があると解釈して提案。\n"
-            "- mood（気分）が低い日が続く場合は、睡眠の質や量の改善をアドバイスに含める。\n\n"
-            "カレンダー予定（date_jst = その予定の日本時間での日付。当日/翌日の判断に必ず使用）: "
-            + json.dumps(enriched_events, ensure_ascii=False)
-            + "\n\n"
-            "睡眠ログ: " + json.dumps(sleep_logs, ensure_ascii=False) + "\n\n"
-            "設定: " + json.dumps(settings, ensure_ascii=False)
-        )
-        if today_override:
-            user_content += (
-                "\n\n"
-                "今日のオーバーライド（今日だけの就寝・起床時刻の変更）: "
-                + json.dumps(today_override, ensure_ascii=False)
-                + "\n上記のオーバーライドを今日の就寝・起床時刻に反映してください。"
-            )
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "あなたは睡眠アドバイザーです。与えられた予定と睡眠ログから、"
-                    "現実的な就寝・起床時刻と、翌日の予定・重要度を踏まえた1つの自然なアドバイス文を JSON 形式で返してください。"
-                    "各日には date（YYYY-MM-DD）・importance・next_day_event を必ず含めてください。"
-                ),
-            },
-            {"role": "user", "content": user_content},
-        ]
+        # 共通の指示は固定の system プレフィックス（プロンプトキャッシュ用）、ユーザーごとのデータは末尾
+        user_content = build_user_content(enriched_events, sleep_logs, settings, today_date)
+        messages = build_messages(user_content)
         # デバッグ: LLM に投げるペイロード（プロンプト内容）をログ
         if len(user_content) <= LLM_PAYLOAD_LOG_MAX_CHARS:
-            logger.info("plan llm payload (user_content): %s", user_content)
+            logger.info(
+                "plan llm payload prompt_version=%s (user_content): %s",
+                PROMPT_VERSION,
+                user_content,
+            )
         else:
             logger.info(
-                "plan llm payload (user_content, truncated): %s ... (truncated, total %d chars)",
+                "plan llm payload prompt_version=%s (user_content, truncated): %s ... (truncated, total %d chars)",
+                PROMPT_VERSION,
                 user_content[:LLM_PAYLOAD_LOG_MAX_CHARS],
                 len(user_content),
             )
-        result = await self.chat_json(
-            messages=messages,
-            temperature=0,
-            max_tokens=2048,
+        usage: dict[str, int] = {}
+        week_plan = await self._generate_week_plan_days(messages, today_date, usage)
+        return {"week_plan": week_plan}, usage
+
+    async def generate_days(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None,
+        dates: list[str],
+        context_days: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        """週のうち dates の日だけを生成する（IPlanGenerator の実装）"""
+        days, _usage = await self.generate_days_with_usage(
+            calendar_events, sleep_logs, settings, today_date, dates, context_days
+        )
+        return days
+
+    async def generate_days_with_usage(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None,
+        dates: list[str],
+        context_days: list[dict[str, Any]],
+    ) -> tuple[list[dict[str, Any]], dict[str, int]]:
+        """
+        週のうち dates の日だけを生成し、(日のリスト, usage の合計) を返す。
+        入力は週全体と同じ（system プレフィックスも共通）で、user メッセージの末尾で
+        既に決まっている日（context_days）と生成する日付を指定する。
+        """
+        enriched_events = _enrich_calendar_events_with_date_jst(calendar_events)
+        user_content = build_user_content(
+            enriched_events, sleep_logs, settings, today_date
+        ) + build_days_request(dates, context_days)
+        logger.info(
+            "plan llm partial request prompt_version=%s dates=%s context_days=%d",
+            PROMPT_VERSION,
+            dates,
+            len(context_days),
+        )
+        usage: dict[str, int] = {}
+        days = await self._generate_week_plan_days(
+            build_messages(user_content), today_date, usage, expected=dates
         )
-        if isinstance(result, dict) and "week_plan" in result:
-            return result
-        return {"week_plan": result} if isinstance(result, list) else {"week_plan": [result]}
+        return days, usage
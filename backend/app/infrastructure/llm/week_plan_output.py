@@ -0,0 +1,233 @@
+"""
+週間プランの LLM 出力の形式（JSON Schema）・逐次パース・検証
+- WEEK_PLAN_RESPONSE_FORMAT: OpenRouter の response_format（structured outputs）に渡すスキーマ
+- WeekPlanStreamParser: ストリーミングで届く本文から、完結した日の要素を届いた順に取り出す。
+  本文が途中で切れても（max_tokens 超過・接続断）、それまでに完結した日は使える
+- validate_day: キャッシュに保存する前に 1 日分の要素を検証する（不正な日は捨てて再要求する）
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Any
+
+PLAN_DAYS = 7
+IMPORTANCE_LEVELS = ("high", "medium", "low")
+
+_DAY_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "date": {"type": "string", "description": "その日に就寝する日付（YYYY-MM-DD）"},
+        "recommended_bedtime": {"type": "string", "description": "HH:MM（JST）"},
+        "recommended_wakeup": {"type": "string", "description": "HH:MM（JST）"},
+        "importance": {"type": "string", "enum": list(IMPORTANCE_LEVELS)},
+        "next_day_event": {"type": ["string", "null"]},
+        "advice": {"type": "string"},
+    },
+    "required": [
+        "date",
+        "recommended_bedtime",
+        "recommended_wakeup",
+        "importance",
+        "next_day_event",
+        "advice",
+    ],
+    "additionalProperties": False,
+}
+
+WEEK_PLAN_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {"week_plan": {"type": "array", "items": _DAY_SCHEMA}},
+    "required": ["week_plan"],
+    "additionalProperties": False,
+}
+
+WEEK_PLAN_RESPONSE_FORMAT: dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {"name": "week_plan", "strict": True, "schema": WEEK_PLAN_SCHEMA},
+}
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# 休日の理想就寝 24:00 をそのまま返すことがあるため時は 24 まで許す
+_TIME_RE = re.compile(r"^([01]\d|2[0-4]):[0-5]\d$")
+
+
+def expected_dates(today_date: str | None, days: int = PLAN_DAYS) -> list[str] | None:
+    """today_date から days 日分の日付。today_date が無い・不正なら None（日付の照合をしない）"""
+    if not today_date:
+        return None
+    try:
+        start = date.fromisoformat(today_date)
+    except ValueError:
+        return None
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def validate_day(day: Any) -> str | None:
+    """1 日分の要素を検証する。問題なければ None、あれば理由"""
+    if not isinstance(day, dict):
+        return "not an object"
+    d = day.get("date")
+    if not isinstance(d, str) or not _DATE_RE.match(d):
+        return "invalid date"
+    try:
+        date.fromisoformat(d)
+    except ValueError:
+        return "invalid date"
+    for key in ("recommended_bedtime", "recommended_wakeup"):
+        value = day.get(key)
+        if not isinstance(value, str) or not _TIME_RE.match(value):
+            return f"invalid {key}"
+    if day.get("importance") not in IMPORTANCE_LEVELS:
+        return "invalid importance"
+    event = day.get("next_day_event")
+    if event is not None and not isinstance(event, str):
+        return "invalid next_day_event"
+    advice = day.get("advice")
+    if not isinstance(advice, str) or not advice.strip():
+        return "empty advice"
+    return None
+
+
+class WeekPlanStreamParser:
+    """
+    {"week_plan": [ {...}, ... ]}（またはトップレベルが配列）の本文を少しずつ受け取り、
+    完結した日の要素（配列直下のオブジェクト）を取り出す。```json のフェンスや前置きの文は読み飛ばす。
+    complete はトップレベルの JSON が閉じたか（False のまま終われば途中で切れている）。
+    """
+
+    def __init__(self) -> None:
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        # 読み取り中の日の要素の文字（日の外なら None）
+        self._day_chars: list[str] | None = None
+        self.complete = False
+        self.days: list[Any] = []
+        # 日の要素として取り出せなかった（JSON として壊れている）数
+        self.malformed = 0
+
+    def _is_day_level(self) -> bool:
+        # 配列直下のオブジェクト: ルートが配列 [ か、ルートのオブジェクト内の配列 { [
+        return self._stack in (["["], ["{", "["])
+
+    def feed(self, chunk: str) -> list[Any]:
+        """本文の続きを渡し、このチャンクで完結した日の要素を返す"""
+        new_days: list[Any] = []
+        for ch in chunk:
+            if self.complete:
+                break
+            if self._day_chars is not None:
+                self._day_chars.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._stack and ch not in "{[":
+                continue  # ルートの前の前置き・フェンス
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._is_day_level():
+                    self._day_chars = ["{"]
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if ch == "}" and self._day_chars is not None and self._is_day_level():
+                    day = self._take_day()
+                    if day is not _MALFORMED:
+                        new_days.append(day)
+                if not self._stack:
+                    self.complete = True
+        self.days.extend(new_days)
+        return new_days
+
+    def _take_day(self) -> Any:
+        text = "".join(self._day_chars or ())
+        self._day_chars = None
+        try:
+            return json.loads(text)
+        except ValueError:
+            self.malformed += 1
+            return _MALFORMED
+
+
+_MALFORMED = object()
+
+
+@dataclass
+class WeekPlanOutputMetrics:
+    """
+    週間プラン生成の各経路の回数（プロセス内の累積値。GET /health/metrics で参照）
+    complete: 1 回目の応答で全日そろった
+    truncated: 応答の JSON が閉じていなかった（max_tokens 超過・接続断・JSON 以外の応答）
+    length_truncated: max_tokens に達して切れた（finish_reason=length。truncated の内数）
+    invalid_days: 検証で捨てた日の数（壊れた JSON を含む）
+    repair_calls: 不足日だけを再要求した回数
+    repaired: 再要求で全日そろった
+    failed: 再要求しても全日そろわず、生成失敗にした
+    """
+
+    complete: int = 0
+    truncated: int = 0
+    length_truncated: int = 0
+    invalid_days: int = 0
+    repair_calls: int = 0
+    repaired: int = 0
+    failed: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return asdict(self)
+
+
+week_plan_output_metrics = WeekPlanOutputMetrics()
+
+
+class WeekPlanCollector:
+    """
+    検証済みの日を集め、期待する日付（today_date から 7 日、または expected で指定した日）に対して
+    何が足りないかを管理する。期待する日付が分からない場合は、検証を通った日が 1 つ以上あればそろったとみなす。
+    """
+
+    def __init__(
+        self,
+        today_date: str | None,
+        metrics: WeekPlanOutputMetrics,
+        expected: list[str] | None = None,
+    ):
+        self.expected = expected if expected is not None else expected_dates(today_date)
+        self.metrics = metrics
+        self._days: dict[str, dict[str, Any]] = {}
+
+    def add(self, day: Any) -> None:
+        reason = validate_day(day)
+        if reason is None and self.expected is not None and day["date"] not in self.expected:
+            reason = "unexpected date"
+        if reason is not None:
+            self.metrics.invalid_days += 1
+            return
+        # 同じ日付が重複したら先に届いたものを使う
+        self._days.setdefault(day["date"], day)
+
+    def missing(self) -> list[str]:
+        if self.expected is None:
+            return [] if self._days else ["*"]
+        return [d for d in self.expected if d not in self._days]
+
+    def week_plan(self) -> list[dict[str, Any]]:
+        order = self.expected or sorted(self._days)
+        return [self._days[d] for d in order if d in self._days]
+
+
+class IncompleteWeekPlanError(ValueError):
+    """再要求しても週間プランの日がそろわなかった（キャッシュには保存しない）"""
+
+    def __init__(self, missing: list[str]):
+        super().__init__(f"LLM の週間プランに不足・不正な日があります: {', '.join(missing)}")
+        self.missing = missing
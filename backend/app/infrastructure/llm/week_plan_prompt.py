@@ -0,0 +1,94 @@
+"""
+週間プラン生成のプロンプト（バージョン付きテンプレート）
+プロバイダ側のプロンプトキャッシュ（先頭一致）に載るよう、ルール・出力形式など全リクエスト共通の指示は
+バイト単位で固定の system メッセージ（SYSTEM_PROMPT）にまとめ、日付・予定・睡眠ログ・設定などの
+ユーザーごとのデータは最後の user メッセージにだけ入れる。
+SYSTEM_PROMPT の文言を変えたら PROMPT_VERSION を上げる（ログ・メトリクスで版を区別する）。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+PROMPT_VERSION = "week-plan-v2"
+
+SYSTEM_PROMPT = (
+    "あなたは睡眠アドバイザーです。与えられた予定と睡眠ログから、"
+    "現実的な就寝・起床時刻と、翌日の予定・重要度を踏まえた1つの自然なアドバイス文を JSON 形式で返してください。"
+    "各日には date（YYYY-MM-DD）・importance・next_day_event を必ず含めてください。\n\n"
+    "ユーザーのメッセージの「今日の日付」を起点に、今日から7日分の「1週間の睡眠プラン」を作成してください。\n"
+    "タイムゾーンは Asia/Tokyo です。\n\n"
+    "返却形式は必ず次の JSON のみにしてください（他に説明は不要、マークダウン修飾も不要）。\n"
+    "{\n"
+    '  "week_plan": [\n'
+    '    { "date": "YYYY-MM-DD", "recommended_bedtime": "22:00", "recommended_wakeup": "06:30", '
+    '"importance": "high|medium|low", "next_day_event": "翌日の主要予定またはnull", "advice": "翌日の予定と重要度を考慮した1つの自然なアドバイス文。必ず翌日の重要度（高い・普通・低い等）に関する言及を含めること" },\n'
+    "    ... 7日分（今日から7日間、date を必須で含める）\n"
+    "  ]\n"
+    "}\n\n"
+    "ルール:\n"
+    "- 各要素に date（YYYY-MM-DD）を必須で含める。曜日ではなく日付で返す。\n"
+    "- week_plan の各 date は「その日に就寝する日」を表します。つまり date が 2026-02-21 なら、21日の夜に寝て22日の朝に起きる日のプランです。\n"
+    "- importance と next_day_event は「翌日」の予定に基づきます。ここで「翌日」= date の次の日（date+1日）です。例: date が 2026-02-21 なら翌日は 2026-02-22。\n"
+    "- カレンダー予定の start と end、および date_jst はすべて日本時間 (JST) で統一されています。必ずこれらを参照して、どの日付・時間帯の予定かを判断してください。\n"
+    "- importance: 翌日（date+1日）の予定の重要度。会議・試験・発表など重要な予定がある日は high、軽い予定は medium、予定なし・緩い日は low。\n"
+    "- next_day_event: 翌日（date+1日）の最も重要な予定のタイトル。該当なければ null。\n"
+    "- preparation_minutes が設定にある場合、起床から家を出る（または予定に取りかかる）までにその分数が必要。外出予定の開始時刻から逆算して起床時刻を決める。\n"
+    "- 夜の予定が遅く朝の予定が早いなどスケジュールが詰まっている場合、睡眠時間が多少短くなってしまっても良いので、朝の移動時間だけでなく、夜の帰宅移動時間と就寝準備時間の確保を優先して就寝時刻を決定してください。\n"
+    "- その日の最後の予定が終わった後、帰宅するための「移動時間」と帰宅後の「就寝準備時間」を一般常識から推測（推測が難しい場合は合わせて2時間と仮定）し、その時間を必ず確保した上で就寝時刻を設定してください。\n"
+    "- 外出予定がある場合、予定のある場所への移動時間を一般常識から推測（推測が難しい場合は1時間と仮定）し、その分も起床時刻を早める。\n"
+    "- 平日: 理想就寝 23:00、理想起床 6:00。ただし予定を優先。\n"
+    "- 休日: 理想就寝 24:00、理想起床 8:00。平日の睡眠不足を補うよう長めの睡眠を提案。\n"
+    "- 十分な睡眠が取れない日は、前後数日で睡眠時間を長めに取り補う。\n"
+    "- 睡眠ログの評価（score）が悪い日は、実質的な睡眠時間が短い可能性があると解釈して提案。\n"
+    "- mood（気分）が低い日が続く場合は、睡眠の質や量の改善をアドバイスに含める。\n"
+    "- 今日のオーバーライド（今日だけの就寝・起床時刻の変更）が与えられた場合は、今日の就寝・起床時刻に反映する。\n"
+)
+
+
+def build_user_content(
+    enriched_events: list[dict[str, Any]],
+    sleep_logs: list[Any],
+    settings: dict[str, Any],
+    today_date: str | None,
+) -> str:
+    """ユーザーごとのデータだけからなる user メッセージ（enriched_events は date_jst 付与済み）"""
+    content = (
+        "今日の日付は "
+        + (today_date or "")
+        + " です。この日を起点に、7日分のプランを作成してください。\n\n"
+        "カレンダー予定（date_jst = その予定の日本時間での日付。当日/翌日の判断に必ず使用）: "
+        + json.dumps(enriched_events, ensure_ascii=False)
+        + "\n\n"
+        "睡眠ログ: " + json.dumps(sleep_logs, ensure_ascii=False) + "\n\n"
+        "設定: " + json.dumps(settings, ensure_ascii=False)
+    )
+    today_override = settings.get("today_override")
+    if today_override:
+        content += "\n\n今日のオーバーライド（今日だけの就寝・起床時刻の変更）: " + json.dumps(
+            today_override, ensure_ascii=False
+        )
+    return content
+
+
+def build_days_request(dates: list[str], context_days: list[dict[str, Any]]) -> str:
+    """
+    週の一部の日だけを生成するときに user メッセージの末尾に足す指示。
+    既に決まっている日を前後の文脈として渡し、dates の日だけを返させる（system プレフィックスは共通のまま）。
+    """
+    return (
+        "\n\n既に決まっている日のプラン（前後の日との睡眠時間のバランスを取るための参考。返さなくてよい）: "
+        + json.dumps(context_days, ensure_ascii=False)
+        + "\n\n今回作成するのは次の日付だけです。不足している日付: "
+        + ", ".join(dates)
+        + "\nこれらの日付の要素だけを week_plan に入れ、同じ JSON 形式で返してください。"
+    )
+
+
+def build_messages(user_content: str) -> list[dict[str, str]]:
+    """固定の system プレフィックス + ユーザーごとの user メッセージ"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_content},
+    ]
@@ -2,31 +2,105 @@
 データベース接続設定
 開発環境: PostgreSQL (Docker)
 本番環境: Supabase PostgreSQL
+
+DATABASE_REPLICA_URL を設定すると、読み取り専用ルート（get_read_db 経由）はレプリカに向く。
+書き込み直後のユーザーは DATABASE_READ_STICKY_SECONDS の間 primary から読む（read-your-writes）。
+
+セッションは最初の SQL 実行時にだけ接続をプールから借り、書き込みが無ければ COMMIT しない。
+リクエストごとの SQL 実行数・接続保持時間は DbStats（current_db_stats）に集計される。
+SLOW_QUERY_MS を設定すると、遅い SQL を slow_query_log に記録する（slow_query.py）。
 """
 
-from collections.abc import AsyncGenerator
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 
+from sqlalchemy import Engine, event
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, ORMExecuteState, Session, SessionTransaction
+from sqlalchemy.sql.elements import TextClause
 
+from app.application.tracing import tracer
 from app.config import settings
+from app.infrastructure.persistence.slow_query import SlowQueryLog, install_slow_query_capture
+
+# session.info のキー（書き込みの有無・書き込んだユーザー・DB 利用状況）
+SESSION_HAS_WRITES = "has_writes"
+SESSION_USER_ID = "user_id"
+SESSION_STATS = "db_stats"
+_SESSION_HELD_CONNECTIONS = "held_connections"
+_SESSION_TRANSACTION_STARTED = "transaction_started"
+# conn.info のキー（実行中の SQL のスパン）
+_CONNECTION_SPAN = "trace_span"
+# スパン属性に載せる SQL 文の最大長
+_TRACE_STATEMENT_MAX_CHARS = 1000
+
+
+@dataclass
+class DbStats:
+    """1 リクエスト内の DB 利用状況（そのリクエストで開いたセッションを合算）"""
+
+    statements: int = 0
+    connections: int = 0
+    connection_hold_seconds: float = 0.0
+    # 最初の SQL から接続を借りられるまでの時間（プール待ち + pre_ping）
+    pool_wait_seconds: float = 0.0
+    commits: int = 0
+
+
+# リクエスト単位の DbStats（DbStatsMiddleware が設定する。未設定ならセッションごとに集計）
+current_db_stats: ContextVar[DbStats | None] = ContextVar("current_db_stats", default=None)
+
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        # 既定は SQLAlchemy と同じ 5 + 10
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL)
+replica_engine: AsyncEngine | None = (
+    _create_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
 )
 
+# 遅い SQL の記録（SLOW_QUERY_MS > 0 のときだけリスナーを登録する）
+slow_query_log = SlowQueryLog(max_entries=settings.SLOW_QUERY_BUFFER_SIZE)
+if settings.SLOW_QUERY_MS > 0:
+    for _engine in (engine, replica_engine):
+        if _engine is not None:
+            install_slow_query_capture(
+                _engine,
+                slow_query_log,
+                settings.SLOW_QUERY_MS,
+                settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            )
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+# 読み取り専用セッション（レプリカ未設定なら primary）
+ReadSessionLocal = async_sessionmaker(
+    replica_engine or engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 class Base(DeclarativeBase):
     """SQLAlchemy モデルの基底クラス"""
@@ -34,17 +108,222 @@ class Base(DeclarativeBase):
     pass
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """データベースセッションを取得する Dependency"""
+class ReadYourWritesTracker:
+    """
+    書き込んだユーザーを一定時間 primary に固定するためのトラッカー（プロセス内メモリ）。
+    ワーカーをまたいだ固定はしないため、窓はレプリカ遅延の上限より長めに取ること。
+    窓の長さは一定なので、書き込み順に並べれば期限切れは先頭に集まる（mark_write のたびに先頭から捨てる）。
+    """
+
+    def __init__(self, window_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._until: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def mark_write(self, user_id: str) -> None:
+        """user_id が書き込んだことを記録する（期限切れの記録は捨てる）"""
+        if self.window_seconds <= 0:
+            return
+        now = self._clock()
+        self._until[user_id] = now + self.window_seconds
+        self._until.move_to_end(user_id)
+        while self._until:
+            oldest, until = next(iter(self._until.items()))
+            if until > now:
+                break
+            del self._until[oldest]
+
+    def is_sticky(self, user_id: str) -> bool:
+        """user_id の読み取りを primary に向けるべきか"""
+        until = self._until.get(user_id)
+        if until is None:
+            return False
+        if self._clock() >= until:
+            del self._until[user_id]
+            return False
+        return True
+
+
+write_tracker = ReadYourWritesTracker(settings.DATABASE_READ_STICKY_SECONDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_writes(session: Session, _flush_context) -> None:
+    session.info[SESSION_HAS_WRITES] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state: ORMExecuteState) -> None:
+    statement = orm_execute_state.statement
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+        # text() は種類が分からないため、SELECT 以外は書き込みとみなす（余分な COMMIT になるだけ）
+        or (isinstance(statement, TextClause) and not _is_select_text(statement.text))
+    ):
+        orm_execute_state.session.info[SESSION_HAS_WRITES] = True
+
+
+def _is_select_text(sql: str) -> bool:
+    return sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "SHOW") if sql.strip() else True
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _track_transaction_start(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None and SESSION_STATS in session.info:
+        session.info[_SESSION_TRANSACTION_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _track_connection_checkout(session: Session, _transaction, connection) -> None:
+    stats = session.info.get(SESSION_STATS)
+    if stats is None:
+        return
+    now = time.perf_counter()
+    stats.connections += 1
+    stats.pool_wait_seconds += now - session.info.pop(_SESSION_TRANSACTION_STARTED, now)
+    # 接続は after_transaction_end の時点で返却済みなので、info（プール上の接続に紐づく dict）を持つ
+    connection.info[SESSION_STATS] = stats
+    session.info.setdefault(_SESSION_HELD_CONNECTIONS, []).append((connection.info, now))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _track_connection_release(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is not None:
+        return
+    held = session.info.pop(_SESSION_HELD_CONNECTIONS, None)
+    if not held:
+        return
+    now = time.perf_counter()
+    for connection_info, started in held:
+        stats = connection_info.pop(SESSION_STATS, None)
+        if stats is not None:
+            stats.connection_hold_seconds += now - started
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, _cursor, _statement, _parameters, _context, _executemany) -> None:
+    stats = conn.info.get(SESSION_STATS)
+    if stats is not None:
+        stats.statements += 1
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_span(conn, _cursor, statement, _parameters, _context, executemany) -> None:
+    if not tracer.enabled:
+        return
+    conn.info[_CONNECTION_SPAN] = tracer.start_span(
+        "db.statement",
+        {
+            "db.system": conn.dialect.name,
+            "db.operation": statement.lstrip().split(None, 1)[0].upper() if statement else "",
+            "db.statement": statement[:_TRACE_STATEMENT_MAX_CHARS],
+            "db.executemany": executemany,
+        },
+    )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement_span(conn, cursor, _statement, _parameters, _context, _executemany) -> None:
+    span = conn.info.pop(_CONNECTION_SPAN, None)
+    if span is None:
+        return
+    # SELECT などドライバーが件数を返さない文は -1
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        span.set_attribute("db.rows", cursor.rowcount)
+    tracer.end_span(span)
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_statement_span(context) -> None:
+    conn = context.connection
+    span = conn.info.pop(_CONNECTION_SPAN, None) if conn is not None else None
+    if span is not None:
+        tracer.end_span(span, context.original_exception)
+
+
+def _has_pending_writes(session: AsyncSession) -> bool:
+    return bool(
+        session.info.get(SESSION_HAS_WRITES) or session.new or session.dirty or session.deleted
+    )
+
+
+async def finish_transaction(session: AsyncSession) -> None:
+    """
+    進行中のトランザクションを終えて接続をプールに返す。書き込みがあれば COMMIT、無ければ COMMIT せずに閉じる
+    （プール返却時にロールバックされる）。セッションはこの後も使える（次の SQL 実行時に接続を借り直す）。
+    """
+    if _has_pending_writes(session):
+        await session.commit()
+        session.info.pop(SESSION_HAS_WRITES, None)
+        stats = session.info.get(SESSION_STATS)
+        if stats is not None:
+            stats.commits += 1
+        user_id = session.info.get(SESSION_USER_ID)
+        if user_id:
+            write_tracker.mark_write(user_id)
+    elif session.in_transaction():
+        # rollback() だと読み込んだオブジェクトが expire されるため、close() で切り離して返却する
+        await session.close()
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    1 つの作業単位（トランザクション）のセッション。抜けるときに finish_transaction し、例外ならロールバックする。
+    LLM 呼び出しのように長く待つ処理の前後では、リクエスト全体ではなくこの単位で接続を借りる。
+    """
     async with AsyncSessionLocal() as session:
+        session.info[SESSION_STATS] = current_db_stats.get() or DbStats()
         try:
             yield session
-            await session.commit()
+            await finish_transaction(session)
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    データベースセッションを取得する Dependency。
+    接続は最初の SQL 実行時に借りる（autobegin）。書き込みが無ければ COMMIT せずに閉じる。
+    """
+    async with session_scope() as session:
+        yield session
+
+
+def uses_replica(user_id: str | None = None) -> bool:
+    """読み取りをレプリカに向けるか（未設定、または user_id が書き込み直後なら False）"""
+    if replica_engine is None:
+        return False
+    return not (user_id and write_tracker.is_sticky(user_id))
+
+
+def reads_from_replica(session: AsyncSession) -> bool:
+    """session がレプリカに向いているか（レプリカの値は遅れ得るので、プロセス内キャッシュには載せない）"""
+    return replica_engine is not None and session.bind is replica_engine
+
+
+async def get_read_session(user_id: str | None = None) -> AsyncGenerator[AsyncSession, None]:
+    """
+    読み取り専用セッションを取得する。commit はしない。
+    user_id を渡すと、そのユーザーが直前に書き込んでいれば primary から読む。
+    """
+    session_factory = ReadSessionLocal if uses_replica(user_id) else AsyncSessionLocal
+    async with session_factory() as session:
+        session.info[SESSION_STATS] = current_db_stats.get() or DbStats()
+        yield session
+
+
+async def dispose_engines() -> None:
+    """primary・レプリカのプールの接続を全て閉じる（シャットダウン時。貸し出し中の接続は返却時に閉じる）"""
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 async def init_db() -> None:
@@ -0,0 +1,40 @@
+"""
+COMMIT 後のドメインイベント発行
+書き込み経路のイベントはセッションの session.info に溜め、COMMIT が成功した後（after_commit）に
+購読者へ渡す。ロールバック・COMMIT の失敗ではイベントを捨てる（書き込まれていない変更で事前計算しない）。
+"""
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.domain.events import DomainEvent, IDomainEventPublisher
+
+# session.info のキー（COMMIT 待ちの (購読者, イベント)）
+_SESSION_EVENTS = "pending_domain_events"
+
+
+class AfterCommitEventPublisher:
+    """IDomainEventPublisher の実装。session が COMMIT した後に subscribers へ発行する"""
+
+    def __init__(self, session: AsyncSession, subscribers: list[IDomainEventPublisher]):
+        self.session = session
+        self.subscribers = subscribers
+
+    def publish(self, event: DomainEvent) -> bool:
+        pending = self.session.info.setdefault(_SESSION_EVENTS, [])
+        pending.extend((subscriber, event) for subscriber in self.subscribers)
+        return bool(self.subscribers)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    for subscriber, domain_event in session.info.pop(_SESSION_EVENTS, ()):
+        subscriber.publish(domain_event)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_rollback(session: Session, transaction: SessionTransaction) -> None:
+    # COMMIT 済みなら after_commit で取り出し済み。ここに残っているのはロールバックした分
+    if transaction.parent is None:
+        session.info.pop(_SESSION_EVENTS, None)
@@ -0,0 +1,79 @@
+"""
+DB の疎通確認と接続プールの状態（GET /health/ready）
+疎通確認は ttl_seconds の間結果を使い回し、同時に来たプローブは 1 回の確認にまとめる
+（ロードバランサーのプローブが増えても DB への SELECT 1 が増えないように）。
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class DatabaseProbe:
+    """engine への SELECT 1（タイムアウト付き・結果をキャッシュ）"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl_seconds: float = 2.0,
+        timeout_seconds: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self._clock = clock
+        self._result: dict[str, Any] | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> dict[str, Any]:
+        """{"ok", "latency_ms", "error", "age_seconds"}（age_seconds は結果を得てからの秒数）"""
+        if not self._fresh():
+            async with self._lock:
+                # 待っている間に他のプローブが確認を終えていればそれを使う
+                if not self._fresh():
+                    self._result = await self._ping()
+                    self._checked_at = self._clock()
+        assert self._result is not None
+        return {**self._result, "age_seconds": round(self._clock() - self._checked_at, 2)}
+
+    def _fresh(self) -> bool:
+        return self._result is not None and self._clock() - self._checked_at < self.ttl_seconds
+
+    async def _ping(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        error: str | None = None
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                async with self.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except TimeoutError:
+            error = f"timed out after {self.timeout_seconds}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {
+            "ok": error is None,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": error,
+        }
+
+    def invalidate(self) -> None:
+        """次の check() で必ず確認し直す"""
+        self._result = None
+
+
+def pool_status(engine: AsyncEngine, max_connections: int) -> dict[str, Any]:
+    """接続プールの使用状況（saturation は貸し出し中 / max_connections）"""
+    pool = engine.sync_engine.pool
+    checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+    return {
+        "checked_out": checked_out,
+        "idle": pool.checkedin() if hasattr(pool, "checkedin") else 0,
+        "max_connections": max_connections,
+        "saturation": round(checked_out / max_connections, 3) if max_connections else 0.0,
+    }
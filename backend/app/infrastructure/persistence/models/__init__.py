@@ -3,9 +3,24 @@ SQLAlchemy ORM モデル
 """
 
 from app.infrastructure.persistence.database import Base
+from app.infrastructure.persistence.models.calendar_event import CalendarEvent, CalendarSyncState
+from app.infrastructure.persistence.models.plan_generation_lease import PlanGenerationLease
+from app.infrastructure.persistence.models.rate_limit_bucket import RateLimitBucket
 from app.infrastructure.persistence.models.sleep_log import SleepLog
 from app.infrastructure.persistence.models.sleep_plan_cache import SleepPlanCache
+from app.infrastructure.persistence.models.sleep_plan_day import SleepPlanDay
 from app.infrastructure.persistence.models.sleep_settings import SleepSettings
 from app.infrastructure.persistence.models.user import User
 
-__all__ = ["Base", "User", "SleepPlanCache", "SleepSettings", "SleepLog"]
+__all__ = [
+    "Base",
+    "User",
+    "SleepPlanCache",
+    "SleepPlanDay",
+    "SleepSettings",
+    "SleepLog",
+    "RateLimitBucket",
+    "PlanGenerationLease",
+    "CalendarEvent",
+    "CalendarSyncState",
+]
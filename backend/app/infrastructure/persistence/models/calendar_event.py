@@ -0,0 +1,55 @@
+"""
+CalendarEvent / CalendarSyncState ORM モデル
+クライアントから差分同期されたカレンダー予定（1 ユーザー × 予定 ID で 1 行）と、
+ユーザーごとの同期状態（同期トークンの元になる version と予定全体のダイジェスト）。
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.infrastructure.persistence.database import Base
+
+
+class CalendarEvent(Base):
+    """同期済みのカレンダー予定 ORM モデル"""
+
+    __tablename__ = "calendar_events"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # クライアント（端末のカレンダー）側の予定 ID
+    event_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # プラン取得の calendar_events の要素 1 つ（title, start, end, all_day 等）の JSON
+    event_json: Mapped[str] = mapped_column(Text, nullable=False)
+    event_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+
+class CalendarSyncState(Base):
+    """カレンダーの同期状態 ORM モデル（1 ユーザー 1 行）"""
+
+    __tablename__ = "calendar_sync_states"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    digest: Mapped[str] = mapped_column(String(64), nullable=False)
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -0,0 +1,21 @@
+"""
+plan_generation_leases テーブル（PostgresGenerationLease のリース）
+key はユーザー × 署名ハッシュ。expires_at を過ぎた行は他のワーカーが奪える。
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.infrastructure.persistence.database import Base
+
+
+class PlanGenerationLease(Base):
+    """生成中のリース 1 件（所有者トークンと失効時刻）"""
+
+    __tablename__ = "plan_generation_leases"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    token: Mapped[str] = mapped_column(String(64), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
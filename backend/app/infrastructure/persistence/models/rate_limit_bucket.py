@@ -0,0 +1,24 @@
+"""
+rate_limit_buckets テーブル（PostgresRateLimiter のトークンバケット）
+key はユーザー × 操作（例: plan_force:<user_id>）。
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.infrastructure.persistence.database import Base
+
+
+class RateLimitBucket(Base):
+    """トークンバケット 1 個（残りトークン数と最終更新時刻）"""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
@@ -1,15 +1,17 @@
 """
 SleepPlanCache ORM モデル
 朝・ホーム画面用の週間睡眠プランキャッシュ（1ユーザー1行で管理）
+プラン本体は plan_format に応じて plan_json（平文）または plan_data（圧縮）に保存する。
 """
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, Text
+from sqlalchemy import DateTime, ForeignKey, LargeBinary, SmallInteger, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.infrastructure.persistence.database import Base
+from app.infrastructure.persistence.plan_codec import FORMAT_TEXT, decode_plan
 
 
 class SleepPlanCache(Base):
@@ -23,8 +25,20 @@ class SleepPlanCache(Base):
         primary_key=True,
     )
     signature_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
-    plan_json: Mapped[str] = mapped_column(Text, nullable=False)
+    # 保存形式のバージョン（app.infrastructure.persistence.plan_codec の FORMAT_*）
+    plan_format: Mapped[int] = mapped_column(
+        SmallInteger, nullable=False, default=FORMAT_TEXT, server_default="0"
+    )
+    # 平文 JSON（plan_format=0 のときのみ。列名は互換のため plan_json のまま）
+    plan_text: Mapped[str | None] = mapped_column("plan_json", Text, nullable=True)
+    # 圧縮済み JSON（plan_format>=1）
+    plan_data: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
     )
+
+    @property
+    def plan_json(self) -> str:
+        """保存形式に関わらず平文の plan JSON を返す"""
+        return decode_plan(self.plan_format, self.plan_text, self.plan_data)
@@ -0,0 +1,33 @@
+"""
+SleepPlanDay ORM モデル
+日単位の睡眠プランキャッシュ（1 ユーザー × 日付で 1 行）。日ごとの署名が一致する日は、
+週の入力が変わっても（日付が進んでも）再利用する。
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.infrastructure.persistence.database import Base
+
+
+class SleepPlanDay(Base):
+    """日単位の睡眠プランキャッシュ ORM モデル"""
+
+    __tablename__ = "sleep_plan_days"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    signature_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # week_plan の要素 1 つ（1 日分）の JSON
+    day_json: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
@@ -0,0 +1,135 @@
+"""
+週間プラン JSON の保存形式（エンコード / デコード）
+sleep_plan_cache.plan_format でバージョン管理し、旧形式の行も読めるようにする。
+
+- 0 (TEXT): plan_json 列に平文 JSON（マイグレーション 005 以前の行）
+- 1 (ZLIB): plan_data 列に zlib 圧縮した UTF-8 JSON（標準ライブラリのみで動く）
+- 2 (ZSTD): plan_data 列に zstd 圧縮した UTF-8 JSON（zstandard が必要）
+- 3 (ZSTD_DICT): 学習済み辞書付き zstd（PLAN_CACHE_ZSTD_DICT_PATH の辞書が必要）
+"""
+
+from __future__ import annotations
+
+import logging
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+
+zstandard: Any
+try:  # zstd は任意依存（pip install 'sleepsupport-backend[zstd]'）
+    import zstandard
+except ImportError:  # pragma: no cover - 環境依存
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_TEXT = 0
+FORMAT_ZLIB = 1
+FORMAT_ZSTD = 2
+FORMAT_ZSTD_DICT = 3
+
+# PLAN_CACHE_CODEC の値と書き込み時の形式の対応
+CODEC_FORMATS = {
+    "none": FORMAT_TEXT,
+    "zlib": FORMAT_ZLIB,
+    "zstd": FORMAT_ZSTD,
+    "zstd-dict": FORMAT_ZSTD_DICT,
+}
+
+
+class PlanCodecError(ValueError):
+    """保存済みプランをデコードできない（未知の形式・辞書なし等）"""
+
+
+@dataclass(frozen=True)
+class EncodedPlan:
+    """エンコード結果。TEXT なら text、それ以外は data に値が入る"""
+
+    format: int
+    text: str | None
+    data: bytes | None
+
+
+@lru_cache
+def _zstd_dict(path: str) -> Any:
+    if zstandard is None:
+        raise PlanCodecError("zstandard がインストールされていません")
+    try:
+        return zstandard.ZstdCompressionDict(Path(path).read_bytes())
+    except OSError as e:
+        raise PlanCodecError(f"zstd 辞書を読み込めません: {path}") from e
+
+
+@lru_cache
+def _zstd_compressor(fmt: int, level: int, dict_path: str) -> Any:
+    if fmt == FORMAT_ZSTD_DICT:
+        return zstandard.ZstdCompressor(level=level, dict_data=_zstd_dict(dict_path))
+    return zstandard.ZstdCompressor(level=level)
+
+
+@lru_cache
+def _zstd_decompressor(fmt: int, dict_path: str) -> Any:
+    if zstandard is None:
+        raise PlanCodecError("zstd 形式の行を読むには zstandard が必要です")
+    if fmt == FORMAT_ZSTD_DICT:
+        if not dict_path:
+            raise PlanCodecError("PLAN_CACHE_ZSTD_DICT_PATH が設定されていません")
+        return zstandard.ZstdDecompressor(dict_data=_zstd_dict(dict_path))
+    return zstandard.ZstdDecompressor()
+
+
+def resolve_write_format(codec: str | None = None) -> int:
+    """
+    設定（PLAN_CACHE_CODEC）から書き込み形式を決める。
+    zstd が使えない環境では zlib にフォールバックする（読み込みの互換性は plan_format で保たれる）。
+    """
+    name = (codec or settings.PLAN_CACHE_CODEC).lower()
+    if name not in CODEC_FORMATS:
+        raise PlanCodecError(f"未知の PLAN_CACHE_CODEC: {name}")
+    fmt = CODEC_FORMATS[name]
+    if fmt in (FORMAT_ZSTD, FORMAT_ZSTD_DICT) and zstandard is None:
+        logger.warning("zstandard が無いため plan_cache の圧縮形式を zlib にフォールバックします")
+        return FORMAT_ZLIB
+    if fmt == FORMAT_ZSTD_DICT and not settings.PLAN_CACHE_ZSTD_DICT_PATH:
+        logger.warning("PLAN_CACHE_ZSTD_DICT_PATH が未設定のため辞書なし zstd で保存します")
+        return FORMAT_ZSTD
+    return fmt
+
+
+def encode_plan(plan_json: str, fmt: int | None = None) -> EncodedPlan:
+    """plan_json を指定形式（省略時は設定値）でエンコードする"""
+    fmt = resolve_write_format() if fmt is None else fmt
+    if fmt == FORMAT_TEXT:
+        return EncodedPlan(format=FORMAT_TEXT, text=plan_json, data=None)
+    raw = plan_json.encode("utf-8")
+    if fmt == FORMAT_ZLIB:
+        level = min(settings.PLAN_CACHE_COMPRESSION_LEVEL, 9)
+        return EncodedPlan(format=fmt, text=None, data=zlib.compress(raw, level))
+    if fmt in (FORMAT_ZSTD, FORMAT_ZSTD_DICT):
+        if zstandard is None:
+            raise PlanCodecError("zstd 形式で保存するには zstandard が必要です")
+        compressor = _zstd_compressor(
+            fmt, settings.PLAN_CACHE_COMPRESSION_LEVEL, settings.PLAN_CACHE_ZSTD_DICT_PATH
+        )
+        return EncodedPlan(format=fmt, text=None, data=compressor.compress(raw))
+    raise PlanCodecError(f"未知の plan_format: {fmt}")
+
+
+def decode_plan(fmt: int, text: str | None, data: bytes | None) -> str:
+    """保存済みの列から plan_json 文字列を復元する"""
+    if fmt == FORMAT_TEXT:
+        if text is None:
+            raise PlanCodecError("TEXT 形式なのに plan_json が空です")
+        return text
+    if data is None:
+        raise PlanCodecError(f"plan_format={fmt} なのに plan_data が空です")
+    if fmt == FORMAT_ZLIB:
+        return zlib.decompress(data).decode("utf-8")
+    if fmt in (FORMAT_ZSTD, FORMAT_ZSTD_DICT):
+        decompressor = _zstd_decompressor(fmt, settings.PLAN_CACHE_ZSTD_DICT_PATH)
+        return str(decompressor.decompress(data).decode("utf-8"))
+    raise PlanCodecError(f"未知の plan_format: {fmt}")
@@ -8,11 +8,13 @@ from typing import Generic, TypeVar
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.application.tracing import traced_methods
 from app.infrastructure.persistence.database import Base
 
 ModelT = TypeVar("ModelT", bound=Base)
 
 
+@traced_methods
 class BaseRepository(Generic[ModelT]):
     """Repository 基底クラス"""
 
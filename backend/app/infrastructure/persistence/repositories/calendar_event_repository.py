@@ -0,0 +1,152 @@
+"""
+CalendarEventRepository 実装（ICalendarEventRepository のアダプター）
+"""
+
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.application.tracing import traced_methods
+from app.domain.calendar import repositories as domain
+from app.infrastructure.persistence.models.calendar_event import CalendarEvent, CalendarSyncState
+
+
+def _to_state(row: CalendarSyncState) -> domain.CalendarSyncState:
+    return domain.CalendarSyncState(
+        version=row.version, digest=row.digest, event_count=row.event_count
+    )
+
+
+@traced_methods
+class CalendarEventRepository:
+    """差分同期したカレンダー予定のリポジトリ実装"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _state_row(self, user_id: str, for_update: bool = False) -> CalendarSyncState | None:
+        stmt = select(CalendarSyncState).where(CalendarSyncState.user_id == user_id)
+        if for_update:
+            stmt = stmt.with_for_update()
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_state(
+        self, user_id: str, for_update: bool = False
+    ) -> domain.CalendarSyncState | None:
+        """同期状態を取得（for_update なら同じユーザーの同期を直列化するため行ロック）"""
+        row = await self._state_row(user_id, for_update)
+        return _to_state(row) if row is not None else None
+
+    async def _event_rows(self, user_id: str, event_ids: list[str]) -> list[CalendarEvent]:
+        result = await self.db.execute(
+            select(CalendarEvent).where(
+                CalendarEvent.user_id == user_id,
+                CalendarEvent.event_id.in_(event_ids),
+            )
+        )
+        return list(result.scalars().all())
+
+    async def get_event_hashes(self, user_id: str, event_ids: list[str]) -> dict[str, str]:
+        """event_ids のうち保存済みの予定を ID → 予定ハッシュで返す"""
+        if not event_ids:
+            return {}
+        result = await self.db.execute(
+            select(CalendarEvent.event_id, CalendarEvent.event_hash).where(
+                CalendarEvent.user_id == user_id,
+                CalendarEvent.event_id.in_(event_ids),
+            )
+        )
+        return dict(result.tuples().all())
+
+    async def replace(
+        self,
+        user_id: str,
+        upserts: dict[str, tuple[dict[str, Any], str]],
+        deletes: list[str],
+        clear: bool = False,
+    ) -> None:
+        """予定を ID ごとに上書き（なければ INSERT）・削除する。clear なら先に全件削除する"""
+        if clear:
+            await self.db.execute(delete(CalendarEvent).where(CalendarEvent.user_id == user_id))
+        elif deletes:
+            await self.db.execute(
+                delete(CalendarEvent).where(
+                    CalendarEvent.user_id == user_id,
+                    CalendarEvent.event_id.in_(deletes),
+                )
+            )
+        existing = (
+            {}
+            if clear
+            else {row.event_id: row for row in await self._event_rows(user_id, list(upserts))}
+        )
+        for event_id, (event, event_hash) in upserts.items():
+            event_json = orjson.dumps(event).decode("utf-8")
+            row = existing.get(event_id)
+            if row is None:
+                self.db.add(
+                    CalendarEvent(
+                        user_id=user_id,
+                        event_id=event_id,
+                        event_json=event_json,
+                        event_hash=event_hash,
+                    )
+                )
+            else:
+                row.event_json = event_json
+                row.event_hash = event_hash
+        await self.db.flush()
+
+    async def save_state(self, user_id: str, state: domain.CalendarSyncState) -> None:
+        """同期状態を保存する（なければ INSERT）"""
+        row = await self._state_row(user_id)
+        if row is None:
+            self.db.add(
+                CalendarSyncState(
+                    user_id=user_id,
+                    version=state.version,
+                    digest=state.digest,
+                    event_count=state.event_count,
+                )
+            )
+        else:
+            row.version = state.version
+            row.digest = state.digest
+            row.event_count = state.event_count
+        await self.db.flush()
+
+    async def get_snapshot(self, user_id: str) -> domain.CalendarSnapshot | None:
+        """保存済みの予定全体（予定 ID 順）とダイジェスト。一度も同期していなければ None"""
+        row = await self._state_row(user_id)
+        if row is None:
+            return None
+        result = await self.db.execute(
+            select(CalendarEvent.event_json)
+            .where(CalendarEvent.user_id == user_id)
+            .order_by(CalendarEvent.event_id)
+        )
+        return domain.CalendarSnapshot(
+            digest=row.digest,
+            events=[orjson.loads(event_json) for event_json in result.scalars().all()],
+        )
+
+
+@traced_methods
+class ShortLivedCalendarEventRepository:
+    """
+    メソッド呼び出しごとに短い作業単位（session_scope）で DB にアクセスするカレンダー予定のリポジトリ。
+    プラン取得（キャッシュミス時のみ予定を読む）で使い、LLM 生成を待つ間は接続を保持しない。
+    """
+
+    def __init__(self, session_scope: Callable[[], AbstractAsyncContextManager[AsyncSession]]):
+        self.session_scope = session_scope
+
+    async def get_snapshot(self, user_id: str) -> domain.CalendarSnapshot | None:
+        """保存済みの予定全体（予定 ID 順）とダイジェスト。一度も同期していなければ None"""
+        async with self.session_scope() as db:
+            return await CalendarEventRepository(db).get_snapshot(user_id)
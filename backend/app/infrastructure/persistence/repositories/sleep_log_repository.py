@@ -7,9 +7,11 @@ from datetime import date, datetime
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.application.tracing import traced_methods
 from app.infrastructure.persistence.models.sleep_log import SleepLog
 
 
+@traced_methods
 class SleepLogRepository:
     """睡眠ログのリポジトリ実装"""
 
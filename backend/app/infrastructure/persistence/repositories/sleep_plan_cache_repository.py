@@ -2,12 +2,20 @@
 SleepPlanCacheRepository 実装（IPlanCacheRepository のアダプター）
 """
 
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
 
+from app.application.tracing import traced_methods
+from app.infrastructure.persistence.database import SESSION_USER_ID
 from app.infrastructure.persistence.models.sleep_plan_cache import SleepPlanCache
+from app.infrastructure.persistence.plan_codec import encode_plan
 
 
+@traced_methods
 class SleepPlanCacheRepository:
     """週間睡眠プランキャッシュのリポジトリ実装"""
 
@@ -34,20 +42,58 @@ class SleepPlanCacheRepository:
         return result.scalar_one_or_none()
 
     async def upsert(self, user_id: str, signature_hash: str, plan_json: str) -> SleepPlanCache:
-        """同一 user_id の行を上書き（なければ INSERT）"""
+        """
+        同一 user_id の行を上書き（なければ INSERT）。created_at は生成時刻として更新する。
+        plan_json は PLAN_CACHE_CODEC の形式でエンコードして保存する。
+        """
+        encoded = encode_plan(plan_json)
         row = await self.get_by_user_id(user_id)
         if row:
             row.signature_hash = signature_hash
-            row.plan_json = plan_json
+            row.plan_format = encoded.format
+            row.plan_text = encoded.text
+            row.plan_data = encoded.data
+            row.created_at = func.now()
             await self.db.flush()
             await self.db.refresh(row)
             return row
         row = SleepPlanCache(
             user_id=user_id,
             signature_hash=signature_hash,
-            plan_json=plan_json,
+            plan_format=encoded.format,
+            plan_text=encoded.text,
+            plan_data=encoded.data,
         )
         self.db.add(row)
         await self.db.flush()
         await self.db.refresh(row)
         return row
+
+
+@traced_methods
+class ShortLivedSleepPlanCacheRepository:
+    """
+    メソッド呼び出しごとに短い作業単位（session_scope）で DB にアクセスするキャッシュリポジトリ。
+    検索 → 接続返却 → LLM 生成 → 新しい作業単位で upsert、となり、LLM を待つ間は接続を保持しない。
+    """
+
+    def __init__(self, session_scope: Callable[[], AbstractAsyncContextManager[AsyncSession]]):
+        self.session_scope = session_scope
+
+    async def get_by_user_and_hash(
+        self, user_id: str, signature_hash: str
+    ) -> SleepPlanCache | None:
+        """user_id と signature_hash が一致するキャッシュを 1 件取得"""
+        async with self.session_scope() as db:
+            return await SleepPlanCacheRepository(db).get_by_user_and_hash(user_id, signature_hash)
+
+    async def get_by_user_id(self, user_id: str) -> SleepPlanCache | None:
+        """user_id で 1 件取得（1 ユーザー 1 行のため）"""
+        async with self.session_scope() as db:
+            return await SleepPlanCacheRepository(db).get_by_user_id(user_id)
+
+    async def upsert(self, user_id: str, signature_hash: str, plan_json: str) -> SleepPlanCache:
+        """同一 user_id の行を上書き（なければ INSERT）し、この作業単位で COMMIT する"""
+        async with self.session_scope() as db:
+            db.info[SESSION_USER_ID] = user_id
+            return await SleepPlanCacheRepository(db).upsert(user_id, signature_hash, plan_json)
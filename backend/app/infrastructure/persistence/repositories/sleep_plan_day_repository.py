@@ -0,0 +1,107 @@
+"""
+SleepPlanDayRepository 実装（IPlanDayCacheRepository のアダプター）
+"""
+
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import date
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.application.tracing import traced_methods
+from app.domain.plan.repositories import PlanDay
+from app.infrastructure.persistence.database import SESSION_USER_ID
+from app.infrastructure.persistence.models.sleep_plan_day import SleepPlanDay
+
+
+def _to_plan_day(row: SleepPlanDay) -> PlanDay:
+    return PlanDay(
+        date=row.date.isoformat(), signature_hash=row.signature_hash, day_json=row.day_json
+    )
+
+
+@traced_methods
+class SleepPlanDayRepository:
+    """日単位の睡眠プランキャッシュのリポジトリ実装"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _rows(self, user_id: str, dates: list[date]) -> list[SleepPlanDay]:
+        result = await self.db.execute(
+            select(SleepPlanDay).where(
+                SleepPlanDay.user_id == user_id,
+                SleepPlanDay.date.in_(dates),
+            )
+        )
+        return list(result.scalars().all())
+
+    async def get_days(self, user_id: str, dates: list[str]) -> dict[str, PlanDay]:
+        """dates（YYYY-MM-DD）のうち保存済みの日を date → PlanDay で返す"""
+        if not dates:
+            return {}
+        rows = await self._rows(user_id, [date.fromisoformat(d) for d in dates])
+        return {row.date.isoformat(): _to_plan_day(row) for row in rows}
+
+    async def upsert_days(
+        self, user_id: str, days: list[PlanDay], keep_from: str | None = None
+    ) -> None:
+        """
+        同じ日付の行を上書き（なければ INSERT）。created_at は生成時刻として更新する。
+        keep_from（今日）より前の日付の行は二度と使われないため削除する。
+        """
+        if keep_from is not None:
+            await self.db.execute(
+                delete(SleepPlanDay).where(
+                    SleepPlanDay.user_id == user_id,
+                    SleepPlanDay.date < date.fromisoformat(keep_from),
+                )
+            )
+        if not days:
+            return
+        existing = {
+            row.date.isoformat(): row
+            for row in await self._rows(user_id, [date.fromisoformat(d.date) for d in days])
+        }
+        for day in days:
+            row = existing.get(day.date)
+            if row is None:
+                self.db.add(
+                    SleepPlanDay(
+                        user_id=user_id,
+                        date=date.fromisoformat(day.date),
+                        signature_hash=day.signature_hash,
+                        day_json=day.day_json,
+                    )
+                )
+            else:
+                row.signature_hash = day.signature_hash
+                row.day_json = day.day_json
+                row.created_at = func.now()
+        await self.db.flush()
+
+
+@traced_methods
+class ShortLivedSleepPlanDayRepository:
+    """
+    メソッド呼び出しごとに短い作業単位（session_scope）で DB にアクセスする日単位キャッシュのリポジトリ。
+    LLM 生成の前後で別々に接続を借り、生成を待つ間は接続を保持しない。
+    """
+
+    def __init__(self, session_scope: Callable[[], AbstractAsyncContextManager[AsyncSession]]):
+        self.session_scope = session_scope
+
+    async def get_days(self, user_id: str, dates: list[str]) -> dict[str, PlanDay]:
+        """dates（YYYY-MM-DD）のうち保存済みの日を date → PlanDay で返す"""
+        async with self.session_scope() as db:
+            return await SleepPlanDayRepository(db).get_days(user_id, dates)
+
+    async def upsert_days(
+        self, user_id: str, days: list[PlanDay], keep_from: str | None = None
+    ) -> None:
+        """日ごとに上書き（なければ INSERT）し、この作業単位で COMMIT する"""
+        async with self.session_scope() as db:
+            db.info[SESSION_USER_ID] = user_id
+            await SleepPlanDayRepository(db).upsert_days(user_id, days, keep_from)
@@ -8,9 +8,11 @@ from datetime import date
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.application.tracing import traced_methods
 from app.infrastructure.persistence.models.sleep_settings import SleepSettings
 
 
+@traced_methods
 class SleepSettingsRepository:
     """睡眠設定リポジトリ（1 ユーザー 1 行）"""
 
@@ -5,10 +5,16 @@ UserRepository 実装（IPlanCacheRepository のアダプター）
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.application.tracing import traced_methods
+from app.infrastructure.cache import TOPIC_USER, LocalCache
 from app.infrastructure.persistence.models.user import User
 from app.infrastructure.persistence.repositories.base import BaseRepository
 
+# 存在を確認済みの user_id（認証付き書き込みのたびに users を SELECT しないため）
+known_users: LocalCache[bool] = LocalCache(TOPIC_USER)
 
+
+@traced_methods
 class UserRepository(BaseRepository[User]):
     """ユーザーリポジトリ実装"""
 
@@ -34,9 +40,14 @@ class UserRepository(BaseRepository[User]):
         """
         認証済み user_id に対応する users 行が存在することを保証する。
         存在しなければ id=user_id で 1 件挿入する（Supabase Auth の uid と整合させるため）。
+        確認済みの user_id はプロセス内にキャッシュする（挿入した行は COMMIT 前なので次回の確認で載せる）。
         """
+        if known_users.get(user_id, False):
+            return
+        generation = known_users.generation(user_id)
         existing = await self.get_by_id(user_id)
         if existing is not None:
+            known_users.set_if_generation(user_id, generation, True)
             return
         # 同一 id で Supabase Auth と紐づく行を挿入（email は unique のためプレースホルダー）
         user = User(
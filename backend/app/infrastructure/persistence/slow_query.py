@@ -0,0 +1,244 @@
+"""
+遅い SQL の記録（SLOW_QUERY_MS 以上かかった SQL）
+install_slow_query_capture でエンジンに実行時間を測るリスナーを登録し、閾値を超えた SQL を
+正規化した文・パラメータの型・所要時間でリングバッファ（SlowQueryLog）に残す。
+読み取り SQL の一部（SLOW_QUERY_EXPLAIN_SAMPLE_RATE）は、別の接続で
+EXPLAIN (ANALYZE, BUFFERS) を取って記録に添える（実行計画の劣化の確認用）。
+パラメータの値は記録しない（個人情報を残さないため、型と件数だけ）。
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# conn.info のキー（実行開始時刻のスタック・EXPLAIN 用の接続の印）
+_QUERY_STARTED = "slow_query_started"
+_EXPLAIN_CONNECTION = "slow_query_explain"
+
+# 同時に走らせる EXPLAIN の上限（超えた分は取らない）
+MAX_CONCURRENT_EXPLAINS = 2
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+# IN ($2::VARCHAR, $3::VARCHAR, ...) のように件数で形が変わるプレースホルダーの並び
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*\$\d+(?:::\w+)?\s*,)+\s*\$\d+(?:::\w+)?\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """同じ形の SQL が同じ文字列になるよう、空白を詰め・リテラルを ? に・IN のプレースホルダー列を (...) にする"""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _PLACEHOLDER_LIST.sub("(...)", sql)
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """パラメータの形（型名の並び。executemany は件数 × 1 行の形）。値は含めない"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameter_shape(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+def is_read_only(statement: str) -> bool:
+    """EXPLAIN ANALYZE してよい読み取り SQL か（行ロックを取る SELECT は除く）"""
+    sql = statement.lstrip().upper()
+    return sql.startswith("SELECT") and " FOR UPDATE" not in sql and " FOR SHARE" not in sql
+
+
+@dataclass
+class SlowQuery:
+    """記録した遅い SQL 1 件"""
+
+    statement: str
+    parameters: str
+    duration_ms: float
+    recorded_at: datetime
+    engine: str
+    # EXPLAIN (ANALYZE, BUFFERS) の結果（取らなかった場合は None。取得中は空リスト）
+    plan: list[str] | None = None
+    plan_error: str | None = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "parameters": self.parameters,
+            "duration_ms": round(self.duration_ms, 1),
+            "recorded_at": self.recorded_at.isoformat(),
+            "engine": self.engine,
+            "plan": self.plan,
+            "plan_error": self.plan_error,
+        }
+
+
+@dataclass
+class SlowQueryLog:
+    """遅い SQL のリングバッファ（新しい順に読む）"""
+
+    max_entries: int = 200
+    threshold_ms: float = 0.0
+    explain_sample_rate: float = 0.0
+    recorded: int = 0
+    explained: int = 0
+    _entries: deque[SlowQuery] = field(default_factory=deque)
+
+    def __post_init__(self) -> None:
+        self._entries = deque(maxlen=self.max_entries)
+
+    def add(self, entry: SlowQuery) -> None:
+        self._entries.append(entry)
+        self.recorded += 1
+
+    def entries(self) -> list[SlowQuery]:
+        return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "enabled": self.threshold_ms > 0,
+            "threshold_ms": self.threshold_ms,
+            "explain_sample_rate": self.explain_sample_rate,
+            "recorded": self.recorded,
+            "explained": self.explained,
+            "entries": [e.snapshot() for e in self.entries()],
+        }
+
+
+class _SlowQueryCapture:
+    """1 つのエンジンに登録するリスナー一式"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        log: SlowQueryLog,
+        threshold_ms: float,
+        explain_sample_rate: float,
+        sample: Callable[[], float],
+    ):
+        self.engine = engine
+        self.log = log
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.sample = sample
+        self._explains: set[asyncio.Task[None]] = set()
+
+    def before_cursor_execute(self, conn, _cursor, _statement, _parameters, _context, _many):
+        conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, _cursor, statement, parameters, _context, executemany):
+        started = conn.info.get(_QUERY_STARTED)
+        if not started:
+            return
+        duration_ms = (time.perf_counter() - started.pop()) * 1000
+        if duration_ms < self.threshold_ms or conn.info.get(_EXPLAIN_CONNECTION):
+            return
+        entry = SlowQuery(
+            statement=normalize_sql(statement),
+            parameters=parameter_shape(parameters, executemany),
+            duration_ms=duration_ms,
+            recorded_at=datetime.now(UTC),
+            engine=self.engine.url.render_as_string(hide_password=True),
+        )
+        self.log.add(entry)
+        logger.info("slow query %.1fms: %s", duration_ms, entry.statement[:500])
+        if (
+            not executemany
+            and self.explain_sample_rate > 0
+            and is_read_only(statement)
+            and len(self._explains) < MAX_CONCURRENT_EXPLAINS
+            and self.sample() < self.explain_sample_rate
+        ):
+            self._start_explain(entry, statement, parameters)
+
+    def handle_error(self, context) -> None:
+        conn = context.connection
+        started = conn.info.get(_QUERY_STARTED) if conn is not None else None
+        if started:
+            started.pop()
+
+    def _start_explain(self, entry: SlowQuery, statement: str, parameters: Any) -> None:
+        # リスナーは SQL を実行中の接続の中（greenlet）で呼ばれるため、EXPLAIN は別のタスク・別の接続で取る。
+        # リクエストの contextvar（SQL 数・スパン）を引き継がないよう空のコンテキストで動かす
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        entry.plan = []
+        task = loop.create_task(
+            self._explain(entry, statement, parameters), context=contextvars.Context()
+        )
+        self._explains.add(task)
+        task.add_done_callback(self._explains.discard)
+
+    async def _explain(self, entry: SlowQuery, statement: str, parameters: Any) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                conn.info[_EXPLAIN_CONNECTION] = True
+                try:
+                    # EXPLAIN ANALYZE は SQL を実際に実行する。記録した時間の数倍で打ち切る
+                    timeout_ms = max(1000, int(entry.duration_ms * 5))
+                    await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+                    result = await conn.exec_driver_sql(
+                        f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                    )
+                    entry.plan = [row[0] for row in result]
+                    self.log.explained += 1
+                finally:
+                    conn.info.pop(_EXPLAIN_CONNECTION, None)
+                    # 読み取りだけだが、念のため COMMIT せずに閉じる
+                    await conn.rollback()
+        except Exception as e:
+            entry.plan = None
+            entry.plan_error = f"{type(e).__name__}: {e}"
+            logger.warning("slow query EXPLAIN failed: %s", e)
+
+    async def wait_explains(self) -> None:
+        """実行中の EXPLAIN が終わるまで待つ（テスト・終了時用）"""
+        if self._explains:
+            await asyncio.gather(*self._explains, return_exceptions=True)
+
+
+def install_slow_query_capture(
+    engine: AsyncEngine,
+    log: SlowQueryLog,
+    threshold_ms: float,
+    explain_sample_rate: float = 0.0,
+    sample: Callable[[], float] = random.random,
+) -> _SlowQueryCapture:
+    """engine に遅い SQL を記録するリスナーを登録する（threshold_ms 以上を log に残す）"""
+    log.threshold_ms = threshold_ms
+    log.explain_sample_rate = explain_sample_rate
+    capture = _SlowQueryCapture(engine, log, threshold_ms, explain_sample_rate, sample)
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture.before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", capture.after_cursor_execute)
+    event.listen(sync_engine, "handle_error", capture.handle_error)
+    return capture
+
+
+def uninstall_slow_query_capture(capture: _SlowQueryCapture) -> None:
+    """install_slow_query_capture で登録したリスナーを外す"""
+    sync_engine = capture.engine.sync_engine
+    event.remove(sync_engine, "before_cursor_execute", capture.before_cursor_execute)
+    event.remove(sync_engine, "after_cursor_execute", capture.after_cursor_execute)
+    event.remove(sync_engine, "handle_error", capture.handle_error)
@@ -0,0 +1,61 @@
+"""
+SQL 実行数のカウンター（往復回数・N+1 の回帰検出用）
+with count_statements() as counter: の間に、このコンテキスト（SQLAlchemy の greenlet・
+そこから作られたタスクを含む）で実行された SQL を数える。
+テストでは tests/conftest.py の statement_counter フィクスチャから使う。
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import Engine, event
+
+
+@dataclass
+class StatementCounter:
+    """数えた SQL（実行順）"""
+
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+    def assert_at_most(self, budget: int, label: str = "") -> None:
+        """SQL が budget 回を超えていれば、実行した SQL の一覧つきで AssertionError"""
+        if self.count <= budget:
+            return
+        listing = "\n".join(
+            f"  {i + 1}. {' '.join(s.split())}" for i, s in enumerate(self.statements)
+        )
+        raise AssertionError(
+            f"{label + ': ' if label else ''}SQL {self.count} 回（予算 {budget} 回）\n{listing}"
+        )
+
+
+_current_counter: ContextVar[StatementCounter | None] = ContextVar(
+    "statement_counter", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+@contextmanager
+def count_statements() -> Iterator[StatementCounter]:
+    """with の間に実行された SQL を数える"""
+    counter = StatementCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
@@ -0,0 +1,18 @@
+"""レート制限（IRateLimiter の実装）"""
+
+from app.application.plan.ports import IRateLimiter
+from app.infrastructure.persistence.database import session_scope
+from app.infrastructure.ratelimit.memory import InMemoryRateLimiter
+from app.infrastructure.ratelimit.postgres import PostgresRateLimiter
+
+
+def build_rate_limiter(backend: str) -> IRateLimiter:
+    """RATE_LIMIT_BACKEND（memory | postgres）からレート制限の実装を作る"""
+    if backend == "memory":
+        return InMemoryRateLimiter()
+    if backend == "postgres":
+        return PostgresRateLimiter(session_scope)
+    raise ValueError(f"未知の RATE_LIMIT_BACKEND: {backend}")
+
+
+__all__ = ["InMemoryRateLimiter", "PostgresRateLimiter", "build_rate_limiter"]
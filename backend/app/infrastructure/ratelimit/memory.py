@@ -0,0 +1,72 @@
+"""
+インメモリのトークンバケット（1 プロセス内でのみ有効。単一ワーカー・開発用）
+満タンまで回復したバケットは「初めてのキー」と同じなので、sweep_interval_seconds ごとに捨てる
+（一度だけ来たユーザーのバケットが溜まり続けない）。
+"""
+
+import math
+import time
+from collections.abc import Callable
+
+from app.application.plan.ports import RateLimitDecision, RateLimitPolicy
+
+
+def refill(tokens: float, elapsed_seconds: float, policy: RateLimitPolicy) -> float:
+    """経過時間ぶん回復したトークン数（burst が上限）"""
+    return min(policy.burst, tokens + max(0.0, elapsed_seconds) * policy.refill_per_second)
+
+
+def retry_after(tokens: float, policy: RateLimitPolicy) -> float:
+    """1 トークン貯まるまでの秒数"""
+    if policy.refill_per_second <= 0:
+        return math.inf
+    return max(0.0, (1 - tokens) / policy.refill_per_second)
+
+
+class InMemoryRateLimiter:
+    """IRateLimiter のインメモリ実装"""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        sweep_interval_seconds: float = 60.0,
+    ):
+        self._clock = clock
+        self.sweep_interval_seconds = sweep_interval_seconds
+        # key → (トークン数, 更新時刻, 満タンに戻る時刻)
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._last_sweep = clock()
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+    def _sweep(self, now: float) -> None:
+        """満タンに戻ったバケットを捨てる（次に来たときは burst から始まるので結果は変わらない）"""
+        if now - self._last_sweep < self.sweep_interval_seconds:
+            return
+        self._last_sweep = now
+        full = [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]
+        for key in full:
+            del self._buckets[key]
+
+    def _store(self, key: str, tokens: float, now: float, policy: RateLimitPolicy) -> None:
+        missing = policy.burst - tokens
+        if missing <= 0:
+            full_at = now
+        elif policy.refill_per_second > 0:
+            full_at = now + missing / policy.refill_per_second
+        else:
+            full_at = math.inf
+        self._buckets[key] = (tokens, now, full_at)
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        now = self._clock()
+        self._sweep(now)
+        tokens, updated, _ = self._buckets.get(key, (policy.burst, now, now))
+        tokens = refill(tokens, now - updated, policy)
+        if tokens >= 1:
+            self._store(key, tokens - 1, now, policy)
+            return RateLimitDecision(allowed=True)
+        self._store(key, tokens, now, policy)
+        return RateLimitDecision(allowed=False, retry_after_seconds=retry_after(tokens, policy))
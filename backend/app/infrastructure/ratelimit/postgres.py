@@ -0,0 +1,56 @@
+"""
+PostgreSQL のトークンバケット（rate_limit_buckets テーブル。複数ワーカー・複数インスタンスで共有）
+判定と消費は 1 つの INSERT ... ON CONFLICT DO UPDATE で行うため、同時実行でも二重に消費しない。
+"""
+
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.application.plan.ports import RateLimitDecision, RateLimitPolicy
+from app.infrastructure.ratelimit.memory import refill, retry_after
+
+# 回復後のトークンが 1 以上のときだけ 1 消費して更新する。更新されなければ RETURNING は 0 行
+_ACQUIRE_SQL = text(
+    """
+    INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at)
+    VALUES (:key, :burst - 1, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = LEAST(
+            :burst,
+            b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate
+        ) - 1,
+        updated_at = clock_timestamp()
+    WHERE LEAST(
+        :burst,
+        b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate
+    ) >= 1
+    RETURNING b.tokens
+    """
+)
+
+_STATE_SQL = text(
+    """
+    SELECT tokens, EXTRACT(EPOCH FROM clock_timestamp() - updated_at) AS elapsed
+    FROM rate_limit_buckets WHERE key = :key
+    """
+)
+
+
+class PostgresRateLimiter:
+    """IRateLimiter の PostgreSQL 実装。判定ごとに短い作業単位（session_scope）を使う"""
+
+    def __init__(self, session_scope: Callable[[], AbstractAsyncContextManager[AsyncSession]]):
+        self.session_scope = session_scope
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        params = {"key": key, "burst": policy.burst, "rate": policy.refill_per_second}
+        async with self.session_scope() as db:
+            acquired = (await db.execute(_ACQUIRE_SQL, params)).first()
+            if acquired is not None:
+                return RateLimitDecision(allowed=True)
+            row = (await db.execute(_STATE_SQL, {"key": key})).first()
+        tokens = refill(float(row.tokens), float(row.elapsed), policy) if row else 0.0
+        return RateLimitDecision(allowed=False, retry_after_seconds=retry_after(tokens, policy))
@@ -0,0 +1,18 @@
+"""プラン生成のリース（IGenerationLease の実装）"""
+
+from app.application.plan.ports import IGenerationLease
+from app.infrastructure.persistence.database import session_scope
+from app.infrastructure.singleflight.memory import InMemoryGenerationLease
+from app.infrastructure.singleflight.postgres import PostgresGenerationLease
+
+
+def build_generation_lease(backend: str) -> IGenerationLease:
+    """PLAN_SINGLEFLIGHT_BACKEND（memory | postgres）からリースの実装を作る"""
+    if backend == "memory":
+        return InMemoryGenerationLease()
+    if backend == "postgres":
+        return PostgresGenerationLease(session_scope)
+    raise ValueError(f"未知の PLAN_SINGLEFLIGHT_BACKEND: {backend}")
+
+
+__all__ = ["InMemoryGenerationLease", "PostgresGenerationLease", "build_generation_lease"]
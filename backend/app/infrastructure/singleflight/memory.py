@@ -0,0 +1,33 @@
+"""
+インメモリのリース（1 プロセス内でのみ有効。単一ワーカー・開発用）
+"""
+
+import time
+import uuid
+from collections.abc import Callable
+
+
+class InMemoryGenerationLease:
+    """IGenerationLease のインメモリ実装"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._leases: dict[str, tuple[str, float]] = {}
+
+    async def try_acquire(self, key: str, ttl_seconds: float) -> str | None:
+        now = self._clock()
+        held = self._leases.get(key)
+        if held is not None and held[1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._leases[key] = (token, now + ttl_seconds)
+        return token
+
+    async def is_held(self, key: str) -> bool:
+        held = self._leases.get(key)
+        return held is not None and held[1] > self._clock()
+
+    async def release(self, key: str, token: str) -> None:
+        held = self._leases.get(key)
+        if held is not None and held[0] == token:
+            del self._leases[key]
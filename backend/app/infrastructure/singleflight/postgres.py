@@ -0,0 +1,54 @@
+"""
+PostgreSQL のリース（plan_generation_leases テーブル。複数ワーカー・複数インスタンスで共有）
+取得は 1 つの INSERT ... ON CONFLICT DO UPDATE で行い、失効済みの行だけを奪う。
+advisory lock と違い LLM 生成の間に接続を保持しない（各操作は短い作業単位）。
+"""
+
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 行が無いか失効していれば自分のトークンで上書きする。保持中なら RETURNING は 0 行
+_ACQUIRE_SQL = text(
+    """
+    INSERT INTO plan_generation_leases AS l (key, token, expires_at)
+    VALUES (:key, :token, clock_timestamp() + make_interval(secs => :ttl))
+    ON CONFLICT (key) DO UPDATE SET
+        token = EXCLUDED.token,
+        expires_at = EXCLUDED.expires_at
+    WHERE l.expires_at <= clock_timestamp()
+    RETURNING l.token
+    """
+)
+
+_HELD_SQL = text(
+    "SELECT 1 FROM plan_generation_leases WHERE key = :key AND expires_at > clock_timestamp()"
+)
+
+_RELEASE_SQL = text("DELETE FROM plan_generation_leases WHERE key = :key AND token = :token")
+
+
+class PostgresGenerationLease:
+    """IGenerationLease の PostgreSQL 実装。操作ごとに短い作業単位（session_scope）を使う"""
+
+    def __init__(self, session_scope: Callable[[], AbstractAsyncContextManager[AsyncSession]]):
+        self.session_scope = session_scope
+
+    async def try_acquire(self, key: str, ttl_seconds: float) -> str | None:
+        token = uuid.uuid4().hex
+        async with self.session_scope() as db:
+            row = (
+                await db.execute(_ACQUIRE_SQL, {"key": key, "token": token, "ttl": ttl_seconds})
+            ).first()
+        return token if row is not None else None
+
+    async def is_held(self, key: str) -> bool:
+        async with self.session_scope() as db:
+            return (await db.execute(_HELD_SQL, {"key": key})).first() is not None
+
+    async def release(self, key: str, token: str) -> None:
+        async with self.session_scope() as db:
+            await db.execute(_RELEASE_SQL, {"key": key, "token": token})
@@ -1,17 +1,30 @@
 """
 SleepSupportApp FastAPI Backend（オニオンアーキテクチャ）
+create_app() がミドルウェア・ルーターとアプリごとの状態（app.state）を組み立てる。
+uvicorn からは `--factory app.main:create_app` で起動する（import しただけではアプリを作らない）。
+supabase SDK・OpenRouter クライアントは最初に使うときに読み込む（起動時間の内訳は docs/plan-cache.md「起動時間」）。
 """
 
+import logging
+import sys
 from contextlib import asynccontextmanager
 
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 import app.infrastructure.persistence.models  # noqa: F401 - metadata 登録
+from app.application.shutdown import drain_on_signal
+from app.application.tracing import build_span_exporter, tracer
 from app.config import settings
-from app.database import init_db
-from app.presentation.api import health, plan, sleep_logs, users
+from app.database import dispose_engines, init_db
+from app.infrastructure.cache import build_invalidation_listener
+from app.presentation.api import calendar, debug, health, plan, sleep_logs, users
 from app.presentation.api import settings as settings_api
+from app.presentation.middleware import DbStatsMiddleware, ServerTimingMiddleware
+from app.presentation.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -19,37 +32,54 @@ async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
     print(f"🚀 Starting SleepSupportApp API ({settings.ENV} mode)")
     await init_db()
+    # 他ワーカーの書き込みでプロセス内キャッシュを消すリスナー（CACHE_INVALIDATION_BACKEND=postgres のとき）
+    listener = build_invalidation_listener(settings.CACHE_INVALIDATION_BACKEND)
+    if listener is not None:
+        listener.start()
+    # GET /health/ready がリスナーの生存を確認する
+    app.state.invalidation_listener = listener
+    services: plan.PlanServices = app.state.plan_services
+    # 設定・睡眠ログの書き込み後にプランを裏で生成するワーカー
+    services.precomputer.start()
+    # SIGTERM を受けた時点で新しい生成を断り、/health/ready を 503 にする（uvicorn の終了処理はそのまま）
+    restore_signal = drain_on_signal(services.shutdown)
     yield
+    # 実行中の生成（リクエストがキャンセルされた分を含む）を保存まで待ってから接続を閉じる
+    services.shutdown.begin_drain()
+    await services.precomputer.stop()
+    await services.shutdown.drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    restore_signal()
+    if listener is not None:
+        await listener.stop()
+    _flush_observability(services)
+    await dispose_engines()
     print("👋 Shutting down SleepSupportApp API")
 
 
-web_app = FastAPI(
-    title="SleepSupportApp API",
-    description="睡眠サポートアプリのバックエンドAPI",
-    version="0.1.0",
-    lifespan=lifespan,
-    docs_url="/api/docs" if settings.DEBUG else None,
-    redoc_url="/api/redoc" if settings.DEBUG else None,
-)
-
-_cors_origins = ["*"] if settings.ENV == "development" else settings.CORS_ORIGINS
-_cors_credentials = settings.ENV != "development"
-web_app.add_middleware(
-    CORSMiddleware,
-    allow_origins=_cors_origins,
-    allow_credentials=_cors_credentials,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-web_app.include_router(health.router, prefix=settings.API_PREFIX, tags=["health"])
-web_app.include_router(users.router, prefix=settings.API_PREFIX)
-web_app.include_router(plan.router, prefix=settings.API_PREFIX)
-web_app.include_router(settings_api.router, prefix=settings.API_PREFIX)
-web_app.include_router(sleep_logs.router, prefix=settings.API_PREFIX)
-
-
-@web_app.get("/")
+def _flush_observability(services: plan.PlanServices) -> None:
+    """このワーカーの累積カウンタをログに残し、ログのハンドラー・標準出力を吐き出す"""
+    logger.info(
+        "final metrics %s shutdown=%s",
+        orjson.dumps(health.metrics_snapshot(services)).decode(),
+        services.shutdown.snapshot(),
+    )
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    sys.stdout.flush()
+
+
+# API_PREFIX 以下のルーター（tests/test_query_budgets.py が全ルートの SQL 予算を確認する）
+API_ROUTERS = [
+    health.router,
+    users.router,
+    plan.router,
+    settings_api.router,
+    sleep_logs.router,
+    calendar.router,
+    debug.router,
+]
+
+
 async def root():
     """ルートエンドポイント"""
     return {
@@ -57,3 +87,53 @@ async def root():
         "version": "0.1.0",
         "docs": "/api/docs" if settings.DEBUG else "disabled",
     }
+
+
+def create_app() -> FastAPI:
+    """
+    FastAPI アプリを組み立てる（トレーシング・ミドルウェア・ルーター・app.state）。
+    レート制限・リース・サーキットブレーカー・事前計算・シャットダウンの退避はアプリごとに作り、
+    呼ぶたびに別の状態を持つ（エクスポーターと DB エンジンはプロセスで共有）。
+    """
+    # TRACING_EXPORTER=none（既定）の間はスパンを作らない
+    tracer.exporter = build_span_exporter(settings.TRACING_EXPORTER)
+
+    fastapi_app = FastAPI(
+        title="SleepSupportApp API",
+        description="睡眠サポートアプリのバックエンドAPI",
+        version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+        docs_url="/api/docs" if settings.DEBUG else None,
+        redoc_url="/api/redoc" if settings.DEBUG else None,
+    )
+
+    services = plan.build_plan_services()
+    fastapi_app.state.plan_services = services
+    # 書き込み経路のドメインイベントの購読者（get_event_publisher が COMMIT 後に配る）
+    fastapi_app.state.event_subscribers = [services.precomputer]
+
+    cors_origins = ["*"] if settings.ENV == "development" else settings.CORS_ORIGINS
+    fastapi_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=settings.ENV != "development",
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # 管理者のフロントエンドから区間の内訳を読めるようにする（ヘッダーは管理者にだけ付く）
+        expose_headers=["Server-Timing"],
+    )
+    fastapi_app.add_middleware(DbStatsMiddleware)
+    # 最も外側で計測し、total にミドルウェアを含むリクエスト全体の時間を出す
+    fastapi_app.add_middleware(
+        ServerTimingMiddleware,
+        sample_rate=settings.SERVER_TIMING_SAMPLE_RATE,
+        slow_ms=settings.SERVER_TIMING_SLOW_MS,
+        public=settings.SERVER_TIMING_PUBLIC,
+        allow_origins=cors_origins,
+    )
+
+    for router in API_ROUTERS:
+        fastapi_app.include_router(router, prefix=settings.API_PREFIX)
+    fastapi_app.get("/")(root)
+    return fastapi_app
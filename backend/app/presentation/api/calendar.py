@@ -0,0 +1,68 @@
+"""カレンダー同期 API（POST /calendar/sync）。認証必須。"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.application.calendar import (
+    CalendarSyncConflictError,
+    SyncCalendarInput,
+    SyncCalendarUseCase,
+)
+from app.domain.events import CalendarSynced, IDomainEventPublisher
+from app.infrastructure.persistence.database import get_db
+from app.infrastructure.persistence.repositories.calendar_event_repository import (
+    CalendarEventRepository,
+)
+from app.presentation.dependencies.auth import ensure_current_user
+from app.presentation.dependencies.events import get_event_publisher
+from app.presentation.query_budget import query_budget
+from app.presentation.schemas.calendar import CalendarSyncRequest, CalendarSyncResponse
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+
+def _calendar_repo(db: AsyncSession = Depends(get_db)) -> CalendarEventRepository:
+    return CalendarEventRepository(db)
+
+
+@router.post(
+    "/sync",
+    response_model=CalendarSyncResponse,
+    responses={409: {"description": "sync_token が古い（sync_token を省略して全件同期し直す）"}},
+)
+@query_budget(8)
+async def sync_calendar(
+    body: CalendarSyncRequest,
+    user_id: str = Depends(ensure_current_user),
+    repo: CalendarEventRepository = Depends(_calendar_repo),
+    events: IDomainEventPublisher = Depends(get_event_publisher),
+):
+    """
+    カレンダー予定をサーバーに差分同期する。
+    sync_token 以降に追加・変更した予定（upserted）と削除した予定の id（deleted）だけを送る。
+    sync_token を省略すると全件同期（upserted で保存済みの予定を置き換える）。
+    sync_token が現在の状態と一致しなければ 409（全件同期し直す）。
+    返した calendar_digest を POST /sleep-plans に送れば、予定本体を毎回送らずに済む。
+    同期後に CalendarSynced を発行する（プランの事前計算）。認証必須。
+    """
+    usecase = SyncCalendarUseCase(repo)
+    try:
+        state = await usecase.execute(
+            SyncCalendarInput(
+                user_id=user_id,
+                sync_token=body.sync_token,
+                upserts={event.id: event.model_dump(exclude={"id"}) for event in body.upserted},
+                deletes=body.deleted,
+            )
+        )
+    except CalendarSyncConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail="Calendar sync token is stale. Please resync without sync_token.",
+        ) from e
+    events.publish(CalendarSynced(user_id=user_id, digest=state.digest))
+    return CalendarSyncResponse(
+        sync_token=state.sync_token,
+        calendar_digest=state.digest,
+        event_count=state.event_count,
+    )
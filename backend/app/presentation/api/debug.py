@@ -0,0 +1,45 @@
+"""デバッグ用 API（管理者のみ: ADMIN_USER_IDS）"""
+
+from fastapi import APIRouter, Depends, Request, Response
+
+from app.infrastructure.cache import cache_registry
+from app.infrastructure.persistence.database import slow_query_log
+from app.presentation.dependencies.auth import require_admin
+from app.presentation.query_budget import query_budget
+from app.presentation.readiness import readiness
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/slow-queries")
+@query_budget(0)
+async def get_slow_queries(_admin_id: str = Depends(require_admin)):
+    """
+    SLOW_QUERY_MS 以上かかった SQL（新しい順。このワーカーの分だけ）。
+    plan はサンプリングした読み取り SQL の EXPLAIN (ANALYZE, BUFFERS)。
+    """
+    return slow_query_log.snapshot()
+
+
+@router.delete("/slow-queries", status_code=204)
+@query_budget(0)
+async def clear_slow_queries(_admin_id: str = Depends(require_admin)):
+    """記録した遅い SQL を消す（実行計画の変化を見比べる前に使う）"""
+    slow_query_log.clear()
+    return Response(status_code=204)
+
+
+@router.get("/health")
+@query_budget(1)
+async def detailed_health(request: Request, _admin_id: str = Depends(require_admin)):
+    """
+    GET /health/ready の詳細版（常に 200）。準備完了の各チェックに加え、プロセス内キャッシュの件数・
+    ヒット率と、書き込み後の事前計算のヒット数（このワーカーの分だけ）。
+    """
+    ready, body = await readiness(request.app.state)
+    return {
+        **body,
+        "ready": ready,
+        "caches": cache_registry.snapshot(),
+        "plan_precompute": request.app.state.plan_services.precomputer.snapshot(),
+    }
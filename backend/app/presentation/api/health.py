@@ -1,16 +1,32 @@
-"""ヘルスチェックエンドポイント"""
+"""
+ヘルスチェックエンドポイント
+/health/live はプロセスが応答できるか（再起動の判定用）、/health/ready はトラフィックを受けてよいか
+（ロードバランサーの振り分け用。準備未完了なら 503）。
+"""
 
-from fastapi import APIRouter, Depends
+from typing import Any
+
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.application.timing import server_timing_metrics
 from app.config import settings
+from app.infrastructure.llm.model_router import plan_model_metrics
+from app.infrastructure.llm.week_plan_output import week_plan_output_metrics
+from app.infrastructure.llm.week_plan_prompt import PROMPT_VERSION
+from app.infrastructure.persistence import database
 from app.infrastructure.persistence.database import get_db
+from app.presentation.api.plan import PlanServices
+from app.presentation.query_budget import query_budget
+from app.presentation.readiness import readiness
+from app.presentation.responses import ORJSONResponse
 
-router = APIRouter()
+router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
+@query_budget(0)
 async def health_check():
     """API のヘルスチェック"""
     return {
@@ -19,18 +35,76 @@ async def health_check():
     }
 
 
+@router.get("/health/live")
+@query_budget(0)
+async def liveness():
+    """生存確認（イベントループが応答できれば 200。DB などの依存は見ない）"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+@query_budget(1)
+async def readiness_check(request: Request):
+    """
+    準備完了の確認。DB 疎通（結果は HEALTH_DB_CHECK_TTL_SECONDS の間使い回す）・接続プールの飽和・
+    LLM のサーキットブレーカー・バックグラウンドのワーカーを見て、準備未完了なら 503 を返す。
+    """
+    ready, body = await readiness(request.app.state)
+    return ORJSONResponse(body, status_code=200 if ready else 503)
+
+
+def metrics_snapshot(services: PlanServices) -> dict[str, Any]:
+    """プロセス内の累積カウンタ（GET /health/metrics・シャットダウン時のログ）"""
+    return {
+        "plan_generation": services.metrics.snapshot(),
+        "plan_precompute": services.precomputer.snapshot(),
+        "llm_output": week_plan_output_metrics.snapshot(),
+        "plan_models": plan_model_metrics.snapshot(),
+        "server_timing": server_timing_metrics.snapshot(),
+        "prompt_version": PROMPT_VERSION,
+    }
+
+
+@router.get("/health/metrics")
+@query_budget(0)
+async def metrics(request: Request):
+    """プロセス内の累積カウンタ（ワーカーごとの値）"""
+    return metrics_snapshot(request.app.state.plan_services)
+
+
 @router.get("/health/db")
+@query_budget(1)
 async def db_health_check(db: AsyncSession = Depends(get_db)):
-    """データベース接続のヘルスチェック"""
+    """データベース接続のヘルスチェック（レプリカ設定時はレプリカも確認する。primary に繋がらなければ 503）"""
     try:
         await db.execute(text("SELECT 1"))
+    except Exception as e:
+        return ORJSONResponse(
+            {
+                "status": "unhealthy",
+                "database": "disconnected",
+                "error": str(e),
+            },
+            status_code=503,
+        )
+    if database.replica_engine is None:
         return {
             "status": "healthy",
             "database": "connected",
         }
+    try:
+        async with database.replica_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
     except Exception as e:
+        # primary は生きているので書き込みは可能。読み取り専用ルートのみ失敗する
         return {
-            "status": "unhealthy",
-            "database": "disconnected",
+            "status": "degraded",
+            "database": "connected",
+            "replica": "disconnected",
             "error": str(e),
         }
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "replica": "connected",
+    }
@@ -2,77 +2,374 @@
 
 import json
 import logging
-from datetime import date
+import math
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
 
-from fastapi import APIRouter, Depends, Query
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.application.plan import GetOrCreatePlanInput, GetOrCreatePlanUseCase
-from app.infrastructure.llm.openrouter_client import OpenRouterClient
-from app.infrastructure.persistence.database import get_db
+from app.application.plan import (
+    CalendarOutOfSyncError,
+    GetCurrentPlanUseCase,
+    GetOrCreatePlanInput,
+    GetOrCreatePlanUseCase,
+    PlanGenerationMetrics,
+    PlanPrecomputer,
+    PlanRateLimitedError,
+    PlanResult,
+)
+from app.application.plan.ports import (
+    IGenerationLease,
+    IPlanGenerator,
+    IPlanGeneratorAvailability,
+    IRateLimiter,
+    PlanGeneratorUnavailableError,
+    RateLimitPolicy,
+)
+from app.application.shutdown import ShutdownCoordinator, ShuttingDownError
+from app.application.timing import timed
+from app.config import settings
+from app.domain.plan.repositories import PlanCacheRecord
+from app.infrastructure.llm.circuit_breaker import CircuitBreaker
+from app.infrastructure.llm.model_router import ModelRoutingPlanGenerator, parse_model_tiers
+from app.infrastructure.persistence.database import session_scope
+from app.infrastructure.persistence.repositories.calendar_event_repository import (
+    ShortLivedCalendarEventRepository,
+)
 from app.infrastructure.persistence.repositories.sleep_plan_cache_repository import (
+    ShortLivedSleepPlanCacheRepository,
     SleepPlanCacheRepository,
 )
-from app.presentation.dependencies.auth import ensure_current_user
-from app.presentation.schemas.plan import PlanRequest
+from app.infrastructure.persistence.repositories.sleep_plan_day_repository import (
+    ShortLivedSleepPlanDayRepository,
+)
+from app.infrastructure.ratelimit import build_rate_limiter
+from app.infrastructure.singleflight import build_generation_lease
+from app.presentation.dependencies.auth import ensure_current_user_detached, get_current_user_id
+from app.presentation.dependencies.database import get_read_db
+from app.presentation.query_budget import query_budget
+from app.presentation.schemas.plan import CurrentPlanResponse, PlanRequest
 
 logger = logging.getLogger(__name__)
 
 # デバッグ用: ペイロードログの最大文字数（超えたら省略表示）
 PAYLOAD_LOG_MAX_CHARS = 12000
 
+# キャッシュヒット/ミスを本文を読まずに判別できるようにするレスポンスヘッダー
+PLAN_CACHE_HEADER = "X-Plan-Cache"
+
+# LLM 生成のレート制限（ユーザーごと）。超過時は最後のキャッシュを stale で返すか 429
+FORCE_POLICY = RateLimitPolicy(
+    burst=settings.PLAN_FORCE_BURST,
+    refill_per_second=settings.PLAN_FORCE_PER_HOUR / 3600,
+)
+GENERATE_POLICY = RateLimitPolicy(
+    burst=settings.PLAN_GENERATE_BURST,
+    refill_per_second=settings.PLAN_GENERATE_PER_HOUR / 3600,
+)
+# 事前計算（書き込み後の裏の生成）はユーザーの生成枠とは別のバケット（plan_precompute_generate:*）
+PRECOMPUTE_POLICY = RateLimitPolicy(
+    burst=settings.PLAN_PRECOMPUTE_BURST,
+    refill_per_second=settings.PLAN_PRECOMPUTE_PER_HOUR / 3600,
+)
+
+
+@dataclass(frozen=True)
+class PlanServices:
+    """
+    アプリ（create_app()）ごとのプラン生成の部品。app.state.plan_services に置き、Depends で渡す。
+    lifespan が事前計算のワーカーとシャットダウンの退避を、readiness がブレーカーとワーカーを見る。
+    """
+
+    # LLM 生成のレート制限（ユーザーごと）
+    rate_limiter: IRateLimiter
+    # 同じ入力の同時生成を 1 つに絞るリースと、その効果のカウンタ（GET /health/metrics）
+    generation_lease: IGenerationLease
+    metrics: PlanGenerationMetrics
+    # シャットダウン時に実行中の生成を保存まで待ち、新しい生成を断る（lifespan・SIGTERM で退避を始める）
+    shutdown: ShutdownCoordinator
+    # LLM の障害が続く間は呼ばずに 503 を返すサーキットブレーカー（状態は GET /health/ready）
+    breaker: CircuitBreaker
+    # 入力の複雑さでモデル（段階）を選ぶ生成器（PLAN_MODEL_TIERS）
+    generator: IPlanGenerator
+    # 設定・睡眠ログの書き込みイベントで、次のプラン取得より先にプランを生成しておく（lifespan で開始）
+    precomputer: PlanPrecomputer
+
+
+def build_plan_services() -> PlanServices:
+    """設定からプラン生成の部品を組み立てる（create_app() が 1 アプリにつき 1 回呼ぶ）"""
+    rate_limiter = build_rate_limiter(settings.RATE_LIMIT_BACKEND)
+    generation_lease = build_generation_lease(settings.PLAN_SINGLEFLIGHT_BACKEND)
+    metrics = PlanGenerationMetrics()
+    shutdown = ShutdownCoordinator()
+    breaker = CircuitBreaker(
+        failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=settings.LLM_CIRCUIT_RESET_SECONDS,
+    )
+    generator = ModelRoutingPlanGenerator(
+        parse_model_tiers(settings.PLAN_MODEL_TIERS, settings.OPENROUTER_MODEL),
+        breaker=breaker,
+    )
+
+    def precompute_usecase() -> GetOrCreatePlanUseCase:
+        """
+        事前計算用のユースケース（POST /sleep-plans と同じリース・キャッシュを使う）。
+        レート制限は別のバケット（PRECOMPUTE_POLICY）で、ユーザーが明示的に取得するときの枠を減らさない。
+        """
+        return GetOrCreatePlanUseCase(
+            ShortLivedSleepPlanCacheRepository(session_scope),
+            generator,
+            rate_limiter=rate_limiter,
+            generate_policy=PRECOMPUTE_POLICY,
+            rate_limit_namespace="plan_precompute",
+            lease=generation_lease,
+            lease_ttl_seconds=settings.PLAN_SINGLEFLIGHT_LEASE_SECONDS,
+            wait_timeout_seconds=settings.PLAN_SINGLEFLIGHT_WAIT_SECONDS,
+            metrics=metrics,
+            day_cache_repo=ShortLivedSleepPlanDayRepository(session_scope),
+            calendar_repo=ShortLivedCalendarEventRepository(session_scope),
+            shutdown=shutdown,
+            availability=breaker,
+        )
+
+    precomputer = PlanPrecomputer(
+        precompute_usecase,
+        enabled=settings.PLAN_PRECOMPUTE_ENABLED,
+        debounce_seconds=settings.PLAN_PRECOMPUTE_DEBOUNCE_SECONDS,
+        max_queue=settings.PLAN_PRECOMPUTE_QUEUE_SIZE,
+        workers=settings.PLAN_PRECOMPUTE_WORKERS,
+        max_users=settings.PLAN_PRECOMPUTE_MAX_USERS,
+    )
+    return PlanServices(
+        rate_limiter=rate_limiter,
+        generation_lease=generation_lease,
+        metrics=metrics,
+        shutdown=shutdown,
+        breaker=breaker,
+        generator=generator,
+        precomputer=precomputer,
+    )
+
+
 router = APIRouter(prefix="/sleep-plans", tags=["sleep-plans"])
 
 
-def get_cache_repository(
-    db: AsyncSession = Depends(get_db),
+def get_cache_repository() -> ShortLivedSleepPlanCacheRepository:
+    """POST 用: LLM 生成の間に接続を保持しないよう、検索と upsert を別々の作業単位で行う"""
+    return ShortLivedSleepPlanCacheRepository(session_scope)
+
+
+def get_day_cache_repository() -> ShortLivedSleepPlanDayRepository:
+    """POST 用: 日単位のキャッシュ（週のキャッシュと同じく作業単位ごとに接続を借りる）"""
+    return ShortLivedSleepPlanDayRepository(session_scope)
+
+
+def get_calendar_repository() -> ShortLivedCalendarEventRepository:
+    """POST 用: 同期済みのカレンダー予定（calendar_digest 指定かつキャッシュミスのときだけ読む）"""
+    return ShortLivedCalendarEventRepository(session_scope)
+
+
+def get_cache_read_repository(
+    db: AsyncSession = Depends(get_read_db),
 ) -> SleepPlanCacheRepository:
     return SleepPlanCacheRepository(db)
 
 
-def get_plan_generator() -> OpenRouterClient:
-    return OpenRouterClient()
+def get_plan_services(request: Request) -> PlanServices:
+    services: PlanServices = request.app.state.plan_services
+    return services
+
+
+def get_plan_generator(services: PlanServices = Depends(get_plan_services)) -> IPlanGenerator:
+    return services.generator
 
 
-@router.post("", response_model=dict)
+def get_rate_limiter(services: PlanServices = Depends(get_plan_services)) -> IRateLimiter:
+    return services.rate_limiter
+
+
+def get_generation_lease(services: PlanServices = Depends(get_plan_services)) -> IGenerationLease:
+    return services.generation_lease
+
+
+def get_generator_availability(
+    services: PlanServices = Depends(get_plan_services),
+) -> IPlanGeneratorAvailability:
+    return services.breaker
+
+
+def get_plan_precomputer(services: PlanServices = Depends(get_plan_services)) -> PlanPrecomputer:
+    return services.precomputer
+
+
+def _retry_after_header(seconds: float) -> str:
+    # 回復しない設定（PER_HOUR=0）は inf になるため 1 日で頭打ちにする
+    return str(max(1, math.ceil(min(seconds, 86400))))
+
+
+def _splice_cache_hit(plan_json: str, cache_hit: bool, stale: bool = False) -> bytes:
+    """
+    保存済み plan_json の末尾に "cache_hit"（stale なら "stale": true も）を差し込んだ JSON バイト列を返す。
+    全体をパースせずに済むよう、トップレベルのオブジェクト末尾の "}" だけを書き換える。
+    """
+    body = plan_json.encode("utf-8").rstrip()
+    if not body.endswith(b"}"):
+        # 想定外の形式（オブジェクト以外）は従来どおりパースして付与する
+        wrapped = {"week_plan": orjson.loads(body), "cache_hit": cache_hit}
+        if stale:
+            wrapped["stale"] = True
+        return orjson.dumps(wrapped)
+    head = body[:-1].rstrip()
+    sep = b"" if head.endswith(b"{") else b","
+    flags = b'"cache_hit":' + (b"true" if cache_hit else b"false")
+    if stale:
+        flags += b',"stale":true'
+    return head + sep + flags + b"}"
+
+
+def _plan_response(result: PlanResult) -> Response:
+    """PlanResult を再エンコードせずにレスポンスへ変換する"""
+    headers = {PLAN_CACHE_HEADER: "hit" if result.cache_hit else "miss"}
+    if result.stale:
+        headers[PLAN_CACHE_HEADER] = "stale"
+    if result.retry_after_seconds is not None:
+        headers["Retry-After"] = _retry_after_header(result.retry_after_seconds)
+    with timed("serialize"):
+        content = _splice_cache_hit(result.plan_json, result.cache_hit, result.stale)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _current_plan_body(cached: PlanCacheRecord, now: datetime) -> bytes:
+    """保存済み plan_json をパースせずにレスポンス JSON の plan に埋め込む"""
+    age_seconds = max(0, int((now - cached.created_at).total_seconds()))
+    head = orjson.dumps(
+        {
+            "signature_hash": cached.signature_hash,
+            "created_at": cached.created_at.isoformat(),
+            "age_seconds": age_seconds,
+        }
+    )
+    return head[:-1] + b',"plan":' + cached.plan_json.encode("utf-8") + b"}"
+
+
+@router.get(
+    "/current",
+    response_model=CurrentPlanResponse,
+    responses={304: {"description": "If-None-Match が現在の署名と一致"}, 404: {}},
+)
+@query_budget(1)
+async def get_current_plan(
+    if_none_match: str | None = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+    cache_repo: SleepPlanCacheRepository = Depends(get_cache_read_repository),
+):
+    """
+    最新のキャッシュ済み週間プランを返す（読み取り専用。レプリカ可）。
+    入力の送信・署名計算・LLM 呼び出しを行わないため、ホーム画面の初期表示に使う。
+    入力が変わったときだけ POST /sleep-plans を呼べばよい。
+    ETag は signature_hash。If-None-Match が一致すれば 304 を返す。
+    キャッシュが無い場合は 404。認証必須。
+    """
+    usecase = GetCurrentPlanUseCase(cache_repo)
+    cached = await usecase.execute(user_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="No cached plan")
+
+    etag = f'"{cached.signature_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match is not None and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=_current_plan_body(cached, datetime.now(UTC)),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@router.post(
+    "",
+    response_model=dict,
+    responses={
+        200: {"headers": {PLAN_CACHE_HEADER: {"description": "hit / miss / stale"}}},
+        409: {"description": "calendar_digest が同期済みの予定と一致しない（同期し直す）"},
+        429: {"description": "LLM 生成の上限超過かつ返せるキャッシュが無い（Retry-After 付き）"},
+    },
+)
+@query_budget(10)
 async def get_or_create_plan(
     body: PlanRequest,
     force: bool = Query(False, description="true の場合キャッシュを無視して再計算する"),
-    user_id: str = Depends(ensure_current_user),
-    cache_repo: SleepPlanCacheRepository = Depends(get_cache_repository),
-    plan_generator: OpenRouterClient = Depends(get_plan_generator),
+    user_id: str = Depends(ensure_current_user_detached),
+    cache_repo: ShortLivedSleepPlanCacheRepository = Depends(get_cache_repository),
+    day_cache_repo: ShortLivedSleepPlanDayRepository = Depends(get_day_cache_repository),
+    calendar_repo: ShortLivedCalendarEventRepository = Depends(get_calendar_repository),
+    plan_generator: IPlanGenerator = Depends(get_plan_generator),
+    rate_limiter: IRateLimiter = Depends(get_rate_limiter),
+    generation_lease: IGenerationLease = Depends(get_generation_lease),
+    availability: IPlanGeneratorAvailability = Depends(get_generator_availability),
+    precomputer: PlanPrecomputer = Depends(get_plan_precomputer),
+    services: PlanServices = Depends(get_plan_services),
 ):
     """
     週間睡眠プランを取得または生成する。
     同じ入力ならキャッシュを返し、違う入力なら LLM で生成してキャッシュに保存して返す。
     認証必須。user_id はトークンから確定される。
     force=true の場合はキャッシュを無視して再計算する。
+    DB 接続はユーザー確認・キャッシュ検索・保存の各作業単位でだけ借り、LLM 生成中は保持しない。
     settings に today_override を含める場合、署名ハッシュと LLM 入力に反映される。
+    LLM 生成（force / キャッシュミス）はユーザーごとにレート制限され、超過時は最後のキャッシュを
+    "stale": true・X-Plan-Cache: stale・Retry-After 付きで返す。キャッシュも無ければ 429。
+    同じ入力の生成が他のリクエスト（他ワーカー含む）で進行中なら、完了を待ってその結果を返す。
+    入力は設定・睡眠ログの書き込み後の事前計算（PlanPrecomputer）の元として覚える。
+    週のキャッシュに無くても、日ごとの入力が変わっていない日は日単位のキャッシュから再利用し、
+    足りない日だけを生成する（全ての日がそろえば LLM を呼ばずに X-Plan-Cache: hit）。
+    calendar_digest を送った場合は POST /calendar/sync で同期済みの予定を使い、署名にはダイジェストを
+    含める（予定はキャッシュミスのときだけ読む）。同期済みの予定と一致しなければ 409。
+    LLM の障害が続きサーキットブレーカーが開いている間、生成が必要なリクエストは Retry-After 付きの 503。
+    シャットダウン中も、生成が必要なリクエストは 503（実行中の生成は保存まで続ける）。
     """
     # デバッグ: フロントから受信したペイロードをログ（キャッシュ・ハッシュ差分確認用）
-    try:
-        payload_json = json.dumps(body.model_dump(), ensure_ascii=False, default=str)
-        if len(payload_json) <= PAYLOAD_LOG_MAX_CHARS:
-            logger.info("plan request payload (from frontend): %s", payload_json)
-        else:
-            logger.info(
-                "plan request payload (from frontend, truncated): %s ... (truncated, total %d chars)",
-                payload_json[:PAYLOAD_LOG_MAX_CHARS],
-                len(payload_json),
-            )
-    except Exception as e:
-        logger.warning("plan request payload log failed: %s", e)
+    with timed("payload_log"):
+        try:
+            payload_json = json.dumps(body.model_dump(), ensure_ascii=False, default=str)
+            if len(payload_json) <= PAYLOAD_LOG_MAX_CHARS:
+                logger.info("plan request payload (from frontend): %s", payload_json)
+            else:
+                logger.info(
+                    "plan request payload (from frontend, truncated): %s ... (truncated, total %d chars)",
+                    payload_json[:PAYLOAD_LOG_MAX_CHARS],
+                    len(payload_json),
+                )
+        except Exception as e:
+            logger.warning("plan request payload log failed: %s", e)
 
     today_date = body.today_date or date.today().isoformat()
 
     logger.info(
-        "POST /sleep-plans request len(calendar_events)=%s len(sleep_logs)=%s force=%s today_date=%s",
+        "POST /sleep-plans request len(calendar_events)=%s calendar_digest=%s len(sleep_logs)=%s force=%s today_date=%s",
         len(body.calendar_events),
+        body.calendar_digest[:16] if body.calendar_digest else None,
         len(body.sleep_logs),
         force,
         today_date,
     )
-    usecase = GetOrCreatePlanUseCase(cache_repo, plan_generator)
+    usecase = GetOrCreatePlanUseCase(
+        cache_repo,
+        plan_generator,
+        rate_limiter=rate_limiter,
+        force_policy=FORCE_POLICY,
+        generate_policy=GENERATE_POLICY,
+        lease=generation_lease,
+        lease_ttl_seconds=settings.PLAN_SINGLEFLIGHT_LEASE_SECONDS,
+        wait_timeout_seconds=settings.PLAN_SINGLEFLIGHT_WAIT_SECONDS,
+        metrics=services.metrics,
+        day_cache_repo=day_cache_repo,
+        calendar_repo=calendar_repo,
+        shutdown=services.shutdown,
+        availability=availability,
+    )
     input_data = GetOrCreatePlanInput(
         user_id=user_id,
         calendar_events=body.calendar_events,
@@ -80,10 +377,37 @@ async def get_or_create_plan(
         settings=body.settings,
         today_date=today_date,
         force=force,
+        calendar_digest=body.calendar_digest,
     )
-    plan = await usecase.execute(input_data)
+    try:
+        result = await usecase.execute(input_data)
+    except PlanRateLimitedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many plan generations. Please retry later.",
+            headers={"Retry-After": _retry_after_header(e.retry_after_seconds)},
+        ) from e
+    except CalendarOutOfSyncError as e:
+        raise HTTPException(
+            status_code=409,
+            detail="Calendar digest does not match the synced calendar. Please sync again.",
+        ) from e
+    except ShuttingDownError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down. Please retry.",
+            headers={"Retry-After": "1"},
+        ) from e
+    except PlanGeneratorUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Plan generation is temporarily unavailable. Please retry later.",
+            headers={"Retry-After": _retry_after_header(e.retry_after_seconds)},
+        ) from e
     logger.info(
         "POST /sleep-plans response cache_hit=%s",
-        plan.get("cache_hit", False),
+        result.cache_hit,
     )
-    return plan
+    precomputer.record_read(user_id, result.cache_hit)
+    precomputer.remember(input_data)
+    return _plan_response(result)
@@ -5,11 +5,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.application.settings import GetSettingsUseCase, PutSettingsUseCase
 from app.application.settings.put_settings import PutSettingsPayload, TodayOverrideInput
-from app.infrastructure.persistence.database import get_db
+from app.domain.events import IDomainEventPublisher, SleepSettingsChanged, TodayOverrideSnapshot
+from app.infrastructure.cache import MISSING, TOPIC_SETTINGS, LocalCache
+from app.infrastructure.persistence.database import get_db, reads_from_replica
 from app.infrastructure.persistence.repositories.sleep_settings_repository import (
     SleepSettingsRepository,
 )
-from app.presentation.dependencies.auth import ensure_current_user
+from app.presentation.dependencies.auth import ensure_current_user, get_current_user_id
+from app.presentation.dependencies.database import get_read_db
+from app.presentation.dependencies.events import get_event_publisher
+from app.presentation.query_budget import query_budget
 from app.presentation.schemas.settings import (
     SettingsPutRequest,
     SettingsResponse,
@@ -18,11 +23,18 @@ from app.presentation.schemas.settings import (
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
+# GET /settings の結果（未保存なら None）。sleep_settings への書き込みで消える
+_settings_cache: LocalCache[SettingsResponse | None] = LocalCache(TOPIC_SETTINGS)
+
 
 def _settings_repo(db: AsyncSession = Depends(get_db)) -> SleepSettingsRepository:
     return SleepSettingsRepository(db)
 
 
+def _settings_read_repo(db: AsyncSession = Depends(get_read_db)) -> SleepSettingsRepository:
+    return SleepSettingsRepository(db)
+
+
 def _orm_to_response(row) -> SettingsResponse:
     """SleepSettings ORM を SettingsResponse に変換する。"""
     today_override = None
@@ -51,36 +63,72 @@ def _orm_to_response(row) -> SettingsResponse:
     )
 
 
+def _settings_changed_event(user_id: str, row) -> SleepSettingsChanged:
+    """保存済みの SleepSettings ORM からプランに効く項目のドメインイベントを作る。"""
+    today_override = None
+    if (
+        row.override_date is not None
+        and row.override_sleep_hour is not None
+        and row.override_wake_hour is not None
+    ):
+        today_override = TodayOverrideSnapshot(
+            date=row.override_date,
+            sleep_hour=row.override_sleep_hour,
+            sleep_minute=row.override_sleep_minute or 0,
+            wake_hour=row.override_wake_hour,
+            wake_minute=row.override_wake_minute or 0,
+        )
+    return SleepSettingsChanged(
+        user_id=user_id,
+        wake_up_hour=row.wake_up_hour,
+        wake_up_minute=row.wake_up_minute,
+        sleep_duration_hours=row.sleep_duration_hours,
+        preparation_minutes=row.preparation_minutes,
+        today_override=today_override,
+    )
+
+
 def _default_response() -> SettingsResponse:
     """レコードが無いときのデフォルト設定レスポンス。"""
     return SettingsResponse()
 
 
 @router.get("", response_model=SettingsResponse)
+@query_budget(1)
 async def get_settings(
-    user_id: str = Depends(ensure_current_user),
-    repo: SleepSettingsRepository = Depends(_settings_repo),
+    user_id: str = Depends(get_current_user_id),
+    repo: SleepSettingsRepository = Depends(_settings_read_repo),
 ):
     """
     睡眠設定を取得する。
-    未保存の場合はデフォルト値を返す。認証必須。
+    未保存の場合はデフォルト値を返す。読み取り専用（レプリカ可）。認証必須。
+    primary から読んだ結果はプロセス内にキャッシュし、書き込み時に無効化する（ヒット時は DB を使わない）。
     """
+    cached = _settings_cache.get(user_id)
+    if cached is not MISSING:
+        return cached or _default_response()
+    # 読んでいる間に PUT が COMMIT して無効化したら、読んだ古い行は載せない
+    generation = _settings_cache.generation(user_id)
     usecase = GetSettingsUseCase(repo)
     row = await usecase.execute(user_id)
-    if row is None:
-        return _default_response()
-    return _orm_to_response(row)
+    response = _orm_to_response(row) if row is not None else None
+    if not reads_from_replica(repo.db):
+        _settings_cache.set_if_generation(user_id, generation, response)
+    return response or _default_response()
 
 
 @router.put("", response_model=SettingsResponse)
+@query_budget(4)
 async def put_settings(
     body: SettingsPutRequest,
     user_id: str = Depends(ensure_current_user),
     repo: SleepSettingsRepository = Depends(_settings_repo),
+    events: IDomainEventPublisher = Depends(get_event_publisher),
 ):
     """
     睡眠設定を保存する（upsert）。
     起床・睡眠時間, ics_url, レジリエンス, ミッション, 準備時間, todayOverride 等。
+    保存後に SleepSettingsChanged を発行する（プランの事前計算）。
     認証必須。
     """
     today_override_input = None
@@ -105,4 +153,5 @@ async def put_settings(
     )
     usecase = PutSettingsUseCase(repo)
     row = await usecase.execute(user_id, payload)
+    events.publish(_settings_changed_event(user_id, row))
     return _orm_to_response(row)
@@ -5,11 +5,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.application.sleep_log import CreateSleepLogUseCase, GetSleepLogsUseCase
 from app.application.sleep_log.create_sleep_log import CreateSleepLogInput
+from app.domain.events import IDomainEventPublisher, SleepLogCreated, SleepLogUpdated
 from app.infrastructure.persistence.database import get_db
 from app.infrastructure.persistence.repositories.sleep_log_repository import (
     SleepLogRepository,
 )
-from app.presentation.dependencies.auth import ensure_current_user
+from app.presentation.dependencies.auth import ensure_current_user, get_current_user_id
+from app.presentation.dependencies.database import get_read_db
+from app.presentation.dependencies.events import get_event_publisher
+from app.presentation.query_budget import query_budget
 from app.presentation.schemas.sleep_log import (
     SleepLogCreate,
     SleepLogListResponse,
@@ -26,13 +30,20 @@ def get_sleep_log_repository(
     return SleepLogRepository(db)
 
 
+def get_sleep_log_read_repository(
+    db: AsyncSession = Depends(get_read_db),
+) -> SleepLogRepository:
+    return SleepLogRepository(db)
+
+
 @router.get("", response_model=SleepLogListResponse)
+@query_budget(1)
 async def get_sleep_logs(
-    user_id: str = Depends(ensure_current_user),
+    user_id: str = Depends(get_current_user_id),
     limit: int = Query(7, ge=1, le=100, description="取得件数"),
-    repo: SleepLogRepository = Depends(get_sleep_log_repository),
+    repo: SleepLogRepository = Depends(get_sleep_log_read_repository),
 ):
-    """睡眠ログ一覧を取得する（日付降順）。認証必須。"""
+    """睡眠ログ一覧を取得する（日付降順）。読み取り専用（レプリカ可）。認証必須。"""
     usecase = GetSleepLogsUseCase(repo)
     logs = await usecase.execute(user_id, limit)
     return SleepLogListResponse(
@@ -42,12 +53,17 @@ async def get_sleep_logs(
 
 
 @router.post("", response_model=SleepLogResponse, status_code=201)
+@query_budget(4)
 async def create_sleep_log(
     body: SleepLogCreate,
     user_id: str = Depends(ensure_current_user),
     repo: SleepLogRepository = Depends(get_sleep_log_repository),
+    events: IDomainEventPublisher = Depends(get_event_publisher),
 ):
-    """睡眠ログを新規作成する。同一 user・同一 date は 1 件のみ（409）。認証必須。"""
+    """
+    睡眠ログを新規作成する。同一 user・同一 date は 1 件のみ（409）。認証必須。
+    作成後に SleepLogCreated を発行する（プランの事前計算）。
+    """
     existing = await repo.get_by_user_and_date(user_id, body.date)
     if existing is not None:
         raise HTTPException(
@@ -70,17 +86,31 @@ async def create_sleep_log(
         mood=body.mood,
     )
     log = await usecase.execute(input_data)
+    events.publish(
+        SleepLogCreated(
+            user_id=user_id,
+            date=log.date,
+            score=log.score,
+            scheduled_sleep_time=log.scheduled_sleep_time,
+            mood=log.mood,
+        )
+    )
     return log
 
 
 @router.patch("/{log_id}", response_model=SleepLogResponse)
+@query_budget(5)
 async def update_sleep_log(
     log_id: str,
     body: SleepLogUpdate,
     user_id: str = Depends(ensure_current_user),
     repo: SleepLogRepository = Depends(get_sleep_log_repository),
+    events: IDomainEventPublisher = Depends(get_event_publisher),
 ):
-    """睡眠ログを部分更新する（日付・スコア・ペナルティ・気分など。指定したフィールドのみ更新）。認証必須。"""
+    """
+    睡眠ログを部分更新する（日付・スコア・ペナルティ・気分など。指定したフィールドのみ更新）。認証必須。
+    更新後に SleepLogUpdated を発行する（プランの事前計算）。
+    """
     payload = body.model_dump(exclude_unset=True)
     if not payload:
         raise HTTPException(status_code=422, detail="At least one field required")
@@ -94,4 +124,13 @@ async def update_sleep_log(
     log = await repo.update(log_id, user_id, **payload)
     if log is None:
         raise HTTPException(status_code=404, detail="Sleep log not found")
+    events.publish(
+        SleepLogUpdated(
+            user_id=user_id,
+            date=log.date,
+            score=log.score,
+            scheduled_sleep_time=log.scheduled_sleep_time,
+            mood=log.mood,
+        )
+    )
     return log
@@ -18,6 +18,7 @@ from app.infrastructure.persistence.repositories.user_repository import (
     UserRepository,
 )
 from app.presentation.dependencies.auth import get_current_user_id
+from app.presentation.query_budget import query_budget
 from app.presentation.schemas.user import (
     UserCreate,
     UserListResponse,
@@ -35,6 +36,7 @@ def get_user_repository(
 
 
 @router.post("", response_model=UserResponse, status_code=201)
+@query_budget(3)
 async def create_user(
     data: UserCreate,
     _user_id: str = Depends(get_current_user_id),
@@ -47,6 +49,7 @@ async def create_user(
 
 
 @router.get("", response_model=UserListResponse)
+@query_budget(1)
 async def get_users(
     _user_id: str = Depends(get_current_user_id),
     user_repo: UserRepository = Depends(get_user_repository),
@@ -58,6 +61,7 @@ async def get_users(
 
 
 @router.get("/{user_id}", response_model=UserResponse)
+@query_budget(1)
 async def get_user(
     user_id: str,
     _current_user_id: str = Depends(get_current_user_id),
@@ -70,6 +74,7 @@ async def get_user(
 
 
 @router.put("/{user_id}", response_model=UserResponse)
+@query_budget(3)
 async def update_user(
     user_id: str,
     data: UserUpdate,
@@ -84,6 +89,7 @@ async def update_user(
 
 
 @router.delete("/{user_id}", status_code=204)
+@query_budget(2)
 async def delete_user(
     user_id: str,
     _current_user_id: str = Depends(get_current_user_id),
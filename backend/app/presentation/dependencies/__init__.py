@@ -1,5 +1,23 @@
-"""FastAPI 依存性（認証など）"""
+"""FastAPI 依存性（認証・DB セッションなど）"""
 
-from app.presentation.dependencies.auth import ensure_current_user, get_current_user_id
+from app.presentation.dependencies.auth import (
+    ensure_current_user,
+    ensure_current_user_detached,
+    get_current_user_id,
+    require_admin,
+)
+from app.presentation.dependencies.database import get_read_db
+from app.presentation.dependencies.events import (
+    get_event_publisher,
+    get_event_subscribers,
+)
 
-__all__ = ["get_current_user_id", "ensure_current_user"]
+__all__ = [
+    "get_current_user_id",
+    "ensure_current_user",
+    "ensure_current_user_detached",
+    "require_admin",
+    "get_read_db",
+    "get_event_publisher",
+    "get_event_subscribers",
+]
@@ -2,13 +2,22 @@
 認証依存性: Authorization Bearer トークンを検証し user_id を注入する。
 未認証の場合は 401 Unauthorized を返す。
 ensure_current_user は user_id に紐づく users 行が存在することを保証する（FK エラー防止）。
+ensure_current_user_detached は同じ確認を独立した作業単位で行い、すぐ接続を返す。
+require_admin は ADMIN_USER_IDS に含まれるユーザーだけを通す（それ以外は 403）。
+管理者のリクエストには Server-Timing ヘッダーを返す（それ以外のユーザーには区間の内訳を見せない）。
 """
 
 from fastapi import Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.application.timing import expose_timing_header, timed
+from app.config import settings
 from app.infrastructure.auth import verify_supabase_jwt
-from app.infrastructure.persistence.database import get_db
+from app.infrastructure.persistence.database import (
+    SESSION_USER_ID,
+    get_db,
+    session_scope,
+)
 from app.infrastructure.persistence.repositories.user_repository import UserRepository
 
 
@@ -29,10 +38,20 @@ def get_current_user_id(request: Request) -> str:
         raise HTTPException(status_code=401, detail="Missing token")
 
     try:
-        user_id = verify_supabase_jwt(token)
+        with timed("auth"):
+            user_id = verify_supabase_jwt(token)
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    if user_id in settings.ADMIN_USER_IDS:
+        expose_timing_header()
+    return user_id
+
+
+def require_admin(user_id: str = Depends(get_current_user_id)) -> str:
+    """認証済みかつ ADMIN_USER_IDS に含まれる user_id を返す（デバッグ用 API 向け）"""
+    if user_id not in settings.ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admin only")
     return user_id
 
 
@@ -44,7 +63,24 @@ async def ensure_current_user(
     認証済み user_id を返し、かつ users テーブルに該当行が存在することを保証する。
     sleep_plan_cache / sleep_settings / sleep_logs 等の FK 制約違反を防ぐため、
     初回利用時に id=user_id の行を自動作成する。
+    セッションに user_id を記録し、書き込みがあればそのユーザーの読み取りを一定時間 primary に固定する。
     """
+    db.info[SESSION_USER_ID] = user_id
     repo = UserRepository(db)
-    await repo.ensure_user_exists(user_id)
+    with timed("user"):
+        await repo.ensure_user_exists(user_id)
+    return user_id
+
+
+async def ensure_current_user_detached(
+    user_id: str = Depends(get_current_user_id),
+) -> str:
+    """
+    ensure_current_user と同じだが、リクエストのセッションではなく独立した短い作業単位で確認する。
+    確認後すぐ接続をプールに返すため、LLM を待つような長いリクエストで使う。
+    """
+    with timed("user"):
+        async with session_scope() as db:
+            db.info[SESSION_USER_ID] = user_id
+            await UserRepository(db).ensure_user_exists(user_id)
     return user_id
@@ -0,0 +1,23 @@
+"""
+DB セッション依存性（読み取り専用ルート用）。
+書き込みを伴うルートは従来どおり get_db（primary）を使う。
+"""
+
+from collections.abc import AsyncGenerator
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.persistence.database import get_read_session
+from app.presentation.dependencies.auth import get_current_user_id
+
+
+async def get_read_db(
+    user_id: str = Depends(get_current_user_id),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    読み取り専用セッションを返す。DATABASE_REPLICA_URL があればレプリカから読む。
+    そのユーザーが直前に書き込んでいた場合は primary から読む（read-your-writes）。
+    """
+    async for session in get_read_session(user_id):
+        yield session
@@ -0,0 +1,25 @@
+"""
+ドメインイベントの発行先（書き込み経路の Depends）
+イベントはリクエストのセッション（get_db）が COMMIT した後に購読者へ渡す。
+購読者は create_app() が app.state.event_subscribers に置く（プランの事前計算: api/plan.py）。
+"""
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.events import IDomainEventPublisher
+from app.infrastructure.persistence.database import get_db
+from app.infrastructure.persistence.domain_events import AfterCommitEventPublisher
+
+
+def get_event_subscribers(request: Request) -> list[IDomainEventPublisher]:
+    subscribers: list[IDomainEventPublisher] = request.app.state.event_subscribers
+    return subscribers
+
+
+def get_event_publisher(
+    db: AsyncSession = Depends(get_db),
+    subscribers: list[IDomainEventPublisher] = Depends(get_event_subscribers),
+) -> IDomainEventPublisher:
+    """書き込み経路（設定・睡眠ログ・カレンダー）がドメインイベントを発行する先（COMMIT 後に配る）"""
+    return AfterCommitEventPublisher(db, subscribers)
@@ -0,0 +1,6 @@
+"""ASGI ミドルウェア"""
+
+from app.presentation.middleware.db_stats import DbStatsMiddleware
+from app.presentation.middleware.server_timing import ServerTimingMiddleware
+
+__all__ = ["DbStatsMiddleware", "ServerTimingMiddleware"]
@@ -0,0 +1,53 @@
+"""
+リクエスト単位の DB 利用状況（SQL 実行数・接続保持時間・COMMIT 数）を集計するミドルウェア。
+集計結果は request.state.db_stats で参照でき、リクエスト終了時に DEBUG ログへ出す。
+get_db の後処理（COMMIT）はレスポンス送信後に走るため、ヘッダーではなくログで出力する。
+SQL 実行数がルートの @query_budget を超えたリクエストは WARNING ログに出す。
+"""
+
+import logging
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.infrastructure.persistence.database import DbStats, current_db_stats
+from app.presentation.query_budget import route_query_budget
+
+logger = logging.getLogger(__name__)
+
+
+class DbStatsMiddleware:
+    """pure ASGI ミドルウェア（BaseHTTPMiddleware と違い同じタスク・コンテキストで実行される）"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = DbStats()
+        scope.setdefault("state", {})["db_stats"] = stats
+        token = current_db_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_db_stats.reset(token)
+            budget = route_query_budget(scope.get("route"))
+            if budget is not None and stats.statements > budget:
+                logger.warning(
+                    "db %s %s: statements=%d exceeds query budget %d",
+                    scope["method"],
+                    scope["path"],
+                    stats.statements,
+                    budget,
+                )
+            if stats.connections:
+                logger.debug(
+                    "db %s %s: statements=%d connections=%d hold_ms=%.1f commits=%d",
+                    scope["method"],
+                    scope["path"],
+                    stats.statements,
+                    stats.connections,
+                    stats.connection_hold_seconds * 1000,
+                    stats.commits,
+                )
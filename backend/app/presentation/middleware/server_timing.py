@@ -0,0 +1,86 @@
+"""
+リクエストの区間内訳を Server-Timing レスポンスヘッダーで返すミドルウェア。
+SERVER_TIMING_SAMPLE_RATE の割合のリクエストだけ計測し（0 で無効）、区間は timed() で記録される。
+ヘッダーは管理者（認証で expose_timing_header() が呼ばれたリクエスト）か、public=True
+（SERVER_TIMING_PUBLIC。ローカル・負荷試験用）のときだけ付ける。許可したオリジンには Timing-Allow-Origin も付ける。
+計測したリクエストは ServerTimingMetrics（GET /health/metrics）に集計し、
+SERVER_TIMING_SLOW_MS を超えたものは内訳を INFO ログに出す（それ以外は DEBUG）。
+"""
+
+import logging
+import random
+from collections.abc import Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.application.timing import (
+    RequestTiming,
+    ServerTimingMetrics,
+    current_timing,
+    server_timing_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """pure ASGI ミドルウェア（contextvar が依存性・エンドポイントまで届くよう同じコンテキストで実行する）"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        slow_ms: float = 1000.0,
+        metrics: ServerTimingMetrics | None = None,
+        public: bool = False,
+        allow_origins: Sequence[str] = (),
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.public = public
+        self.allow_origins = allow_origins
+        self.slow_ms = slow_ms
+        self.metrics = metrics or server_timing_metrics
+
+    def _sampled(self) -> bool:
+        if self.sample_rate >= 1.0:
+            return True
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+
+    def _allowed_origin(self, scope: Scope) -> bytes | None:
+        """リクエストの Origin が許可したオリジンなら、その値（Timing-Allow-Origin 用）"""
+        for name, value in scope.get("headers", []):
+            if name == b"origin":
+                allowed = "*" in self.allow_origins or value.decode("latin-1") in self.allow_origins
+                return value if allowed else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._sampled():
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and (self.public or timing.expose_header):
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header_value().encode("latin-1")))
+                origin = self._allowed_origin(scope)
+                if origin is not None:
+                    # ブラウザの Resource Timing（serverTiming）からも読めるようにする
+                    headers.append((b"timing-allow-origin", origin))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            self.metrics.record(timing)
+            total_ms = timing.finish() * 1000
+            level = logging.INFO if total_ms >= self.slow_ms else logging.DEBUG
+            if logger.isEnabledFor(level):
+                logger.log(
+                    level, "timing %s %s: %s", scope["method"], scope["path"], timing.header_value()
+                )
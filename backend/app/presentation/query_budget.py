@@ -0,0 +1,29 @@
+"""
+エンドポイントごとの SQL 実行数の予算
+ルートの関数に @query_budget(n) を付けて宣言する（@router.xxx の下に書く）。
+予算はキャッシュが冷えた状態（既知ユーザー・設定のプロセス内キャッシュが空）での 1 リクエストの SQL 数。
+- テスト: tests/test_query_budgets.py が全ルートを実行して予算内であることを確認する
+- 本番: DbStatsMiddleware が超過したリクエストを WARNING ログに出す
+"""
+
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+_BUDGET_ATTR = "__query_budget__"
+
+
+def query_budget(statements: int) -> Callable[[_F], _F]:
+    """ルートの SQL 実行数の上限を宣言する"""
+
+    def decorator(endpoint: _F) -> _F:
+        setattr(endpoint, _BUDGET_ATTR, statements)
+        return endpoint
+
+    return decorator
+
+
+def route_query_budget(route: Any) -> int | None:
+    """ルート（scope["route"] / app.routes の要素）に宣言された予算（無ければ None）"""
+    return getattr(getattr(route, "endpoint", None), _BUDGET_ATTR, None)
@@ -0,0 +1,100 @@
+"""
+準備完了チェック（GET /health/ready・GET /debug/health）
+DB 疎通（キャッシュ・タイムアウト付き）・接続プールの飽和・LLM のサーキットブレーカー・
+バックグラウンドのワーカーを確認する。
+
+- fail: このインスタンスにトラフィックを送るべきでない（503）。primary に繋がらない・プールが飽和・
+  ワーカーが落ちている・シャットダウン中
+- degraded: 応答はできるが一部が使えない（200）。レプリカ・LLM・キャッシュ無効化バスの障害は
+  全インスタンスに等しく効くため、外しても良くならない（キャッシュ済みのプランは返せる）
+"""
+
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import State
+
+from app.config import settings
+from app.infrastructure.llm.circuit_breaker import CLOSED
+from app.infrastructure.persistence import database
+from app.infrastructure.persistence.health import DatabaseProbe, pool_status
+from app.presentation.api.plan import PlanServices
+
+OK = "ok"
+DEGRADED = "degraded"
+FAIL = "fail"
+
+_probes: dict[AsyncEngine, DatabaseProbe] = {}
+
+
+def database_probe(engine: AsyncEngine) -> DatabaseProbe:
+    """engine ごとの疎通確認（結果のキャッシュを共有するため 1 つずつ）"""
+    probe = _probes.get(engine)
+    if probe is None:
+        probe = DatabaseProbe(
+            engine,
+            ttl_seconds=settings.HEALTH_DB_CHECK_TTL_SECONDS,
+            timeout_seconds=settings.HEALTH_DB_CHECK_TIMEOUT_SECONDS,
+        )
+        _probes[engine] = probe
+    return probe
+
+
+async def _database_check(engine: AsyncEngine, failure: str) -> dict[str, Any]:
+    result = await database_probe(engine).check()
+    return {"status": OK if result["ok"] else failure, **result}
+
+
+def _pool_check(engine: AsyncEngine) -> dict[str, Any]:
+    status = pool_status(engine, settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW)
+    saturated = status["saturation"] >= settings.HEALTH_POOL_SATURATION_THRESHOLD
+    return {"status": FAIL if saturated else OK, **status}
+
+
+def _llm_check(services: PlanServices) -> dict[str, Any]:
+    breaker = services.breaker.snapshot()
+    return {"status": OK if breaker["state"] == CLOSED else DEGRADED, **breaker}
+
+
+def _workers_check(state: State) -> dict[str, Any]:
+    precompute = state.plan_services.precomputer.worker_status()
+    # 起動前（lifespan 外）は数えない。起動したワーカーが減っていれば落ちている
+    status = FAIL if precompute["alive"] < precompute["started"] else OK
+    checks: dict[str, Any] = {"status": status, "plan_precompute": precompute}
+
+    listener = getattr(state, "invalidation_listener", None)
+    if listener is not None:
+        checks["cache_invalidation"] = {
+            "running": listener.running,
+            "connected": listener.connected,
+        }
+        if not listener.running:
+            checks["status"] = FAIL
+        elif not listener.connected and status == OK:
+            checks["status"] = DEGRADED
+    return checks
+
+
+async def readiness(state: State) -> tuple[bool, dict[str, Any]]:
+    """(準備完了か, 本文)。本文の status は ready | degraded | not_ready"""
+    checks: dict[str, Any] = {
+        "pool": _pool_check(database.engine),
+        "database": await _database_check(database.engine, FAIL),
+    }
+    if database.replica_engine is not None:
+        # primary は生きていれば書き込みも読み取りもできる（レプリカ障害は degraded）
+        checks["replica"] = await _database_check(database.replica_engine, DEGRADED)
+    checks["llm"] = _llm_check(state.plan_services)
+    checks["workers"] = _workers_check(state)
+    shutdown = state.plan_services.shutdown.snapshot()
+    checks["shutdown"] = {"status": FAIL if shutdown["draining"] else OK, **shutdown}
+
+    statuses = {check["status"] for check in checks.values()}
+    ready = FAIL not in statuses
+    if not ready:
+        status = "not_ready"
+    elif DEGRADED in statuses:
+        status = DEGRADED
+    else:
+        status = "ready"
+    return ready, {"status": status, "checks": checks}
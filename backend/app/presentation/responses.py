@@ -0,0 +1,16 @@
+"""
+レスポンスクラス
+全ルーターのデフォルトを orjson ベースの JSON レスポンスにする。
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson で JSON をエンコードするレスポンス（ensure_ascii 相当の変換をしない UTF-8 出力）"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,39 @@
+"""カレンダー同期 API の入出力スキーマ"""
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SyncedCalendarEvent(BaseModel):
+    """追加・変更した予定（id 以外はプラン取得の calendar_events の要素と同じ形）"""
+
+    model_config = ConfigDict(extra="allow")
+
+    id: str = Field(..., min_length=1, max_length=255, description="端末のカレンダー側の予定 ID")
+    title: str = Field(default="", description="予定のタイトル")
+    start: str | None = Field(default=None, description="開始（ISO 8601 日時 または YYYY-MM-DD）")
+    end: str | None = Field(default=None, description="終了（ISO 8601 日時 または YYYY-MM-DD）")
+    all_day: bool = Field(default=False, description="終日予定か")
+
+
+class CalendarSyncRequest(BaseModel):
+    """POST /api/v1/calendar/sync のリクエスト Body"""
+
+    sync_token: str | None = Field(
+        default=None,
+        description="前回の同期で返された sync_token。省略時は全件同期（保存済みの予定を置き換える）",
+    )
+    upserted: list[SyncedCalendarEvent] = Field(
+        default_factory=list,
+        description="前回の同期以降に追加・変更した予定（全件同期では全ての予定）",
+    )
+    deleted: list[str] = Field(
+        default_factory=list, description="前回の同期以降に削除した予定の id"
+    )
+
+
+class CalendarSyncResponse(BaseModel):
+    """POST /api/v1/calendar/sync のレスポンス"""
+
+    sync_token: str = Field(..., description="次の差分同期で送るトークン")
+    calendar_digest: str = Field(..., description="POST /sleep-plans の calendar_digest に送る値")
+    event_count: int = Field(..., ge=0, description="同期済みの予定の件数")
@@ -1,5 +1,6 @@
 """プラン API の入出力スキーマ"""
 
+from datetime import datetime
 from typing import Any
 
 from pydantic import BaseModel, Field
@@ -10,11 +11,19 @@ class PlanRequest(BaseModel):
 
     settings には wake_up_time, sleep_duration_hours に加え、
     today_override（今日だけの就寝・起床オーバーライド、任意）を含める。
+    カレンダーを同期済みなら calendar_events の代わりに calendar_digest を送る。
     """
 
     calendar_events: list[dict[str, Any]] = Field(
         default_factory=list, description="カレンダー予定のリスト"
     )
+    calendar_digest: str | None = Field(
+        default=None,
+        description=(
+            "POST /calendar/sync が返した calendar_digest。指定時は calendar_events を送らず、"
+            "サーバーに同期済みの予定を使う"
+        ),
+    )
     sleep_logs: list[dict[str, Any]] = Field(default_factory=list, description="睡眠ログのリスト")
     settings: dict[str, Any] = Field(
         default_factory=dict,
@@ -24,3 +33,15 @@ class PlanRequest(BaseModel):
         default=None,
         description="今日の日付 YYYY-MM-DD（署名・プロンプト用。未指定時はサーバー日付を使用）",
     )
+
+
+class CurrentPlanResponse(BaseModel):
+    """GET /api/v1/sleep-plans/current のレスポンス
+
+    plan は sleep_plan_cache に保存された JSON をパースせずにそのまま埋め込む。
+    """
+
+    signature_hash: str = Field(..., description="キャッシュ生成時の署名ハッシュ")
+    created_at: datetime = Field(..., description="プラン生成日時")
+    age_seconds: int = Field(..., ge=0, description="生成からの経過秒数")
+    plan: dict[str, Any] = Field(..., description="保存済みの週間プラン（week_plan 等）")
@@ -0,0 +1,4 @@
+"""
+性能計測用スクリプト群（アプリ本体からは import しない）
+backend ディレクトリで uv run python -m benchmarks.<name> として実行する。
+"""
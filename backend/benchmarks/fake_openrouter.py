@@ -0,0 +1,366 @@
+"""
+偽 OpenRouter（/chat/completions 互換）サーバー
+OpenRouterClient が使うプロトコル（非ストリーミング JSON / stream=true の SSE）を話し、
+遅延分布・トークン生成速度・429/5xx・壊れた JSON・usage・決定的な週間プランを再現する。
+LLM まわり（リトライ・ヘッジ・ストリーミング・single-flight 等）の性能をコストをかけずに試すためのもの。
+
+    uv run python -m benchmarks.fake_openrouter --port 8089 --latency lognormal:0.8,0.5 \\
+        --tokens-per-second 80 --error-429 0.05 --error-5xx 0.02 --truncated 0.01
+    # 別ターミナルで: OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1 OPENROUTER_API_KEY=fake uv run uvicorn ...
+
+テストからは FakeOpenRouter(profile).transport を OpenRouterClient(transport=...) に渡す（ソケット不要）か、
+tests/conftest.py の fake_openrouter / fake_openrouter_server フィクスチャを使う。
+
+応答の決め方（1 リクエストごと）:
+1. profile.script が残っていれば先頭の結果を使う（"ok" / "fenced" / "429" / "500" / "502" / "503" /
+   "truncated" / "length" / "invalid" / "empty"）。length は max_tokens に達した応答（途中までの JSON を
+   finish_reason=length で正常に終える）
+2. 無ければ error_429 → error_5xx → truncated → invalid → fenced の確率で抽選し、外れれば "ok"
+最後のメッセージに「不足している日付: ...」（不足日の再要求）があれば、その日付の要素だけを返す。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+OUTCOMES = ("ok", "fenced", "429", "500", "502", "503", "truncated", "length", "invalid", "empty")
+_TODAY_RE = re.compile(r"今日の日付は (\d{4}-\d{2}-\d{2})")
+# 不足日の再要求（OpenRouterClient の修復プロンプト）。最後のメッセージにあればその日だけ返す
+_MISSING_DATES_RE = re.compile(r"不足している日付: ([\d\-, ]+)")
+# SSE で 1 チャンクに載せる文字数
+_CHUNK_CHARS = 16
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    遅延分布の指定（秒）を関数に変換する。
+    fixed:0.5 / uniform:0.2,1.0 / lognormal:<中央値>,<sigma> / 0.5（fixed の省略形）
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    values = [float(x) for x in args.split(",")]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rnd: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rnd: rnd.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rnd: rnd.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"invalid latency spec: {spec!r}")
+
+
+@dataclass
+class FakeProfile:
+    """偽サーバーの振る舞い。確率はリクエストごとに独立に抽選する"""
+
+    # 最初のトークンまでの遅延（秒）
+    latency: str = "fixed:0"
+    # 生成速度（completion トークン/秒）。None なら生成時間を足さない
+    tokens_per_second: float | None = None
+    error_429: float = 0.0
+    error_5xx: float = 0.0
+    truncated: float = 0.0
+    invalid: float = 0.0
+    fenced: float = 0.0
+    # 429 の Retry-After（秒）
+    retry_after: int = 1
+    # 先頭から順に使う結果（OUTCOMES のいずれか）。テストで決まった順序を再現する
+    script: list[str] = field(default_factory=list)
+    seed: int = 0
+
+
+def count_tokens(text: str) -> int:
+    """usage 用のおおよそのトークン数（日本語混じりを想定し 3 文字 ≒ 1 トークン）"""
+    return max(1, math.ceil(len(text) / 3))
+
+
+def week_plan_fixture(today: str, seed: int = 0) -> dict[str, Any]:
+    """today から 7 日分の決定的な週間プラン（同じ today・seed なら同じ内容）"""
+    rnd = random.Random(f"{today}:{seed}")
+    start = date.fromisoformat(today)
+    week = []
+    for i in range(7):
+        importance = rnd.choice(["high", "medium", "low"])
+        event = (
+            rnd.choice(["定例会議", "期末試験", "プレゼン発表", None])
+            if importance != "low"
+            else None
+        )
+        bed = f"{rnd.choice([22, 23]):02d}:{rnd.choice([0, 30]):02d}"
+        level = {"high": "高い", "medium": "普通", "low": "低い"}[importance]
+        week.append(
+            {
+                "date": (start + timedelta(days=i)).isoformat(),
+                "recommended_bedtime": bed,
+                "recommended_wakeup": f"{rnd.choice([6, 7]):02d}:00",
+                "importance": importance,
+                "next_day_event": event,
+                "advice": f"翌日の重要度は{level}です。{bed}までに布団に入りましょう。",
+            }
+        )
+    return {"week_plan": week}
+
+
+class FakeOpenRouter:
+    """偽 OpenRouter。app（ASGI）を uvicorn で動かすか、transport で httpx から直接呼ぶ"""
+
+    def __init__(self, profile: FakeProfile | None = None):
+        self.profile = profile or FakeProfile()
+        self._rnd = random.Random(self.profile.seed)
+        self._latency = parse_latency(self.profile.latency)
+        self._script = list(self.profile.script)
+        self._seen_system_prompts: set[str] = set()
+        # 受け取ったリクエスト本文と、返した結果（テストの検証用）
+        self.requests: list[dict[str, Any]] = []
+        self.outcomes: list[str] = []
+        self.app = self._build_app()
+
+    @property
+    def transport(self) -> httpx.ASGITransport:
+        """ソケットを開かずに httpx から呼ぶためのトランスポート（SSE は一括で届く）"""
+        return httpx.ASGITransport(app=self.app)
+
+    def _next_outcome(self) -> str:
+        if self._script:
+            outcome = self._script.pop(0)
+            if outcome not in OUTCOMES:
+                raise ValueError(f"unknown outcome in script: {outcome!r}")
+            return outcome
+        p = self.profile
+        if self._rnd.random() < p.error_429:
+            return "429"
+        if self._rnd.random() < p.error_5xx:
+            return self._rnd.choice(["500", "502", "503"])
+        if self._rnd.random() < p.truncated:
+            return "truncated"
+        if self._rnd.random() < p.invalid:
+            return "invalid"
+        if self._rnd.random() < p.fenced:
+            return "fenced"
+        return "ok"
+
+    def _content(self, messages: list[dict[str, Any]], outcome: str) -> str:
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        m = _TODAY_RE.search(prompt)
+        today = m.group(1) if m else "2026-01-01"
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "big")
+        plan = week_plan_fixture(today, seed)
+        missing = (
+            _MISSING_DATES_RE.search(str(messages[-1].get("content", ""))) if messages else None
+        )
+        if missing:
+            wanted = {d.strip() for d in missing.group(1).split(",")}
+            plan["week_plan"] = [d for d in plan["week_plan"] if d["date"] in wanted]
+        body = json.dumps(plan, ensure_ascii=False)
+        if outcome == "fenced":
+            return f"```json\n{body}\n```"
+        if outcome in ("truncated", "length"):
+            return body[: len(body) // 2]
+        if outcome == "invalid":
+            return "申し訳ありませんが、プランを作成できませんでした。"
+        return body
+
+    def _usage(self, messages: list[dict[str, Any]], content: str) -> dict[str, Any]:
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+        # 先頭の system メッセージが既出ならプレフィックスキャッシュに載ったものとして数える
+        cached = 0
+        if messages and messages[0].get("role") == "system":
+            system = str(messages[0].get("content", ""))
+            if system in self._seen_system_prompts:
+                cached = count_tokens(system)
+            self._seen_system_prompts.add(system)
+        completion_tokens = count_tokens(content) if content else 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    def _generation_seconds(self, completion_tokens: int) -> float:
+        tps = self.profile.tokens_per_second
+        return completion_tokens / tps if tps else 0.0
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="fake-openrouter", docs_url=None, redoc_url=None)
+
+        async def chat_completions(request: Request) -> Response:
+            body = await request.json()
+            self.requests.append(body)
+            outcome = self._next_outcome()
+            self.outcomes.append(outcome)
+            await asyncio.sleep(max(0.0, self._latency(self._rnd)))
+
+            if outcome == "429":
+                return JSONResponse(
+                    {"error": {"code": 429, "message": "Rate limit exceeded (fake)"}},
+                    status_code=429,
+                    headers={"Retry-After": str(self.profile.retry_after)},
+                )
+            if outcome in ("500", "502", "503"):
+                return JSONResponse(
+                    {"error": {"code": int(outcome), "message": "Upstream error (fake)"}},
+                    status_code=int(outcome),
+                )
+
+            messages = body.get("messages") or []
+            model = body.get("model") or "fake/model"
+            completion_id = f"gen-fake-{len(self.requests)}"
+            content = "" if outcome == "empty" else self._content(messages, outcome)
+            usage = self._usage(messages, content)
+            if body.get("stream"):
+                return StreamingResponse(
+                    self._stream(completion_id, model, content, usage, outcome),
+                    media_type="text/event-stream",
+                )
+
+            await asyncio.sleep(self._generation_seconds(usage["completion_tokens"]))
+            choices = (
+                []
+                if outcome == "empty"
+                else [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "length" if outcome == "length" else "stop",
+                    }
+                ]
+            )
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": choices,
+                    "usage": usage,
+                }
+            )
+
+        app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+        app.add_api_route("/api/v1/chat/completions", chat_completions, methods=["POST"])
+        return app
+
+    async def _stream(
+        self,
+        completion_id: str,
+        model: str,
+        content: str,
+        usage: dict[str, Any],
+        outcome: str,
+    ) -> AsyncIterator[bytes]:
+        """OpenAI 互換の chat.completion.chunk を SSE で流す（truncated は [DONE] を送らずに切る）"""
+
+        def chunk(delta: dict[str, Any], finish_reason: str | None, **extra: Any) -> bytes:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return b"data: " + json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n\n"
+
+        # OpenRouter は生成待ちの間コメント行を送る
+        yield b": OPENROUTER PROCESSING\n\n"
+        yield chunk({"role": "assistant", "content": ""}, None)
+        pieces = [content[i : i + _CHUNK_CHARS] for i in range(0, len(content), _CHUNK_CHARS)]
+        per_piece = self._generation_seconds(usage["completion_tokens"]) / max(1, len(pieces))
+        for piece in pieces:
+            if per_piece:
+                await asyncio.sleep(per_piece)
+            yield chunk({"content": piece}, None)
+        if outcome == "truncated":
+            return
+        yield chunk({}, "length" if outcome == "length" else "stop", usage=usage)
+        yield b"data: [DONE]\n\n"
+
+
+@contextlib.contextmanager
+def serve_in_thread(fake: FakeOpenRouter, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """
+    uvicorn で fake.app を別スレッドに起動し、OPENROUTER_BASE_URL に渡せる URL（…/api/v1）を返す。
+    port=0 なら空いているポートを使う。
+    """
+    import uvicorn
+
+    config = uvicorn.Config(fake.app, host=host, port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("fake OpenRouter server did not start")
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{bound_port}/api/v1"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument(
+        "--latency",
+        default="fixed:0.5",
+        help="最初のトークンまでの遅延: fixed:S / uniform:A,B / lognormal:MEDIAN,SIGMA",
+    )
+    parser.add_argument("--tokens-per-second", type=float, help="生成速度（未指定なら即時）")
+    parser.add_argument("--error-429", type=float, default=0.0, help="429 を返す確率")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="500/502/503 を返す確率")
+    parser.add_argument("--truncated", type=float, default=0.0, help="途中で切れた JSON の確率")
+    parser.add_argument("--invalid", type=float, default=0.0, help="JSON でない応答の確率")
+    parser.add_argument("--fenced", type=float, default=0.0, help="```json フェンス付きの確率")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 の Retry-After（秒）")
+    parser.add_argument(
+        "--script", default="", help="先頭から順に返す結果（カンマ区切り。例: 429,ok,truncated）"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    profile = FakeProfile(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_429=args.error_429,
+        error_5xx=args.error_5xx,
+        truncated=args.truncated,
+        invalid=args.invalid,
+        fenced=args.fenced,
+        retry_after=args.retry_after,
+        script=[s.strip() for s in args.script.split(",") if s.strip()],
+        seed=args.seed,
+    )
+    print(f"OPENROUTER_BASE_URL=http://{args.host}:{args.port}/api/v1")
+    uvicorn.run(FakeOpenRouter(profile).app, host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
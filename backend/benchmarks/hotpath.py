@@ -0,0 +1,278 @@
+"""
+プランリクエストごとに走る純粋関数のマイクロベンチマーク
+署名計算（build_signature_hash / _canonical_value / _sorted_canonical_list）、
+LLM 入力の JST 変換（_enrich_calendar_events_with_date_jst）、LLM 応答のフェンス除去とパース
+（_parse_json_content）について、1 呼び出しあたりの時間（ns）と tracemalloc によるメモリ確保量を計測する。
+
+    uv run python -m benchmarks.hotpath                         # 表で出力
+    uv run python -m benchmarks.hotpath --json                  # 機械可読な出力
+    uv run python -m benchmarks.hotpath --jsonl results.jsonl   # 1 実行 1 行で追記（コミットごとの推移用）
+    uv run python -m benchmarks.hotpath --filter signature --min-time 1
+
+計測方法: 1 バッチが min_time / repeat 秒以上になるようループ回数を合わせ、GC を止めて repeat バッチ計測する。
+ns_per_call は最小値（ノイズの影響が最も小さい）、ns_median はバッチの中央値。
+メモリは別に 1 回だけ tracemalloc 下で呼び、ピーク確保量（alloc_peak_bytes）と、呼び出し後も残っている
+メモリブロック数（retained_blocks。戻り値を含む）を記録する（計測の ns には含まない）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+from app.domain.plan.value_objects import (
+    _canonical_value,
+    _sorted_canonical_list,
+    build_signature_hash,
+)
+from app.infrastructure.llm.openrouter_client import (
+    _enrich_calendar_events_with_date_jst,
+    _parse_json_content,
+)
+from benchmarks.plan_storage import sample_plan
+
+EVENT_COUNTS = (0, 10, 100, 500, 2000)
+LOG_COUNTS = (7, 30, 90)
+_TITLES = ["定例会議", "期末試験", "プレゼン発表", "歯医者", "アルバイト", "ゼミ", "飲み会"]
+
+
+def calendar_events(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """フロントが送るのと同じ形（ISO 8601・ミリ秒付き UTC / 終日）のカレンダー予定を n 件、順不同で作る"""
+    rnd = random.Random(seed)
+    base = datetime(2026, 3, 2, tzinfo=UTC)
+    events: list[dict[str, Any]] = []
+    for i in range(n):
+        if rnd.random() < 0.1:
+            day = (base + timedelta(days=rnd.randrange(60))).date().isoformat()
+            events.append({"title": rnd.choice(_TITLES), "start": day, "end": day, "allDay": True})
+            continue
+        start = base + timedelta(minutes=15 * rnd.randrange(60 * 24 * 4))
+        events.append(
+            {
+                "id": f"ev-{seed}-{i}",
+                "title": rnd.choice(_TITLES),
+                "start": start.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                "end": (start + timedelta(hours=1)).isoformat(timespec="milliseconds"),
+                "location": rnd.choice(["", "本社 3F", "オンライン"]),
+            }
+        )
+    rnd.shuffle(events)
+    return events
+
+
+def sleep_logs(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """直近 n 日分の睡眠ログ（POST /sleep-plans に載る形）"""
+    rnd = random.Random(seed)
+    today = date(2026, 3, 2)
+    return [
+        {
+            "date": (today - timedelta(days=d + 1)).isoformat(),
+            "score": rnd.randint(40, 100),
+            "scheduled_sleep_time": f"{(today - timedelta(days=d + 1)).isoformat()}T14:00:00.000Z",
+            "usage_minutes": rnd.randint(0, 90),
+            "mood": rnd.choice([None, 1, 2, 3, 4, 5]),
+        }
+        for d in range(n)
+    ]
+
+
+def plan_settings(with_override: bool) -> dict[str, Any]:
+    s: dict[str, Any] = {"wake_up_time": "07:00", "sleep_duration_hours": 8}
+    if with_override:
+        s["today_override"] = {"sleep_time": "2026-03-02T15:30:00.000Z", "wake_up_time": "06:00"}
+    return s
+
+
+def llm_content(days: int, fenced: bool) -> str:
+    """LLM の応答本文（```json フェンス付き / 無し）"""
+    body = json.dumps(json.loads(sample_plan(0, days)), ensure_ascii=False, indent=2)
+    return f"```json\n{body}\n```" if fenced else body
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    params: dict[str, Any]
+    fn: Callable[[], Any]
+
+
+def build_cases() -> list[Case]:
+    cases: list[Case] = []
+    logs7 = sleep_logs(7)
+    for n in EVENT_COUNTS:
+        events = calendar_events(n)
+        for override in (False, True):
+            s = plan_settings(override)
+            cases.append(
+                Case(
+                    "build_signature_hash",
+                    {"events": n, "logs": 7, "override": override},
+                    lambda e=events, s=s: build_signature_hash(e, logs7, s, "2026-03-02"),
+                )
+            )
+        cases.append(Case("_canonical_value", {"events": n}, lambda e=events: _canonical_value(e)))
+        cases.append(
+            Case(
+                "_sorted_canonical_list",
+                {"events": n},
+                lambda e=events: _sorted_canonical_list(e, sort_key="start"),
+            )
+        )
+        cases.append(
+            Case(
+                "_enrich_calendar_events_with_date_jst",
+                {"events": n},
+                lambda e=events: _enrich_calendar_events_with_date_jst(e),
+            )
+        )
+    events10 = calendar_events(10)
+    for n in LOG_COUNTS:
+        logs = sleep_logs(n)
+        cases.append(
+            Case(
+                "build_signature_hash",
+                {"events": 10, "logs": n, "override": True},
+                lambda logs=logs: build_signature_hash(
+                    events10, logs, plan_settings(True), "2026-03-02"
+                ),
+            )
+        )
+    for days in (7, 30):
+        for fenced in (False, True):
+            content = llm_content(days, fenced)
+            cases.append(
+                Case(
+                    "_parse_json_content",
+                    {"days": days, "fenced": fenced},
+                    lambda c=content: _parse_json_content(c),
+                )
+            )
+    return cases
+
+
+def measure(fn: Callable[[], Any], min_time: float, repeat: int) -> dict[str, Any]:
+    """fn の 1 呼び出しあたりの時間（ns）とメモリ確保量を計測する"""
+    fn()  # ウォームアップ（初回のみのキャッシュ・遅延 import を除く）
+    batch_time = min_time / repeat
+    loops = 1
+    while True:
+        t0 = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter_ns() - t0 >= batch_time * 1e9 or loops >= 1 << 24:
+            break
+        loops *= 2
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter_ns()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter_ns() - t0) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+    blocks = sum(max(0, stat.count_diff) for stat in after.compare_to(before, "lineno"))
+
+    return {
+        "ns_per_call": int(min(samples)),
+        "ns_median": int(statistics.median(samples)),
+        "loops": loops,
+        "alloc_peak_bytes": peak - base,
+        "retained_blocks": blocks,
+    }
+
+
+def run(min_time: float, repeat: int, name_filter: str | None) -> list[dict[str, Any]]:
+    results = []
+    for case in build_cases():
+        if name_filter and name_filter not in case.name:
+            continue
+        results.append({"name": case.name, **case.params, **measure(case.fn, min_time, repeat)})
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_table(rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    keys = list(dict.fromkeys(k for r in rows for k in r))
+    widths = {k: max(len(k), *(len(str(r.get(k, ""))) for r in rows)) for k in keys}
+    print("  ".join(k.ljust(widths[k]) for k in keys))
+    for r in rows:
+        print("  ".join(str(r.get(k, "")).ljust(widths[k]) for k in keys))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="1 ケースあたりの計測時間（秒）"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="計測バッチ数")
+    parser.add_argument("--filter", help="関数名に含まれる文字列で絞り込む")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    parser.add_argument("--jsonl", metavar="PATH", help="結果を 1 行の JSON として PATH に追記する")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "min_time": args.min_time,
+        "repeat": args.repeat,
+        "results": run(args.min_time, args.repeat, args.filter),
+    }
+    if args.jsonl:
+        with open(args.jsonl, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"appended to {args.jsonl}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_table(report["results"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
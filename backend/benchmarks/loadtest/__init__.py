@@ -0,0 +1,16 @@
+"""
+エンドツーエンドの負荷試験
+/sleep-plans・/sleep-logs・/settings・/health を現実的な比率で混ぜて流し、
+p50/p95/p99・RPS・DB プール待ち・プランキャッシュヒット率を集計する。
+チェックイン済みのベースライン（baseline.json）と比較し、劣化があれば終了コード 1 を返す。
+
+    uv run python -m benchmarks.loadtest                          # ASGI アプリを直接叩く（偽 LLM）
+    uv run python -m benchmarks.loadtest --compare                # baseline.json と比較
+    uv run python -m benchmarks.loadtest --write-baseline         # baseline.json を更新
+    uv run python -m benchmarks.loadtest --base-url http://localhost:8000 --token <JWT>
+
+in-process（既定）: httpx.ASGITransport で create_app() のアプリを直接呼ぶ。認証は X-Load-User ヘッダーで
+上書きし、LLM は FakePlanGenerator に差し替える。DATABASE_URL の DB に仮想ユーザーを作成する（終了時に削除）。
+live（--base-url）: 起動済みの uvicorn を叩く。全リクエストが --token のユーザーになり、
+LLM はサーバー側の設定に従う。プール待ちは計測できない。
+"""
@@ -0,0 +1,208 @@
+"""負荷試験の CLI（使い方は benchmarks/loadtest/__init__.py を参照）"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import Any
+
+import httpx
+from fastapi import Request
+from sqlalchemy import delete
+
+import benchmarks.loadtest as loadtest_pkg
+from benchmarks.loadtest.report import DEFAULT_TOLERANCE, compare, config_mismatch, summarize
+from benchmarks.loadtest.runner import PoolWaitRecorder, run_load
+from benchmarks.loadtest.scenario import VirtualUser, default_mix, parse_mix
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+LOAD_USER_HEADER = "X-Load-User"
+
+
+async def _run_in_process(args: argparse.Namespace) -> dict[str, Any]:
+    # 設定（プールサイズ等）はインポート時に読まれるため、アプリのインポートはここで行う
+    from app.infrastructure.persistence.database import engine, session_scope
+    from app.infrastructure.persistence.models.user import User
+    from app.main import create_app
+    from app.presentation.api.plan import get_plan_generator
+    from app.presentation.dependencies.auth import get_current_user_id
+    from benchmarks.loadtest.fakes import FakePlanGenerator
+
+    web_app = create_app()
+
+    def _load_user(request: Request) -> str:
+        return request.headers[LOAD_USER_HEADER]
+
+    generator = FakePlanGenerator(args.llm_latency, args.llm_jitter, args.seed)
+    users = [
+        VirtualUser(user_id=uid, headers={LOAD_USER_HEADER: uid})
+        for uid in (str(uuid.uuid4()) for _ in range(args.users))
+    ]
+    async with session_scope() as db:
+        for u in users:
+            db.add(User(id=u.user_id, email=f"load-{u.user_id[:8]}@example.com", name="load"))
+
+    web_app.dependency_overrides[get_current_user_id] = _load_user
+    web_app.dependency_overrides[get_plan_generator] = lambda: generator
+    recorder = PoolWaitRecorder(web_app)
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=recorder), base_url="http://loadtest", timeout=120
+        ) as client:
+            return await _measure(client, users, args, recorder)
+    finally:
+        web_app.dependency_overrides.pop(get_current_user_id, None)
+        web_app.dependency_overrides.pop(get_plan_generator, None)
+        async with session_scope() as db:
+            await db.execute(delete(User).where(User.id.in_([u.user_id for u in users])))
+        await engine.dispose()
+
+
+async def _run_live(args: argparse.Namespace) -> dict[str, Any]:
+    if not args.token:
+        raise SystemExit("--base-url には --token（または LOADTEST_TOKEN）が必要です")
+    users = [VirtualUser(user_id="live", headers={"Authorization": f"Bearer {args.token}"})]
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        return await _measure(client, users, args, None)
+
+
+async def _measure(
+    client: httpx.AsyncClient,
+    users: list[VirtualUser],
+    args: argparse.Namespace,
+    recorder: PoolWaitRecorder | None,
+) -> dict[str, Any]:
+    operations = (
+        parse_mix(args.mix, args.plan_miss_ratio) if args.mix else default_mix(args.plan_miss_ratio)
+    )
+    common = {"concurrency": args.concurrency, "api_prefix": args.api_prefix, "seed": args.seed}
+    if args.warmup:
+        # 接続プール・初回のキャッシュ生成を温める（集計しない）
+        await run_load(client, operations, users, total_requests=args.warmup, **common)
+    samples, elapsed = await run_load(
+        client,
+        operations,
+        users,
+        duration=args.duration,
+        total_requests=args.requests,
+        pool_waits=recorder,
+        **common,
+    )
+    return summarize(samples, elapsed)
+
+
+def _config(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "mode": "live" if args.base_url else "in-process",
+        "concurrency": args.concurrency,
+        "users": 1 if args.base_url else args.users,
+        "requests": args.requests,
+        "duration_s": args.duration,
+        "mix": args.mix or "default",
+        "plan_miss_ratio": args.plan_miss_ratio,
+        "llm_latency_s": None if args.base_url else args.llm_latency,
+    }
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    lat, wait = report["latency_ms"], report["pool_wait_ms"]
+    print(
+        f"requests={report['requests']} rps={report['rps']} errors={report['errors']} "
+        f"p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms"
+    )
+    if wait:
+        print(f"pool_wait p50={wait['p50']}ms p95={wait['p95']}ms p99={wait['p99']}ms")
+    print(f"plan_cache={report['plan_cache']} hit_ratio={report['plan_cache_hit_ratio']}")
+    print(f"status={report['status_counts']}")
+    rows = [{"operation": name} | op for name, op in report["operations"].items()]
+    keys = list(rows[0].keys()) if rows else []
+    widths = {k: max(len(k), *(len(str(r[k])) for r in rows)) for k in keys}
+    print()
+    print("  ".join(k.ljust(widths[k]) for k in keys))
+    for r in rows:
+        print("  ".join(str(r[k]).ljust(widths[k]) for k in keys))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadtest",
+        description=loadtest_pkg.__doc__,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("--base-url", help="指定時は起動済みサーバーを叩く（live）")
+    parser.add_argument("--token", default=os.environ.get("LOADTEST_TOKEN"), help="live 用 JWT")
+    parser.add_argument("--api-prefix", default="/api/v1")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時実行ワーカー数")
+    parser.add_argument("--users", type=int, default=50, help="仮想ユーザー数（in-process）")
+    parser.add_argument("--requests", type=int, default=2000, help="計測するリクエスト数")
+    parser.add_argument(
+        "--duration", type=float, help="指定時は秒数で止める（--requests より優先）"
+    )
+    parser.add_argument("--warmup", type=int, default=200, help="集計しない事前リクエスト数")
+    parser.add_argument(
+        "--mix", help='混合比の上書き（例: "GET /settings=10,POST /sleep-plans=5"）'
+    )
+    parser.add_argument(
+        "--plan-miss-ratio", type=float, default=0.1, help="POST /sleep-plans の入力が変わる割合"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="偽 LLM の遅延（秒）")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="偽 LLM の遅延のゆらぎ（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="レポートを JSON で出力する")
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=str(BASELINE_PATH),
+        metavar="PATH",
+        help="ベースラインと比較し、劣化があれば終了コード 1（既定: baseline.json）",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="許容する劣化率")
+    parser.add_argument(
+        "--write-baseline",
+        nargs="?",
+        const=str(BASELINE_PATH),
+        metavar="PATH",
+        help="結果をベースラインとして保存する（既定: baseline.json）",
+    )
+    args = parser.parse_args(argv)
+    if args.duration is not None:
+        args.requests = None
+    os.environ.setdefault("DEBUG", "false")
+
+    # ユースケースの [plan] ログ（stdout）がレポートに混ざらないよう stderr に逃がす
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(_run_live(args) if args.base_url else _run_in_process(args))
+    report = {"config": _config(args)} | report
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_report(report)
+
+    if args.write_baseline:
+        Path(args.write_baseline).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"wrote {args.write_baseline}", file=sys.stderr)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        for diff in config_mismatch(report["config"], baseline.get("config", {})):
+            print(f"warning: config differs from baseline: {diff}", file=sys.stderr)
+        problems = compare(report, baseline, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        if problems:
+            return 1
+        print("no regressions against baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
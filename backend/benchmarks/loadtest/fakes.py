@@ -0,0 +1,51 @@
+"""
+負荷試験用の偽 LLM（IPlanGenerator 実装）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any
+
+import orjson
+
+from benchmarks.plan_storage import sample_plan
+
+
+class FakePlanGenerator:
+    """latency ± jitter 秒待ってから、実際の LLM 出力に近い 7 日分のプランを返す"""
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self._rnd = random.Random(seed)
+        self.calls = 0
+
+    async def generate_week_plan(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None = None,
+    ) -> dict[str, Any]:
+        await self._wait()
+        return orjson.loads(sample_plan(self.calls))
+
+    async def generate_days(
+        self,
+        calendar_events: list[Any],
+        sleep_logs: list[Any],
+        settings: dict[str, Any],
+        today_date: str | None,
+        dates: list[str],
+        context_days: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        await self._wait()
+        week = orjson.loads(sample_plan(self.calls, days=len(dates)))["week_plan"]
+        return [{**day, "date": d} for day, d in zip(week, dates, strict=True)]
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        delay = self.latency + self._rnd.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
@@ -0,0 +1,120 @@
+"""
+計測結果の集計と、チェックイン済みベースライン JSON との比較
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import Any
+
+from benchmarks.loadtest.runner import Sample
+
+# 比較の既定値: 相対で tolerance を超え、かつ絶対差が MIN_DELTA_MS を超えたら劣化とみなす
+DEFAULT_TOLERANCE = 0.25
+MIN_DELTA_MS = 5.0
+MAX_ERROR_RATE_INCREASE = 0.01
+MAX_HIT_RATIO_DROP = 0.05
+# 件数が少ない操作の p95 はぶれが大きいため比較しない
+MIN_OPERATION_SAMPLES = 100
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """最近傍順位法のパーセンタイル（values が空なら 0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _latency_ms(values: list[float]) -> dict[str, float]:
+    return {f"p{p}": round(percentile(values, p) * 1000, 2) for p in (50, 95, 99)} | {
+        "max": round(max(values, default=0.0) * 1000, 2)
+    }
+
+
+def summarize(samples: list[Sample], elapsed_seconds: float) -> dict[str, Any]:
+    """計測結果をレポート（JSON に書ける dict）にまとめる"""
+    errors = sum(1 for s in samples if not s.ok)
+    waits = [s.pool_wait_seconds for s in samples if s.pool_wait_seconds is not None]
+    cache = Counter(s.plan_cache for s in samples if s.plan_cache is not None)
+    cache_total = sum(cache.values())
+
+    by_op: dict[str, list[Sample]] = {}
+    for s in samples:
+        by_op.setdefault(s.operation, []).append(s)
+
+    return {
+        "requests": len(samples),
+        "elapsed_s": round(elapsed_seconds, 3),
+        "rps": round(len(samples) / elapsed_seconds, 1) if elapsed_seconds > 0 else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "status_counts": {str(k): v for k, v in sorted(Counter(s.status for s in samples).items())},
+        "latency_ms": _latency_ms([s.latency_seconds for s in samples]),
+        "pool_wait_ms": _latency_ms(waits) if waits else None,
+        "plan_cache": dict(sorted(cache.items())),
+        "plan_cache_hit_ratio": round(cache["hit"] / cache_total, 3) if cache_total else None,
+        "operations": {
+            name: {"requests": len(group), "errors": sum(1 for s in group if not s.ok)}
+            | _latency_ms([s.latency_seconds for s in group])
+            for name, group in sorted(by_op.items())
+        },
+    }
+
+
+def _slower(label: str, current: float, base: float, tolerance: float, problems: list[str]) -> None:
+    if current > base * (1 + tolerance) and current - base > MIN_DELTA_MS:
+        problems.append(f"{label}: {current:.2f}ms > baseline {base:.2f}ms (+{tolerance:.0%})")
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """
+    ベースラインと比べて劣化した項目を返す（空なら合格）。
+    比較するのは全体と操作ごとの p95/p99、RPS、エラー率、プール待ち p95、キャッシュヒット率。
+    ベースラインに無い操作・項目と、件数が MIN_OPERATION_SAMPLES 未満の操作は比較しない。
+    """
+    problems: list[str] = []
+    for p in ("p95", "p99"):
+        _slower(
+            f"latency {p}",
+            report["latency_ms"][p],
+            baseline["latency_ms"][p],
+            tolerance,
+            problems,
+        )
+    if report["rps"] < baseline["rps"] * (1 - tolerance):
+        problems.append(f"rps: {report['rps']} < baseline {baseline['rps']} (-{tolerance:.0%})")
+    if report["error_rate"] > baseline["error_rate"] + MAX_ERROR_RATE_INCREASE:
+        problems.append(
+            f"error_rate: {report['error_rate']:.2%} > baseline {baseline['error_rate']:.2%}"
+        )
+    if report.get("pool_wait_ms") and baseline.get("pool_wait_ms"):
+        _slower(
+            "pool_wait p95",
+            report["pool_wait_ms"]["p95"],
+            baseline["pool_wait_ms"]["p95"],
+            tolerance,
+            problems,
+        )
+    hit, base_hit = report.get("plan_cache_hit_ratio"), baseline.get("plan_cache_hit_ratio")
+    if hit is not None and base_hit is not None and hit < base_hit - MAX_HIT_RATIO_DROP:
+        problems.append(f"plan_cache_hit_ratio: {hit} < baseline {base_hit}")
+    for name, base_op in baseline.get("operations", {}).items():
+        op = report["operations"].get(name)
+        if op is None or min(op["requests"], base_op["requests"]) < MIN_OPERATION_SAMPLES:
+            continue
+        _slower(f"{name} p95", op["p95"], base_op["p95"], tolerance, problems)
+    return problems
+
+
+def config_mismatch(report_config: dict[str, Any], baseline_config: dict[str, Any]) -> list[str]:
+    """条件の違うベースラインとの比較は意味が薄いため、違う設定項目を返す（警告用）"""
+    return [
+        f"{k}: {report_config.get(k)!r} (baseline {baseline_config.get(k)!r})"
+        for k in sorted(set(report_config) | set(baseline_config))
+        if report_config.get(k) != baseline_config.get(k)
+    ]
@@ -0,0 +1,120 @@
+"""
+負荷の実行: 同時実行数ぶんのワーカーが混合比に従ってリクエストを送り続ける（クローズドループ）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from benchmarks.loadtest.scenario import Operation, VirtualUser
+
+# in-process 実行時にプール待ちを紐づけるためのリクエストヘッダー
+REQUEST_ID_HEADER = "X-Load-Request"
+
+
+@dataclass
+class Sample:
+    """1 リクエストの計測結果"""
+
+    operation: str
+    status: int
+    latency_seconds: float
+    ok: bool
+    # X-Plan-Cache ヘッダー（hit / miss / stale。POST /sleep-plans 以外は None）
+    plan_cache: str | None = None
+    # DbStats.pool_wait_seconds（in-process 実行時のみ）
+    pool_wait_seconds: float | None = None
+
+
+class PoolWaitRecorder:
+    """
+    ASGI アプリを包み、DbStatsMiddleware が scope["state"] に置いた DbStats から
+    リクエストごとのプール待ち時間を拾う（in-process 実行時のみ使える）。
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._waits: dict[str, float] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.app(scope, receive, send)
+        if scope["type"] != "http":
+            return
+        stats = scope.get("state", {}).get("db_stats")
+        request_id = dict(scope["headers"]).get(REQUEST_ID_HEADER.lower().encode())
+        if stats is not None and request_id is not None:
+            self._waits[request_id.decode()] = stats.pool_wait_seconds
+
+    def pop(self, request_id: str) -> float | None:
+        return self._waits.pop(request_id, None)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    operations: list[Operation],
+    users: list[VirtualUser],
+    *,
+    concurrency: int,
+    duration: float | None = None,
+    total_requests: int | None = None,
+    api_prefix: str = "/api/v1",
+    seed: int = 0,
+    pool_waits: PoolWaitRecorder | None = None,
+) -> tuple[list[Sample], float]:
+    """
+    duration 秒経過するか total_requests 件送るまで負荷をかけ、(計測結果, 経過秒) を返す。
+    どちらも None なら 100 件で止める。
+    """
+    if duration is None and total_requests is None:
+        total_requests = 100
+    weights = [op.weight for op in operations]
+    counter = itertools.count()
+    samples: list[Sample] = []
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    async def worker(worker_id: int) -> None:
+        rnd = random.Random(seed * 1000 + worker_id)
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            n = next(counter)
+            if total_requests is not None and n >= total_requests:
+                return
+            op = rnd.choices(operations, weights)[0]
+            user = rnd.choice(users)
+            spec = op.build(user, rnd)
+            request_id = str(n)
+            t0 = time.perf_counter()
+            try:
+                res = await client.request(
+                    spec.method,
+                    api_prefix + spec.path,
+                    json=spec.json,
+                    headers={**user.headers, REQUEST_ID_HEADER: request_id},
+                )
+                status = res.status_code
+                plan_cache = res.headers.get("X-Plan-Cache")
+            except httpx.HTTPError:
+                status, plan_cache = 0, None
+            latency = time.perf_counter() - t0
+            samples.append(
+                Sample(
+                    operation=op.name,
+                    status=status,
+                    latency_seconds=latency,
+                    ok=status in op.ok_statuses,
+                    plan_cache=plan_cache,
+                    pool_wait_seconds=pool_waits.pop(request_id) if pool_waits else None,
+                )
+            )
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, time.perf_counter() - started
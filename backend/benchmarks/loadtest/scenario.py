@@ -0,0 +1,135 @@
+"""
+負荷シナリオ: エンドポイントごとのリクエスト生成と重み付きの混合比
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any
+
+
+@dataclass
+class VirtualUser:
+    """負荷をかける仮想ユーザー 1 人分の状態"""
+
+    user_id: str
+    headers: dict[str, str]
+    # POST /sleep-plans の入力バリアント（変えるとキャッシュミスになる）
+    plan_variant: int = 0
+    # POST /sleep-logs の日付（409 にならないよう 1 件ごとに 1 日ずらす）
+    next_log_day: int = 0
+
+
+@dataclass(frozen=True)
+class RequestSpec:
+    method: str
+    path: str
+    json: Any = None
+
+
+@dataclass(frozen=True)
+class Operation:
+    """混合比の 1 要素。build が仮想ユーザーから 1 リクエストを組み立てる"""
+
+    name: str
+    weight: float
+    build: Callable[[VirtualUser, random.Random], RequestSpec]
+    # 正常とみなすステータス（それ以外はエラーとして数える）
+    ok_statuses: frozenset[int] = field(default_factory=lambda: frozenset({200}))
+
+
+_LOG_BASE_DATE = date(2020, 1, 1)
+
+
+def plan_request_body(variant: int) -> dict[str, Any]:
+    """フロントが送るのと同程度の大きさの POST /sleep-plans 入力"""
+    start = date(2026, 3, 2)
+    events = [
+        {
+            "title": f"予定{i}",
+            "start": f"{(start + timedelta(days=i % 7)).isoformat()}T{9 + i % 8:02d}:00:00+09:00",
+            "end": f"{(start + timedelta(days=i % 7)).isoformat()}T{10 + i % 8:02d}:00:00+09:00",
+        }
+        for i in range(12)
+    ]
+    logs = [
+        {"date": (start - timedelta(days=d + 1)).isoformat(), "score": 60 + (d * 7) % 35}
+        for d in range(7)
+    ]
+    return {
+        "calendar_events": events,
+        "sleep_logs": logs,
+        "settings": {"wake_up_time": "07:00", "sleep_duration_hours": 8, "variant": variant},
+        "today_date": start.isoformat(),
+    }
+
+
+def _plan(miss_ratio: float) -> Callable[[VirtualUser, random.Random], RequestSpec]:
+    def build(user: VirtualUser, rnd: random.Random) -> RequestSpec:
+        if rnd.random() < miss_ratio:
+            user.plan_variant += 1
+        return RequestSpec("POST", "/sleep-plans", plan_request_body(user.plan_variant))
+
+    return build
+
+
+def _create_log(user: VirtualUser, rnd: random.Random) -> RequestSpec:
+    day = _LOG_BASE_DATE + timedelta(days=user.next_log_day)
+    user.next_log_day += 1
+    return RequestSpec(
+        "POST",
+        "/sleep-logs",
+        {"date": day.isoformat(), "score": rnd.randint(40, 100), "usage_minutes": 15},
+    )
+
+
+def _put_settings(user: VirtualUser, rnd: random.Random) -> RequestSpec:
+    return RequestSpec(
+        "PUT",
+        "/settings",
+        {"wake_up_hour": rnd.choice([6, 7]), "wake_up_minute": 0, "sleep_duration_hours": 8},
+    )
+
+
+def default_mix(plan_miss_ratio: float = 0.1) -> list[Operation]:
+    """
+    アプリの起動・ホーム表示を想定した既定の混合比。
+    plan_miss_ratio は POST /sleep-plans のうち入力が変わる（LLM 生成になる）割合。
+    """
+    return [
+        Operation("GET /settings", 25, lambda u, r: RequestSpec("GET", "/settings")),
+        Operation("PUT /settings", 3, _put_settings),
+        Operation("GET /sleep-logs", 20, lambda u, r: RequestSpec("GET", "/sleep-logs")),
+        Operation("POST /sleep-logs", 5, _create_log, frozenset({201})),
+        Operation(
+            "GET /sleep-plans/current",
+            20,
+            lambda u, r: RequestSpec("GET", "/sleep-plans/current"),
+            frozenset({200, 404}),
+        ),
+        Operation("POST /sleep-plans", 20, _plan(plan_miss_ratio)),
+        Operation("GET /health", 7, lambda u, r: RequestSpec("GET", "/health")),
+    ]
+
+
+def parse_mix(spec: str, plan_miss_ratio: float) -> list[Operation]:
+    """
+    "GET /settings=10,POST /sleep-plans=5" 形式で既定の混合比の重みを上書きする。
+    指定しなかった操作は重み 0（実行しない）になる。
+    """
+    ops = {op.name: op for op in default_mix(plan_miss_ratio)}
+    weights: dict[str, float] = {}
+    for item in spec.split(","):
+        name, _, weight = item.rpartition("=")
+        name = name.strip()
+        if name not in ops:
+            raise ValueError(f"unknown operation: {name!r} (choices: {', '.join(ops)})")
+        weights[name] = float(weight)
+    return [
+        Operation(op.name, weights[op.name], op.build, op.ok_statuses)
+        for op in ops.values()
+        if weights.get(op.name, 0) > 0
+    ]
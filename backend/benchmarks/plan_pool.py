@@ -0,0 +1,194 @@
+"""
+LLM 待ち中の DB 接続保持と接続プール待ちのベンチマーク
+POST /sleep-plans（キャッシュミス・遅い偽 LLM）を同時に流しながら GET /settings を叩き、
+GET /settings の応答時間と接続プール待ち時間が LLM の遅延に応じてどう変わるかを計測する。
+
+    uv run python -m benchmarks.plan_pool
+    uv run python -m benchmarks.plan_pool --latencies 0.2,1,2 --concurrency 8 --pool-size 3 --json
+
+mode:
+- request-scoped: 以前の構成（リクエストのセッションで検索・生成待ち・保存。生成中も接続を保持）
+- short-lived:    現在の構成（ユーザー確認・検索・保存をそれぞれ短い作業単位で行う）
+
+DATABASE_URL の DB にベンチ用ユーザーを作成する（終了時に削除）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Any
+
+from fastapi import Depends, Request
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MODES = ("request-scoped", "short-lived")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class _SlowPlanGenerator:
+    """一定時間待ってから固定のプランを返す偽 LLM"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_week_plan(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        return {"week_plan": [{"day": "月曜", "advice": "ベンチ"}]}
+
+
+async def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    # 設定（プールサイズ）はインポート時に読まれるため、アプリのインポートはここで行う
+    from app.infrastructure.persistence.database import engine, get_db, session_scope
+    from app.infrastructure.persistence.models.user import User
+    from app.infrastructure.persistence.repositories.sleep_plan_cache_repository import (
+        SleepPlanCacheRepository,
+    )
+    from app.main import create_app
+    from app.presentation.api.plan import get_cache_repository, get_plan_generator
+    from app.presentation.dependencies.auth import (
+        ensure_current_user,
+        ensure_current_user_detached,
+        get_current_user_id,
+    )
+
+    web_app = create_app()
+
+    def _bench_user(request: Request) -> str:
+        return request.headers["X-Bench-User"]
+
+    def _request_scoped_repo(db: AsyncSession = Depends(get_db)) -> Any:
+        return SleepPlanCacheRepository(db)
+
+    pool_waits: list[float] = []
+
+    async def app(scope, receive, send):
+        """DbStatsMiddleware が scope["state"] に置いた DbStats からプール待ちを拾う"""
+        await web_app(scope, receive, send)
+        stats = scope.get("state", {}).get("db_stats")
+        if stats is not None and scope["path"].endswith("/settings"):
+            pool_waits.append(stats.pool_wait_seconds)
+
+    user_ids = [str(uuid.uuid4()) for _ in range(args.concurrency + 1)]
+    async with session_scope() as db:
+        for uid in user_ids:
+            db.add(User(id=uid, email=f"bench-{uid[:8]}@example.com", name="bench"))
+
+    web_app.dependency_overrides[get_current_user_id] = _bench_user
+    results = []
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench", timeout=120
+        ) as client:
+            for mode in MODES:
+                if mode == "request-scoped":
+                    web_app.dependency_overrides[get_cache_repository] = _request_scoped_repo
+                    web_app.dependency_overrides[ensure_current_user_detached] = ensure_current_user
+                else:
+                    web_app.dependency_overrides.pop(get_cache_repository, None)
+                    web_app.dependency_overrides.pop(ensure_current_user_detached, None)
+
+                for latency in args.latencies:
+                    web_app.dependency_overrides[get_plan_generator] = lambda latency=latency: (
+                        _SlowPlanGenerator(latency)
+                    )
+                    pool_waits.clear()
+
+                    async def plan(uid: str) -> int:
+                        res = await client.post(
+                            "/api/v1/sleep-plans?force=true",
+                            json={"calendar_events": [], "sleep_logs": [], "settings": {}},
+                            headers={"X-Bench-User": uid},
+                        )
+                        return res.status_code
+
+                    async def probe(delay: float) -> list[float]:
+                        await asyncio.sleep(delay)
+                        timings = []
+                        for _ in range(args.probes):
+                            t0 = time.perf_counter()
+                            res = await client.get(
+                                "/api/v1/settings", headers={"X-Bench-User": user_ids[-1]}
+                            )
+                            res.raise_for_status()
+                            timings.append(time.perf_counter() - t0)
+                        return timings
+
+                    statuses, timings = await asyncio.gather(
+                        asyncio.gather(*(plan(uid) for uid in user_ids[:-1])), probe(latency / 10)
+                    )
+                    results.append(
+                        {
+                            "mode": mode,
+                            "llm_latency_s": latency,
+                            "settings_p50_ms": round(statistics.median(timings) * 1000, 1),
+                            "settings_p95_ms": round(_percentile(timings, 95) * 1000, 1),
+                            "pool_wait_p95_ms": round(_percentile(pool_waits, 95) * 1000, 1),
+                            "plan_errors": sum(1 for s in statuses if s != 200),
+                        }
+                    )
+    finally:
+        web_app.dependency_overrides.clear()
+        async with session_scope() as db:
+            await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await engine.dispose()
+    return results
+
+
+def _print_table(rows: list[dict[str, Any]]) -> None:
+    keys = list(rows[0].keys())
+    widths = {k: max(len(k), *(len(str(r[k])) for r in rows)) for k in keys}
+    print("  ".join(k.ljust(widths[k]) for k in keys))
+    for r in rows:
+        print("  ".join(str(r[k]).ljust(widths[k]) for k in keys))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--latencies", default="0.2,0.5,1,2", help="偽 LLM の遅延（秒, カンマ区切り）"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="同時に流す POST /sleep-plans 数"
+    )
+    parser.add_argument("--probes", type=int, default=10, help="GET /settings の回数")
+    parser.add_argument("--pool-size", type=int, default=3, help="DATABASE_POOL_SIZE")
+    parser.add_argument("--max-overflow", type=int, default=0, help="DATABASE_MAX_OVERFLOW")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args(argv)
+    args.latencies = [float(x) for x in args.latencies.split(",")]
+
+    os.environ["DATABASE_POOL_SIZE"] = str(args.pool_size)
+    os.environ["DATABASE_MAX_OVERFLOW"] = str(args.max_overflow)
+    os.environ.setdefault("DEBUG", "false")
+
+    # ユースケースの [plan] ログ（stdout）が表・JSON に混ざらないよう stderr に逃がす
+    with contextlib.redirect_stdout(sys.stderr):
+        rows = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        _print_table(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,250 @@
+"""
+プランキャッシュ保存形式のベンチマーク
+plan_codec の各形式について、保存サイズ・エンコード/デコード時間・書き込み増幅を計測する。
+
+    uv run python -m benchmarks.plan_storage                 # 合成データで形式比較
+    uv run python -m benchmarks.plan_storage --json          # 機械可読な出力
+    uv run python -m benchmarks.plan_storage --train-dict plan.dict   # zstd 辞書を学習して保存
+    uv run python -m benchmarks.plan_storage --database-url postgresql://...  # 実 DB で行サイズ計測
+
+注意: PostgreSQL は 2KB を超える text を TOAST で自動圧縮（pglz）するため、
+平文（none）の実サイズは raw_bytes より小さくなる。--database-url で実測値を確認すること。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any
+
+import orjson
+
+from app.infrastructure.persistence import plan_codec
+
+_ADVICE_TEMPLATES = [
+    "明日は{event}があり重要度は高いです。{bed}には布団に入り、朝の移動時間に余裕を持ちましょう。",
+    "翌日は予定が少なく重要度は低めです。平日の睡眠不足を補うため、いつもより長めに眠りましょう。",
+    "明日の{event}に向けて重要度は普通です。寝る前のスマホは控え、{bed}の就寝を目指しましょう。",
+    "最近スコアが低い日が続いています。明日は{event}があるため重要度は高く、早めの就寝を心がけてください。",
+]
+_EVENTS = ["定例会議", "期末試験", "プレゼン発表", "歯医者", "アルバイト", "ゼミ", None]
+
+
+def sample_plan(seed: int, days: int = 7) -> str:
+    """LLM 出力に近い日本語の週間プラン JSON を生成する"""
+    rnd = random.Random(seed)
+    start = date(2026, 2, 20) + timedelta(days=seed % 30)
+    week = []
+    for i in range(days):
+        event = rnd.choice(_EVENTS)
+        bed = f"{rnd.choice([22, 23, 0]):02d}:{rnd.choice([0, 15, 30, 45]):02d}"
+        week.append(
+            {
+                "date": (start + timedelta(days=i)).isoformat(),
+                "recommended_bedtime": bed,
+                "recommended_wakeup": f"{rnd.choice([5, 6, 7, 8]):02d}:{rnd.choice([0, 30]):02d}",
+                "importance": rnd.choice(["high", "medium", "low"]),
+                "next_day_event": event,
+                "advice": rnd.choice(_ADVICE_TEMPLATES).format(event=event or "予定", bed=bed),
+            }
+        )
+    return orjson.dumps({"week_plan": week}).decode("utf-8")
+
+
+def _median_ns(fn: Any, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    return statistics.median(samples)
+
+
+def available_formats() -> dict[str, int]:
+    formats = {"none": plan_codec.FORMAT_TEXT, "zlib": plan_codec.FORMAT_ZLIB}
+    if plan_codec.zstandard is not None:
+        formats["zstd"] = plan_codec.FORMAT_ZSTD
+        if plan_codec.settings.PLAN_CACHE_ZSTD_DICT_PATH:
+            formats["zstd-dict"] = plan_codec.FORMAT_ZSTD_DICT
+    return formats
+
+
+def bench_codecs(samples: list[str], repeat: int) -> list[dict[str, Any]]:
+    """形式ごとのサイズ・時間を計測する（サンプル全体の中央値）"""
+    results = []
+    raw_sizes = [len(s.encode("utf-8")) for s in samples]
+    for name, fmt in available_formats().items():
+        encoded = [plan_codec.encode_plan(s, fmt) for s in samples]
+        stored = [
+            len(e.data) if e.data is not None else len((e.text or "").encode("utf-8"))
+            for e in encoded
+        ]
+        enc_ns = statistics.median(
+            _median_ns(lambda s=s, f=fmt: plan_codec.encode_plan(s, f), repeat) for s in samples
+        )
+        dec_ns = statistics.median(
+            _median_ns(lambda e=e: plan_codec.decode_plan(e.format, e.text, e.data), repeat)
+            for e in encoded
+        )
+        results.append(
+            {
+                "codec": name,
+                "plan_format": fmt,
+                "raw_bytes": statistics.median(raw_sizes),
+                "stored_bytes": statistics.median(stored),
+                "ratio": round(sum(stored) / sum(raw_sizes), 3),
+                "encode_ns": int(enc_ns),
+                "decode_ns": int(dec_ns),
+            }
+        )
+    return results
+
+
+def train_dict(path: str, n_samples: int, dict_size: int) -> None:
+    """合成プランから zstd 辞書を学習して保存する（本番では実データのサンプルで学習すること）"""
+    if plan_codec.zstandard is None:
+        raise SystemExit("zstandard が必要です: uv sync --extra zstd")
+    samples = [sample_plan(i).encode("utf-8") for i in range(n_samples)]
+    d = plan_codec.zstandard.train_dictionary(dict_size, samples)
+    with open(path, "wb") as f:
+        f.write(d.as_bytes())
+    print(f"wrote {path} ({len(d.as_bytes())} bytes, dict_id={d.dict_id()})", file=sys.stderr)
+
+
+async def bench_database(
+    database_url: str, samples: list[str], rounds: int
+) -> list[dict[str, Any]]:
+    """
+    実 DB で形式ごとに upsert を rounds 回繰り返し、列サイズと書き込み増幅を計測する。
+    書き込み増幅 = 1 回の再生成あたりの WAL 生成量（heap + TOAST + index の変更すべて）/ 平文 JSON のバイト数
+    （他の書き込みが無い DB で実行すること）
+    """
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.infrastructure.persistence.models.user import User
+
+    if database_url.startswith("postgresql://"):
+        database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    engine = create_async_engine(database_url)
+    results = []
+    raw = statistics.median(len(s.encode("utf-8")) for s in samples)
+    try:
+        for name, fmt in available_formats().items():
+            user_id = str(uuid.uuid4())
+            async with engine.begin() as conn:
+                await conn.execute(
+                    User.__table__.insert().values(
+                        id=user_id, email=f"bench-{user_id[:8]}@example.com", name="bench"
+                    )
+                )
+            async with engine.begin() as conn:
+                before = (await conn.execute(text("SELECT pg_current_wal_lsn()"))).scalar_one()
+            for i in range(rounds):
+                enc = plan_codec.encode_plan(samples[i % len(samples)], fmt)
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text(
+                            "INSERT INTO sleep_plan_cache "
+                            "(user_id, signature_hash, plan_format, plan_json, plan_data) "
+                            "VALUES (:u, :h, :f, :t, :d) ON CONFLICT (user_id) DO UPDATE SET "
+                            "signature_hash = EXCLUDED.signature_hash, plan_format = EXCLUDED.plan_format, "
+                            "plan_json = EXCLUDED.plan_json, plan_data = EXCLUDED.plan_data"
+                        ),
+                        {
+                            "u": user_id,
+                            "h": f"{i:064x}",
+                            "f": enc.format,
+                            "t": enc.text,
+                            "d": enc.data,
+                        },
+                    )
+            async with engine.begin() as conn:
+                wal_bytes = (
+                    await conn.execute(
+                        text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :before)"),
+                        {"before": before},
+                    )
+                ).scalar_one()
+                col = (
+                    await conn.execute(
+                        text(
+                            "SELECT coalesce(pg_column_size(plan_json), 0) + "
+                            "coalesce(pg_column_size(plan_data), 0) FROM sleep_plan_cache "
+                            "WHERE user_id = :u"
+                        ),
+                        {"u": user_id},
+                    )
+                ).scalar_one()
+                await conn.execute(User.__table__.delete().where(User.__table__.c.id == user_id))
+            per_write = float(wal_bytes) / rounds
+            results.append(
+                {
+                    "codec": name,
+                    "db_column_bytes": col,
+                    "wal_bytes_per_regeneration": int(per_write),
+                    "write_amplification": round(per_write / raw, 2),
+                }
+            )
+    finally:
+        await engine.dispose()
+    return results
+
+
+def _print_table(rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    keys = list(rows[0].keys())
+    widths = {k: max(len(k), *(len(str(r[k])) for r in rows)) for k in keys}
+    print("  ".join(k.ljust(widths[k]) for k in keys))
+    for r in rows:
+        print("  ".join(str(r[k]).ljust(widths[k]) for k in keys))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--samples", type=int, default=50, help="合成プランの件数")
+    parser.add_argument(
+        "--days", type=int, default=7, help="1 プランあたりの日数（多バリアント想定なら増やす）"
+    )
+    parser.add_argument("--repeat", type=int, default=200, help="1 サンプルあたりの計測回数")
+    parser.add_argument("--json", action="store_true", help="JSON で出力する")
+    parser.add_argument(
+        "--train-dict", metavar="PATH", help="zstd 辞書を学習して PATH に保存して終了"
+    )
+    parser.add_argument("--dict-size", type=int, default=16 * 1024)
+    parser.add_argument("--database-url", help="指定時は実 DB で行サイズと書き込み増幅も計測")
+    parser.add_argument("--rounds", type=int, default=200, help="DB 計測時の upsert 回数")
+    args = parser.parse_args(argv)
+
+    if args.train_dict:
+        train_dict(args.train_dict, max(args.samples, 200), args.dict_size)
+        return 0
+
+    samples = [sample_plan(i, args.days) for i in range(args.samples)]
+    report: dict[str, Any] = {"codecs": bench_codecs(samples, args.repeat)}
+    if args.database_url:
+        import asyncio
+
+        report["database"] = asyncio.run(bench_database(args.database_url, samples, args.rounds))
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_table(report["codecs"])
+        if "database" in report:
+            print()
+            _print_table(report["database"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
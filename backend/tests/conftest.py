@@ -10,13 +10,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 # 全モデルを Base.metadata に登録
 import app.infrastructure.persistence.models  # noqa: F401
+from app.infrastructure.cache import cache_registry
 from app.infrastructure.persistence.database import (
     AsyncSessionLocal,
     Base,
     engine,
 )
-from app.main import web_app as fastapi_app
+from app.infrastructure.persistence.statement_counter import StatementCounter, count_statements
+from app.main import create_app
 from app.presentation.dependencies.auth import get_current_user_id
+from benchmarks.fake_openrouter import FakeOpenRouter, serve_in_thread
+
+# テストで共有するアプリ（テスト用の別アプリは create_app() で作る）
+fastapi_app = create_app()
 
 # テスト用の固定 user_id（認証オーバーライドで使用）
 TEST_USER_ID = "11111111-1111-1111-1111-111111111111"
@@ -30,6 +36,13 @@ def _override_auth():
     fastapi_app.dependency_overrides.pop(get_current_user_id, None)
 
 
+@pytest.fixture(autouse=True)
+def _clear_local_caches():
+    """プロセス内キャッシュ（既知ユーザー・設定）をテストごとに空にする"""
+    cache_registry.set_connected(False)
+    yield
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """全テストで同じイベントループを共有（SQLAlchemyのDB接続と整合）"""
@@ -76,9 +89,36 @@ def unique_email() -> str:
     return f"test-{uuid.uuid4().hex[:8]}@example.com"
 
 
+@pytest.fixture
+def statement_counter() -> StatementCounter:
+    """
+    テスト中に実行された SQL を数える。counter.assert_at_most(n) で往復回数の回帰を検出する。
+    準備のリクエストを数えない場合は、計測するリクエストの直前に counter.reset() する。
+    """
+    with count_statements() as counter:
+        yield counter
+
+
 @pytest.fixture
 async def db_session() -> AsyncSession:
     """DB 接続を使う統合テスト用セッション（テスト終了後にロールバック）"""
     async with AsyncSessionLocal() as session:
         yield session
         await session.rollback()
+
+
+@pytest.fixture
+def fake_openrouter() -> FakeOpenRouter:
+    """
+    偽 OpenRouter（ASGI 直呼び）。OpenRouterClient(transport=fake_openrouter.transport) でつなぐ。
+    fake_openrouter.profile を書き換える場合は、新しい FakeOpenRouter(profile) を作ること。
+    """
+    return FakeOpenRouter()
+
+
+@pytest.fixture
+def fake_openrouter_server(fake_openrouter: FakeOpenRouter):
+    """偽 OpenRouter を uvicorn で起動し、base_url（…/api/v1）を返す（ストリーミングの実時間計測用）"""
+    pytest.importorskip("uvicorn")
+    with serve_in_thread(fake_openrouter) as base_url:
+        yield base_url
@@ -0,0 +1,292 @@
+"""
+プロセス内キャッシュ（LocalCache / CacheRegistry）と LISTEN/NOTIFY による無効化のテスト
+"""
+
+import asyncio
+import json
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.application.settings import GetSettingsUseCase
+from app.config import settings
+from app.infrastructure.cache import (
+    TOPIC_SETTINGS,
+    TOPIC_USER,
+    CacheRegistry,
+    InvalidationListener,
+    LocalCache,
+    invalidation,
+)
+from app.infrastructure.cache.invalidation import CHANNEL, listener_dsn
+from app.infrastructure.persistence.database import DbStats, current_db_stats, session_scope
+from app.infrastructure.persistence.models.sleep_settings import SleepSettings
+from app.infrastructure.persistence.repositories.user_repository import UserRepository
+from app.presentation.api.settings import _settings_cache
+from tests.conftest import TEST_USER_ID
+
+DSN = listener_dsn(settings.DATABASE_URL)
+
+
+async def _wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+async def _put_settings(client: AsyncClient, wake_up_hour: int) -> None:
+    res = await client.put(
+        "/api/v1/settings",
+        json={"wake_up_hour": wake_up_hour, "wake_up_minute": 0, "sleep_duration_hours": 8},
+    )
+    assert res.status_code == 200
+
+
+async def _rolled_back_update() -> None:
+    async with session_scope() as db:
+        row = await db.get(SleepSettings, TEST_USER_ID)
+        row.wake_up_hour = 4
+        await db.flush()
+        raise RuntimeError("rollback")
+
+
+class TestLocalCache:
+    def test_ttl_depends_on_bus_connection(self):
+        now = [0.0]
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=5, clock=lambda: now[0])
+        cache: LocalCache[int] = LocalCache("t", registry=registry)
+
+        cache.set("k", 1)
+        now[0] = 5
+        assert cache.get("k", None) is None  # 未接続は短い TTL
+
+        registry.set_connected(True)
+        cache.set("k", 1)
+        now[0] = 200
+        assert cache.get("k") == 1
+
+        registry.set_connected(False)  # 切断時は取りこぼしに備えて空にする
+        assert cache.get("k", None) is None
+
+    def test_caches_none_and_limits_entries(self):
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=300)
+        cache: LocalCache[int | None] = LocalCache("t", max_entries=2, registry=registry)
+        cache.set("a", None)
+        assert cache.get("a", "miss") is None
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert len(cache) == 2
+        assert cache.get("a", "miss") == "miss"
+
+    def test_user_topic_evicts_every_cache(self):
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=300)
+        a: LocalCache[int] = LocalCache("a", registry=registry)
+        b: LocalCache[int] = LocalCache("b", registry=registry)
+        a.set("u1", 1)
+        b.set("u1", 1)
+        b.set("u2", 2)
+        registry.evict("a", "u1")
+        assert a.get("u1", None) is None and b.get("u1") == 1
+        registry.evict(TOPIC_USER, "u1")
+        assert b.get("u1", None) is None and b.get("u2") == 2
+        registry.evict("b", "*")
+        assert len(b) == 0
+
+    def test_set_if_generation_skips_values_read_before_an_eviction(self):
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=300)
+        cache: LocalCache[int] = LocalCache("t", max_entries=2, registry=registry)
+        generation = cache.generation("k")
+        cache.evict("other")
+        assert cache.set_if_generation("k", generation, 1)  # 別の key の無効化は関係ない
+
+        generation = cache.generation("k")
+        cache.evict("k")  # 読んでいる間に書き込みが COMMIT した
+        assert not cache.set_if_generation("k", generation, 0)
+        assert cache.get("k", None) is None
+
+        generation = cache.generation("k")
+        cache.evict("*")
+        assert not cache.set_if_generation("k", generation, 0)
+
+        # 覚えきれずに忘れた無効化も「消されたかもしれない」とみなす
+        generation = cache.generation("k")
+        for key in ("k", "a", "b"):
+            cache.evict(key)
+        assert not cache.set_if_generation("k", generation, 0)
+        assert cache.set_if_generation("k", cache.generation("k"), 2)
+
+    def test_zero_fallback_ttl_disables_caching(self):
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=0)
+        cache: LocalCache[int] = LocalCache("t", registry=registry)
+        cache.set("k", 1)
+        assert len(cache) == 0
+
+
+class TestLocalInvalidation:
+    async def test_settings_cached_until_committed_write(self, client: AsyncClient):
+        await client.put(
+            "/api/v1/settings",
+            json={"wake_up_hour": 6, "wake_up_minute": 0, "sleep_duration_hours": 8},
+        )
+        assert (await client.get("/api/v1/settings")).json()["wake_up_hour"] == 6
+        assert _settings_cache.get(TEST_USER_ID) is not None
+
+        stats = DbStats()
+        token = current_db_stats.set(stats)
+        try:
+            res = await client.get("/api/v1/settings")
+        finally:
+            current_db_stats.reset(token)
+        assert res.json()["wake_up_hour"] == 6
+        assert stats.statements == 0  # ヒット時は DB を使わない
+
+        await client.put(
+            "/api/v1/settings",
+            json={"wake_up_hour": 5, "wake_up_minute": 0, "sleep_duration_hours": 8},
+        )
+        assert (await client.get("/api/v1/settings")).json()["wake_up_hour"] == 5
+
+    async def test_get_racing_a_put_does_not_cache_the_old_row(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        await _put_settings(client, 6)
+        _settings_cache.evict(TEST_USER_ID)
+        read_old_row = GetSettingsUseCase.execute
+
+        async def execute_then_put(self, user_id: str):
+            row = await read_old_row(self, user_id)
+            # GET が古い行を読んだあと、載せる前に PUT が COMMIT して無効化する
+            monkeypatch.setattr(GetSettingsUseCase, "execute", read_old_row)
+            await _put_settings(client, 5)
+            return row
+
+        monkeypatch.setattr(GetSettingsUseCase, "execute", execute_then_put)
+        assert (await client.get("/api/v1/settings")).json()["wake_up_hour"] == 6
+        assert _settings_cache.get(TEST_USER_ID, "miss") == "miss"
+        assert (await client.get("/api/v1/settings")).json()["wake_up_hour"] == 5
+
+    async def test_rolled_back_write_keeps_cache(self, client: AsyncClient):
+        await _put_settings(client, 6)
+        _settings_cache.set(TEST_USER_ID, None)
+        with pytest.raises(RuntimeError):
+            await _rolled_back_update()
+        assert _settings_cache.get(TEST_USER_ID, "miss") is None
+
+    async def test_known_user_skips_select(self):
+        async with session_scope() as db:
+            await UserRepository(db).ensure_user_exists(TEST_USER_ID)
+        stats = DbStats()
+        token = current_db_stats.set(stats)
+        try:
+            async with session_scope() as db:
+                await UserRepository(db).ensure_user_exists(TEST_USER_ID)
+        finally:
+            current_db_stats.reset(token)
+        assert stats.statements == 0
+
+
+@pytest.fixture
+async def notifications():
+    """CHANNEL を LISTEN する別接続（他ワーカー相当）。受け取った payload のリストを返す"""
+    try:
+        conn = await asyncpg.connect(DSN)
+    except Exception as e:
+        pytest.skip(f"database unavailable: {e}")
+    received: list[dict] = []
+    await conn.add_listener(CHANNEL, lambda *args: received.append(json.loads(args[3])))
+    try:
+        yield received
+    finally:
+        await conn.close()
+
+
+class TestNotify:
+    @pytest.fixture(autouse=True)
+    def _enable_publisher(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(invalidation.publisher, "enabled", True)
+
+    async def test_committed_write_notifies(self, client: AsyncClient, notifications):
+        res = await client.put(
+            "/api/v1/settings",
+            json={"wake_up_hour": 7, "wake_up_minute": 0, "sleep_duration_hours": 8},
+        )
+        assert res.status_code == 200
+        await _wait_for(lambda: notifications)
+        assert [TOPIC_SETTINGS, TEST_USER_ID] in notifications[0]["k"]
+        assert notifications[0]["o"] == invalidation.ORIGIN_ID
+
+    async def test_rolled_back_write_does_not_notify(self, client: AsyncClient):
+        await _put_settings(client, 6)
+        conn = await asyncpg.connect(DSN)
+        notifications: list[str] = []
+        await conn.add_listener(CHANNEL, lambda *args: notifications.append(args[3]))
+        try:
+            with pytest.raises(RuntimeError):
+                await _rolled_back_update()
+            async with session_scope() as db:
+                await db.get(SleepSettings, TEST_USER_ID)  # 読み取りだけのセッションも通知しない
+            await asyncio.sleep(0.2)
+        finally:
+            await conn.close()
+        assert notifications == []
+
+
+class TestInvalidationListener:
+    async def test_evicts_on_foreign_notify_and_reconnects(self):
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=5)
+        cache: LocalCache[int] = LocalCache(TOPIC_SETTINGS, registry=registry)
+        listener = InvalidationListener(DSN, registry, min_backoff=0.05, max_backoff=0.1)
+        listener.start()
+        try:
+            await _wait_for(lambda: listener.connected)
+            assert registry.ttl_seconds == 300
+
+            cache.set("u1", 1)
+            cache.set("u2", 2)
+            conn = await asyncpg.connect(DSN)
+            try:
+                payload = json.dumps({"o": "other-worker", "k": [[TOPIC_SETTINGS, "u1"]]})
+                await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+                await _wait_for(lambda: cache.get("u1", None) is None)
+                assert cache.get("u2") == 2
+
+                # 自プロセス発の通知は読み飛ばす
+                own = json.dumps({"o": invalidation.ORIGIN_ID, "k": [[TOPIC_SETTINGS, "u2"]]})
+                await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, own)
+                await asyncio.sleep(0.1)
+                assert cache.get("u2") == 2
+
+                # 接続を切られたら短い TTL に落とし、再接続する
+                await conn.execute(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE pid <> pg_backend_pid() AND query LIKE 'LISTEN%'"
+                )
+                await _wait_for(lambda: listener.connects >= 2)
+                assert listener.connected
+            finally:
+                await conn.close()
+        finally:
+            await listener.stop()
+        assert not registry.connected
+
+    async def test_unreachable_database_falls_back_to_ttl(self):
+        registry = CacheRegistry(ttl_seconds=300, fallback_ttl_seconds=5)
+        attempts = []
+
+        async def failing_connect(dsn: str):
+            attempts.append(dsn)
+            raise OSError("connection refused")
+
+        listener = InvalidationListener(
+            DSN, registry, min_backoff=0.01, max_backoff=0.02, connect=failing_connect
+        )
+        listener.start()
+        try:
+            await _wait_for(lambda: len(attempts) >= 3)
+            assert not listener.connected
+            assert registry.ttl_seconds == 5
+        finally:
+            await listener.stop()
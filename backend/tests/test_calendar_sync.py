@@ -0,0 +1,141 @@
+"""
+カレンダー予定の差分同期のテスト
+ダイジェストの差分更新（update_calendar_digest）・同期 API（全件 / 差分 / トークン不一致）・
+calendar_digest を使うプラン取得（実 DB）を検証する。
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+
+from app.application.plan import GetOrCreatePlanInput
+from app.application.plan.precompute import apply_events
+from app.domain.calendar.value_objects import (
+    EMPTY_CALENDAR_DIGEST,
+    calendar_event_hash,
+    update_calendar_digest,
+)
+from app.domain.events import CalendarSynced
+from app.presentation.api.plan import get_plan_generator
+from app.presentation.dependencies.auth import get_current_user_id
+from tests.conftest import fastapi_app as app
+
+TODAY = "2026-03-02"
+
+MEETING = {
+    "id": "ev-1",
+    "title": "会議",
+    "start": "2026-03-03T10:00:00+09:00",
+    "end": "2026-03-03T11:00:00+09:00",
+    "all_day": False,
+}
+EXAM = {"id": "ev-2", "title": "試験", "start": "2026-03-05", "end": "2026-03-06", "all_day": True}
+
+
+def _body(event: dict) -> dict:
+    return {k: v for k, v in event.items() if k != "id"}
+
+
+class TestCalendarDigest:
+    def test_digest_is_order_independent_and_incremental(self):
+        a = calendar_event_hash("ev-1", _body(MEETING))
+        b = calendar_event_hash("ev-2", _body(EXAM))
+        both = update_calendar_digest(EMPTY_CALENDAR_DIGEST, added=[a, b])
+        assert both == update_calendar_digest(EMPTY_CALENDAR_DIGEST, added=[b, a])
+        assert update_calendar_digest(both, removed=[b]) == update_calendar_digest(
+            EMPTY_CALENDAR_DIGEST, added=[a]
+        )
+        assert update_calendar_digest(both, removed=[a, b]) == EMPTY_CALENDAR_DIGEST
+
+    def test_calendar_synced_switches_precompute_input_to_digest(self):
+        base = GetOrCreatePlanInput("user-001", [_body(MEETING)], [], {}, TODAY)
+        applied = apply_events(base, [CalendarSynced("user-001", "d" * 64)], TODAY)
+        assert applied.calendar_events == []
+        assert applied.calendar_digest == "d" * 64
+
+
+class TestCalendarSyncAPI:
+    @pytest.fixture
+    async def user_id(self, client: AsyncClient, unique_email: str) -> str:
+        res = await client.post("/api/v1/users", json={"email": unique_email, "name": "Cal"})
+        user_id = res.json()["id"]
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+        return user_id
+
+    async def test_delta_sync_matches_full_sync(self, client: AsyncClient, user_id: str):
+        full = await client.post("/api/v1/calendar/sync", json={"upserted": [MEETING]})
+        assert full.status_code == 200
+        first = full.json()
+        assert first["event_count"] == 1
+
+        moved = {**MEETING, "start": "2026-03-03T13:00:00+09:00"}
+        delta = await client.post(
+            "/api/v1/calendar/sync",
+            json={"sync_token": first["sync_token"], "upserted": [moved, EXAM], "deleted": []},
+        )
+        assert delta.status_code == 200
+        second = delta.json()
+        assert second["sync_token"] != first["sync_token"]
+        assert second["event_count"] == 2
+
+        removed = await client.post(
+            "/api/v1/calendar/sync",
+            json={"sync_token": second["sync_token"], "deleted": ["ev-2", "unknown"]},
+        )
+        third = removed.json()
+        assert third["event_count"] == 1
+
+        # 同じ予定を全件同期し直しても同じダイジェストになる
+        resync = await client.post("/api/v1/calendar/sync", json={"upserted": [moved]})
+        assert resync.json()["calendar_digest"] == third["calendar_digest"]
+
+    async def test_stale_token_is_conflict(self, client: AsyncClient, user_id: str):
+        first = (await client.post("/api/v1/calendar/sync", json={"upserted": [MEETING]})).json()
+        await client.post(
+            "/api/v1/calendar/sync", json={"sync_token": first["sync_token"], "upserted": [EXAM]}
+        )
+        stale = await client.post(
+            "/api/v1/calendar/sync", json={"sync_token": first["sync_token"], "deleted": ["ev-1"]}
+        )
+        assert stale.status_code == 409
+
+    async def test_unknown_token_before_first_sync_is_conflict(
+        self, client: AsyncClient, user_id: str
+    ):
+        res = await client.post("/api/v1/calendar/sync", json={"sync_token": "3", "upserted": []})
+        assert res.status_code == 409
+
+
+class TestPlanWithCalendarDigest:
+    @pytest.fixture
+    def generator(self):
+        mock = AsyncMock()
+        mock.generate_week_plan = AsyncMock(return_value={"week_plan": [{"advice": "テスト"}]})
+        app.dependency_overrides[get_plan_generator] = lambda: mock
+        yield mock
+        app.dependency_overrides.pop(get_plan_generator, None)
+
+    async def test_plan_uses_synced_events(self, client: AsyncClient, unique_email: str, generator):
+        res = await client.post("/api/v1/users", json={"email": unique_email, "name": "CalPlan"})
+        user_id = res.json()["id"]
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+        synced = (
+            await client.post("/api/v1/calendar/sync", json={"upserted": [EXAM, MEETING]})
+        ).json()
+
+        body = {"calendar_digest": synced["calendar_digest"], "today_date": TODAY}
+        first = await client.post("/api/v1/sleep-plans", json=body)
+        assert first.status_code == 200
+        assert first.headers["x-plan-cache"] == "miss"
+        events = generator.generate_week_plan.call_args[0][0]
+        assert events == [_body(MEETING), _body(EXAM)]
+
+        second = await client.post("/api/v1/sleep-plans", json=body)
+        assert second.headers["x-plan-cache"] == "hit"
+        assert generator.generate_week_plan.await_count == 1
+
+        stale = await client.post(
+            "/api/v1/sleep-plans", json={"calendar_digest": "0" * 64, "today_date": TODAY}
+        )
+        assert stale.status_code == 409
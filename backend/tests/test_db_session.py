@@ -0,0 +1,102 @@
+"""
+get_db のセッション管理（遅延接続・書き込みが無ければ COMMIT しない・DbStats の集計）のテスト
+"""
+
+import logging
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, text
+
+from app.infrastructure.persistence.database import (
+    DbStats,
+    current_db_stats,
+    engine,
+    get_db,
+)
+from app.infrastructure.persistence.models.user import User
+
+
+@pytest.fixture
+def stats():
+    """リクエスト単位の DbStats を設定する（DbStatsMiddleware 相当）"""
+    s = DbStats()
+    token = current_db_stats.set(s)
+    yield s
+    current_db_stats.reset(token)
+
+
+async def _run_get_db(body) -> None:
+    """get_db を Dependency と同じ手順で開いて閉じる"""
+    gen = get_db()
+    session = await gen.__anext__()
+    await body(session)
+    with pytest.raises(StopAsyncIteration):
+        await gen.__anext__()
+
+
+class TestGetDb:
+    async def test_no_statement_does_not_checkout_connection(self, stats: DbStats):
+        checked_out = engine.pool.checkedout()
+
+        async def body(session):
+            assert engine.pool.checkedout() == checked_out
+
+        await _run_get_db(body)
+        assert stats == DbStats()
+
+    async def test_read_only_session_skips_commit(self, stats: DbStats):
+        async def body(session):
+            await session.execute(text("SELECT 1"))
+            await session.execute(select(User).limit(1))
+
+        await _run_get_db(body)
+        assert stats.statements == 2
+        assert stats.connections == 1
+        assert stats.commits == 0
+        assert stats.connection_hold_seconds > 0
+
+    async def test_write_session_commits(self, stats: DbStats):
+        uid = str(uuid.uuid4())
+
+        async def body(session):
+            session.add(User(id=uid, email=f"dbstats-{uid[:8]}@example.com", name="DbStats"))
+
+        await _run_get_db(body)
+        assert stats.commits == 1
+        assert stats.statements >= 1
+
+        async def check(session):
+            assert await session.get(User, uid) is not None
+
+        await _run_get_db(check)
+        assert stats.commits == 1
+
+    async def test_textual_write_commits(self, stats: DbStats):
+        async def body(session):
+            await session.execute(text("UPDATE users SET name = name WHERE false"))
+
+        await _run_get_db(body)
+        assert stats.commits == 1
+
+
+class TestDbStatsMiddleware:
+    async def test_logs_request_db_stats(
+        self, client: AsyncClient, caplog: pytest.LogCaptureFixture
+    ):
+        with caplog.at_level(logging.DEBUG, logger="app.presentation.middleware.db_stats"):
+            res = await client.get("/api/v1/settings")
+        assert res.status_code == 200
+        records = [r.getMessage() for r in caplog.records if "/api/v1/settings" in r.getMessage()]
+        assert len(records) == 1
+        assert "statements=1 " in records[0]
+        assert "commits=0" in records[0]
+
+    async def test_no_log_without_db_access(
+        self, client: AsyncClient, caplog: pytest.LogCaptureFixture
+    ):
+        with caplog.at_level(logging.DEBUG, logger="app.presentation.middleware.db_stats"):
+            res = await client.get("/api/v1/health")
+        assert res.status_code == 200
+        assert not [r for r in caplog.records if r.name == "app.presentation.middleware.db_stats"]
@@ -0,0 +1,218 @@
+"""
+偽 OpenRouter サーバー（benchmarks.fake_openrouter）と OpenRouterClient の結合テスト
+"""
+
+import json
+import random
+import time
+
+import httpx
+import pytest
+
+from app.infrastructure.llm.openrouter_client import OpenRouterClient, repair_max_tokens_for
+from app.infrastructure.llm.week_plan_output import IncompleteWeekPlanError, WeekPlanOutputMetrics
+from benchmarks.fake_openrouter import FakeOpenRouter, FakeProfile, parse_latency
+
+MESSAGES = [
+    {"role": "system", "content": "あなたは睡眠アドバイザーです。"},
+    {"role": "user", "content": "今日の日付は 2026-03-02 です。"},
+]
+
+
+def _client(fake: FakeOpenRouter, metrics: WeekPlanOutputMetrics | None = None) -> OpenRouterClient:
+    return OpenRouterClient(
+        api_key="fake",
+        base_url="http://fake/api/v1",
+        model="fake/model",
+        transport=fake.transport,
+        metrics=metrics or WeekPlanOutputMetrics(),
+    )
+
+
+def _sse_events(body: str) -> list[dict]:
+    return [
+        json.loads(line[len("data: ") :])
+        for line in body.splitlines()
+        if line.startswith("data: ") and line != "data: [DONE]"
+    ]
+
+
+class TestFakeOpenRouterWithClient:
+    async def test_generate_week_plan_is_deterministic(self, fake_openrouter: FakeOpenRouter):
+        client = _client(fake_openrouter)
+        first = await client.generate_week_plan([], [], {}, today_date="2026-03-02")
+        second = await client.generate_week_plan([], [], {}, today_date="2026-03-02")
+        assert first == second
+        assert [d["date"] for d in first["week_plan"]][:2] == ["2026-03-02", "2026-03-03"]
+        assert fake_openrouter.requests[0]["model"] == "fake/model"
+
+    async def test_week_plan_requests_json_schema_stream(self, fake_openrouter: FakeOpenRouter):
+        metrics = WeekPlanOutputMetrics()
+        result = await _client(fake_openrouter, metrics).generate_week_plan(
+            [], [], {}, today_date="2026-03-02"
+        )
+        assert len(result["week_plan"]) == 7
+        body = fake_openrouter.requests[0]
+        assert body["stream"] is True
+        assert body["response_format"]["type"] == "json_schema"
+        assert metrics.complete == 1 and metrics.repair_calls == 0
+
+    @pytest.mark.parametrize("outcome", ["truncated", "invalid", "fenced"])
+    async def test_week_plan_repairs_only_missing_days(self, outcome: str):
+        fake = FakeOpenRouter(FakeProfile(script=[outcome, "ok"]))
+        metrics = WeekPlanOutputMetrics()
+        result = await _client(fake, metrics).generate_week_plan(
+            [], [], {}, today_date="2026-03-02"
+        )
+
+        dates = [d["date"] for d in result["week_plan"]]
+        assert dates == [f"2026-03-0{i}" for i in range(2, 9)]
+        if outcome == "fenced":
+            assert len(fake.requests) == 1 and metrics.complete == 1
+            return
+        # 2 回目は不足日だけを要求する（1 回目で届いた日は再要求しない）
+        assert len(fake.requests) == 2
+        repair_prompt = fake.requests[1]["messages"][-1]["content"]
+        kept = json.loads(fake.requests[1]["messages"][-2]["content"])["week_plan"]
+        for day in kept:
+            assert day["date"] not in repair_prompt
+        assert metrics.repair_calls == 1 and metrics.repaired == 1
+        assert metrics.truncated == 1
+        if outcome == "truncated":
+            assert kept
+
+    async def test_generate_days_returns_only_requested_dates(self, fake_openrouter):
+        client = _client(fake_openrouter)
+        week = await client.generate_week_plan([], [], {}, today_date="2026-03-02")
+        context = week["week_plan"][1:]
+
+        days = await client.generate_days(
+            [], [], {}, "2026-03-03", dates=["2026-03-09"], context_days=context
+        )
+
+        assert [d["date"] for d in days] == ["2026-03-09"]
+        messages = fake_openrouter.requests[1]["messages"]
+        # system プレフィックスは週全体の生成と共通で、文脈の日と対象日は user メッセージの末尾
+        assert messages[0] == fake_openrouter.requests[0]["messages"][0]
+        assert "不足している日付: 2026-03-09" in messages[-1]["content"]
+        assert context[0]["advice"] in messages[-1]["content"]
+
+    async def test_length_truncation_repairs_with_a_larger_budget(self):
+        fake = FakeOpenRouter(FakeProfile(script=["length", "ok"]))
+        metrics = WeekPlanOutputMetrics()
+        result = await _client(fake, metrics).generate_week_plan(
+            [], [], {}, today_date="2026-03-02"
+        )
+
+        assert len(result["week_plan"]) == 7
+        kept = json.loads(fake.requests[1]["messages"][-2]["content"])["week_plan"]
+        assert 0 < len(kept) < 7
+        first, repair = (r["max_tokens"] for r in fake.requests)
+        assert repair == repair_max_tokens_for(first, len(kept), 7 - len(kept))
+        assert repair > first
+        assert metrics.truncated == 1 and metrics.length_truncated == 1
+        assert metrics.repaired == 1
+
+    @pytest.mark.parametrize(
+        ("done", "missing", "expected"),
+        [(4, 3, 1024), (2, 5, 3072), (0, 7, 2048), (1, 6, 4096)],
+    )
+    def test_repair_budget(self, done: int, missing: int, expected: int):
+        assert repair_max_tokens_for(1024, done, missing) == expected
+
+    async def test_week_plan_fails_without_caching_when_repair_fails(self):
+        fake = FakeOpenRouter(FakeProfile(script=["invalid", "truncated"]))
+        metrics = WeekPlanOutputMetrics()
+        with pytest.raises(IncompleteWeekPlanError) as e:
+            await _client(fake, metrics).generate_week_plan([], [], {}, today_date="2026-03-02")
+        assert e.value.missing
+        assert metrics.failed == 1
+
+    async def test_fenced_response_is_parsed(self):
+        fake = FakeOpenRouter(FakeProfile(script=["fenced", "ok"]))
+        client = _client(fake)
+        fenced = await client.chat_json(MESSAGES)
+        assert fenced == await client.chat_json(MESSAGES)
+        assert fenced["week_plan"][0]["date"] == "2026-03-02"
+
+    async def test_error_injection(self):
+        fake = FakeOpenRouter(FakeProfile(script=["429", "503"], retry_after=7))
+        client = _client(fake)
+        with pytest.raises(httpx.HTTPStatusError) as e:
+            await client.chat(MESSAGES)
+        assert e.value.response.status_code == 429
+        assert e.value.response.headers["Retry-After"] == "7"
+        with pytest.raises(httpx.HTTPStatusError) as e:
+            await client.chat(MESSAGES)
+        assert e.value.response.status_code == 503
+
+    @pytest.mark.parametrize("outcome", ["truncated", "invalid"])
+    async def test_broken_json_raises(self, outcome: str):
+        fake = FakeOpenRouter(FakeProfile(script=[outcome]))
+        with pytest.raises(ValueError):
+            await _client(fake).chat_json(MESSAGES)
+
+    async def test_empty_choices_raises(self):
+        fake = FakeOpenRouter(FakeProfile(script=["empty"]))
+        with pytest.raises(ValueError, match="空の応答"):
+            await _client(fake).chat(MESSAGES)
+
+
+class TestFakeOpenRouterProtocol:
+    async def _post(self, fake: FakeOpenRouter, **body) -> httpx.Response:
+        async with httpx.AsyncClient(transport=fake.transport, base_url="http://fake") as c:
+            return await c.post(
+                "/api/v1/chat/completions", json={"model": "m", "messages": MESSAGES, **body}
+            )
+
+    async def test_usage_reports_cached_system_prompt(self):
+        fake = FakeOpenRouter()
+        first = (await self._post(fake)).json()["usage"]
+        second = (await self._post(fake)).json()["usage"]
+        assert first["total_tokens"] == first["prompt_tokens"] + first["completion_tokens"]
+        assert first["prompt_tokens_details"]["cached_tokens"] == 0
+        assert second["prompt_tokens_details"]["cached_tokens"] > 0
+
+    async def test_streaming_sse(self):
+        fake = FakeOpenRouter()
+        res = await self._post(fake, stream=True)
+        assert res.headers["content-type"].startswith("text/event-stream")
+        assert res.text.rstrip().endswith("data: [DONE]")
+        events = _sse_events(res.text)
+        content = "".join(e["choices"][0]["delta"].get("content", "") for e in events)
+        assert json.loads(content)["week_plan"]
+        assert events[-1]["choices"][0]["finish_reason"] == "stop"
+        assert events[-1]["usage"]["completion_tokens"] > 0
+
+    async def test_truncated_stream_has_no_done(self):
+        fake = FakeOpenRouter(FakeProfile(script=["truncated"]))
+        res = await self._post(fake, stream=True)
+        assert "[DONE]" not in res.text
+        content = "".join(
+            e["choices"][0]["delta"].get("content", "") for e in _sse_events(res.text)
+        )
+        with pytest.raises(ValueError):
+            json.loads(content)
+
+    async def test_latency_and_token_rate(self):
+        fake = FakeOpenRouter(FakeProfile(latency="fixed:0.05", tokens_per_second=10_000))
+        t0 = time.perf_counter()
+        res = await self._post(fake)
+        elapsed = time.perf_counter() - t0
+        expected = 0.05 + res.json()["usage"]["completion_tokens"] / 10_000
+        assert elapsed >= expected * 0.9
+
+    def test_parse_latency(self):
+        rnd = random.Random(0)
+        assert parse_latency("0.3")(rnd) == 0.3
+        assert 0.2 <= parse_latency("uniform:0.2,0.4")(rnd) <= 0.4
+        assert parse_latency("lognormal:0.5,0.3")(rnd) > 0
+        with pytest.raises(ValueError):
+            parse_latency("gamma:1")
+
+
+class TestFakeOpenRouterServer:
+    async def test_client_over_real_socket(self, fake_openrouter_server: str):
+        client = OpenRouterClient(api_key="fake", base_url=fake_openrouter_server)
+        result = await client.generate_week_plan([], [], {}, today_date="2026-03-02")
+        assert len(result["week_plan"]) == 7
@@ -0,0 +1,65 @@
+"""
+プラン生成のリース（IGenerationLease）のテスト。PostgresGenerationLease は実 DB を使う。
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from app.infrastructure.persistence.database import session_scope
+from app.infrastructure.singleflight import InMemoryGenerationLease, PostgresGenerationLease
+
+
+class TestInMemoryGenerationLease:
+    async def test_exclusive_until_released_or_expired(self):
+        now = [0.0]
+        lease = InMemoryGenerationLease(clock=lambda: now[0])
+
+        token = await lease.try_acquire("k", ttl_seconds=10)
+        assert token is not None
+        assert await lease.try_acquire("k", ttl_seconds=10) is None
+        assert await lease.is_held("k")
+
+        await lease.release("k", "someone-else")
+        assert await lease.is_held("k")
+        await lease.release("k", token)
+        assert not await lease.is_held("k")
+
+        await lease.try_acquire("k", ttl_seconds=10)
+        now[0] += 10
+        assert await lease.try_acquire("k", ttl_seconds=10) is not None
+
+
+class TestPostgresGenerationLease:
+    @pytest.fixture
+    def lease(self) -> PostgresGenerationLease:
+        return PostgresGenerationLease(session_scope)
+
+    async def test_acquire_release(self, lease: PostgresGenerationLease):
+        key = f"test:{uuid.uuid4()}"
+        token = await lease.try_acquire(key, ttl_seconds=30)
+        assert token is not None
+        assert await lease.try_acquire(key, ttl_seconds=30) is None
+        assert await lease.is_held(key)
+
+        await lease.release(key, "stale-token")
+        assert await lease.is_held(key)
+        await lease.release(key, token)
+        assert not await lease.is_held(key)
+
+    async def test_expired_lease_can_be_taken_over(self, lease: PostgresGenerationLease):
+        key = f"test:{uuid.uuid4()}"
+        first = await lease.try_acquire(key, ttl_seconds=0.05)
+        await asyncio.sleep(0.1)
+        assert not await lease.is_held(key)
+        second = await lease.try_acquire(key, ttl_seconds=30)
+        assert second is not None and second != first
+        # 失効後に元の保持者が解放しても、奪った側のリースは残る
+        await lease.release(key, first)
+        assert await lease.is_held(key)
+
+    async def test_concurrent_acquires_have_one_winner(self, lease: PostgresGenerationLease):
+        key = f"test:{uuid.uuid4()}"
+        tokens = await asyncio.gather(*(lease.try_acquire(key, ttl_seconds=30) for _ in range(6)))
+        assert sum(t is not None for t in tokens) == 1
@@ -0,0 +1,45 @@
+"""
+LLM 応答のフェンス除去・パースと、マイクロベンチマーク（benchmarks.hotpath）の入力生成・計測のテスト
+"""
+
+import pytest
+
+from app.domain.plan.value_objects import build_signature_hash
+from app.infrastructure.llm.openrouter_client import _parse_json_content
+from benchmarks.hotpath import calendar_events, llm_content, measure, sleep_logs
+
+
+class TestParseJsonContent:
+    def test_plain_json(self):
+        assert _parse_json_content('{"week_plan": []}') == {"week_plan": []}
+
+    def test_strips_code_fence(self):
+        assert _parse_json_content('```json\n{"week_plan": [1]}\n```') == {"week_plan": [1]}
+        assert _parse_json_content("```\n[1, 2]\n```") == [1, 2]
+
+    def test_invalid_json_raises(self):
+        with pytest.raises(ValueError):
+            _parse_json_content("```json\nnot json\n```")
+
+    def test_fenced_and_plain_content_parse_the_same(self):
+        assert _parse_json_content(llm_content(7, fenced=True)) == _parse_json_content(
+            llm_content(7, fenced=False)
+        )
+
+
+class TestHotpathBenchmark:
+    def test_generators_are_deterministic_and_order_independent(self):
+        events = calendar_events(50)
+        assert len(events) == 50
+        assert events == calendar_events(50)
+        logs = sleep_logs(7)
+        settings = {"wake_up_time": "07:00"}
+        assert build_signature_hash(events, logs, settings) == build_signature_hash(
+            list(reversed(events)), logs, settings
+        )
+
+    def test_measure_reports_time_and_allocations(self):
+        result = measure(lambda: [0] * 1000, min_time=0.01, repeat=2)
+        assert result["ns_per_call"] > 0
+        assert result["ns_median"] >= result["ns_per_call"]
+        assert result["alloc_peak_bytes"] >= 8000
@@ -0,0 +1,81 @@
+"""
+負荷試験ハーネス（benchmarks.loadtest）の集計・比較と、ASGI アプリに対する小さな実行のテスト
+"""
+
+import random
+
+from httpx import AsyncClient
+
+from benchmarks.loadtest.report import compare, percentile, summarize
+from benchmarks.loadtest.runner import Sample, run_load
+from benchmarks.loadtest.scenario import VirtualUser, default_mix, parse_mix
+from tests.conftest import TEST_USER_ID
+
+
+def _samples(latency: float, n: int = 200, cache: str = "hit") -> list[Sample]:
+    return [
+        Sample("GET /settings", 200, latency, True),
+        *(Sample("POST /sleep-plans", 200, latency, True, plan_cache=cache) for _ in range(n)),
+    ]
+
+
+class TestReport:
+    def test_percentile_nearest_rank(self):
+        values = [i / 100 for i in range(1, 101)]
+        assert percentile(values, 50) == 0.5
+        assert percentile(values, 99) == 0.99
+        assert percentile([], 95) == 0.0
+
+    def test_summarize_counts_errors_and_cache_hits(self):
+        samples = _samples(0.01, n=3) + [
+            Sample("POST /sleep-plans", 200, 0.5, True, plan_cache="miss"),
+            Sample("GET /settings", 500, 0.02, False, pool_wait_seconds=0.004),
+        ]
+        report = summarize(samples, elapsed_seconds=2.0)
+        assert report["requests"] == 6
+        assert report["rps"] == 3.0
+        assert report["errors"] == 1
+        assert report["plan_cache"] == {"hit": 3, "miss": 1}
+        assert report["plan_cache_hit_ratio"] == 0.75
+        assert report["pool_wait_ms"]["p95"] == 4.0
+        assert report["operations"]["POST /sleep-plans"]["requests"] == 4
+
+    def test_compare_flags_latency_regression_only(self):
+        baseline = summarize(_samples(0.02), 1.0)
+        assert compare(summarize(_samples(0.021), 1.0), baseline) == []
+
+        problems = compare(summarize(_samples(0.05), 1.0), baseline)
+        assert any(p.startswith("latency p95") for p in problems)
+        assert any(p.startswith("POST /sleep-plans p95") for p in problems)
+        # 件数の少ない操作は比較しない
+        assert not any(p.startswith("GET /settings") for p in problems)
+
+    def test_compare_flags_hit_ratio_drop(self):
+        baseline = summarize(_samples(0.02), 1.0)
+        problems = compare(summarize(_samples(0.02, cache="miss"), 1.0), baseline)
+        assert any(p.startswith("plan_cache_hit_ratio") for p in problems)
+
+
+class TestScenario:
+    def test_parse_mix_overrides_weights(self):
+        ops = parse_mix("GET /health=1,POST /sleep-plans=3", plan_miss_ratio=0)
+        assert [(op.name, op.weight) for op in ops] == [
+            ("POST /sleep-plans", 3.0),
+            ("GET /health", 1.0),
+        ]
+
+    def test_plan_variant_changes_only_on_miss(self):
+        plan = next(op for op in default_mix(plan_miss_ratio=0) if op.name == "POST /sleep-plans")
+        user = VirtualUser(user_id="u", headers={})
+        rnd = random.Random(0)
+        assert plan.build(user, rnd).json == plan.build(user, rnd).json
+
+
+class TestRunLoad:
+    async def test_runs_against_asgi_app(self, client: AsyncClient):
+        ops = parse_mix("GET /health=1,GET /settings=1", plan_miss_ratio=0)
+        users = [VirtualUser(user_id=TEST_USER_ID, headers={})]
+        samples, elapsed = await run_load(client, ops, users, concurrency=4, total_requests=20)
+        assert len(samples) == 20
+        assert all(s.ok for s in samples), [s.status for s in samples]
+        assert elapsed > 0
@@ -0,0 +1,239 @@
+"""
+入力の複雑さによるモデルの振り分け（model_router）のテスト
+"""
+
+import httpx
+import pytest
+
+from app.application.plan.ports import PlanGeneratorUnavailableError
+from app.infrastructure.llm.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    is_outage,
+)
+from app.infrastructure.llm.model_router import (
+    ModelRoutingPlanGenerator,
+    ModelTier,
+    PlanModelMetrics,
+    parse_model_tiers,
+    score_plan_input,
+    select_tier,
+)
+from app.infrastructure.llm.openrouter_client import OpenRouterClient
+from app.infrastructure.llm.week_plan_output import IncompleteWeekPlanError, WeekPlanOutputMetrics
+from benchmarks.fake_openrouter import FakeOpenRouter, FakeProfile
+from benchmarks.hotpath import calendar_events
+
+TODAY = "2026-03-02"
+
+
+def _event(start: str, end: str, title: str = "会議") -> dict:
+    return {"title": title, "start": start, "end": end}
+
+
+class TestScorePlanInput:
+    def test_empty_week_scores_zero(self):
+        complexity = score_plan_input([], [], {"wake_up_time": "07:00"}, TODAY)
+        assert complexity.score == 0
+
+    def test_counts_conflicts_early_events_and_override(self):
+        events = [
+            # JST 10:00-11:00 と 10:30-12:00 が重なる
+            _event("2026-03-03T01:00:00.000Z", "2026-03-03T02:00:00.000Z"),
+            _event("2026-03-03T01:30:00.000Z", "2026-03-03T03:00:00.000Z"),
+            # JST 07:00 開始（早朝）
+            _event("2026-03-04T22:00:00.000Z", "2026-03-04T23:00:00.000Z"),
+            # 対象期間外
+            _event("2026-04-20T01:00:00.000Z", "2026-04-20T02:00:00.000Z"),
+            {"title": "祝日", "start": "2026-03-05", "end": "2026-03-05", "allDay": True},
+        ]
+        settings = {"today_override": {"wake_up_time": "06:00"}}
+        complexity = score_plan_input(events, [], settings, TODAY)
+        assert complexity.events == 4
+        assert complexity.conflicts == 1
+        assert complexity.early_events == 1
+        assert complexity.override is True
+
+    def test_bad_score_streak(self):
+        logs = [
+            {"date": "2026-02-27", "score": 50},
+            {"date": "2026-02-25", "score": 40},
+            {"date": "2026-02-26", "score": 55},
+            {"date": "2026-02-28", "score": 90},
+            {"date": "2026-03-01", "score": 30},
+        ]
+        complexity = score_plan_input([], logs, {}, TODAY)
+        assert complexity.bad_streak == 3
+        assert complexity.score == 3
+
+    def test_packed_week_scores_higher_than_sparse_week(self):
+        sparse = score_plan_input(calendar_events(2, seed=1), [], {}, TODAY)
+        packed = score_plan_input(calendar_events(500, seed=1), [], {}, TODAY)
+        assert packed.score > sparse.score
+
+
+class TestModelTiers:
+    def test_parse_and_select(self):
+        tiers = parse_model_tiers(
+            "complex:openai/gpt-4o:3072:12, simple::1536:0, free:deepseek/v3:free:2048:4",
+            default_model="openai/gpt-4o-mini",
+        )
+        assert [t.name for t in tiers] == ["simple", "free", "complex"]
+        assert tiers[0].model == "openai/gpt-4o-mini"
+        assert tiers[1].model == "deepseek/v3:free"
+        assert select_tier(tiers, 0).name == "simple"
+        assert select_tier(tiers, 11).name == "free"
+        assert select_tier(tiers, 40).name == "complex"
+
+    def test_empty_spec_is_single_default_tier(self):
+        assert parse_model_tiers("", "m") == [ModelTier("default", "m", 2048, 0)]
+
+    @pytest.mark.parametrize("spec", ["simple:m:2048", "a::1:0,a::2:3", "a::x:0"])
+    def test_invalid_spec(self, spec: str):
+        with pytest.raises(ValueError):
+            parse_model_tiers(spec, "m")
+
+
+class TestModelRoutingPlanGenerator:
+    def _router(self, fake: FakeOpenRouter, metrics: PlanModelMetrics):
+        tiers = [
+            ModelTier("simple", "fake/small", 1024, 0),
+            ModelTier("complex", "fake/large", 4096, 5),
+        ]
+        clients = {
+            t.name: OpenRouterClient(
+                api_key="fake",
+                base_url="http://fake/api/v1",
+                model=t.model,
+                max_tokens=t.max_tokens,
+                transport=fake.transport,
+                metrics=WeekPlanOutputMetrics(),
+            )
+            for t in tiers
+        }
+        return ModelRoutingPlanGenerator(tiers, clients, metrics)
+
+    async def test_routes_by_complexity_and_records_per_tier(self):
+        fake = FakeOpenRouter()
+        metrics = PlanModelMetrics()
+        router = self._router(fake, metrics)
+
+        await router.generate_week_plan([], [], {}, today_date=TODAY)
+        await router.generate_week_plan(calendar_events(200), [], {}, today_date=TODAY)
+
+        assert [(r["model"], r["max_tokens"]) for r in fake.requests] == [
+            ("fake/small", 1024),
+            ("fake/large", 4096),
+        ]
+        snapshot = metrics.snapshot()
+        assert snapshot["simple"]["requests"] == 1
+        assert snapshot["complex"]["requests"] == 1
+        assert snapshot["simple"]["completion_tokens"] > 0
+        assert snapshot["simple"]["prompt_tokens"] < snapshot["complex"]["prompt_tokens"]
+
+    async def test_records_errors(self):
+        fake = FakeOpenRouter(FakeProfile(script=["503"]))
+        metrics = PlanModelMetrics()
+        with pytest.raises(httpx.HTTPStatusError):
+            await self._router(fake, metrics).generate_week_plan([], [], {}, today_date=TODAY)
+        assert metrics.snapshot()["simple"]["errors"] == 1
+
+
+class _FailingClient:
+    """常に失敗するクライアント（呼ばれた回数を数える）"""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.error = error or httpx.ConnectError("down")
+
+    async def generate_week_plan_with_usage(self, *args, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://fake/api/v1/chat/completions")
+    return httpx.HTTPStatusError(
+        "error", request=request, response=httpx.Response(status, request=request)
+    )
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_half_opens_after_reset(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=lambda: now[0])
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        with pytest.raises(PlanGeneratorUnavailableError) as exc:
+            breaker.before_call()
+        assert exc.value.retry_after_seconds == 10
+
+        now[0] = 10
+        assert breaker.state == HALF_OPEN
+        breaker.before_call()  # 試行は 1 件だけ
+        with pytest.raises(PlanGeneratorUnavailableError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN and breaker.opens == 2
+
+        now[0] = 20
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+
+    async def test_router_stops_calling_llm_while_open(self):
+        tiers = [ModelTier("simple", "fake/small", 1024, 0)]
+        client = _FailingClient()
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        router = ModelRoutingPlanGenerator(
+            tiers, {"simple": client}, PlanModelMetrics(), breaker=breaker
+        )
+
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await router.generate_week_plan([], [], {}, today_date=TODAY)
+        with pytest.raises(PlanGeneratorUnavailableError):
+            await router.generate_week_plan([], [], {}, today_date=TODAY)
+        assert client.calls == 2
+        assert router.metrics.tiers["simple"].errors == 2
+
+    def test_only_transport_timeout_and_5xx_are_outages(self):
+        assert is_outage(httpx.ConnectError("down"))
+        assert is_outage(httpx.ReadTimeout("slow"))
+        assert is_outage(TimeoutError())
+        assert is_outage(_status_error(503))
+        assert not is_outage(_status_error(429))
+        assert not is_outage(IncompleteWeekPlanError(["2026-03-02"]))
+        assert not is_outage(ValueError("OpenRouter が空の応答を返しました"))
+
+    async def test_incomplete_output_does_not_open_breaker(self):
+        tiers = [ModelTier("simple", "fake/small", 1024, 0)]
+        client = _FailingClient(IncompleteWeekPlanError(["2026-03-02"]))
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        router = ModelRoutingPlanGenerator(
+            tiers, {"simple": client}, PlanModelMetrics(), breaker=breaker
+        )
+
+        for _ in range(3):
+            with pytest.raises(IncompleteWeekPlanError):
+                await router.generate_week_plan([], [], {}, today_date=TODAY)
+        assert client.calls == 3
+        assert breaker.state == CLOSED
+
+    def test_ensure_available_keeps_the_half_open_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=lambda: now[0])
+        breaker.record_failure()
+        with pytest.raises(PlanGeneratorUnavailableError):
+            breaker.ensure_available()
+
+        now[0] = 10
+        breaker.ensure_available()
+        breaker.ensure_available()
+        breaker.before_call()  # 試行枠は実際に呼ぶときに取る
+        with pytest.raises(PlanGeneratorUnavailableError):
+            breaker.ensure_available()
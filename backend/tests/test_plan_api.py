@@ -3,14 +3,17 @@ POST /api/v1/sleep-plans の統合テスト（実 DB、LLM はモック）
 todayOverride, force, cache_hit の E2E テスト含む。
 """
 
+import json
 from unittest.mock import AsyncMock
 
 import pytest
 from httpx import AsyncClient
 
-from app.main import web_app as app
-from app.presentation.api.plan import get_plan_generator
+from app.application.plan.ports import RateLimitDecision
+from app.infrastructure.persistence.database import engine
+from app.presentation.api.plan import _splice_cache_hit, get_plan_generator, get_rate_limiter
 from app.presentation.dependencies.auth import get_current_user_id
+from tests.conftest import fastapi_app as app
 
 
 class TestPlanAPIAuth:
@@ -134,6 +137,9 @@ class TestPlanAPI:
             assert res2.status_code == 200
             assert res1.json()["cache_hit"] is False
             assert res2.json()["cache_hit"] is True
+            assert res1.headers["x-plan-cache"] == "miss"
+            assert res2.headers["x-plan-cache"] == "hit"
+            assert res2.json()["week_plan"] == res1.json()["week_plan"]
             assert mock_plan_generator.generate_week_plan.call_count == 1
         finally:
             app.dependency_overrides.pop(get_plan_generator, None)
@@ -305,3 +311,196 @@ class TestPlanAPI:
             assert mock_plan_generator.generate_week_plan.call_count == 2
         finally:
             app.dependency_overrides.pop(get_plan_generator, None)
+
+
+class TestPlanConnectionRelease:
+    """LLM 生成中は DB 接続を保持しない（検索 → 返却 → 生成 → 別の作業単位で保存）"""
+
+    async def test_no_connection_checked_out_while_generating(
+        self, client: AsyncClient, unique_email: str
+    ):
+        observed: dict = {}
+
+        class SlowGenerator:
+            async def generate_week_plan(self, *args, **kwargs):
+                observed["checked_out"] = engine.pool.checkedout()
+                # 生成待ちの間も他のリクエストは DB を使える
+                res = await client.get("/api/v1/settings")
+                observed["settings_status"] = res.status_code
+                return {"week_plan": [{"day": "月曜", "advice": "テスト"}]}
+
+        app.dependency_overrides[get_plan_generator] = lambda: SlowGenerator()
+        try:
+            create_res = await client.post(
+                "/api/v1/users",
+                json={"email": unique_email, "name": "PoolTest"},
+            )
+            user_id = create_res.json()["id"]
+            app.dependency_overrides[get_current_user_id] = lambda: user_id
+            assert engine.pool.checkedout() == 0
+
+            res = await client.post(
+                "/api/v1/sleep-plans",
+                json={"calendar_events": [], "sleep_logs": [], "settings": {}},
+            )
+            assert res.status_code == 200
+            assert observed == {"checked_out": 0, "settings_status": 200}
+
+            # 保存は別の作業単位で COMMIT 済み
+            current = await client.get("/api/v1/sleep-plans/current")
+            assert current.status_code == 200
+            assert engine.pool.checkedout() == 0
+        finally:
+            app.dependency_overrides.pop(get_plan_generator, None)
+
+
+class _DenyAllRateLimiter:
+    async def acquire(self, key, policy):
+        return RateLimitDecision(allowed=False, retry_after_seconds=41.2)
+
+
+class TestPlanRateLimit:
+    """LLM 生成の上限超過時は最後のキャッシュを stale で返し、キャッシュが無ければ 429"""
+
+    BODY = {"calendar_events": [], "sleep_logs": [], "settings": {}}
+
+    @pytest.fixture
+    def generator(self):
+        mock = AsyncMock()
+        mock.generate_week_plan = AsyncMock(return_value={"week_plan": [{"day": "月曜"}]})
+        return mock
+
+    async def _create_user(self, client: AsyncClient, email: str) -> str:
+        res = await client.post("/api/v1/users", json={"email": email, "name": "RateLimit"})
+        user_id = res.json()["id"]
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+        return user_id
+
+    async def test_over_limit_returns_last_plan_as_stale(
+        self, client: AsyncClient, unique_email: str, generator
+    ):
+        app.dependency_overrides[get_plan_generator] = lambda: generator
+        try:
+            await self._create_user(client, unique_email)
+            first = await client.post("/api/v1/sleep-plans", json=self.BODY)
+            assert first.status_code == 200
+
+            app.dependency_overrides[get_rate_limiter] = lambda: _DenyAllRateLimiter()
+            changed = {**self.BODY, "settings": {"wake_up_time": "05:00"}}
+            res = await client.post("/api/v1/sleep-plans?force=true", json=changed)
+            assert res.status_code == 200
+            assert res.headers["x-plan-cache"] == "stale"
+            assert res.headers["retry-after"] == "42"
+            data = res.json()
+            assert data["stale"] is True
+            assert data["week_plan"] == [{"day": "月曜"}]
+            generator.generate_week_plan.assert_called_once()
+        finally:
+            app.dependency_overrides.pop(get_plan_generator, None)
+            app.dependency_overrides.pop(get_rate_limiter, None)
+
+    async def test_over_limit_without_cache_returns_429(
+        self, client: AsyncClient, unique_email: str, generator
+    ):
+        app.dependency_overrides[get_plan_generator] = lambda: generator
+        app.dependency_overrides[get_rate_limiter] = lambda: _DenyAllRateLimiter()
+        try:
+            await self._create_user(client, unique_email)
+            res = await client.post("/api/v1/sleep-plans", json=self.BODY)
+            assert res.status_code == 429
+            assert res.headers["retry-after"] == "42"
+            generator.generate_week_plan.assert_not_called()
+        finally:
+            app.dependency_overrides.pop(get_plan_generator, None)
+            app.dependency_overrides.pop(get_rate_limiter, None)
+
+
+class TestCurrentPlanAPI:
+    """GET /sleep-plans/current（キャッシュ済みプランの読み取り専用取得）"""
+
+    @pytest.fixture
+    def mock_plan_generator(self):
+        mock = AsyncMock()
+        mock.generate_week_plan = AsyncMock(
+            return_value={"week_plan": [{"date": "2026-02-20", "advice": "最新"}]}
+        )
+        return mock
+
+    async def _create_user(self, client: AsyncClient, email: str) -> str:
+        create_res = await client.post(
+            "/api/v1/users",
+            json={"email": email, "name": "CurrentPlanTest"},
+        )
+        assert create_res.status_code == 201
+        user_id = create_res.json()["id"]
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+        return user_id
+
+    async def test_current_returns_404_without_cache(self, client: AsyncClient, unique_email: str):
+        """キャッシュが無いユーザーは 404"""
+        await self._create_user(client, unique_email)
+
+        res = await client.get("/api/v1/sleep-plans/current")
+        assert res.status_code == 404
+
+    async def test_current_returns_cached_plan_with_signature_and_age(
+        self, client: AsyncClient, unique_email: str, mock_plan_generator
+    ):
+        """POST で生成したプランが署名・経過秒数付きで返り、LLM は追加で呼ばれない"""
+        app.dependency_overrides[get_plan_generator] = lambda: mock_plan_generator
+        try:
+            await self._create_user(client, unique_email)
+            body = {"calendar_events": [], "sleep_logs": [], "settings": {}}
+            post_res = await client.post("/api/v1/sleep-plans", json=body)
+            assert post_res.status_code == 200
+
+            res = await client.get("/api/v1/sleep-plans/current")
+            assert res.status_code == 200
+            data = res.json()
+            assert data["plan"]["week_plan"][0]["advice"] == "最新"
+            assert "cache_hit" not in data["plan"]
+            assert len(data["signature_hash"]) == 64
+            assert data["age_seconds"] >= 0
+            assert data["created_at"]
+            assert res.headers["etag"] == f'"{data["signature_hash"]}"'
+            assert mock_plan_generator.generate_week_plan.call_count == 1
+        finally:
+            app.dependency_overrides.pop(get_plan_generator, None)
+
+    async def test_current_returns_304_when_etag_matches(
+        self, client: AsyncClient, unique_email: str, mock_plan_generator
+    ):
+        """If-None-Match が現在の署名と一致すれば 304（本文なし）"""
+        app.dependency_overrides[get_plan_generator] = lambda: mock_plan_generator
+        try:
+            await self._create_user(client, unique_email)
+            body = {"calendar_events": [], "sleep_logs": [], "settings": {}}
+            await client.post("/api/v1/sleep-plans", json=body)
+
+            first = await client.get("/api/v1/sleep-plans/current")
+            etag = first.headers["etag"]
+
+            res = await client.get("/api/v1/sleep-plans/current", headers={"If-None-Match": etag})
+            assert res.status_code == 304
+            assert res.content == b""
+        finally:
+            app.dependency_overrides.pop(get_plan_generator, None)
+
+
+class TestSpliceCacheHit:
+    """保存済み plan_json への cache_hit 差し込み（パースしない）"""
+
+    def test_splices_into_object(self):
+        body = _splice_cache_hit('{"week_plan": [{"advice": "テスト"}]}', True)
+        assert json.loads(body) == {"week_plan": [{"advice": "テスト"}], "cache_hit": True}
+
+    def test_splices_into_empty_object_and_trailing_whitespace(self):
+        assert json.loads(_splice_cache_hit("{ }\n", False)) == {"cache_hit": False}
+
+    def test_non_object_is_wrapped(self):
+        body = _splice_cache_hit('[{"advice": "x"}]', False)
+        assert json.loads(body) == {"week_plan": [{"advice": "x"}], "cache_hit": False}
+
+    def test_splices_stale_flag(self):
+        body = _splice_cache_hit('{"week_plan": []}', True, stale=True)
+        assert json.loads(body) == {"week_plan": [], "cache_hit": True, "stale": True}
@@ -7,6 +7,7 @@ import uuid
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.infrastructure.persistence import plan_codec
 from app.infrastructure.persistence.models.user import User
 from app.infrastructure.persistence.repositories.sleep_plan_cache_repository import (
     SleepPlanCacheRepository,
@@ -78,3 +79,19 @@ class TestSleepPlanCacheRepository:
 
         miss_user = await repo.get_by_user_and_hash("other-user-id", "sig_123")
         assert miss_user is None
+
+    async def test_upsert_stores_compressed(
+        self, repo: SleepPlanCacheRepository, user_id: str, db_session: AsyncSession
+    ):
+        """既定（zlib）では plan_data に圧縮して保存し、plan_json で復元できる"""
+        plan = '{"week_plan": [{"day": "水曜", "advice": "' + "早めに寝ましょう。" * 50 + '"}]}'
+        row = await repo.upsert(user_id=user_id, signature_hash="sig_zip", plan_json=plan)
+        assert row.plan_format == plan_codec.resolve_write_format()
+        assert row.plan_text is None
+        assert row.plan_data is not None
+        assert len(row.plan_data) < len(plan.encode("utf-8"))
+
+        db_session.expire_all()
+        got = await repo.get_by_user_id(user_id)
+        assert got is not None
+        assert got.plan_json == plan
@@ -0,0 +1,65 @@
+"""
+plan_codec（プランキャッシュの保存形式）の単体テスト
+"""
+
+import pytest
+
+from app.infrastructure.persistence import plan_codec
+from app.infrastructure.persistence.plan_codec import (
+    FORMAT_TEXT,
+    FORMAT_ZLIB,
+    FORMAT_ZSTD,
+    PlanCodecError,
+    decode_plan,
+    encode_plan,
+    resolve_write_format,
+)
+
+PLAN = '{"week_plan":[{"date":"2026-02-20","advice":"早めに寝ましょう"}]}'
+
+
+class TestPlanCodec:
+    """エンコード → デコードで元の JSON 文字列に戻るか"""
+
+    @pytest.mark.parametrize("fmt", [FORMAT_TEXT, FORMAT_ZLIB])
+    def test_round_trip(self, fmt: int):
+        enc = encode_plan(PLAN, fmt)
+        assert enc.format == fmt
+        assert decode_plan(enc.format, enc.text, enc.data) == PLAN
+
+    def test_round_trip_zstd(self):
+        pytest.importorskip("zstandard")
+        enc = encode_plan(PLAN, FORMAT_ZSTD)
+        assert enc.text is None
+        assert decode_plan(enc.format, enc.text, enc.data) == PLAN
+
+    def test_text_format_reads_legacy_column(self):
+        """005 以前の行（plan_format=0, plan_json のみ）はそのまま読める"""
+        assert decode_plan(FORMAT_TEXT, PLAN, None) == PLAN
+
+    def test_compressed_format_stores_bytes_only(self):
+        enc = encode_plan(PLAN, FORMAT_ZLIB)
+        assert enc.text is None
+        assert isinstance(enc.data, bytes)
+
+    def test_unknown_format_raises(self):
+        with pytest.raises(PlanCodecError):
+            decode_plan(99, None, b"x")
+        with pytest.raises(PlanCodecError):
+            encode_plan(PLAN, 99)
+        with pytest.raises(PlanCodecError):
+            resolve_write_format("brotli")
+
+    def test_missing_payload_raises(self):
+        with pytest.raises(PlanCodecError):
+            decode_plan(FORMAT_ZLIB, None, None)
+
+    def test_zstd_falls_back_to_zlib_without_zstandard(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(plan_codec, "zstandard", None)
+        assert resolve_write_format("zstd") == FORMAT_ZLIB
+        assert resolve_write_format("zstd-dict") == FORMAT_ZLIB
+
+    def test_zstd_dict_without_path_falls_back_to_zstd(self, monkeypatch: pytest.MonkeyPatch):
+        pytest.importorskip("zstandard")
+        monkeypatch.setattr(plan_codec.settings, "PLAN_CACHE_ZSTD_DICT_PATH", "")
+        assert resolve_write_format("zstd-dict") == FORMAT_ZSTD
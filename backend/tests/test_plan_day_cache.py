@@ -0,0 +1,258 @@
+"""
+日単位のプランキャッシュのテスト
+日ごとの署名（build_day_signatures）・日の再利用と不足日だけの生成（GetOrCreatePlanUseCase）・
+SleepPlanDayRepository（実 DB）を検証する。
+"""
+
+import json
+import uuid
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.application.plan import GetOrCreatePlanInput, GetOrCreatePlanUseCase, PlanGenerationMetrics
+from app.domain.plan.repositories import PlanDay
+from app.domain.plan.value_objects import build_day_signatures, plan_dates
+from app.infrastructure.persistence.database import session_scope
+from app.infrastructure.persistence.models.user import User
+from app.infrastructure.persistence.repositories.sleep_plan_day_repository import (
+    ShortLivedSleepPlanDayRepository,
+)
+
+TODAY = "2026-03-02"
+
+
+def _shift(d: str, days: int) -> str:
+    return (date.fromisoformat(d) + timedelta(days=days)).isoformat()
+
+
+def _signatures(events=(), logs=(), settings=None, today=TODAY):
+    return build_day_signatures(list(events), list(logs), settings or {}, plan_dates(today), today)
+
+
+class TestBuildDaySignatures:
+    def test_event_changes_only_that_day_and_the_day_before(self):
+        before = _signatures()
+        # 2026-03-05 10:00 JST
+        after = _signatures(events=[{"title": "会議", "start": "2026-03-05T01:00:00Z"}])
+        changed = [d for d in before if before[d] != after[d]]
+        assert changed == ["2026-03-04", "2026-03-05"]
+
+    def test_event_date_is_judged_in_jst(self):
+        # UTC では 3/4 だが JST では 3/5 の朝
+        late_utc = _signatures(events=[{"title": "朝会", "start": "2026-03-04T23:00:00Z"}])
+        base = _signatures()
+        assert late_utc["2026-03-03"] == base["2026-03-03"]
+        assert late_utc["2026-03-05"] != base["2026-03-05"]
+
+    def test_override_affects_only_today(self):
+        base = _signatures(settings={"wake_up_time": "07:00"})
+        overridden = _signatures(
+            settings={"wake_up_time": "07:00", "today_override": {"sleepHour": 23}}
+        )
+        assert [d for d in base if base[d] != overridden[d]] == [TODAY]
+
+    def test_new_sleep_log_affects_only_today(self):
+        base = _signatures(logs=[{"date": "2026-02-28", "score": 80}])
+        with_yesterday = _signatures(
+            logs=[{"date": "2026-02-28", "score": 80}, {"date": "2026-03-01", "score": 40}]
+        )
+        assert [d for d in base if base[d] != with_yesterday[d]] == [TODAY]
+
+    def test_settings_change_affects_every_day(self):
+        a = _signatures(settings={"wake_up_time": "07:00"})
+        b = _signatures(settings={"wake_up_time": "06:00"})
+        assert all(a[d] != b[d] for d in a)
+
+    def test_rollover_keeps_overlapping_days(self):
+        events = [{"title": "試験", "start": "2026-03-06"}]
+        today = _signatures(events=events)
+        tomorrow = _signatures(events=events, today=_shift(TODAY, 1))
+        overlap = [d for d in today if d in tomorrow]
+        assert len(overlap) == 6
+        assert all(today[d] == tomorrow[d] for d in overlap)
+
+
+class _DictCacheRepo:
+    def __init__(self):
+        self.rows: dict[tuple[str, str], str] = {}
+
+    async def get_by_user_and_hash(self, user_id: str, signature_hash: str):
+        plan_json = self.rows.get((user_id, signature_hash))
+        return AsyncMock(plan_json=plan_json) if plan_json is not None else None
+
+    async def get_by_user_id(self, user_id: str):
+        return None
+
+    async def upsert(self, user_id: str, signature_hash: str, plan_json: str) -> None:
+        self.rows[(user_id, signature_hash)] = plan_json
+
+
+class _DictDayRepo:
+    def __init__(self):
+        self.days: dict[tuple[str, str], PlanDay] = {}
+
+    async def get_days(self, user_id: str, dates: list[str]) -> dict[str, PlanDay]:
+        return {d: self.days[(user_id, d)] for d in dates if (user_id, d) in self.days}
+
+    async def upsert_days(self, user_id: str, days: list[PlanDay], keep_from=None) -> None:
+        if keep_from is not None:
+            self.days = {k: v for k, v in self.days.items() if k[1] >= keep_from}
+        for day in days:
+            self.days[(user_id, day.date)] = day
+
+
+def _day(d: str, tag: str) -> dict:
+    return {
+        "date": d,
+        "recommended_bedtime": "23:00",
+        "recommended_wakeup": "06:00",
+        "importance": "low",
+        "next_day_event": None,
+        "advice": f"{tag} {d}",
+    }
+
+
+class _Generator:
+    """週全体の生成か一部の日の生成かを advice に印として付ける偽 LLM"""
+
+    def __init__(self):
+        self.week_calls: list[str] = []
+        self.days_calls: list[tuple[list[str], list[str]]] = []
+
+    async def generate_week_plan(self, calendar_events, sleep_logs, settings, today_date=None):
+        self.week_calls.append(today_date)
+        return {"week_plan": [_day(d, "week") for d in plan_dates(today_date)]}
+
+    async def generate_days(
+        self, calendar_events, sleep_logs, settings, today_date, dates, context_days
+    ):
+        self.days_calls.append((dates, [c["date"] for c in context_days]))
+        return [_day(d, "partial") for d in dates]
+
+
+class TestDayCacheReuse:
+    @pytest.fixture
+    def usecase(self):
+        return GetOrCreatePlanUseCase(
+            _DictCacheRepo(),
+            _Generator(),
+            metrics=PlanGenerationMetrics(),
+            day_cache_repo=_DictDayRepo(),
+        )
+
+    def _input(self, today: str, events=(), force: bool = False) -> GetOrCreatePlanInput:
+        return GetOrCreatePlanInput(
+            user_id="user-001",
+            calendar_events=list(events),
+            sleep_logs=[],
+            settings={"wake_up_time": "07:00"},
+            today_date=today,
+            force=force,
+        )
+
+    async def test_rollover_generates_only_the_new_day(self, usecase):
+        await usecase.execute(self._input(TODAY))
+        result = await usecase.execute(self._input(_shift(TODAY, 1)))
+
+        generator = usecase.plan_generator
+        assert generator.week_calls == [TODAY]
+        new_day = _shift(TODAY, 7)
+        assert generator.days_calls == [([new_day], plan_dates(_shift(TODAY, 1))[:6])]
+        week = json.loads(result.plan_json)["week_plan"]
+        assert [d["date"] for d in week] == plan_dates(_shift(TODAY, 1))
+        assert week[0]["advice"] == f"week {_shift(TODAY, 1)}"
+        assert week[-1]["advice"] == f"partial {new_day}"
+        assert result.cache_hit is False
+        assert usecase.metrics.days_generated == 8
+        assert usecase.metrics.days_reused == 6
+        assert usecase.metrics.partial_generations == 1
+        # 今日より前の日は削除される
+        assert ("user-001", TODAY) not in usecase.day_cache_repo.days
+
+    async def test_changed_event_regenerates_affected_days(self, usecase):
+        await usecase.execute(self._input(TODAY))
+        event = {"title": "発表", "start": "2026-03-05T10:00:00+09:00"}
+        await usecase.execute(self._input(TODAY, events=[event]))
+        assert usecase.plan_generator.days_calls[0][0] == ["2026-03-04", "2026-03-05"]
+
+    async def test_all_days_cached_assembles_without_llm(self, usecase):
+        await usecase.execute(self._input(TODAY))
+        # 週の外の予定は週の署名を変えるが、どの日の署名も変えない
+        far = {"title": "旅行", "start": "2026-04-01"}
+        result = await usecase.execute(self._input(TODAY, events=[far]))
+
+        assert result.cache_hit is True
+        assert usecase.plan_generator.week_calls == [TODAY]
+        assert usecase.plan_generator.days_calls == []
+        assert usecase.metrics.assembled == 1
+        assert len(json.loads(result.plan_json)["week_plan"]) == 7
+
+    async def test_missing_generated_days_fall_back_to_the_whole_week(self, usecase):
+        await usecase.execute(self._input(TODAY))
+        generator = usecase.plan_generator
+
+        async def drop_last_day(*args, dates, **kwargs):
+            generator.days_calls.append((dates, []))
+            return [_day(d, "partial") for d in dates[:-1]]
+
+        generator.generate_days = drop_last_day
+        event = {"title": "発表", "start": "2026-03-05T10:00:00+09:00"}
+        result = await usecase.execute(self._input(TODAY, events=[event]))
+
+        # 欠けた週を全体の署名で保存せず、週全体を生成し直す
+        assert generator.week_calls == [TODAY, TODAY]
+        week = json.loads(result.plan_json)["week_plan"]
+        assert [d["date"] for d in week] == plan_dates(TODAY)
+        assert all(d["advice"].startswith("week") for d in week)
+        assert usecase.metrics.partial_fallbacks == 1
+
+    async def test_force_regenerates_the_whole_week(self, usecase):
+        await usecase.execute(self._input(TODAY))
+        await usecase.execute(self._input(TODAY, force=True))
+        assert usecase.plan_generator.week_calls == [TODAY, TODAY]
+        assert usecase.plan_generator.days_calls == []
+
+    async def test_days_without_dates_are_not_cached(self):
+        generator = AsyncMock()
+        generator.generate_week_plan.return_value = {"week_plan": [{"day": "月曜"}]}
+        day_repo = _DictDayRepo()
+        usecase = GetOrCreatePlanUseCase(_DictCacheRepo(), generator, day_cache_repo=day_repo)
+
+        result = await usecase.execute(self._input(TODAY))
+
+        assert json.loads(result.plan_json) == {"week_plan": [{"day": "月曜"}]}
+        assert day_repo.days == {}
+
+
+class TestSleepPlanDayRepository:
+    @pytest.fixture
+    async def user_id(self) -> str:
+        async with session_scope() as db:
+            user = User(email=f"day-cache-{uuid.uuid4().hex[:8]}@example.com", name="DayCache")
+            db.add(user)
+            await db.flush()
+            return user.id
+
+    async def test_upsert_get_and_prune(self, user_id: str):
+        repo = ShortLivedSleepPlanDayRepository(session_scope)
+        dates = plan_dates(TODAY)
+        await repo.upsert_days(
+            user_id, [PlanDay(d, f"sig-{d}", json.dumps(_day(d, "v1"))) for d in dates]
+        )
+        got = await repo.get_days(user_id, dates)
+        assert list(got) == dates
+        assert got[TODAY].signature_hash == f"sig-{TODAY}"
+
+        tomorrow = _shift(TODAY, 1)
+        await repo.upsert_days(
+            user_id,
+            [PlanDay(tomorrow, "sig-new", json.dumps(_day(tomorrow, "v2")))],
+            keep_from=tomorrow,
+        )
+        got = await repo.get_days(user_id, dates)
+        assert TODAY not in got
+        assert got[tomorrow].signature_hash == "sig-new"
+        assert json.loads(got[tomorrow].day_json)["advice"] == f"v2 {tomorrow}"
+        assert len(got) == 6
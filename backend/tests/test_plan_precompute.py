@@ -0,0 +1,299 @@
+"""
+書き込み後のプラン事前計算（PlanPrecomputer）のテスト
+イベントの反映（フロントエンドの body と同じ署名になるか）・まとめ・キューの上限・
+書き込み → 事前計算 → 次の POST /sleep-plans がヒットになる流れ（実 DB）を検証する。
+"""
+
+import asyncio
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from app.application.plan import (
+    GetOrCreatePlanInput,
+    GetOrCreatePlanUseCase,
+    PlanPrecomputer,
+)
+from app.application.plan.precompute import apply_events
+from app.domain.events import (
+    SleepLogCreated,
+    SleepLogUpdated,
+    SleepSettingsChanged,
+    TodayOverrideSnapshot,
+)
+from app.domain.plan.value_objects import build_signature_hash
+from app.infrastructure.persistence.database import AsyncSessionLocal, session_scope
+from app.infrastructure.persistence.domain_events import AfterCommitEventPublisher
+from app.infrastructure.persistence.repositories.sleep_plan_cache_repository import (
+    ShortLivedSleepPlanCacheRepository,
+)
+from app.presentation.api.plan import get_plan_generator, get_plan_precomputer
+from app.presentation.dependencies.auth import get_current_user_id
+from app.presentation.dependencies.events import get_event_subscribers
+from tests.conftest import fastapi_app as app
+
+TODAY = "2026-03-02"
+
+# フロントエンド（sleepPlanApi.ts の toSnakeCaseBody）が送る形
+FRONTEND_SETTINGS = {"wake_up_time": "07:00", "sleep_duration_hours": 8, "preparation_minutes": 60}
+FRONTEND_LOG = {
+    "date": "2026-02-28",
+    "score": 80,
+    "scheduled_sleep_time": "2026-02-28T23:00:00+09:00",
+    "mood": 3,
+}
+EVENTS = [
+    {"title": "会議", "start": "2026-03-03T10:00:00+09:00", "end": "2026-03-03T11:00:00+09:00"}
+]
+
+
+def _base() -> GetOrCreatePlanInput:
+    return GetOrCreatePlanInput(
+        user_id="user-001",
+        calendar_events=EVENTS,
+        sleep_logs=[FRONTEND_LOG],
+        settings=FRONTEND_SETTINGS,
+        today_date=TODAY,
+    )
+
+
+def _signature(input: GetOrCreatePlanInput) -> str:
+    return build_signature_hash(
+        input.calendar_events, input.sleep_logs, input.settings, input.today_date
+    )
+
+
+def _log_created(day: str, score: int = 70, mood: int | None = None) -> SleepLogCreated:
+    return SleepLogCreated(
+        user_id="user-001",
+        date=date.fromisoformat(day),
+        # DB からは UTC で返ってくることがある
+        scheduled_sleep_time=datetime(2026, 3, 1, 14, 30, tzinfo=UTC),
+        score=score,
+        mood=mood,
+    )
+
+
+class TestApplyEvents:
+    def test_log_created_matches_frontend_body(self):
+        applied = apply_events(_base(), [_log_created("2026-03-01", mood=4)], TODAY)
+        frontend = {
+            "date": "2026-03-01",
+            "score": 70,
+            "scheduled_sleep_time": "2026-03-01T23:30:00+09:00",
+            "mood": 4,
+        }
+        assert applied.sleep_logs[0] == frontend
+        expected = GetOrCreatePlanInput(
+            "user-001", EVENTS, [frontend, FRONTEND_LOG], FRONTEND_SETTINGS, TODAY
+        )
+        assert _signature(applied) == _signature(expected)
+
+    def test_mood_update_replaces_the_log_of_that_date(self):
+        updated = SleepLogUpdated(
+            user_id="user-001",
+            date=date(2026, 2, 28),
+            score=80,
+            scheduled_sleep_time=datetime(2026, 2, 28, 14, 0, tzinfo=UTC),
+            mood=5,
+        )
+        applied = apply_events(_base(), [updated], TODAY)
+        assert applied.sleep_logs == [{**FRONTEND_LOG, "mood": 5}]
+
+    def test_keeps_only_recent_logs(self):
+        events = [_log_created(f"2026-02-{d:02d}") for d in range(18, 28)]
+        applied = apply_events(_base(), events, TODAY)
+        assert [lg["date"] for lg in applied.sleep_logs] == [
+            "2026-02-28",
+            "2026-02-27",
+            "2026-02-26",
+            "2026-02-25",
+            "2026-02-24",
+            "2026-02-23",
+            "2026-02-22",
+        ]
+
+    def test_settings_and_today_override(self):
+        override = TodayOverrideSnapshot(date(2026, 3, 2), 23, 30, 7, 0)
+        changed = SleepSettingsChanged("user-001", 6, 30, 7, 45, today_override=override)
+        applied = apply_events(_base(), [changed], TODAY)
+        assert applied.settings == {
+            "wake_up_time": "06:30",
+            "sleep_duration_hours": 7,
+            "preparation_minutes": 45,
+            "today_override": {
+                "date": TODAY,
+                "sleepHour": 23,
+                "sleepMinute": 30,
+                "wakeHour": 7,
+                "wakeMinute": 0,
+            },
+        }
+        # 今日以外のオーバーライドはフロントエンドと同じく送らない
+        tomorrow = apply_events(_base(), [changed], "2026-03-03")
+        assert "today_override" not in tomorrow.settings
+
+
+class TestPlanPrecomputer:
+    def _precomputer(self, generator, **kwargs) -> PlanPrecomputer:
+        def factory():
+            repo = AsyncMock()
+            repo.get_by_user_and_hash.return_value = None
+            return GetOrCreatePlanUseCase(repo, generator)
+
+        return PlanPrecomputer(factory, today=lambda: TODAY, **kwargs)
+
+    async def test_events_for_one_user_are_coalesced(self):
+        generator = AsyncMock()
+        generator.generate_week_plan.return_value = {"week_plan": []}
+        precomputer = self._precomputer(generator, debounce_seconds=0.05, workers=2)
+        precomputer.remember(_base())
+        precomputer.start()
+        try:
+            assert precomputer.publish(_log_created("2026-03-01"))
+            await asyncio.sleep(0.02)
+            assert precomputer.publish(_log_created("2026-03-01", mood=2))
+            assert precomputer.publish(SleepSettingsChanged("user-001", 6, 0, 8, 60))
+            await precomputer.join()
+        finally:
+            await precomputer.stop()
+
+        generator.generate_week_plan.assert_awaited_once()
+        _events, logs, settings = generator.generate_week_plan.call_args[0]
+        assert logs[0]["mood"] == 2
+        assert settings["wake_up_time"] == "06:00"
+        snapshot = precomputer.snapshot()
+        assert snapshot["published"] == 3
+        assert snapshot["coalesced"] == 2
+        assert snapshot["regenerated"] == 1
+        assert snapshot["queue_depth"] == 0
+
+    async def test_queue_is_bounded(self):
+        precomputer = self._precomputer(AsyncMock(), max_queue=1)
+        for user_id in ("user-001", "user-002"):
+            precomputer.remember(GetOrCreatePlanInput(user_id, [], [], {}, TODAY))
+        assert precomputer.publish(SleepSettingsChanged("user-001", 7, 0, 8, 60))
+        assert not precomputer.publish(SleepSettingsChanged("user-002", 7, 0, 8, 60))
+        # 同じユーザーは既に積まれている 1 件にまとまる
+        assert precomputer.publish(SleepSettingsChanged("user-001", 6, 0, 8, 60))
+        assert precomputer.metrics.rejected == 1
+        assert precomputer.queue_depth == 1
+
+    def test_users_without_a_previous_plan_request_are_skipped(self):
+        precomputer = self._precomputer(AsyncMock())
+        assert not precomputer.publish(SleepSettingsChanged("user-001", 7, 0, 8, 60))
+        assert precomputer.metrics.skipped == 1
+
+    def test_hit_after_write_rate(self):
+        precomputer = self._precomputer(AsyncMock())
+        precomputer.remember(_base())
+        precomputer.record_read("user-001", cache_hit=False)  # 書き込み前の取得は数えない
+        precomputer.publish(SleepSettingsChanged("user-001", 7, 0, 8, 60))
+        precomputer.record_read("user-001", cache_hit=True)
+        precomputer.record_read("user-001", cache_hit=True)
+        assert precomputer.snapshot()["reads_after_write"] == 1
+        assert precomputer.snapshot()["hit_after_write_rate"] == 1.0
+
+    def test_evicted_users_stop_awaiting_a_read(self):
+        precomputer = self._precomputer(AsyncMock(), max_users=2)
+        precomputer.remember(_base())
+        precomputer.publish(SleepSettingsChanged("user-001", 7, 0, 8, 60))
+        # 書き込んだあと読みに来ないまま、他のユーザーに押し出される
+        for user_id in ("user-002", "user-003"):
+            precomputer.remember(GetOrCreatePlanInput(user_id, [], [], {}, TODAY))
+        assert precomputer._awaiting_read == set()
+
+
+class _RecordingSubscriber:
+    def __init__(self):
+        self.events: list[object] = []
+
+    def publish(self, event) -> bool:
+        self.events.append(event)
+        return True
+
+
+class TestAfterCommitEventPublisher:
+    async def test_events_reach_subscribers_only_after_commit(self):
+        subscriber = _RecordingSubscriber()
+        event = SleepSettingsChanged("user-001", 7, 0, 8, 60)
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("SELECT 1"))
+            assert AfterCommitEventPublisher(session, [subscriber]).publish(event)
+            assert subscriber.events == []
+            await session.commit()
+        assert subscriber.events == [event]
+
+    async def test_rolled_back_events_are_discarded(self):
+        subscriber = _RecordingSubscriber()
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("SELECT 1"))
+            AfterCommitEventPublisher(session, [subscriber]).publish(
+                SleepSettingsChanged("user-001", 7, 0, 8, 60)
+            )
+            await session.rollback()
+            # 同じセッションの次のトランザクションの COMMIT でも発行しない
+            await session.execute(text("SELECT 1"))
+            await session.commit()
+        assert subscriber.events == []
+
+
+class TestPrecomputeAfterWriteAPI:
+    @pytest.fixture
+    def generator(self):
+        mock = AsyncMock()
+        mock.generate_week_plan = AsyncMock(return_value={"week_plan": [{"advice": "テスト"}]})
+        return mock
+
+    @pytest.fixture
+    def precomputer(self, generator):
+        def factory():
+            return GetOrCreatePlanUseCase(
+                ShortLivedSleepPlanCacheRepository(session_scope), generator
+            )
+
+        return PlanPrecomputer(factory, debounce_seconds=0.01, today=lambda: TODAY)
+
+    async def test_next_plan_request_after_log_write_is_a_hit(
+        self, client: AsyncClient, unique_email: str, generator, precomputer: PlanPrecomputer
+    ):
+        app.dependency_overrides[get_plan_generator] = lambda: generator
+        app.dependency_overrides[get_event_subscribers] = lambda: [precomputer]
+        app.dependency_overrides[get_plan_precomputer] = lambda: precomputer
+        precomputer.start()
+        try:
+            res = await client.post("/api/v1/users", json={"email": unique_email, "name": "Pre"})
+            user_id = res.json()["id"]
+            app.dependency_overrides[get_current_user_id] = lambda: user_id
+
+            body = {
+                "calendar_events": EVENTS,
+                "sleep_logs": [FRONTEND_LOG],
+                "settings": FRONTEND_SETTINGS,
+                "today_date": TODAY,
+            }
+            first = await client.post("/api/v1/sleep-plans", json=body)
+            assert first.headers["x-plan-cache"] == "miss"
+
+            log = {
+                "date": "2026-03-01",
+                "score": 65,
+                "scheduled_sleep_time": "2026-03-01T23:15:00+09:00",
+            }
+            assert (await client.post("/api/v1/sleep-logs", json=log)).status_code == 201
+            await precomputer.join()
+            assert generator.generate_week_plan.await_count == 2
+
+            # フロントエンドは作成したログを先頭に加えて送る
+            body["sleep_logs"] = [{**log, "mood": None}, FRONTEND_LOG]
+            second = await client.post("/api/v1/sleep-plans", json=body)
+            assert second.headers["x-plan-cache"] == "hit"
+            assert generator.generate_week_plan.await_count == 2
+            assert precomputer.metrics.hits_after_write == 1
+        finally:
+            await precomputer.stop()
+            for dep in (get_plan_generator, get_event_subscribers, get_plan_precomputer):
+                app.dependency_overrides.pop(dep, None)
@@ -3,6 +3,8 @@ GetOrCreatePlanUseCase の単体テスト（リポジトリ・LLM をモック
 todayOverride, force, cache_hit の振る舞いを検証する。
 """
 
+import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -10,7 +12,13 @@ import pytest
 from app.application.plan import (
     GetOrCreatePlanInput,
     GetOrCreatePlanUseCase,
+    PlanGenerationMetrics,
+    PlanRateLimitedError,
 )
+from app.application.plan.ports import PlanGeneratorUnavailableError, RateLimitPolicy
+from app.infrastructure.llm.circuit_breaker import CircuitBreaker
+from app.infrastructure.ratelimit import InMemoryRateLimiter
+from app.infrastructure.singleflight import InMemoryGenerationLease
 
 
 class TestGetOrCreatePlanUseCase:
@@ -45,8 +53,10 @@ class TestGetOrCreatePlanUseCase:
         usecase = GetOrCreatePlanUseCase(mock_cache_repo, mock_plan_generator)
         result = await usecase.execute(sample_input)
 
-        assert result["week_plan"] == cached_plan["week_plan"]
-        assert result["cache_hit"] is True
+        # ヒット時は保存済み JSON 文字列をパースせずそのまま返す
+        assert result.plan_json is mock_row.plan_json
+        assert json.loads(result.plan_json)["week_plan"] == cached_plan["week_plan"]
+        assert result.cache_hit is True
         mock_cache_repo.get_by_user_and_hash.assert_called_once()
         mock_cache_repo.upsert.assert_not_called()
         mock_plan_generator.generate_week_plan.assert_not_called()
@@ -62,14 +72,17 @@ class TestGetOrCreatePlanUseCase:
         usecase = GetOrCreatePlanUseCase(mock_cache_repo, mock_plan_generator)
         result = await usecase.execute(sample_input)
 
-        assert result["week_plan"] == llm_plan["week_plan"]
-        assert result["cache_hit"] is False
+        assert json.loads(result.plan_json)["week_plan"] == llm_plan["week_plan"]
+        assert result.cache_hit is False
         mock_cache_repo.get_by_user_and_hash.assert_called_once()
         mock_cache_repo.upsert.assert_called_once()
         kwargs = mock_cache_repo.upsert.call_args[1]
         assert kwargs["user_id"] == "user-001"
-        assert kwargs["signature_hash"]
+        assert kwargs["signature_hash"] == result.signature_hash
         assert '"week_plan"' in kwargs["plan_json"]
+        # 保存する JSON とレスポンス用の JSON は同一（cache_hit は保存しない）
+        assert kwargs["plan_json"] == result.plan_json
+        assert "cache_hit" not in json.loads(kwargs["plan_json"])
 
     async def test_force_skips_cache(self, mock_cache_repo, mock_plan_generator):
         """force=True の場合はキャッシュを検索せず LLM を呼ぶ"""
@@ -87,13 +100,15 @@ class TestGetOrCreatePlanUseCase:
         usecase = GetOrCreatePlanUseCase(mock_cache_repo, mock_plan_generator)
         result = await usecase.execute(input_data)
 
-        assert result["week_plan"] == llm_plan["week_plan"]
-        assert result["cache_hit"] is False
+        assert json.loads(result.plan_json)["week_plan"] == llm_plan["week_plan"]
+        assert result.cache_hit is False
         # force=True なのでキャッシュ検索は行われない
         mock_cache_repo.get_by_user_and_hash.assert_not_called()
         mock_cache_repo.upsert.assert_called_once()
 
-    async def test_today_override_in_settings_passed_to_generator(self, mock_cache_repo, mock_plan_generator):
+    async def test_today_override_in_settings_passed_to_generator(
+        self, mock_cache_repo, mock_plan_generator
+    ):
         """settings 内の today_override が LLM ジェネレータに渡されること"""
         mock_cache_repo.get_by_user_and_hash.return_value = None
         llm_plan = {"week_plan": [{"day": "月曜", "advice": "オーバーライド反映"}]}
@@ -140,7 +155,9 @@ class TestGetOrCreatePlanUseCase:
         call_kwargs = mock_plan_generator.generate_week_plan.call_args[1]
         assert call_kwargs["today_date"] == "2026-02-20"
 
-    async def test_today_override_in_settings_changes_signature(self, mock_cache_repo, mock_plan_generator):
+    async def test_today_override_in_settings_changes_signature(
+        self, mock_cache_repo, mock_plan_generator
+    ):
         """settings 内の today_override が異なると署名ハッシュも変わる"""
         mock_cache_repo.get_by_user_and_hash.return_value = None
         llm_plan = {"week_plan": []}
@@ -180,3 +197,212 @@ class TestGetOrCreatePlanUseCase:
         hash_with_override = mock_cache_repo.get_by_user_and_hash.call_args[0][1]
 
         assert hash_no_override != hash_with_override
+
+
+class TestGetOrCreatePlanRateLimit:
+    """LLM 生成のレート制限（超過時は最後のキャッシュを stale で返す）"""
+
+    POLICY = RateLimitPolicy(burst=1, refill_per_second=1 / 60)
+
+    @pytest.fixture
+    def limiter(self):
+        return InMemoryRateLimiter(clock=lambda: 0.0)
+
+    def _input(self, force: bool, wake: str = "07:00") -> GetOrCreatePlanInput:
+        return GetOrCreatePlanInput(
+            user_id="user-001",
+            calendar_events=[],
+            sleep_logs=[],
+            settings={"wake_up_time": wake},
+            force=force,
+        )
+
+    def _usecase(self, cache_repo, generator, limiter) -> GetOrCreatePlanUseCase:
+        return GetOrCreatePlanUseCase(
+            cache_repo,
+            generator,
+            rate_limiter=limiter,
+            force_policy=self.POLICY,
+            generate_policy=self.POLICY,
+        )
+
+    async def test_force_over_limit_returns_last_cached_plan_as_stale(self, limiter):
+        cache_repo = AsyncMock()
+        generator = AsyncMock()
+        generator.generate_week_plan.return_value = {"week_plan": []}
+        last = MagicMock()
+        last.plan_json = '{"week_plan": ["last"]}'
+        last.signature_hash = "old-signature"
+        cache_repo.get_by_user_id.return_value = last
+        usecase = self._usecase(cache_repo, generator, limiter)
+
+        first = await usecase.execute(self._input(force=True))
+        assert first.cache_hit is False
+
+        second = await usecase.execute(self._input(force=True, wake="08:00"))
+        assert second.stale is True
+        assert second.cache_hit is True
+        assert second.plan_json == last.plan_json
+        assert second.retry_after_seconds == pytest.approx(60)
+        generator.generate_week_plan.assert_called_once()
+
+    async def test_cache_hit_does_not_consume_tokens(self, limiter):
+        cache_repo = AsyncMock()
+        hit = MagicMock()
+        hit.plan_json = '{"week_plan": []}'
+        cache_repo.get_by_user_and_hash.return_value = hit
+        usecase = self._usecase(cache_repo, AsyncMock(), limiter)
+
+        for _ in range(3):
+            result = await usecase.execute(self._input(force=False))
+            assert result.cache_hit is True and result.stale is False
+
+    async def test_over_limit_without_cache_raises(self, limiter):
+        cache_repo = AsyncMock()
+        cache_repo.get_by_user_and_hash.return_value = None
+        cache_repo.get_by_user_id.return_value = None
+        generator = AsyncMock()
+        generator.generate_week_plan.return_value = {"week_plan": []}
+        usecase = self._usecase(cache_repo, generator, limiter)
+
+        await usecase.execute(self._input(force=False))
+        with pytest.raises(PlanRateLimitedError) as exc_info:
+            await usecase.execute(self._input(force=False, wake="08:00"))
+        assert exc_info.value.retry_after_seconds == pytest.approx(60)
+
+    async def test_open_breaker_does_not_consume_tokens(self, limiter):
+        cache_repo = AsyncMock()
+        cache_repo.get_by_user_and_hash.return_value = None
+        generator = AsyncMock()
+        generator.generate_week_plan.return_value = {"week_plan": []}
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        usecase = GetOrCreatePlanUseCase(
+            cache_repo,
+            generator,
+            rate_limiter=limiter,
+            generate_policy=self.POLICY,
+            availability=breaker,
+        )
+
+        with pytest.raises(PlanGeneratorUnavailableError):
+            await usecase.execute(self._input(force=False))
+        breaker.record_success()
+        result = await usecase.execute(self._input(force=False))
+        assert result.cache_hit is False
+        generator.generate_week_plan.assert_called_once()
+
+
+class _DictCacheRepo:
+    """(user_id, signature_hash) → plan_json の最小限のキャッシュ（ワーカー間で共有される DB 相当）"""
+
+    def __init__(self):
+        self.rows: dict[tuple[str, str], str] = {}
+
+    async def get_by_user_and_hash(self, user_id: str, signature_hash: str):
+        plan_json = self.rows.get((user_id, signature_hash))
+        return MagicMock(plan_json=plan_json) if plan_json is not None else None
+
+    async def get_by_user_id(self, user_id: str):
+        return None
+
+    async def upsert(self, user_id: str, signature_hash: str, plan_json: str) -> None:
+        self.rows[(user_id, signature_hash)] = plan_json
+
+
+class TestGetOrCreatePlanSingleFlight:
+    """同じ入力の同時リクエストはリースで 1 つの LLM 生成にまとまる"""
+
+    def _input(self, force: bool = False) -> GetOrCreatePlanInput:
+        return GetOrCreatePlanInput(
+            user_id="user-001", calendar_events=[], sleep_logs=[], settings={}, force=force
+        )
+
+    def _generator(self, delay: float, fail_first: bool = False) -> AsyncMock:
+        calls = []
+
+        async def generate(*args, **kwargs):
+            calls.append(1)
+            await asyncio.sleep(delay)
+            if fail_first and len(calls) == 1:
+                raise RuntimeError("LLM error")
+            return {"week_plan": [len(calls)]}
+
+        return AsyncMock(side_effect=generate)
+
+    def _usecase(self, cache_repo, generator, lease, metrics, wait: float = 5.0):
+        plan_generator = MagicMock()
+        plan_generator.generate_week_plan = generator
+        return GetOrCreatePlanUseCase(
+            cache_repo,
+            plan_generator,
+            lease=lease,
+            wait_timeout_seconds=wait,
+            poll_interval_seconds=0.01,
+            metrics=metrics,
+        )
+
+    @pytest.mark.parametrize("force", [False, True])
+    async def test_concurrent_requests_call_llm_once(self, force):
+        cache_repo = _DictCacheRepo()
+        lease = InMemoryGenerationLease()
+        metrics = PlanGenerationMetrics()
+        generator = self._generator(delay=0.1)
+        # ワーカーごとに別の UseCase（共有するのはリースとキャッシュだけ）
+        results = await asyncio.gather(
+            *(
+                self._usecase(cache_repo, generator, lease, metrics).execute(self._input(force))
+                for _ in range(4)
+            )
+        )
+
+        assert generator.await_count == 1
+        assert len({r.plan_json for r in results}) == 1
+        assert sorted(r.cache_hit for r in results) == [False, True, True, True]
+        assert metrics.snapshot() == {
+            "lease_acquired": 1,
+            "lease_contended": 3,
+            "coalesced": 3,
+            "wait_timeouts": 0,
+            "llm_calls": 1,
+            "partial_generations": 0,
+            "partial_fallbacks": 0,
+            "assembled": 0,
+            "days_reused": 0,
+            "days_generated": 0,
+        }
+        assert not await lease.is_held(f"plan:user-001:{results[0].signature_hash}")
+
+    async def test_waiter_takes_over_when_generation_fails(self):
+        cache_repo = _DictCacheRepo()
+        lease = InMemoryGenerationLease()
+        metrics = PlanGenerationMetrics()
+        generator = self._generator(delay=0.05, fail_first=True)
+        first, second = await asyncio.gather(
+            self._usecase(cache_repo, generator, lease, metrics).execute(self._input()),
+            self._usecase(cache_repo, generator, lease, metrics).execute(self._input()),
+            return_exceptions=True,
+        )
+
+        assert isinstance(first, RuntimeError)
+        assert second.cache_hit is False
+        assert metrics.lease_acquired == 2 and metrics.coalesced == 0
+        assert generator.await_count == 2
+
+    async def test_wait_timeout_generates_without_lease(self):
+        cache_repo = _DictCacheRepo()
+        lease = InMemoryGenerationLease()
+        metrics = PlanGenerationMetrics()
+        generator = self._generator(delay=0.2)
+        results = await asyncio.gather(
+            *(
+                self._usecase(cache_repo, generator, lease, metrics, wait=0.05).execute(
+                    self._input()
+                )
+                for _ in range(2)
+            )
+        )
+
+        assert [r.cache_hit for r in results] == [False, False]
+        assert metrics.wait_timeouts == 1
+        assert metrics.llm_calls == 2
@@ -0,0 +1,246 @@
+"""
+エンドポイントごとの SQL 実行数の予算（@query_budget）のテスト
+全ての API ルートに予算が宣言され、キャッシュが冷えた状態の 1 リクエストが予算内に収まることを確認する。
+準備のリクエストは数えず、計測するリクエストだけを statement_counter で数える。
+"""
+
+import logging
+from collections.abc import Awaitable, Callable
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.routing import APIRoute
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.infrastructure.cache import cache_registry
+from app.infrastructure.persistence.database import get_db
+from app.infrastructure.persistence.statement_counter import StatementCounter
+from app.main import API_ROUTERS
+from app.presentation.api.plan import get_plan_generator
+from app.presentation.dependencies.auth import get_current_user_id, require_admin
+from app.presentation.middleware import DbStatsMiddleware
+from app.presentation.query_budget import query_budget, route_query_budget
+from tests.conftest import fastapi_app as app
+
+TODAY = "2026-03-02"
+LOG = {"date": "2026-03-01", "score": 80}
+PLAN_BODY = {"settings": {"wake_up_time": "07:00"}, "today_date": TODAY}
+
+Scenario = Callable[[AsyncClient, str], Awaitable[Callable[[], Awaitable[Response]]]]
+SCENARIOS: dict[tuple[str, str], Scenario] = {}
+
+
+def scenario(method: str, path: str) -> Callable[[Scenario], Scenario]:
+    """(method, ルートのパス) の計測シナリオ。準備をして、計測するリクエストを返す"""
+
+    def decorator(fn: Scenario) -> Scenario:
+        SCENARIOS[(method, path)] = fn
+        return fn
+
+    return decorator
+
+
+def _api_routes() -> dict[tuple[str, str], APIRoute]:
+    return {
+        (method, settings.API_PREFIX + route.path): route
+        for router in API_ROUTERS
+        for route in router.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+
+
+@scenario("GET", "/api/v1/health")
+async def _health(client, user_id):
+    return lambda: client.get("/api/v1/health")
+
+
+@scenario("GET", "/api/v1/health/live")
+async def _health_live(client, user_id):
+    return lambda: client.get("/api/v1/health/live")
+
+
+@scenario("GET", "/api/v1/health/ready")
+async def _health_ready(client, user_id):
+    return lambda: client.get("/api/v1/health/ready")
+
+
+@scenario("GET", "/api/v1/health/metrics")
+async def _health_metrics(client, user_id):
+    return lambda: client.get("/api/v1/health/metrics")
+
+
+@scenario("GET", "/api/v1/health/db")
+async def _health_db(client, user_id):
+    return lambda: client.get("/api/v1/health/db")
+
+
+@scenario("POST", "/api/v1/users")
+async def _create_user(client, user_id):
+    return lambda: client.post(
+        "/api/v1/users", json={"email": f"b-{user_id}@example.com", "name": "B"}
+    )
+
+
+@scenario("GET", "/api/v1/users")
+async def _list_users(client, user_id):
+    return lambda: client.get("/api/v1/users?limit=5")
+
+
+@scenario("GET", "/api/v1/users/{user_id}")
+async def _get_user(client, user_id):
+    return lambda: client.get(f"/api/v1/users/{user_id}")
+
+
+@scenario("PUT", "/api/v1/users/{user_id}")
+async def _update_user(client, user_id):
+    return lambda: client.put(f"/api/v1/users/{user_id}", json={"name": "Renamed"})
+
+
+@scenario("DELETE", "/api/v1/users/{user_id}")
+async def _delete_user(client, user_id):
+    return lambda: client.delete(f"/api/v1/users/{user_id}")
+
+
+@scenario("GET", "/api/v1/settings")
+async def _get_settings(client, user_id):
+    await client.put("/api/v1/settings", json={"wake_up_time": "07:00"})
+    return lambda: client.get("/api/v1/settings")
+
+
+@scenario("PUT", "/api/v1/settings")
+async def _put_settings(client, user_id):
+    return lambda: client.put("/api/v1/settings", json={"wake_up_time": "07:00"})
+
+
+@scenario("GET", "/api/v1/sleep-logs")
+async def _list_logs(client, user_id):
+    await client.post("/api/v1/sleep-logs", json=LOG)
+    return lambda: client.get("/api/v1/sleep-logs")
+
+
+@scenario("POST", "/api/v1/sleep-logs")
+async def _create_log(client, user_id):
+    return lambda: client.post("/api/v1/sleep-logs", json=LOG)
+
+
+@scenario("PATCH", "/api/v1/sleep-logs/{log_id}")
+async def _update_log(client, user_id):
+    log_id = (await client.post("/api/v1/sleep-logs", json=LOG)).json()["id"]
+    return lambda: client.patch(
+        f"/api/v1/sleep-logs/{log_id}", json={"date": "2026-02-28", "mood": 3}
+    )
+
+
+@scenario("GET", "/api/v1/sleep-plans/current")
+async def _current_plan(client, user_id):
+    await client.post("/api/v1/sleep-plans", json=PLAN_BODY)
+    return lambda: client.get("/api/v1/sleep-plans/current")
+
+
+@scenario("POST", "/api/v1/sleep-plans")
+async def _generate_plan(client, user_id):
+    # キャッシュミス（LLM 生成・週と日の保存）
+    return lambda: client.post("/api/v1/sleep-plans", json=PLAN_BODY)
+
+
+@scenario("POST", "/api/v1/calendar/sync")
+async def _calendar_sync(client, user_id):
+    first = (
+        await client.post("/api/v1/calendar/sync", json={"upserted": [{"id": "a", "title": "A"}]})
+    ).json()
+    return lambda: client.post(
+        "/api/v1/calendar/sync",
+        json={
+            "sync_token": first["sync_token"],
+            "upserted": [{"id": "b", "title": "B"}],
+            "deleted": ["a"],
+        },
+    )
+
+
+@scenario("GET", "/api/v1/debug/slow-queries")
+async def _slow_queries(client, user_id):
+    app.dependency_overrides[require_admin] = lambda: user_id
+    return lambda: client.get("/api/v1/debug/slow-queries")
+
+
+@scenario("DELETE", "/api/v1/debug/slow-queries")
+async def _clear_slow_queries(client, user_id):
+    app.dependency_overrides[require_admin] = lambda: user_id
+    return lambda: client.delete("/api/v1/debug/slow-queries")
+
+
+@scenario("GET", "/api/v1/debug/health")
+async def _detailed_health(client, user_id):
+    app.dependency_overrides[require_admin] = lambda: user_id
+    return lambda: client.get("/api/v1/debug/health")
+
+
+@pytest.fixture
+def generator():
+    mock = AsyncMock()
+    mock.generate_week_plan = AsyncMock(
+        return_value={"week_plan": [{"date": TODAY, "advice": "テスト"}]}
+    )
+    app.dependency_overrides[get_plan_generator] = lambda: mock
+    yield mock
+    app.dependency_overrides.pop(get_plan_generator, None)
+
+
+def test_every_api_route_declares_a_budget():
+    missing = [key for key, route in _api_routes().items() if route_query_budget(route) is None]
+    assert missing == []
+
+
+def test_every_budget_has_a_scenario():
+    assert set(_api_routes()) == set(SCENARIOS)
+
+
+@pytest.mark.parametrize("key", list(SCENARIOS), ids=lambda k: f"{k[0]} {k[1]}")
+async def test_route_stays_within_budget(
+    key: tuple[str, str],
+    client: AsyncClient,
+    unique_email: str,
+    statement_counter: StatementCounter,
+    generator,
+):
+    user_id = (
+        await client.post("/api/v1/users", json={"email": unique_email, "name": "Budget"})
+    ).json()["id"]
+    app.dependency_overrides[get_current_user_id] = lambda: user_id
+    overrides = dict(app.dependency_overrides)
+    try:
+        send = await SCENARIOS[key](client, user_id)
+        # 準備で温まった既知ユーザー・設定のキャッシュを空にし、冷えた状態で数える
+        cache_registry.set_connected(False)
+        statement_counter.reset()
+        res = await send()
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
+
+    assert res.status_code < 400, res.text
+    budget = route_query_budget(_api_routes()[key])
+    statement_counter.assert_at_most(budget, f"{key[0]} {key[1]}")
+
+
+async def test_middleware_warns_when_budget_is_exceeded(caplog: pytest.LogCaptureFixture):
+    mini = FastAPI()
+
+    @mini.get("/chatty")
+    @query_budget(1)
+    async def chatty(db: AsyncSession = Depends(get_db)):
+        await db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 2"))
+        return {"ok": True}
+
+    mini.add_middleware(DbStatsMiddleware)
+    async with AsyncClient(transport=ASGITransport(app=mini), base_url="http://test") as ac:
+        with caplog.at_level(logging.WARNING, logger="app.presentation.middleware.db_stats"):
+            assert (await ac.get("/chatty")).status_code == 200
+    assert "exceeds query budget 1" in caplog.text
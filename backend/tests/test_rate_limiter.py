@@ -0,0 +1,83 @@
+"""
+レート制限（トークンバケット）のテスト。PostgresRateLimiter は実 DB を使う。
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from app.application.plan.ports import RateLimitPolicy
+from app.infrastructure.persistence.database import session_scope
+from app.infrastructure.ratelimit import InMemoryRateLimiter, PostgresRateLimiter
+
+# 連続 2 回まで、以降 10 秒に 1 回
+POLICY = RateLimitPolicy(burst=2, refill_per_second=0.1)
+
+
+class TestInMemoryRateLimiter:
+    async def test_burst_then_refill(self):
+        now = [0.0]
+        limiter = InMemoryRateLimiter(clock=lambda: now[0])
+
+        assert (await limiter.acquire("k", POLICY)).allowed
+        assert (await limiter.acquire("k", POLICY)).allowed
+        denied = await limiter.acquire("k", POLICY)
+        assert denied.allowed is False
+        assert denied.retry_after_seconds == pytest.approx(10)
+
+        now[0] += 5
+        denied = await limiter.acquire("k", POLICY)
+        assert denied.retry_after_seconds == pytest.approx(5)
+
+        now[0] += 5
+        assert (await limiter.acquire("k", POLICY)).allowed
+        assert (await limiter.acquire("other", POLICY)).allowed
+
+    async def test_refill_is_capped_at_burst(self):
+        now = [0.0]
+        limiter = InMemoryRateLimiter(clock=lambda: now[0])
+        now[0] += 3600
+        results = [(await limiter.acquire("k", POLICY)).allowed for _ in range(3)]
+        assert results == [True, True, False]
+
+    async def test_refilled_buckets_are_swept(self):
+        now = [0.0]
+        limiter = InMemoryRateLimiter(clock=lambda: now[0], sweep_interval_seconds=60)
+        for i in range(100):
+            await limiter.acquire(f"user-{i}", POLICY)
+        await limiter.acquire("busy", POLICY)
+        await limiter.acquire("busy", POLICY)
+        assert limiter.bucket_count == 101
+
+        # 1 トークン使ったバケットは 10 秒、2 トークン使ったバケットは 20 秒で満タンに戻る
+        now[0] = 55
+        await limiter.acquire("busy", POLICY)  # 65 秒まで満タンにならない
+        now[0] = 60
+        await limiter.acquire("new", POLICY)
+        assert limiter.bucket_count == 2  # busy と new だけ残る
+
+        # 捨てたキーは初めてのキーと同じく burst から始まる
+        results = [(await limiter.acquire("user-0", POLICY)).allowed for _ in range(3)]
+        assert results == [True, True, False]
+
+
+class TestPostgresRateLimiter:
+    @pytest.fixture
+    def limiter(self) -> PostgresRateLimiter:
+        return PostgresRateLimiter(session_scope)
+
+    async def test_burst_then_denied_with_retry_after(self, limiter: PostgresRateLimiter):
+        key = f"test:{uuid.uuid4()}"
+        assert (await limiter.acquire(key, POLICY)).allowed
+        assert (await limiter.acquire(key, POLICY)).allowed
+        denied = await limiter.acquire(key, POLICY)
+        assert denied.allowed is False
+        assert 0 < denied.retry_after_seconds <= 10
+
+    async def test_concurrent_acquires_do_not_overspend(self, limiter: PostgresRateLimiter):
+        key = f"test:{uuid.uuid4()}"
+        policy = RateLimitPolicy(burst=3, refill_per_second=0.001)
+        await limiter.acquire(key, policy)  # 行を作成
+        decisions = await asyncio.gather(*(limiter.acquire(key, policy) for _ in range(6)))
+        assert sum(d.allowed for d in decisions) == 2
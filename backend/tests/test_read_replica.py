@@ -0,0 +1,147 @@
+"""
+読み取りレプリカへのルーティングと read-your-writes（書き込み直後の primary 固定）のテスト
+レプリカには同じサーバー上の別データベースを使う（レプリケーションはしないので、
+どちらから読んだかを値の違いで判別できる）。
+"""
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.infrastructure.cache import cache_registry
+from app.infrastructure.persistence import database
+from app.infrastructure.persistence.database import Base, ReadYourWritesTracker
+from app.infrastructure.persistence.models.sleep_settings import SleepSettings
+from app.infrastructure.persistence.models.user import User
+from app.presentation.dependencies.auth import get_current_user_id
+from tests.conftest import fastapi_app as app
+
+REPLICA_DB_NAME = "sleepsupport_test_replica"
+STICKY_SECONDS = 5.0
+
+
+class TestReadYourWritesTracker:
+    """書き込み後の固定期間の判定"""
+
+    def test_sticky_within_window_then_expires(self):
+        now = [100.0]
+        tracker = ReadYourWritesTracker(STICKY_SECONDS, clock=lambda: now[0])
+        assert tracker.is_sticky("u1") is False
+
+        tracker.mark_write("u1")
+        assert tracker.is_sticky("u1") is True
+        assert tracker.is_sticky("u2") is False
+
+        now[0] += STICKY_SECONDS
+        assert tracker.is_sticky("u1") is False
+
+    def test_expired_writers_are_dropped_on_next_write(self):
+        now = [100.0]
+        tracker = ReadYourWritesTracker(STICKY_SECONDS, clock=lambda: now[0])
+        for i in range(100):
+            tracker.mark_write(f"writer-{i}")  # 書き込んだあと読みに来ないユーザー
+        now[0] += STICKY_SECONDS
+        tracker.mark_write("u1")
+        assert len(tracker) == 1
+        assert tracker.is_sticky("u1") is True
+
+    def test_zero_window_disables_sticky(self):
+        tracker = ReadYourWritesTracker(0)
+        tracker.mark_write("u1")
+        assert tracker.is_sticky("u1") is False
+
+
+@pytest.fixture
+async def replica(monkeypatch: pytest.MonkeyPatch):
+    """別データベースをレプリカとして差し込み、時計を固定したトラッカーに差し替える（キャッシュ無効）"""
+    url = make_url(settings.DATABASE_URL)
+    admin = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            exists = await conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": REPLICA_DB_NAME},
+            )
+            if not exists:
+                await conn.execute(text(f'CREATE DATABASE "{REPLICA_DB_NAME}"'))
+    except Exception as e:
+        pytest.skip(f"replica database unavailable: {e}")
+    finally:
+        await admin.dispose()
+
+    replica_engine = create_async_engine(url.set(database=REPLICA_DB_NAME))
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = [0.0]
+    monkeypatch.setattr(database, "replica_engine", replica_engine)
+    monkeypatch.setattr(
+        database,
+        "ReadSessionLocal",
+        async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    monkeypatch.setattr(
+        database, "write_tracker", ReadYourWritesTracker(STICKY_SECONDS, clock=lambda: now[0])
+    )
+    # どちらから読んだかを値で判別するため、プロセス内キャッシュは使わない
+    monkeypatch.setattr(cache_registry, "fallback_ttl_seconds", 0)
+
+    user_id = str(uuid.uuid4())
+    app.dependency_overrides[get_current_user_id] = lambda: user_id
+    try:
+        yield SimpleNamespace(engine=replica_engine, user_id=user_id, now=now)
+    finally:
+        app.dependency_overrides.pop(get_current_user_id, None)
+        await replica_engine.dispose()
+
+
+async def _seed_replica_settings(replica_engine, user_id: str, wake_up_hour: int) -> None:
+    """レプリカ側だけに設定行を入れる（primary とは別の値）"""
+    async with AsyncSession(replica_engine) as session:
+        session.add(User(id=user_id, email=f"replica-{user_id[:8]}@example.com", name="Replica"))
+        await session.flush()
+        session.add(SleepSettings(user_id=user_id, wake_up_hour=wake_up_hour))
+        await session.commit()
+
+
+class TestReadReplicaRouting:
+    """GET はレプリカ、書き込み直後のユーザーは一定時間 primary から読む"""
+
+    async def test_get_settings_reads_replica_and_sticks_to_primary_after_write(
+        self, client: AsyncClient, replica
+    ):
+        await _seed_replica_settings(replica.engine, replica.user_id, wake_up_hour=5)
+
+        res = await client.get("/api/v1/settings")
+        assert res.status_code == 200
+        assert res.json()["wake_up_hour"] == 5  # レプリカの値
+
+        put = await client.put(
+            "/api/v1/settings",
+            json={"wake_up_hour": 6, "wake_up_minute": 0, "sleep_duration_hours": 8},
+        )
+        assert put.status_code == 200
+
+        res = await client.get("/api/v1/settings")
+        assert res.json()["wake_up_hour"] == 6  # 書き込み直後は primary
+
+        replica.now[0] += STICKY_SECONDS
+        res = await client.get("/api/v1/settings")
+        assert res.json()["wake_up_hour"] == 5  # 固定期間が過ぎればレプリカに戻る
+
+    async def test_read_only_routes_do_not_mark_user_sticky(self, client: AsyncClient, replica):
+        for path in ("/api/v1/settings", "/api/v1/sleep-logs", "/api/v1/sleep-plans/current"):
+            res = await client.get(path)
+            assert res.status_code in (200, 404)
+        assert database.write_tracker.is_sticky(replica.user_id) is False
+
+    async def test_health_db_reports_replica(self, client: AsyncClient, replica):
+        res = await client.get("/api/v1/health/db")
+        assert res.status_code == 200
+        assert res.json() == {"status": "healthy", "database": "connected", "replica": "connected"}
@@ -0,0 +1,150 @@
+"""
+Server-Timing（区間内訳）のテスト
+timed() の記録・ServerTimingMiddleware のヘッダーとサンプリング・プラン取得の区間を検証する。
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.application.timing import (
+    RequestTiming,
+    ServerTimingMetrics,
+    current_timing,
+    timed,
+)
+from app.config import settings
+from app.main import create_app
+from app.presentation.api.plan import get_plan_generator
+from app.presentation.dependencies import auth
+from app.presentation.middleware import ServerTimingMiddleware
+from tests.conftest import TEST_USER_ID
+
+
+def _spans(header: str) -> dict[str, float]:
+    spans = {}
+    for part in header.split(","):
+        name, dur = part.strip().split(";dur=")
+        spans[name] = float(dur)
+    return spans
+
+
+def _app(sample_rate: float, metrics: ServerTimingMetrics, **options) -> FastAPI:
+    mini = FastAPI()
+
+    @mini.get("/work")
+    async def work():
+        with timed("step"):
+            pass
+        with timed("step"):
+            pass
+        return {"ok": True}
+
+    mini.add_middleware(ServerTimingMiddleware, sample_rate=sample_rate, metrics=metrics, **options)
+    return mini
+
+
+class TestTimed:
+    def test_noop_without_sampled_request(self):
+        with timed("anything"):
+            pass
+        assert current_timing.get() is None
+
+    def test_same_name_is_summed(self):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            for _ in range(3):
+                with timed("db"):
+                    pass
+        finally:
+            current_timing.reset(token)
+        assert list(timing.spans) == ["db"]
+        assert timing.spans["db"][1] == 3
+        assert timing.header_value().endswith(f"total;dur={timing.total * 1000:.1f}")
+
+
+class TestServerTimingMiddleware:
+    async def test_header_and_metrics(self):
+        metrics = ServerTimingMetrics()
+        app = _app(1.0, metrics, public=True, allow_origins=["https://app.example"])
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            res = await client.get("/work", headers={"Origin": "https://app.example"})
+            other = await client.get("/work", headers={"Origin": "https://evil.example"})
+        assert list(_spans(res.headers["server-timing"])) == ["step", "total"]
+        assert res.headers["timing-allow-origin"] == "https://app.example"
+        assert "timing-allow-origin" not in other.headers
+        snapshot = metrics.snapshot()
+        assert snapshot["requests"] == 2
+        assert snapshot["spans"]["step"]["count"] == 2
+
+    async def test_header_is_not_public_by_default(self):
+        metrics = ServerTimingMetrics()
+        async with AsyncClient(
+            transport=ASGITransport(app=_app(1.0, metrics)), base_url="http://test"
+        ) as client:
+            res = await client.get("/work")
+        assert "server-timing" not in res.headers
+        # 集計はヘッダーを返さないリクエストも含める
+        assert metrics.snapshot()["spans"]["step"]["count"] == 1
+
+    async def test_sampling_off(self):
+        metrics = ServerTimingMetrics()
+        async with AsyncClient(
+            transport=ASGITransport(app=_app(0.0, metrics)), base_url="http://test"
+        ) as client:
+            res = await client.get("/work")
+        assert "server-timing" not in res.headers
+        assert metrics.requests == 0
+
+
+def test_disabled_by_default():
+    # ヘッダーは誰にでも返るため、明示的に有効にしない限り付けない
+    assert settings.SERVER_TIMING_SAMPLE_RATE == 0.0
+
+
+async def _post_plan(client: AsyncClient, monkeypatch: pytest.MonkeyPatch):
+    """実際の認証（JWT 検証だけ差し替え）で POST /sleep-plans を呼ぶ"""
+    monkeypatch.setattr(auth, "verify_supabase_jwt", lambda token: TEST_USER_ID)
+    body = {"calendar_events": [], "settings": {"wake_up_time": "06:45"}}
+    return await client.post(
+        "/api/v1/sleep-plans", json=body, headers={"Authorization": "Bearer test"}
+    )
+
+
+@pytest.fixture
+def timed_app(monkeypatch: pytest.MonkeyPatch) -> FastAPI:
+    """全リクエストを計測する新しいアプリ（LLM は偽物）"""
+    monkeypatch.setattr(settings, "SERVER_TIMING_SAMPLE_RATE", 1.0)
+    app = create_app()
+    generator = AsyncMock()
+    generator.generate_week_plan = AsyncMock(return_value={"week_plan": [{"advice": "テスト"}]})
+    app.dependency_overrides[get_plan_generator] = lambda: generator
+    return app
+
+
+async def test_plan_request_breakdown_for_admin(
+    timed_app: FastAPI, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings, "ADMIN_USER_IDS", [TEST_USER_ID])
+    async with AsyncClient(
+        transport=ASGITransport(app=timed_app), base_url="http://test"
+    ) as client:
+        res = await _post_plan(client, monkeypatch)
+    spans = _spans(res.headers["server-timing"])
+    for name in ("auth", "user", "signature", "cache", "llm", "store", "serialize", "total"):
+        assert name in spans
+    assert spans["total"] >= spans["llm"]
+
+
+async def test_plan_request_breakdown_hidden_from_users(
+    timed_app: FastAPI, monkeypatch: pytest.MonkeyPatch
+):
+    async with AsyncClient(
+        transport=ASGITransport(app=timed_app), base_url="http://test"
+    ) as client:
+        res = await _post_plan(client, monkeypatch)
+    assert res.status_code == 200
+    assert "server-timing" not in res.headers
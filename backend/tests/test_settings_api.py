@@ -4,8 +4,8 @@ GET /api/v1/settings と PUT /api/v1/settings の統合テスト（認証必須
 
 from httpx import AsyncClient
 
-from app.main import web_app as app
 from app.presentation.dependencies.auth import get_current_user_id
+from tests.conftest import fastapi_app as app
 
 
 class TestSettingsAPIAuth:
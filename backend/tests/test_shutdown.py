@@ -0,0 +1,143 @@
+"""
+シャットダウン時の生成の退避（ShutdownCoordinator・lifespan）のテスト
+遅い偽の生成の途中で SIGTERM を送り、新しい生成を断ること、リクエストがキャンセルされても
+実行中の生成が sleep_plan_cache に保存されること、期限を過ぎた生成だけがキャンセルされることを確認する。
+"""
+
+import asyncio
+import os
+import signal
+from dataclasses import replace
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+
+from app.application.shutdown import ShutdownCoordinator, ShuttingDownError, drain_on_signal
+from app.presentation.api.plan import get_plan_generator
+from app.presentation.dependencies.auth import get_current_user_id
+from tests.conftest import fastapi_app as app
+
+TODAY = "2026-03-02"
+PLAN_BODY = {"settings": {"wake_up_time": "07:00"}, "today_date": TODAY}
+
+
+class TestShutdownCoordinator:
+    async def test_drain_waits_for_in_flight_and_rejects_new_work(self):
+        coordinator = ShutdownCoordinator()
+        release = asyncio.Event()
+
+        async def generation() -> str:
+            await release.wait()
+            return "saved"
+
+        request = asyncio.create_task(coordinator.run(generation()))
+        await asyncio.sleep(0)
+        # uvicorn の --timeout-graceful-shutdown でリクエストがキャンセルされても生成は続く
+        request.cancel()
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        await coordinator.drain(deadline_seconds=5)
+
+        assert coordinator.snapshot() == {
+            "draining": True,
+            "in_flight": 0,
+            "rejected": 0,
+            "drained": 1,
+            "abandoned": 0,
+        }
+        with pytest.raises(ShuttingDownError):
+            coordinator.ensure_accepting()
+
+    async def test_generations_past_the_deadline_are_cancelled(self):
+        now = [0.0]
+        coordinator = ShutdownCoordinator(clock=lambda: now[0])
+        cancelled = asyncio.Event()
+
+        async def stuck() -> None:
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        request = asyncio.create_task(coordinator.run(stuck()))
+        await asyncio.sleep(0)
+        coordinator.begin_drain()
+        now[0] = 9.95  # SIGTERM から 9.95 秒経過（残り 0.05 秒）
+        await coordinator.drain(deadline_seconds=10)
+
+        assert cancelled.is_set()
+        assert coordinator.abandoned == 1
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+
+@pytest.fixture
+def sigterm_calls():
+    """uvicorn の代わりの SIGTERM ハンドラー（呼ばれた回数を記録する）"""
+    calls: list[int] = []
+    original = signal.signal(signal.SIGTERM, lambda sig, _frame: calls.append(sig))
+    yield calls
+    signal.signal(signal.SIGTERM, original)
+
+
+def test_drain_on_signal_chains_previous_handler(sigterm_calls):
+    coordinator = ShutdownCoordinator()
+    restore = drain_on_signal(coordinator)
+    os.kill(os.getpid(), signal.SIGTERM)
+    assert coordinator.draining
+    assert sigterm_calls == [signal.SIGTERM]
+    restore()
+    os.kill(os.getpid(), signal.SIGTERM)
+    assert sigterm_calls == [signal.SIGTERM] * 2
+
+
+async def test_sigterm_during_slow_generation_persists_the_plan(
+    client: AsyncClient,
+    unique_email: str,
+    sigterm_calls,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    coordinator = ShutdownCoordinator()
+    services = replace(app.state.plan_services, shutdown=coordinator)
+    monkeypatch.setattr(app.state, "plan_services", services)
+    user_id = (
+        await client.post("/api/v1/users", json={"email": unique_email, "name": "Drain"})
+    ).json()["id"]
+    app.dependency_overrides[get_current_user_id] = lambda: user_id
+
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_generation(*args, **kwargs):
+        started.set()
+        await release.wait()
+        return {"week_plan": [{"date": TODAY, "advice": "退避テスト"}]}
+
+    generator = AsyncMock()
+    generator.generate_week_plan = AsyncMock(side_effect=slow_generation)
+    app.dependency_overrides[get_plan_generator] = lambda: generator
+    try:
+        async with app.router.lifespan_context(app):
+            request = asyncio.create_task(client.post("/api/v1/sleep-plans", json=PLAN_BODY))
+            await started.wait()
+
+            os.kill(os.getpid(), signal.SIGTERM)
+            assert coordinator.draining
+            assert sigterm_calls == [signal.SIGTERM]  # uvicorn の終了処理も呼ばれる
+            assert (await client.get("/api/v1/health/ready")).status_code == 503
+            # 退避中の新しい生成は断る（キャッシュヒットなら返せる）
+            other = {**PLAN_BODY, "settings": {"wake_up_time": "06:00"}}
+            res = await client.post("/api/v1/sleep-plans", json=other)
+            assert res.status_code == 503
+            assert res.headers["Retry-After"] == "1"
+
+            # uvicorn の猶予切れでリクエストはキャンセルされる。生成は lifespan の終了で待つ
+            request.cancel()
+            asyncio.get_running_loop().call_later(0.05, release.set)
+        assert coordinator.drained == 1 and coordinator.abandoned == 0
+
+        res = await client.get("/api/v1/sleep-plans/current")
+        assert res.status_code == 200
+        assert res.json()["plan"]["week_plan"][0]["advice"] == "退避テスト"
+    finally:
+        app.dependency_overrides.pop(get_plan_generator, None)
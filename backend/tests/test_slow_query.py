@@ -0,0 +1,104 @@
+"""
+遅い SQL の記録のテスト
+SQL の正規化・パラメータの形・リングバッファ、実 DB での記録と EXPLAIN (ANALYZE, BUFFERS)、
+管理者限定のデバッグ API を検証する。
+"""
+
+from datetime import UTC, datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from app.config import settings
+from app.infrastructure.persistence import database
+from app.infrastructure.persistence.database import AsyncSessionLocal, engine
+from app.infrastructure.persistence.slow_query import (
+    SlowQuery,
+    SlowQueryLog,
+    install_slow_query_capture,
+    is_read_only,
+    normalize_sql,
+    parameter_shape,
+    uninstall_slow_query_capture,
+)
+from tests.conftest import TEST_USER_ID
+
+
+class TestNormalize:
+    def test_literals_and_in_lists_are_collapsed(self):
+        a = normalize_sql("SELECT *\n  FROM t WHERE id IN ($1::VARCHAR, $2::VARCHAR) AND n = 10")
+        b = normalize_sql(
+            "SELECT * FROM t WHERE id IN ($1::VARCHAR, $2::VARCHAR, $3::VARCHAR) AND n = 3"
+        )
+        assert a == b == "SELECT * FROM t WHERE id IN (...) AND n = ?"
+        assert normalize_sql("SELECT 'secret' AS s") == "SELECT ? AS s"
+
+    def test_parameter_shape_has_no_values(self):
+        assert parameter_shape(("alice@example.com", 3, None)) == "(str, int, NoneType)"
+        assert parameter_shape([("a", 1), ("b", 2)], executemany=True) == "2 x (str, int)"
+        assert "alice" not in parameter_shape({"email": "alice@example.com"})
+
+    def test_only_plain_selects_are_explained(self):
+        assert is_read_only("  select * from users")
+        assert not is_read_only("SELECT * FROM users FOR UPDATE")
+        assert not is_read_only("UPDATE users SET name = 'x'")
+
+    def test_ring_buffer_keeps_newest(self):
+        log = SlowQueryLog(max_entries=2)
+        for i in range(3):
+            log.add(SlowQuery(f"SELECT {i}", "()", 1.0, datetime.now(UTC), "db"))
+        assert [e.statement for e in log.entries()] == ["SELECT 2", "SELECT 1"]
+        assert log.recorded == 3
+
+
+class TestCapture:
+    @pytest.fixture
+    def capture(self):
+        log = SlowQueryLog(max_entries=50)
+        # 閾値をほぼ 0 にして全ての SQL を記録し、読み取りは必ず EXPLAIN する
+        capture = install_slow_query_capture(engine, log, 0.001, 1.0, sample=lambda: 0.0)
+        yield capture
+        uninstall_slow_query_capture(capture)
+
+    async def test_slow_select_gets_explain_analyze(self, capture):
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                text("SELECT count(*) FROM users WHERE email = :email"), {"email": "x@example.com"}
+            )
+        await capture.wait_explains()
+
+        (entry,) = [e for e in capture.log.entries() if "FROM users" in e.statement]
+        assert entry.parameters == "(str)"
+        assert entry.plan_error is None
+        assert entry.plan and any("Execution Time" in line for line in entry.plan)
+        # EXPLAIN 自身の SQL は記録しない
+        assert not any(e.statement.startswith("EXPLAIN") for e in capture.log.entries())
+        assert capture.log.explained == 1
+
+    async def test_writes_are_not_explained(self, capture):
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                text("UPDATE users SET name = name WHERE id = :id"), {"id": "no-such-user"}
+            )
+            await session.rollback()
+        await capture.wait_explains()
+        (entry,) = [e for e in capture.log.entries() if e.statement.startswith("UPDATE")]
+        assert entry.plan is None
+
+
+class TestDebugAPI:
+    async def test_non_admin_is_forbidden(self, client: AsyncClient):
+        res = await client.get("/api/v1/debug/slow-queries")
+        assert res.status_code == 403
+
+    async def test_admin_reads_and_clears(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(settings, "ADMIN_USER_IDS", [TEST_USER_ID])
+        database.slow_query_log.add(SlowQuery("SELECT ?", "(int)", 12.0, datetime.now(UTC), "db"))
+        body = (await client.get("/api/v1/debug/slow-queries")).json()
+        assert body["entries"][0]["statement"] == "SELECT ?"
+
+        assert (await client.delete("/api/v1/debug/slow-queries")).status_code == 204
+        assert (await client.get("/api/v1/debug/slow-queries")).json()["entries"] == []
@@ -0,0 +1,69 @@
+"""
+起動時間（import app.main）のテスト
+別プロセスで python -X importtime を実行し、重いモジュールを起動時に読み込んでいないこと、
+app.main の累計 import 時間が予算内であることを確認する。
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.application.shutdown import ShuttingDownError
+from app.main import create_app
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 実測は 0.7〜0.9 秒（docs/plan-cache.md「起動時間」）。CI の揺れを見込んだ上限
+IMPORT_BUDGET_MS = 2000
+
+# 最初に使うときまで読み込まないモジュール
+DEFERRED_MODULES = ["supabase", "app.infrastructure.llm.openrouter_client"]
+
+
+def _import_times() -> dict[str, float]:
+    """import app.main の -X importtime 出力を {モジュール名: 累計ミリ秒} にする"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative_us) / 1000
+    return times
+
+
+def test_import_skips_deferred_modules_and_stays_within_budget():
+    times = _import_times()
+    assert [m for m in DEFERRED_MODULES if m in times] == []
+    assert times["app.main"] < IMPORT_BUDGET_MS, f"import app.main: {times['app.main']:.0f}ms"
+
+
+def test_import_does_not_build_an_app():
+    import app.main as main
+
+    # uvicorn --factory app.main:create_app が起動時に作る
+    assert not hasattr(main, "web_app")
+
+
+def test_each_app_has_its_own_plan_services():
+    a, b = create_app(), create_app()
+    services_a, services_b = a.state.plan_services, b.state.plan_services
+    assert services_a.precomputer is not services_b.precomputer
+    assert services_a.breaker is not services_b.breaker
+    assert a.state.event_subscribers == [services_a.precomputer]
+    assert b.state.event_subscribers == [services_b.precomputer]
+
+    # A の退避中も B は新しい生成を受け付ける
+    services_a.shutdown.begin_drain()
+    with pytest.raises(ShuttingDownError):
+        services_a.shutdown.ensure_accepting()
+    services_b.shutdown.ensure_accepting()
+    assert services_b.shutdown.snapshot()["draining"] is False
@@ -0,0 +1,152 @@
+"""
+トレーシングのテスト
+スパンの親子関係・エラー状態・無効時の挙動、プラン取得のスパン木
+（ユースケース → リポジトリ → SQL）と LLM 呼び出しのトークン数属性を InMemorySpanExporter で検証する。
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+
+from app.application.tracing import (
+    NON_RECORDING_SPAN,
+    InMemorySpanExporter,
+    Span,
+    build_span_exporter,
+    get_current_span,
+    trace_async,
+    tracer,
+)
+from app.infrastructure.llm.openrouter_client import OpenRouterClient
+from app.infrastructure.llm.week_plan_output import WeekPlanOutputMetrics
+from app.presentation.api.plan import get_plan_generator
+from benchmarks.fake_openrouter import FakeOpenRouter
+from tests.conftest import fastapi_app as app
+
+TODAY = "2026-03-02"
+
+
+@pytest.fixture
+def exporter():
+    memory = InMemorySpanExporter()
+    tracer.exporter = memory
+    yield memory
+    tracer.exporter = None
+
+
+def _children(spans: list[Span], parent: Span) -> list[Span]:
+    return [s for s in spans if s.parent_span_id == parent.span_id]
+
+
+def _descendants(spans: list[Span], parent: Span) -> list[Span]:
+    found = []
+    for child in _children(spans, parent):
+        found += [child, *_descendants(spans, child)]
+    return found
+
+
+class TestTracer:
+    def test_nested_spans_share_trace_and_parent(self, exporter: InMemorySpanExporter):
+        with tracer.span("outer") as outer:
+            with tracer.span("inner", {"k": 1}):
+                assert get_current_span().name == "inner"
+            leaf = tracer.start_span("leaf")
+            tracer.end_span(leaf)
+        assert get_current_span() is NON_RECORDING_SPAN
+
+        spans = {s.name: s for s in exporter.get_finished_spans()}
+        assert spans["inner"].parent_span_id == outer.span_id
+        assert spans["leaf"].parent_span_id == outer.span_id
+        assert spans["outer"].parent_span_id is None
+        assert {s.trace_id for s in spans.values()} == {outer.trace_id}
+        assert spans["inner"].attributes == {"k": 1}
+        assert spans["outer"].status == "OK"
+
+    async def test_error_is_recorded(self, exporter: InMemorySpanExporter):
+        @trace_async("failing")
+        async def failing():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await failing()
+        (span,) = exporter.get_finished_spans()
+        assert span.status == "ERROR"
+        assert "boom" in (span.status_description or "")
+
+    def test_disabled_records_nothing(self):
+        assert build_span_exporter("none") is None
+        assert tracer.start_span("x") is None
+        with tracer.span("x") as span:
+            span.set_attribute("k", 1)
+        assert span is NON_RECORDING_SPAN
+
+    def test_unknown_exporter_is_rejected(self):
+        with pytest.raises(ValueError):
+            build_span_exporter("otlp-typo")
+
+
+class TestPlanSpans:
+    @pytest.fixture
+    def generator(self):
+        mock = AsyncMock()
+        mock.generate_week_plan = AsyncMock(return_value={"week_plan": [{"advice": "テスト"}]})
+        app.dependency_overrides[get_plan_generator] = lambda: mock
+        yield mock
+        app.dependency_overrides.pop(get_plan_generator, None)
+
+    async def test_usecase_repository_and_sql_spans(
+        self, client: AsyncClient, exporter: InMemorySpanExporter, generator
+    ):
+        body = {"calendar_events": [{"title": "trace"}], "today_date": TODAY}
+        assert (await client.post("/api/v1/sleep-plans", json=body)).status_code == 200
+
+        spans = exporter.get_finished_spans()
+        (usecase,) = [s for s in spans if s.name == "GetOrCreatePlanUseCase.execute"]
+        assert usecase.attributes["plan.cache_tier"] == "miss"
+        repo_calls = _children(spans, usecase)
+        lookup = next(s for s in repo_calls if s.name.endswith(".get_by_user_and_hash"))
+        assert lookup.attributes["db.rows"] == 0
+        # ShortLived リポジトリは内側のリポジトリを呼ぶため、SQL は孫以下のスパンになる
+        (statement,) = [s for s in _descendants(spans, lookup) if s.name == "db.statement"]
+        assert statement.trace_id == usecase.trace_id
+        assert statement.attributes["db.operation"] == "SELECT"
+        assert "sleep_plan_cache" in str(statement.attributes["db.statement"])
+        assert any(s.name.endswith(".upsert") for s in repo_calls)
+
+        exporter.clear()
+        await client.post("/api/v1/sleep-plans", json=body)
+        (usecase,) = [
+            s for s in exporter.get_finished_spans() if s.name == "GetOrCreatePlanUseCase.execute"
+        ]
+        assert usecase.attributes["plan.cache_tier"] == "week"
+
+    async def test_disabled_tracing_exports_nothing(
+        self, client: AsyncClient, exporter: InMemorySpanExporter, generator
+    ):
+        tracer.exporter = None
+        await client.post("/api/v1/sleep-plans", json={"today_date": TODAY})
+        assert exporter.get_finished_spans() == []
+
+
+class TestLlmSpans:
+    async def test_stream_span_has_token_counts(
+        self, exporter: InMemorySpanExporter, fake_openrouter: FakeOpenRouter
+    ):
+        client = OpenRouterClient(
+            api_key="fake",
+            base_url="http://fake/api/v1",
+            model="fake/model",
+            transport=fake_openrouter.transport,
+            metrics=WeekPlanOutputMetrics(),
+        )
+        _plan, usage = await client.generate_week_plan_with_usage([], [], {}, today_date=TODAY)
+
+        llm_spans = [s for s in exporter.get_finished_spans() if s.name == "llm.chat"]
+        assert llm_spans
+        attrs = llm_spans[0].attributes
+        assert attrs["llm.model"] == "fake/model"
+        assert attrs["llm.stream"] is True
+        assert attrs["llm.finish_reason"] == "stop"
+        assert sum(s.attributes["llm.prompt_tokens"] for s in llm_spans) == usage["prompt_tokens"]
+        assert attrs["llm.completion_tokens"] > 0
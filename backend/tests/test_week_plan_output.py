@@ -0,0 +1,106 @@
+"""
+週間プランの LLM 出力の逐次パース（WeekPlanStreamParser）と日ごとの検証のテスト
+"""
+
+import json
+
+import pytest
+
+from app.infrastructure.llm.week_plan_output import (
+    WEEK_PLAN_SCHEMA,
+    WeekPlanCollector,
+    WeekPlanOutputMetrics,
+    WeekPlanStreamParser,
+    validate_day,
+)
+from benchmarks.fake_openrouter import week_plan_fixture
+
+PLAN = week_plan_fixture("2026-03-02")
+BODY = json.dumps(PLAN, ensure_ascii=False)
+
+
+def _feed_in_chunks(text: str, size: int) -> WeekPlanStreamParser:
+    parser = WeekPlanStreamParser()
+    for i in range(0, len(text), size):
+        parser.feed(text[i : i + size])
+    return parser
+
+
+class TestWeekPlanStreamParser:
+    @pytest.mark.parametrize("size", [1, 7, 64, len(BODY)])
+    def test_yields_each_day_regardless_of_chunking(self, size: int):
+        parser = _feed_in_chunks(BODY, size)
+        assert parser.complete
+        assert parser.days == PLAN["week_plan"]
+
+    def test_days_arrive_before_the_document_closes(self):
+        parser = WeekPlanStreamParser()
+        first_day_end = BODY.index("}") + 1
+        assert parser.feed(BODY[:first_day_end]) == [PLAN["week_plan"][0]]
+        assert not parser.complete
+
+    def test_truncated_body_keeps_completed_days(self):
+        parser = _feed_in_chunks(BODY[: len(BODY) // 2], 16)
+        assert not parser.complete
+        assert 0 < len(parser.days) < 7
+        assert parser.days == PLAN["week_plan"][: len(parser.days)]
+
+    def test_skips_fence_and_braces_inside_strings(self):
+        day = dict(PLAN["week_plan"][0], advice='予定 "{会議}" の前に [早め] に寝ましょう\\')
+        body = "```json\n" + json.dumps({"week_plan": [day]}, ensure_ascii=False) + "\n```"
+        parser = _feed_in_chunks(body, 3)
+        assert parser.complete
+        assert parser.days == [day]
+
+    def test_top_level_array(self):
+        parser = _feed_in_chunks(json.dumps(PLAN["week_plan"][:2]), 5)
+        assert parser.complete and len(parser.days) == 2
+
+    def test_non_json_text_is_not_complete(self):
+        parser = _feed_in_chunks("申し訳ありませんが、プランを作成できませんでした。", 4)
+        assert not parser.complete and parser.days == []
+
+
+class TestValidateDay:
+    def test_fixture_days_are_valid(self):
+        assert all(validate_day(d) is None for d in PLAN["week_plan"])
+
+    @pytest.mark.parametrize(
+        ("override", "reason"),
+        [
+            ({"date": "月曜"}, "invalid date"),
+            ({"date": "2026-02-30"}, "invalid date"),
+            ({"recommended_bedtime": "25:00"}, "invalid recommended_bedtime"),
+            ({"recommended_wakeup": 7}, "invalid recommended_wakeup"),
+            ({"importance": "urgent"}, "invalid importance"),
+            ({"next_day_event": ["会議"]}, "invalid next_day_event"),
+            ({"advice": " "}, "empty advice"),
+        ],
+    )
+    def test_rejects_invalid_fields(self, override, reason):
+        assert validate_day({**PLAN["week_plan"][0], **override}) == reason
+
+    def test_accepts_midnight_as_24(self):
+        assert validate_day({**PLAN["week_plan"][0], "recommended_bedtime": "24:00"}) is None
+
+    def test_schema_requires_every_field(self):
+        day_schema = WEEK_PLAN_SCHEMA["properties"]["week_plan"]["items"]
+        assert set(day_schema["required"]) == set(day_schema["properties"])
+
+
+class TestWeekPlanCollector:
+    def test_tracks_missing_dates_and_orders_output(self):
+        metrics = WeekPlanOutputMetrics()
+        collector = WeekPlanCollector("2026-03-02", metrics)
+        days = PLAN["week_plan"]
+        for day in reversed(days[2:]):
+            collector.add(day)
+        collector.add({**days[0], "importance": "urgent"})
+        collector.add({**days[1], "date": "2026-04-01"})
+        assert collector.missing() == ["2026-03-02", "2026-03-03"]
+        assert metrics.invalid_days == 2
+
+        collector.add(days[0])
+        collector.add(days[1])
+        assert collector.missing() == []
+        assert collector.week_plan() == days
@@ -0,0 +1,56 @@
+"""
+週間プランのプロンプト（固定の system プレフィックス + ユーザーごとの user メッセージ）のテスト
+"""
+
+import hashlib
+
+from app.infrastructure.llm.openrouter_client import OpenRouterClient
+from app.infrastructure.llm.week_plan_output import WeekPlanOutputMetrics
+from app.infrastructure.llm.week_plan_prompt import (
+    PROMPT_VERSION,
+    SYSTEM_PROMPT,
+    build_messages,
+    build_user_content,
+)
+from benchmarks.fake_openrouter import FakeOpenRouter
+from benchmarks.hotpath import calendar_events, plan_settings, sleep_logs
+
+# SYSTEM_PROMPT を変えたら PROMPT_VERSION を上げ、ここにハッシュを追加する
+PROMPT_HASHES = {"week-plan-v2": "29f9448650424431"}
+
+
+def test_prompt_version_matches_system_prompt():
+    digest = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+    assert PROMPT_HASHES.get(PROMPT_VERSION) == digest
+
+
+def test_user_data_is_only_in_the_last_message():
+    a = build_messages(build_user_content([], [], plan_settings(False), "2026-03-02"))
+    b = build_messages(
+        build_user_content(calendar_events(5), sleep_logs(7), plan_settings(True), "2026-04-10")
+    )
+    assert a[0] == b[0]
+    assert a[0]["role"] == "system"
+    assert "2026-03-02" not in SYSTEM_PROMPT and "2026-04-10" not in SYSTEM_PROMPT
+    assert b[-1]["content"].startswith("今日の日付は 2026-04-10")
+    assert "今日のオーバーライド" in b[-1]["content"]
+    assert "今日のオーバーライド（" not in a[-1]["content"]
+
+
+async def test_repeated_requests_report_cached_prefix():
+    fake = FakeOpenRouter()
+    client = OpenRouterClient(
+        api_key="fake",
+        base_url="http://fake/api/v1",
+        model="fake/model",
+        transport=fake.transport,
+        metrics=WeekPlanOutputMetrics(),
+    )
+    _, first = await client.generate_week_plan_with_usage([], [], {}, today_date="2026-03-02")
+    _, second = await client.generate_week_plan_with_usage(
+        calendar_events(3), [], {}, today_date="2026-03-05"
+    )
+    assert first["cached_tokens"] == 0
+    assert second["cached_tokens"] > 0
+    assert second["first_token_ms"] >= 0
+    assert fake.requests[0]["messages"][0] == fake.requests[1]["messages"][0]